@@ -8,6 +8,8 @@ use App\Http\Requests\EdgeServerUpdateRequest;
 use App\Services\SubscriptionService;
 use Illuminate\Http\Request;
 use Illuminate\Http\JsonResponse;
+use App\Models\AiCommand;
+use App\Models\AiCommandLog;
 use App\Models\EdgeServer;
 use App\Models\EdgeServerLog;
 use App\Models\License;
@@ -16,6 +18,9 @@ use Illuminate\Support\Str;
 
 class EdgeController extends Controller
 {
+    // Commands delivered but not acknowledged within this many seconds are delivered again
+    private const COMMAND_REDELIVER_AFTER = 60;
+
     protected SubscriptionService $subscriptionService;
 
     public function __construct(SubscriptionService $subscriptionService)
@@ -567,10 +572,16 @@ class EdgeController extends Controller
                     ];
                 });
 
-            return response()->json([
+            $payload = [
                 'cameras' => $cameras,
                 'count' => $cameras->count(),
-            ]);
+            ];
+
+            // Edges poll this endpoint; answer 304 (no body) when their copy is current
+            $response = response()->json($payload)->setEtag(sha1(json_encode($payload)));
+            $response->isNotModified($request);
+
+            return $response;
         } catch (\Illuminate\Validation\ValidationException $e) {
             return response()->json([
                 'error' => 'Validation failed',
@@ -588,6 +599,116 @@ class EdgeController extends Controller
         }
     }
 
+    /**
+     * Fetch commands queued for this Edge Server (HMAC authenticated)
+     * GET /edges/commands/poll?wait=N&cursor=X
+     * 
+     * Answers right away instead of holding the request (a held request would
+     * keep a PHP worker busy per edge); the edge backs off while idle.
+     * Each command is claimed with a conditional update, so concurrent polls
+     * never deliver it twice. A command that is not acknowledged within
+     * COMMAND_REDELIVER_AFTER seconds is delivered again (the edge drops
+     * command ids it has already run).
+     */
+    public function pollCommands(Request $request): JsonResponse
+    {
+        $edge = $request->get('edge_server');
+
+        if (!$edge) {
+            return response()->json(['message' => 'Edge server not authenticated'], 401);
+        }
+
+        $cursor = (int) $request->query('cursor', 0);
+        $redeliverBefore = now()->subSeconds(self::COMMAND_REDELIVER_AFTER);
+
+        $candidates = AiCommand::where('organization_id', $edge->organization_id)
+            ->where(function ($query) use ($redeliverBefore) {
+                $query->where('status', 'queued')
+                    ->orWhere(function ($query) use ($redeliverBefore) {
+                        $query->where('status', 'sent')->where('updated_at', '<', $redeliverBefore);
+                    });
+            })
+            ->whereHas('targets', function ($query) use ($edge) {
+                $query->where('target_type', 'edge')->where('target_id', (string) $edge->id);
+            })
+            ->orderBy('id')
+            ->limit(50)
+            ->get();
+
+        // Claim: only the poll whose update still sees the row unchanged delivers it
+        $commands = $candidates->filter(function ($command) {
+            return AiCommand::where('id', $command->id)
+                ->where('status', $command->status)
+                ->where('updated_at', $command->updated_at)
+                ->update(['status' => 'sent']) === 1;
+        });
+
+        foreach ($commands as $command) {
+            AiCommandLog::create([
+                'ai_command_id' => $command->id,
+                'status' => 'sent',
+                'message' => $command->status === 'sent'
+                    ? 'Delivered again over the edge command channel (not acknowledged)'
+                    : 'Delivered over the edge command channel',
+            ]);
+        }
+
+        return response()->json([
+            'commands' => $commands->map(function ($command) {
+                return [
+                    'id' => $command->id,
+                    'command_type' => $command->payload['command_type'] ?? $command->title,
+                    'payload' => $command->payload,
+                    'issued_at' => $command->created_at?->toIso8601String(),
+                ];
+            })->values(),
+            'cursor' => (string) max($commands->max('id') ?? 0, $cursor),
+        ]);
+    }
+
+    /**
+     * Acknowledge a command executed by this Edge Server (HMAC authenticated)
+     * POST /edges/commands/{commandId}/ack
+     */
+    public function ackCommand(Request $request, int $commandId): JsonResponse
+    {
+        $edge = $request->get('edge_server');
+
+        if (!$edge) {
+            return response()->json(['message' => 'Edge server not authenticated'], 401);
+        }
+
+        $data = $request->validate([
+            'status' => 'required|string|in:acknowledged,completed,failed',
+            'result' => 'nullable|array',
+        ]);
+
+        $command = AiCommand::where('id', $commandId)
+            ->where('organization_id', $edge->organization_id)
+            ->whereHas('targets', function ($query) use ($edge) {
+                $query->where('target_type', 'edge')->where('target_id', (string) $edge->id);
+            })
+            ->first();
+
+        if (!$command) {
+            return response()->json(['message' => 'Command not found'], 404);
+        }
+
+        $command->update([
+            'status' => $data['status'],
+            'acknowledged_at' => now(),
+        ]);
+
+        AiCommandLog::create([
+            'ai_command_id' => $command->id,
+            'status' => $data['status'],
+            'message' => "Acknowledged by edge {$edge->edge_id}",
+            'meta' => $data['result'] ?? null,
+        ]);
+
+        return response()->json(['ok' => true]);
+    }
+
     /**
      * Get edge server statistics
      * Mobile app endpoint: GET /edge-servers/stats
@@ -91,7 +91,8 @@ class VerifyEdgeSignature
 
         // Build signature string: method|path|timestamp|body_hash
         $method = strtoupper($request->method());
-        $path = $request->path();
+        // Edges sign the absolute path (/api/v1/...); Request::path() has no leading slash
+        $path = '/' . ltrim($request->path(), '/');
         $bodyHash = hash('sha256', $request->getContent() ?: '');
         $signatureString = "{$method}|{$path}|{$timestamp}|{$bodyHash}";
 
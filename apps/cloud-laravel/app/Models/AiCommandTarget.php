@@ -4,6 +4,13 @@ namespace App\Models;
 
 class AiCommandTarget extends BaseModel
 {
+    protected $fillable = [
+        'ai_command_id',
+        'target_type',
+        'target_id',
+        'meta',
+    ];
+
     protected $casts = [
         'meta' => 'array',
     ];
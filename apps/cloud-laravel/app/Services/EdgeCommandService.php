@@ -2,6 +2,9 @@
 
 namespace App\Services;
 
+use App\Models\AiCommand;
+use App\Models\AiCommandLog;
+use App\Models\AiCommandTarget;
 use App\Models\EdgeServer;
 use Illuminate\Support\Facades\Http;
 use Illuminate\Support\Facades\Log;
@@ -133,6 +136,51 @@ class EdgeCommandService
         }
     }
 
+    /**
+     * Queue a command for the Edge Server's long-poll command channel
+     * 
+     * The edge picks it up on its next GET /edges/commands/poll, so it also
+     * reaches edges the Cloud cannot connect to.
+     * 
+     * @param EdgeServer $edgeServer
+     * @param string $command Command name (e.g., 'restart', 'sync_config')
+     * @param array $payload Optional payload data
+     * @return array Response data with success status
+     */
+    public function queueCommand(EdgeServer $edgeServer, string $command, array $payload = []): array
+    {
+        $aiCommand = AiCommand::create([
+            'organization_id' => $edgeServer->organization_id,
+            'title' => $command,
+            'status' => 'queued',
+            'payload' => ['command_type' => $command, ...$payload],
+        ]);
+
+        AiCommandTarget::create([
+            'ai_command_id' => $aiCommand->id,
+            'target_type' => 'edge',
+            'target_id' => (string) $edgeServer->id,
+        ]);
+
+        AiCommandLog::create([
+            'ai_command_id' => $aiCommand->id,
+            'status' => 'queued',
+            'message' => 'Command queued for the Edge Server command channel',
+        ]);
+
+        Log::info("Command queued for Edge Server", [
+            'edge_server_id' => $edgeServer->id,
+            'command' => $command,
+            'command_id' => $aiCommand->id,
+        ]);
+
+        return [
+            'success' => true,
+            'message' => 'Command queued for the Edge Server',
+            'data' => ['command_id' => $aiCommand->id]
+        ];
+    }
+
     /**
      * Restart Edge Server
      * 
@@ -141,7 +189,7 @@ class EdgeCommandService
      */
     public function restart(EdgeServer $edgeServer): array
     {
-        return $this->sendCommand($edgeServer, 'restart', []);
+        return $this->queueCommand($edgeServer, 'restart');
     }
 
     /**
@@ -152,7 +200,7 @@ class EdgeCommandService
      */
     public function syncConfig(EdgeServer $edgeServer): array
     {
-        return $this->sendCommand($edgeServer, 'sync_config', []);
+        return $this->queueCommand($edgeServer, 'sync_config');
     }
 
     /**
@@ -58,6 +58,8 @@ Route::prefix('v1')->group(function () {
     Route::middleware(['verify.edge.signature', 'throttle:100,1'])->group(function () {
         Route::post('/edges/events', [EventController::class, 'ingest']);
         Route::get('/edges/cameras', [EdgeController::class, 'getCamerasForEdge']);
+        Route::get('/edges/commands/poll', [EdgeController::class, 'pollCommands']);
+        Route::post('/edges/commands/{commandId}/ack', [EdgeController::class, 'ackCommand'])->whereNumber('commandId');
     });
 
     Route::middleware('auth:sanctum')->group(function () {
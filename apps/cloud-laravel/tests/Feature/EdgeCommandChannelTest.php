@@ -0,0 +1,128 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\AiCommand;
+use App\Models\EdgeServer;
+use App\Models\Organization;
+use App\Services\EdgeCommandService;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Tests\TestCase;
+
+class EdgeCommandChannelTest extends TestCase
+{
+    use RefreshDatabase;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+        $this->artisan('migrate:fresh');
+        $this->artisan('db:seed');
+    }
+
+    private function createEdge(?Organization $org = null, string $edgeId = 'test-edge'): EdgeServer
+    {
+        $org = $org ?? Organization::create([
+            'name' => 'Test Org',
+            'subscription_plan' => 'basic',
+            'is_active' => true,
+        ]);
+
+        return EdgeServer::create([
+            'organization_id' => $org->id,
+            'edge_id' => $edgeId,
+            'edge_key' => "{$edgeId}_key_123456789012345678901234567890",
+            'edge_secret' => "{$edgeId}_secret_123456789012345678901234567890123456789012345678901234567890",
+            'name' => 'Test Edge',
+            'online' => true,
+        ]);
+    }
+
+    private function signedHeaders(EdgeServer $edge, string $method, string $path, string $body = ''): array
+    {
+        $timestamp = time();
+        $message = "{$method}|{$path}|{$timestamp}|" . hash('sha256', $body);
+
+        return [
+            'X-EDGE-KEY' => $edge->edge_key,
+            'X-EDGE-TIMESTAMP' => (string) $timestamp,
+            'X-EDGE-SIGNATURE' => hash_hmac('sha256', $message, $edge->edge_secret),
+        ];
+    }
+
+    /** @test */
+    public function poll_requires_valid_hmac_signature()
+    {
+        $this->createEdge();
+
+        $this->getJson('/api/v1/edges/commands/poll?wait=0')->assertUnauthorized();
+    }
+
+    /** @test */
+    public function queued_command_is_delivered_once_and_acknowledged()
+    {
+        $edge = $this->createEdge();
+        $queued = app(EdgeCommandService::class)->restart($edge);
+        $commandId = $queued['data']['command_id'];
+
+        $path = '/api/v1/edges/commands/poll';
+        $response = $this->withHeaders($this->signedHeaders($edge, 'GET', $path))
+            ->getJson("{$path}?wait=0");
+
+        $response->assertOk()
+            ->assertJsonPath('commands.0.id', $commandId)
+            ->assertJsonPath('commands.0.command_type', 'restart')
+            ->assertJsonPath('cursor', (string) $commandId);
+        $this->assertSame('sent', AiCommand::find($commandId)->status);
+
+        // Already delivered: an idle poll returns no commands
+        $this->withHeaders($this->signedHeaders($edge, 'GET', $path))
+            ->getJson("{$path}?wait=0")
+            ->assertOk()
+            ->assertJsonCount(0, 'commands');
+
+        // postJson sends json_encode($ack), the body the signature covers
+        $ackPath = "/api/v1/edges/commands/{$commandId}/ack";
+        $ack = ['status' => 'completed', 'result' => ['success' => true]];
+        $this->postJson($ackPath, $ack, $this->signedHeaders($edge, 'POST', $ackPath, json_encode($ack)))
+            ->assertOk();
+
+        $command = AiCommand::find($commandId);
+        $this->assertSame('completed', $command->status);
+        $this->assertNotNull($command->acknowledged_at);
+    }
+
+    /** @test */
+    public function unacknowledged_command_is_delivered_again()
+    {
+        $edge = $this->createEdge();
+        $commandId = app(EdgeCommandService::class)->syncConfig($edge)['data']['command_id'];
+
+        $path = '/api/v1/edges/commands/poll';
+        $this->withHeaders($this->signedHeaders($edge, 'GET', $path))
+            ->getJson($path)
+            ->assertJsonPath('commands.0.id', $commandId);
+
+        // The response was lost: no ack, so the command comes back once the delivery expires
+        $this->travel(61)->seconds();
+        $this->withHeaders($this->signedHeaders($edge, 'GET', $path))
+            ->getJson("{$path}?cursor={$commandId}")
+            ->assertOk()
+            ->assertJsonPath('commands.0.id', $commandId);
+    }
+
+    /** @test */
+    public function edge_cannot_acknowledge_another_edges_command()
+    {
+        $edge = $this->createEdge();
+        $other = $this->createEdge($edge->organization, 'other-edge');
+        $commandId = app(EdgeCommandService::class)->restart($edge)['data']['command_id'];
+
+        $ackPath = "/api/v1/edges/commands/{$commandId}/ack";
+        $ack = ['status' => 'completed'];
+        $this->postJson($ackPath, $ack, $this->signedHeaders($other, 'POST', $ackPath, json_encode($ack)))
+            ->assertNotFound();
+
+        $this->assertSame('queued', AiCommand::find($commandId)->status);
+    }
+}
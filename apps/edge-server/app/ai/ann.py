@@ -0,0 +1,238 @@
+"""
+Approximate Nearest Neighbour Index
+Inverted-file (IVF) index in numpy for large embedding galleries
+"""
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+
+class IVFIndex:
+    """
+    Inverted-file index with a k-means coarse quantizer
+
+    Vectors are assigned to their nearest centroid; a query scans only the
+    nprobe lists whose centroids are closest to it. Supports incremental
+    add/remove (swap-delete inside a list) and persistence to a .npz file.
+    Distances are Euclidean.
+    """
+
+    def __init__(self, dim: int, nlist: int = 0, nprobe: int = 8):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self._vectors: List[np.ndarray] = []  # per list, preallocated capacity
+        self._ids: List[List[str]] = []
+        self._sizes: List[int] = []
+        self._where: Dict[str, Tuple[int, int]] = {}  # id -> (list, position)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self._where
+
+    @property
+    def is_trained(self) -> bool:
+        return len(self.centroids) > 0
+
+    def train(self, vectors: np.ndarray, iterations: int = 10, seed: int = 0):
+        """Fit the coarse quantizer with k-means on (a sample of) vectors"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        nlist = self.nlist or int(np.clip(4 * np.sqrt(n), 16, 4096))
+        nlist = max(1, min(nlist, n))
+        rng = np.random.default_rng(seed)
+
+        sample = vectors
+        if n > nlist * 40:
+            sample = vectors[rng.choice(n, nlist * 40, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._nearest(sample, centroids)
+            counts = np.bincount(assign, minlength=nlist)
+            order = np.argsort(assign, kind='stable')
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            if empty.any():
+                # Re-seed empty clusters with random samples
+                centroids[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+
+        self.nlist = nlist
+        self.centroids = centroids
+        self._vectors = [np.zeros((0, self.dim), dtype=np.float32) for _ in range(nlist)]
+        self._ids = [[] for _ in range(nlist)]
+        self._sizes = [0] * nlist
+        self._where.clear()
+
+    @staticmethod
+    def _sq_distances(queries: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        sq = (
+            np.einsum('ij,ij->i', queries, queries)[:, None]
+            + np.einsum('ij,ij->i', vectors, vectors)[None, :]
+            - 2.0 * (queries @ vectors.T)
+        )
+        return np.maximum(sq, 0.0, out=sq)
+
+    def _nearest(self, vectors: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        out = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            block = vectors[start:start + chunk]
+            out[start:start + chunk] = self._sq_distances(block, centroids).argmin(axis=1)
+        return out
+
+    def add(self, ids: Iterable[str], vectors: np.ndarray):
+        """Add (or replace) vectors"""
+        ids = list(ids)
+        if not ids:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        if not self.is_trained:
+            self.train(vectors)
+
+        self.remove([i for i in ids if i in self._where])
+        assign = self._nearest(vectors, self.centroids)
+        for list_no in np.unique(assign):
+            rows = np.nonzero(assign == list_no)[0]
+            self._append(int(list_no), [ids[r] for r in rows], vectors[rows])
+
+    def _append(self, list_no: int, ids: List[str], vectors: np.ndarray):
+        size = self._sizes[list_no]
+        storage = self._vectors[list_no]
+        needed = size + len(ids)
+        if needed > len(storage):
+            grown = np.zeros((max(needed, 2 * len(storage), 16), self.dim), dtype=np.float32)
+            grown[:size] = storage[:size]
+            storage = self._vectors[list_no] = grown
+        storage[size:needed] = vectors
+        list_ids = self._ids[list_no]
+        for offset, vector_id in enumerate(ids):
+            list_ids.append(vector_id)
+            self._where[vector_id] = (list_no, size + offset)
+        self._sizes[list_no] = needed
+
+    def remove(self, ids: Iterable[str]):
+        """Remove vectors by id (unknown ids are ignored)"""
+        for vector_id in ids:
+            location = self._where.pop(vector_id, None)
+            if location is None:
+                continue
+            list_no, pos = location
+            last = self._sizes[list_no] - 1
+            list_ids = self._ids[list_no]
+            if pos != last:
+                # Swap-delete: move the last entry into the hole
+                storage = self._vectors[list_no]
+                storage[pos] = storage[last]
+                moved = list_ids[last]
+                list_ids[pos] = moved
+                self._where[moved] = (list_no, pos)
+            list_ids.pop()
+            self._sizes[list_no] = last
+
+    def search(self, queries: np.ndarray, k: int = 1, nprobe: Optional[int] = None) -> Tuple[List[List[str]], np.ndarray]:
+        """
+        Approximate k nearest neighbours per query
+
+        Returns:
+            (ids, distances): ids is a list of up to k ids per query,
+            distances an (m, k) array padded with inf
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        m = len(queries)
+        distances = np.full((m, k), np.inf, dtype=np.float32)
+        found: List[List[str]] = [[] for _ in range(m)]
+        if not len(self):
+            return found, distances
+
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_sq = self._sq_distances(queries, self.centroids)
+        if nprobe < self.nlist:
+            probes = np.argpartition(centroid_sq, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), centroid_sq.shape)
+
+        for q in range(m):
+            lists = [int(l) for l in probes[q] if self._sizes[l]]
+            if not lists:
+                continue
+            candidates = np.concatenate([self._vectors[l][:self._sizes[l]] for l in lists])
+            sq = self._sq_distances(queries[q:q + 1], candidates)[0]
+            kk = min(k, len(sq))
+            top = np.argpartition(sq, kk - 1)[:kk] if kk < len(sq) else np.arange(len(sq))
+            top = top[np.argsort(sq[top])]
+
+            offsets = np.cumsum([0] + [self._sizes[l] for l in lists])
+            for rank, index in enumerate(top):
+                slot = int(np.searchsorted(offsets, index, side='right') - 1)
+                found[q].append(self._ids[lists[slot]][index - offsets[slot]])
+                distances[q, rank] = np.sqrt(sq[index])
+
+        return found, distances
+
+    def save(self, path: str, extra: Optional[Dict[str, np.ndarray]] = None):
+        """Persist the index atomically to a .npz file"""
+        sizes = np.asarray(self._sizes, dtype=np.int64)
+        vectors = (
+            np.concatenate([self._vectors[l][:s] for l, s in enumerate(self._sizes)])
+            if len(self) else np.zeros((0, self.dim), dtype=np.float32)
+        )
+        ids = np.asarray([i for list_ids in self._ids for i in list_ids], dtype=str)
+
+        # A private temp file per save: concurrent writers never share one
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path), suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    dim=np.int64(self.dim),
+                    nprobe=np.int64(self.nprobe),
+                    centroids=self.centroids,
+                    sizes=sizes,
+                    vectors=vectors,
+                    ids=ids,
+                    **(extra or {})
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Tuple['IVFIndex', Dict[str, np.ndarray]]:
+        """
+        Load an index saved with save()
+
+        Returns:
+            (index, extra arrays stored alongside it)
+        """
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+
+        index = cls(int(arrays.pop('dim')), nprobe=int(arrays.pop('nprobe')))
+        index.centroids = arrays.pop('centroids').astype(np.float32)
+        index.nlist = len(index.centroids)
+        sizes = arrays.pop('sizes')
+        vectors = arrays.pop('vectors').astype(np.float32)
+        ids = arrays.pop('ids').tolist()
+
+        index._vectors, index._ids, index._sizes = [], [], []
+        start = 0
+        for list_no, size in enumerate(sizes.tolist()):
+            index._vectors.append(vectors[start:start + size].copy())
+            index._ids.append(ids[start:start + size])
+            index._sizes.append(size)
+            for pos, vector_id in enumerate(index._ids[-1]):
+                index._where[vector_id] = (list_no, pos)
+            start += size
+
+        logger.info(f"Loaded ANN index with {len(index)} vectors from {path}")
+        return index, arrays
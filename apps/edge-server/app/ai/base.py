@@ -3,16 +3,61 @@ Base AI Module
 All AI modules inherit from this base class
 """
 from abc import ABC, abstractmethod
+from functools import wraps
+from time import perf_counter
 from typing import Dict, List, Optional, Any
 import numpy as np
 from loguru import logger
 
+from app.core.metrics import AI_MODULE_LATENCY
+
+
+def _timed(process_frame):
+    """Record process_frame latency in the module's histogram series"""
+    @wraps(process_frame)
+    def wrapper(self, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return process_frame(self, *args, **kwargs)
+        finally:
+            self._latency.observe(perf_counter() - start)
+    wrapper._timed = True
+    return wrapper
+
 
 class BaseAIModule(ABC):
     """
     Base class for all AI processing modules
     All modules must implement process_frame method
     """
+
+    # Modules that consume the shared detector pass set this to True.
+    # detector_classes lists the COCO class ids they need (None = all classes)
+    uses_shared_detector: bool = False
+    detector_classes: Optional[List[int]] = None
+
+    # Motion gate: gated modules are skipped on frames without motion in
+    # their regions of interest (motion_threshold None = MOTION_THRESHOLD)
+    motion_gated: bool = True
+    motion_threshold: Optional[float] = None
+
+    # Modules that read faces get the frame's shared FaceAnalysis attached
+    uses_face_analysis: bool = False
+
+    # Modules that read the camera's shared PersonTracks (track service)
+    uses_person_tracks: bool = False
+
+    # Modules that can work on frames without a fresh detector pass (their
+    # persons come from the propagated tracks); the shared pass is skipped
+    # for a camera only while every consumer propagates
+    propagates_tracks: bool = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every concrete process_frame is timed (edge_ai_module_seconds)
+        process_frame = cls.__dict__.get("process_frame")
+        if process_frame is not None and not getattr(process_frame, "_timed", False):
+            cls.process_frame = _timed(process_frame)
     
     def __init__(self, module_id: str, module_name: str, confidence_threshold: float = 0.5):
         self.module_id = module_id
@@ -20,6 +65,10 @@ class BaseAIModule(ABC):
         self.confidence_threshold = confidence_threshold
         self.enabled = False
         self._initialized = False
+        self._shared_detections = None
+        self._face_analysis = None
+        self._person_tracks = None
+        self._latency = AI_MODULE_LATENCY.labels(module_id)
 
     @abstractmethod
     def initialize(self) -> bool:
@@ -80,10 +129,81 @@ class BaseAIModule(ABC):
         self.confidence_threshold = max(0.0, min(1.0, threshold))
         logger.debug(f"Module '{self.module_name}' confidence threshold: {self.confidence_threshold}")
 
+    def detector_confidence(self) -> float:
+        """Lowest confidence this module needs from the shared detector"""
+        return self.confidence_threshold
+
+    def unavailable_stages(self) -> List[str]:
+        """Pipeline stages that failed to initialize (the module runs limited without them)"""
+        return []
+
+    def attach_detections(self, detections):
+        """Attach the shared detector result for the frame being processed"""
+        self._shared_detections = detections
+
+    def shared_detections(
+        self,
+        classes: Optional[List[int]] = None,
+        confidence: Optional[float] = None
+    ) -> Optional[List[Dict]]:
+        """
+        Get shared detector results for the current frame
+
+        Returns None when no shared pass was attached, so the module
+        can fall back to running its own model
+        """
+        if self._shared_detections is None:
+            return None
+        return self._shared_detections.filter(
+            classes if classes is not None else self.detector_classes,
+            self.confidence_threshold if confidence is None else confidence
+        )
+
+    def detection_keyframe(self) -> bool:
+        """False when the attached detections were carried over from an earlier pass"""
+        return self._shared_detections is None or self._shared_detections.keyframe
+
+    def attach_person_tracks(self, tracks):
+        """Attach the camera's tracked persons for the frame being processed"""
+        self._person_tracks = tracks
+
+    def person_tracks(self):
+        """
+        Get the shared PersonTracks of the current frame
+
+        Returns None when no track service result was attached, so the
+        module can fall back to its own detection
+        """
+        return self._person_tracks
+
+    def attach_face_analysis(self, analysis):
+        """Attach the shared face analysis for the frame being processed"""
+        self._face_analysis = analysis
+
+    def motion_roi(self, camera_id: str, metadata: Optional[Dict] = None) -> Optional[List[List[int]]]:
+        """
+        Regions [x, y, w, h] where motion matters to this module
+
+        Returns None to use the whole frame
+        """
+        return None
+
+    def keep_alive(self, camera_id: str, metadata: Optional[Dict] = None):
+        """
+        Lightweight update for a frame the motion gate skipped
+
+        Stateful modules override this to keep their tracks alive while
+        the scene is static
+        """
+        pass
+
     def cleanup(self):
         """Cleanup resources"""
         self.enabled = False
         self._initialized = False
+        self._shared_detections = None
+        self._face_analysis = None
+        self._person_tracks = None
 
 
 
@@ -0,0 +1,338 @@
+"""
+Shared Detector
+Runs the YOLO detector once per frame and shares the result between modules
+"""
+import importlib.util
+import time
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+import numpy as np
+from loguru import logger
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+
+DEFAULT_WEIGHTS = 'yolov8n.pt'
+
+# COCO class names (YOLOv8 uses COCO dataset)
+COCO_CLASS_NAMES = [
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck',
+    'boat', 'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench',
+    'bird', 'cat', 'dog', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra',
+    'giraffe', 'backpack', 'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee',
+    'skis', 'snowboard', 'sports ball', 'kite', 'baseball bat', 'baseball glove',
+    'skateboard', 'surfboard', 'tennis racket', 'bottle', 'wine glass', 'cup',
+    'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple', 'sandwich', 'orange',
+    'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair', 'couch',
+    'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse',
+    'remote', 'keyboard', 'cell phone', 'microwave', 'oven', 'toaster', 'sink',
+    'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier',
+    'toothbrush'
+]
+
+# One model instance per weights file for the whole process
+_model_cache: Dict[str, Any] = {}
+
+
+def require_yolo(weights: str = DEFAULT_WEIGHTS):
+    """
+    Check that load_yolo(weights) can succeed without loading anything
+
+    Raises ImportError if ultralytics is not installed and the weights are
+    not already loaded
+    """
+    if weights not in _model_cache and importlib.util.find_spec("ultralytics") is None:
+        raise ImportError("ultralytics is not installed")
+
+
+def load_yolo(weights: str = DEFAULT_WEIGHTS):
+    """
+    Load a YOLO model, reusing an already loaded instance for the same weights
+
+    Raises ImportError if ultralytics is not installed
+    """
+    model = _model_cache.get(weights)
+    if model is None:
+        from ultralytics import YOLO
+        model = YOLO(weights)
+        _model_cache[weights] = model
+    return model
+
+
+def letterbox(
+    frame: np.ndarray,
+    size: int,
+    pad_value: int = 114
+) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize a frame to size x size keeping aspect ratio, padding the rest
+
+    Returns:
+        (image, scale, (pad_x, pad_y)) - boxes on the image map back to the
+        original frame with (box - pad) / scale
+    """
+    h, w = frame.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+    image = np.full((size, size, frame.shape[2]) if frame.ndim == 3 else (size, size), pad_value, dtype=frame.dtype)
+    if CV2_AVAILABLE:
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    else:
+        # Nearest-neighbour fallback without OpenCV
+        ys = (np.arange(new_h) / scale).astype(np.int32).clip(0, h - 1)
+        xs = (np.arange(new_w) / scale).astype(np.int32).clip(0, w - 1)
+        resized = frame[ys][:, xs]
+    image[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+
+    return image, scale, (pad_x, pad_y)
+
+
+class DetectionSet:
+    """
+    Detections produced by one detector pass over a frame
+    Boxes are stored as xyxy float arrays so per-module filtering stays vectorized
+    keyframe is False for a set carried over to a frame the detector skipped
+    """
+
+    __slots__ = ('boxes', 'confidences', 'class_ids', 'keyframe')
+
+    def __init__(
+        self,
+        boxes: np.ndarray,
+        confidences: np.ndarray,
+        class_ids: np.ndarray,
+        keyframe: bool = True
+    ):
+        self.boxes = boxes.reshape(-1, 4).astype(np.float32, copy=False)
+        self.confidences = confidences.reshape(-1).astype(np.float32, copy=False)
+        self.class_ids = class_ids.reshape(-1).astype(np.int32, copy=False)
+        self.keyframe = keyframe
+
+    @classmethod
+    def empty(cls) -> 'DetectionSet':
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0))
+
+    def __len__(self) -> int:
+        return len(self.confidences)
+
+    def carried_over(self) -> 'DetectionSet':
+        """The same detections, marked as coming from an earlier frame"""
+        return DetectionSet(self.boxes, self.confidences, self.class_ids, keyframe=False)
+
+    def unletterbox(self, scale: float, pad: Tuple[int, int]) -> 'DetectionSet':
+        """Map boxes from letterboxed coordinates back to the original frame"""
+        if len(self) and scale > 0:
+            self.boxes[:, [0, 2]] -= pad[0]
+            self.boxes[:, [1, 3]] -= pad[1]
+            self.boxes /= scale
+        return self
+
+    def filter(
+        self,
+        classes: Optional[Iterable[int]] = None,
+        confidence: float = 0.0
+    ) -> List[Dict]:
+        """
+        Get detections for the given classes above a confidence threshold
+
+        Args:
+            classes: COCO class ids to keep (None keeps every class)
+            confidence: Minimum confidence
+
+        Returns:
+            List of detections in the module format:
+            [{'bbox': [x, y, w, h], 'confidence': float, 'center': (x, y), 'class_id': int}]
+        """
+        mask = self.confidences >= confidence
+        if classes is not None:
+            mask &= np.isin(self.class_ids, list(classes))
+
+        detections = []
+        for (x1, y1, x2, y2), conf, class_id in zip(
+            self.boxes[mask], self.confidences[mask], self.class_ids[mask]
+        ):
+            detections.append({
+                'bbox': [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],
+                'confidence': float(conf),
+                'center': (int((x1 + x2) / 2), int((y1 + y2) / 2)),
+                'class_id': int(class_id),
+            })
+        return detections
+
+
+class SharedDetector:
+    """
+    Shared detection stage
+    Runs the detector once per frame with the union of the classes that all
+    enabled modules need, instead of one forward pass per module
+    """
+
+    def __init__(self, weights: str = DEFAULT_WEIGHTS):
+        self.weights = weights
+        self._model = None
+        self._initialized = False
+        self.last_inference_ms = 0.0
+        self.stats = {
+            'frames': 0,
+            'passes_run': 0,
+            'passes_saved': 0,
+            'frames_propagated': 0,
+            'inference_ms_total': 0.0,
+        }
+
+    def initialize(self) -> bool:
+        """Load the shared detector model"""
+        if self._initialized:
+            return self._model is not None
+
+        self._initialized = True
+        try:
+            self._model = load_yolo(self.weights)
+            logger.info(f"Shared detector initialized with {self.weights}")
+        except ImportError:
+            logger.warning("ultralytics not installed - shared detector disabled")
+            self._model = None
+        except Exception as e:
+            logger.warning(f"Could not load shared detector model: {e}")
+            self._model = None
+        return self._model is not None
+
+    @property
+    def available(self) -> bool:
+        return self._model is not None
+
+    def detect(
+        self,
+        frame: np.ndarray,
+        classes: Optional[Iterable[int]] = None,
+        confidence: float = 0.25,
+        consumers: int = 1
+    ) -> DetectionSet:
+        """
+        Run one detector pass over a frame
+
+        Args:
+            frame: Input frame
+            classes: Union of COCO class ids needed (None = all classes)
+            confidence: Lowest confidence threshold among consumers
+            consumers: Number of modules served by this pass (for stats)
+        """
+        if not self._model:
+            return DetectionSet.empty()
+
+        started = time.perf_counter()
+        try:
+            kwargs = {'conf': confidence, 'verbose': False}
+            if classes is not None:
+                kwargs['classes'] = sorted(classes)
+            results = self._model(frame, **kwargs)
+            detections = self._to_detection_set(results)
+        except Exception as e:
+            logger.error(f"Shared detector error: {e}")
+            detections = DetectionSet.empty()
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+        self.stats['frames'] += 1
+        self.stats['passes_run'] += 1
+        self.stats['passes_saved'] += max(0, consumers - 1)
+        self.stats['inference_ms_total'] += elapsed_ms
+        self.last_inference_ms = elapsed_ms
+
+        return detections
+
+    def detect_batch(
+        self,
+        frames: List[np.ndarray],
+        classes: Optional[Iterable[int]] = None,
+        confidence: float = 0.25,
+        consumers: int = 1,
+        input_size: Optional[int] = None
+    ) -> List[DetectionSet]:
+        """
+        Run one detector call over a batch of frames (possibly from different cameras)
+
+        Args:
+            frames: Input frames
+            classes: Union of COCO class ids needed (None = all classes)
+            confidence: Lowest confidence threshold among consumers
+            consumers: Number of module passes served by this call (for stats)
+            input_size: Letterbox frames to this size before inference so the
+                whole batch shares one tensor shape (None = let the model resize)
+
+        Returns:
+            One DetectionSet per frame, in original frame coordinates
+        """
+        if not self._model or not frames:
+            return [DetectionSet.empty() for _ in frames]
+
+        started = time.perf_counter()
+        try:
+            inputs, transforms = frames, None
+            if input_size:
+                boxed = [letterbox(frame, input_size) for frame in frames]
+                inputs = [image for image, _, _ in boxed]
+                transforms = [(scale, pad) for _, scale, pad in boxed]
+
+            kwargs = {'conf': confidence, 'verbose': False}
+            if classes is not None:
+                kwargs['classes'] = sorted(classes)
+            if input_size:
+                kwargs['imgsz'] = input_size
+            results = self._model(inputs, **kwargs)
+
+            detections = [self._to_detection_set([result]) for result in results]
+            if transforms:
+                detections = [
+                    dets.unletterbox(scale, pad)
+                    for dets, (scale, pad) in zip(detections, transforms)
+                ]
+        except Exception as e:
+            logger.error(f"Shared detector batch error: {e}")
+            detections = [DetectionSet.empty() for _ in frames]
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+        self.stats['frames'] += len(frames)
+        self.stats['passes_run'] += 1
+        self.stats['passes_saved'] += max(0, consumers - 1)
+        self.stats['inference_ms_total'] += elapsed_ms
+        self.last_inference_ms = elapsed_ms
+
+        return detections
+
+    def record_propagated(self, frames: int = 1):
+        """Count frames whose consumers propagated tracks instead of getting a pass"""
+        self.stats['frames_propagated'] += frames
+
+    def _to_detection_set(self, results) -> DetectionSet:
+        """Convert ultralytics results into a DetectionSet"""
+        boxes, confidences, class_ids = [], [], []
+        for result in results:
+            if result.boxes is None or len(result.boxes) == 0:
+                continue
+            boxes.append(result.boxes.xyxy.cpu().numpy())
+            confidences.append(result.boxes.conf.cpu().numpy())
+            class_ids.append(result.boxes.cls.cpu().numpy())
+
+        if not boxes:
+            return DetectionSet.empty()
+
+        return DetectionSet(
+            np.concatenate(boxes),
+            np.concatenate(confidences),
+            np.concatenate(class_ids)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get detector usage statistics"""
+        stats = dict(self.stats)
+        passes = stats['passes_run']
+        stats['avg_inference_ms'] = stats['inference_ms_total'] / passes if passes else 0.0
+        stats['inference_ms_saved'] = stats['avg_inference_ms'] * stats['passes_saved']
+        total = stats['frames'] + stats['frames_propagated']
+        stats['propagated_ratio'] = stats['frames_propagated'] / total if total else 0.0
+        return stats
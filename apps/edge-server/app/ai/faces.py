@@ -0,0 +1,269 @@
+"""
+Face Analysis
+Detects and encodes the faces of a frame once and shares them between modules
+"""
+import os
+import time
+from typing import Dict, List, Optional, Any, Tuple
+import numpy as np
+from loguru import logger
+
+from app.ai.gallery import EmbeddingGallery
+from config.settings import settings
+
+
+class FaceAnalysis:
+    """
+    Face detections and embeddings of one frame
+
+    Everything is computed lazily and at most once: the colour conversion
+    on first access, detection when faces are first read and one batched
+    encoding call for all faces when embeddings are first needed.
+    """
+
+    def __init__(self, analyzer: 'FaceAnalyzer', camera_id: str, seq: Optional[int], frame: np.ndarray):
+        self.analyzer = analyzer
+        self.camera_id = camera_id
+        self.seq = seq
+        self.frame = frame
+        self._rgb: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+        self._faces: Optional[List[Dict]] = None
+        self._encodings: Optional[List[Optional[np.ndarray]]] = None
+        self._matches: Dict[Tuple[int, float], List[Optional[Tuple[Dict, float]]]] = {}
+
+    @property
+    def rgb(self) -> np.ndarray:
+        if self._rgb is None:
+            self._rgb = self.analyzer.cv2.cvtColor(self.frame, self.analyzer.cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = self.analyzer.cv2.cvtColor(self.frame, self.analyzer.cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def faces(self) -> List[Dict]:
+        """Detected faces: [{'bbox': [x, y, w, h], 'confidence', 'location'}]"""
+        if self._faces is None:
+            self._faces = self.analyzer.detect(self)
+        return self._faces
+
+    @property
+    def encodings(self) -> List[Optional[np.ndarray]]:
+        """One embedding per face (None where the face could not be encoded)"""
+        if self._encodings is None:
+            self._encodings = self.analyzer.encode(self)
+        return self._encodings
+
+    def match(self, gallery: EmbeddingGallery, max_distance: float) -> List[Optional[Tuple[Dict, float]]]:
+        """
+        Best gallery match per face within max_distance
+
+        Results are cached per gallery and distance, so modules sharing the
+        gallery search it once per frame
+
+        Returns:
+            One (record, distance) or None per face
+        """
+        key = (id(gallery), max_distance)
+        cached = self._matches.get(key)
+        if cached is not None:
+            return cached
+
+        matches: List[Optional[Tuple[Dict, float]]] = [None] * len(self.faces)
+        if len(gallery) and self.faces:
+            encoded = [i for i, e in enumerate(self.encodings) if e is not None]
+            if encoded:
+                found = gallery.match(np.stack([self.encodings[i] for i in encoded]), max_distance)
+                for i, best in zip(encoded, found):
+                    matches[i] = best
+        self._matches[key] = matches
+        return matches
+
+
+class FaceAnalyzer:
+    """
+    Shared face detector/encoder
+
+    AIModuleManager owns one analyzer and attaches a FaceAnalysis per
+    (camera_id, frame sequence) to the face-consuming modules, so the
+    colour conversion, detection and dlib encoding run once per frame no
+    matter how many modules read the faces. The registered-face gallery is
+    also shared.
+    """
+
+    def __init__(self, index_path: Optional[str] = None):
+        """
+        Args:
+            index_path: Where the gallery's IVF index is saved; processes
+                running their own analyzer need separate paths
+        """
+        self.gallery = EmbeddingGallery(
+            index_path=index_path or os.path.join(settings.cache_dir, 'face_ann_index.npz')
+        )
+        self.face_database: Dict[str, Dict] = {}  # face_id -> face_data
+        self.cv2 = None
+        self.face_recognition = None
+        self._cascade = None
+        self._initialized = False
+        self._latest: Dict[str, FaceAnalysis] = {}  # camera_id -> latest analysis
+
+        self._stats = {
+            'frames': 0,
+            'reused': 0,
+            'detections': 0,
+            'encoded_faces': 0,
+            'detect_ms': 0.0,
+            'encode_ms': 0.0,
+        }
+
+    def initialize(self) -> bool:
+        """Load face_recognition, falling back to OpenCV detection only"""
+        if self._initialized:
+            return True
+        try:
+            import cv2
+            self.cv2 = cv2
+        except ImportError:
+            logger.error("OpenCV is required for face analysis")
+            return False
+
+        try:
+            import face_recognition
+            self.face_recognition = face_recognition
+            logger.info("Face analysis initialized with face_recognition library")
+        except ImportError:
+            logger.warning("face_recognition library not installed. Install with: pip install face-recognition dlib")
+            logger.warning("Falling back to OpenCV face detection only")
+            self._cascade = self.cv2.CascadeClassifier(
+                self.cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+            )
+            if self._cascade.empty():
+                logger.error("Failed to load OpenCV face detector")
+                return False
+            logger.info("Face analysis initialized with OpenCV (detection only)")
+
+        self._initialized = True
+        return True
+
+    @property
+    def can_encode(self) -> bool:
+        return self.face_recognition is not None
+
+    def sync(self, metadata: Optional[Dict]):
+        """Update the shared gallery from sync metadata (only when its version changes)"""
+        if not metadata or 'faces_database' not in metadata:
+            return
+        faces = metadata.get('faces_database') or []
+        if self.gallery.sync(faces, metadata.get('faces_version'), metadata.get('faces_delta')):
+            self.face_database = {face.get('id'): face for face in faces}
+
+    def analysis(self, camera_id: str, frame: np.ndarray, seq: Optional[int] = None) -> FaceAnalysis:
+        """
+        Get the analysis of a camera's frame
+
+        The latest analysis per camera is cached under its sequence number;
+        without a sequence number a fresh analysis is returned
+        """
+        cached = self._latest.get(camera_id)
+        if seq is not None and cached is not None and cached.seq == seq:
+            self._stats['reused'] += 1
+            return cached
+
+        analysis = FaceAnalysis(self, camera_id, seq, frame)
+        self._latest[camera_id] = analysis
+        self._stats['frames'] += 1
+        return analysis
+
+    def release(self, camera_id: str):
+        """Drop the cached analysis (and its frame reference) of a camera"""
+        self._latest.pop(camera_id, None)
+
+    def detect(self, analysis: FaceAnalysis) -> List[Dict]:
+        """Detect faces in an analysis' frame"""
+        faces = []
+        if not self._initialized:
+            return faces
+
+        start = time.perf_counter()
+        try:
+            if self.face_recognition:
+                for top, right, bottom, left in self.face_recognition.face_locations(analysis.rgb, model='hog'):
+                    faces.append({
+                        'bbox': [left, top, right - left, bottom - top],
+                        'confidence': 0.95,  # face_recognition doesn't provide confidence
+                        'location': (top, right, bottom, left),  # For encoding
+                    })
+            else:
+                face_rects = self._cascade.detectMultiScale(
+                    analysis.gray,
+                    scaleFactor=1.1,
+                    minNeighbors=5,
+                    minSize=(30, 30)
+                )
+                for (x, y, w, h) in face_rects:
+                    faces.append({
+                        'bbox': [int(x), int(y), int(w), int(h)],
+                        'confidence': 0.85,  # OpenCV doesn't provide confidence
+                        'location': None,
+                    })
+        except Exception as e:
+            logger.error(f"Error detecting faces: {e}")
+
+        self._stats['detections'] += len(faces)
+        self._stats['detect_ms'] += (time.perf_counter() - start) * 1000
+        return faces
+
+    def encode(self, analysis: FaceAnalysis) -> List[Optional[np.ndarray]]:
+        """Encode every located face of an analysis in one batched call"""
+        faces = analysis.faces
+        encodings: List[Optional[np.ndarray]] = [None] * len(faces)
+        located = [i for i, face in enumerate(faces) if face.get('location')]
+        if not self.can_encode or not located:
+            return encodings
+
+        start = time.perf_counter()
+        try:
+            computed = self.face_recognition.face_encodings(
+                analysis.rgb,
+                [faces[i]['location'] for i in located]
+            )
+            for i, encoding in zip(located, computed):
+                encodings[i] = np.asarray(encoding, dtype=np.float32)
+            self._stats['encoded_faces'] += len(computed)
+        except Exception as e:
+            logger.error(f"Error encoding faces: {e}")
+
+        self._stats['encode_ms'] += (time.perf_counter() - start) * 1000
+        return encodings
+
+    def add_face(self, person_id: str, person_name: str, face_image: np.ndarray) -> bool:
+        """Add a face to the shared gallery from an image"""
+        if not self.can_encode:
+            logger.warning("Face recognition not available - cannot add face to database")
+            return False
+
+        rgb_image = self.cv2.cvtColor(face_image, self.cv2.COLOR_BGR2RGB)
+        face_encodings = self.face_recognition.face_encodings(rgb_image)
+        if not face_encodings:
+            logger.warning(f"No face found in image for {person_name}")
+            return False
+
+        self.face_database[person_id] = {
+            'id': person_id,
+            'name': person_name,
+            'embedding': face_encodings[0].tolist(),  # Convert to list for JSON serialization
+        }
+        self.gallery.build(list(self.face_database.values()))
+        logger.info(f"Added face to database: {person_name} ({person_id})")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'gallery_size': len(self.gallery),
+            'gallery_approximate': self.gallery.approximate,
+        }
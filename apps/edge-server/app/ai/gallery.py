@@ -0,0 +1,377 @@
+"""
+Embedding Gallery
+Registered face embeddings in one contiguous matrix for vectorized matching
+"""
+import os
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from app.ai.ann import IVFIndex
+from config.settings import settings
+
+
+class ExactIndex:
+    """
+    Contiguous float32 matrix with precomputed squared norms
+
+    Rows are kept dense (swap-delete on removal) so a search is a single
+    matrix product over the whole gallery
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self._rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:len(self._ids)]
+
+    def add(self, ids: Iterable[str], vectors: np.ndarray):
+        ids = list(ids)
+        if not ids:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        self.remove([i for i in ids if i in self._rows])
+
+        size = len(self._ids)
+        needed = size + len(ids)
+        if needed > len(self._matrix):
+            capacity = max(needed, 2 * len(self._matrix), 64)
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            matrix[:size] = self._matrix[:size]
+            norms = np.zeros(capacity, dtype=np.float32)
+            norms[:size] = self._sq_norms[:size]
+            self._matrix, self._sq_norms = matrix, norms
+
+        self._matrix[size:needed] = vectors
+        self._sq_norms[size:needed] = np.einsum('ij,ij->i', vectors, vectors)
+        for offset, vector_id in enumerate(ids):
+            self._rows[vector_id] = size + offset
+            self._ids.append(vector_id)
+
+    def remove(self, ids: Iterable[str]):
+        for vector_id in ids:
+            row = self._rows.pop(vector_id, None)
+            if row is None:
+                continue
+            last = len(self._ids) - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._sq_norms[row] = self._sq_norms[last]
+                moved = self._ids[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+            self._ids.pop()
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[List[List[str]], np.ndarray]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        m, n = len(queries), len(self._ids)
+        distances = np.full((m, k), np.inf, dtype=np.float32)
+        found: List[List[str]] = [[] for _ in range(m)]
+        if not n or not m:
+            return found, distances
+
+        sq = (
+            np.einsum('ij,ij->i', queries, queries)[:, None]
+            + self._sq_norms[None, :n]
+            - 2.0 * (queries @ self._matrix[:n].T)
+        )
+        np.maximum(sq, 0.0, out=sq)
+
+        kk = min(k, n)
+        idx = np.argpartition(sq, kk - 1, axis=1)[:, :kk] if kk < n else np.broadcast_to(np.arange(n), sq.shape)
+        part = np.take_along_axis(sq, idx, axis=1)
+        order = np.argsort(part, axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        distances[:, :kk] = np.sqrt(np.take_along_axis(part, order, axis=1))
+        for q in range(m):
+            found[q] = [self._ids[i] for i in idx[q]]
+        return found, distances
+
+
+class EmbeddingGallery:
+    """
+    Registered embeddings with vectorized (or approximate) matching
+
+    Small galleries are one contiguous float32 matrix with precomputed
+    squared norms: matching every face in a frame is one matrix product.
+    Galleries of FACE_ANN_MIN_SIZE entries or more switch to an IVF index
+    (app/ai/ann.py) that is persisted to index_path, so restarts only
+    re-add entries whose embedding changed. A changed index is saved at
+    most every FACE_ANN_PERSIST_INTERVAL seconds; each process needs its
+    own index_path.
+
+    Updates are incremental: a sync delta (upserts/removed) is applied
+    directly when it follows the gallery's version, otherwise the records
+    are reconciled by id and embedding checksum. Distances are Euclidean,
+    matching face_recognition.face_distance.
+    """
+
+    def __init__(
+        self,
+        embedding_key: str = 'embedding',
+        id_key: str = 'id',
+        index_path: Optional[str] = None
+    ):
+        self.embedding_key = embedding_key
+        self.id_key = id_key
+        self.index_path = index_path
+        self.persist_interval = settings.FACE_ANN_PERSIST_INTERVAL
+        self.ann_enabled = settings.FACE_ANN_ENABLED
+        self.ann_min_size = settings.FACE_ANN_MIN_SIZE
+        self.ann_nprobe = settings.FACE_ANN_NPROBE
+
+        self.records: Dict[str, Dict] = {}
+        self.index = None  # ExactIndex or IVFIndex
+        self.version: Any = None
+        self._checksums: Dict[str, int] = {}
+        self._source: Optional[List[Dict]] = None
+        self._synced = False
+        self._loaded_persisted = False
+        self._dirty = False  # IVF index changed since it was last saved
+        self._persisted_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.index) if self.index is not None else 0
+
+    @property
+    def dim(self) -> int:
+        return self.index.dim if self.index is not None else 0
+
+    @property
+    def approximate(self) -> bool:
+        return isinstance(self.index, IVFIndex)
+
+    def sync(
+        self,
+        records: Optional[List[Dict]],
+        version: Any = None,
+        delta: Optional[Dict] = None
+    ) -> bool:
+        """
+        Bring the gallery up to date with the synced records
+
+        Args:
+            records: All registered records, each with an embedding
+            version: Sync version of the records; when None, a different
+                list object counts as a change
+            delta: {'base_version', 'version', 'upserts', 'removed'} from
+                SyncService, applied directly if it follows our version
+
+        Returns:
+            True if the gallery changed
+        """
+        if records is None:
+            return False
+        if self._dirty:
+            self._persist()
+        if self._synced:
+            if version is not None and version == self.version:
+                return False
+            if version is None and records is self._source:
+                return False
+
+        if (
+            self._synced and delta
+            and delta.get('base_version') == self.version
+            and delta.get('version') == version
+        ):
+            changed = self.apply(delta.get('upserts', []), delta.get('removed', []))
+        else:
+            changed = self.reconcile(records)
+
+        self.version = version
+        self._source = records
+        self._synced = True
+        return changed
+
+    def build(self, records: List[Dict]):
+        """Replace the gallery content with records"""
+        self.reconcile(records)
+        self._source = records
+
+    def reconcile(self, records: List[Dict]) -> bool:
+        """Diff records against the gallery by id and embedding checksum"""
+        if not self._loaded_persisted:
+            self._load_persisted()
+
+        upserts, seen = [], set()
+        for record in records:
+            key = self._key(record)
+            if key is None:
+                continue
+            seen.add(key)
+            vector = self._vector(record)
+            if vector is None or self._checksums.get(key) != self._checksum(vector):
+                upserts.append(record)
+            else:
+                self.records[key] = record
+        removed = [key for key in list(self._checksums) if key not in seen]
+        return self.apply(upserts, removed)
+
+    def apply(self, upserts: List[Dict], removed: Iterable[Any]) -> bool:
+        """Add/replace and remove entries"""
+        removed = [str(r) for r in removed]
+        if self.index is not None and removed:
+            self.index.remove(removed)
+        for key in removed:
+            self.records.pop(key, None)
+            self._checksums.pop(key, None)
+
+        ids, vectors = [], []
+        for record in upserts:
+            key = self._key(record)
+            vector = self._vector(record)
+            if key is None:
+                continue
+            if vector is None:
+                # Embedding removed: drop the entry
+                if self.index is not None:
+                    self.index.remove([key])
+                self.records.pop(key, None)
+                self._checksums.pop(key, None)
+                removed.append(key)
+                continue
+            if self.index is None:
+                self.index = ExactIndex(vector.shape[0])
+            if vector.shape[0] != self.index.dim:
+                logger.warning(
+                    f"Skipping embedding for {key}: dimension {vector.shape[0]} != {self.index.dim}"
+                )
+                continue
+            ids.append(key)
+            vectors.append(vector)
+            self.records[key] = record
+            self._checksums[key] = self._checksum(vector)
+
+        if ids:
+            self.index.add(ids, np.stack(vectors))
+
+        changed = bool(ids or removed)
+        if changed:
+            self._maybe_switch_backend()
+            if self.approximate:
+                self._dirty = True
+                self._persist()
+            logger.debug(
+                f"Embedding gallery updated: +{len(ids)} -{len(removed)} "
+                f"({len(self)} entries, {'ivf' if self.approximate else 'exact'})"
+            )
+        return changed
+
+    def _maybe_switch_backend(self):
+        """Move between the exact matrix and the IVF index by gallery size"""
+        size = len(self)
+        if self.ann_enabled and isinstance(self.index, ExactIndex) and size >= self.ann_min_size:
+            exact = self.index
+            index = IVFIndex(exact.dim, nlist=settings.FACE_ANN_NLIST, nprobe=self.ann_nprobe)
+            index.train(exact.matrix)
+            index.add(list(exact._ids), exact.matrix)
+            self.index = index
+            logger.info(f"Embedding gallery switched to IVF index ({size} entries, {index.nlist} lists)")
+        elif isinstance(self.index, IVFIndex) and size < self.ann_min_size // 2:
+            # Shrunk well below the threshold: exact search is cheap again
+            ivf = self.index
+            exact = ExactIndex(ivf.dim)
+            for list_no, list_ids in enumerate(ivf._ids):
+                if list_ids:
+                    exact.add(list_ids, ivf._vectors[list_no][:len(list_ids)])
+            self.index = exact
+            self._dirty = False
+            if self.index_path and os.path.exists(self.index_path):
+                os.remove(self.index_path)
+
+    def _persist(self, force: bool = False):
+        """Save a changed IVF index, at most once per persist_interval unless forced"""
+        if not (self._dirty and self.index_path):
+            return
+        now = time.monotonic()
+        if not force and self._persisted_at is not None and now - self._persisted_at < self.persist_interval:
+            return
+        self._persisted_at = now
+        try:
+            keys = list(self._checksums)
+            self.index.save(self.index_path, extra={
+                'checksum_ids': np.asarray(keys, dtype=str),
+                'checksums': np.asarray([self._checksums[k] for k in keys], dtype=np.int64),
+            })
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"Could not persist ANN index: {e}")
+
+    def flush(self):
+        """Save pending index changes now (on shutdown)"""
+        self._persist(force=True)
+
+    def _load_persisted(self):
+        self._loaded_persisted = True
+        if not (self.ann_enabled and self.index_path and os.path.exists(self.index_path)):
+            return
+        try:
+            index, extra = IVFIndex.load(self.index_path)
+            index.nprobe = self.ann_nprobe
+            self.index = index
+            self._checksums = dict(zip(
+                extra['checksum_ids'].tolist(),
+                extra['checksums'].tolist()
+            ))
+        except Exception as e:
+            logger.warning(f"Could not load ANN index, rebuilding: {e}")
+
+    def _key(self, record: Dict) -> Optional[str]:
+        value = record.get(self.id_key)
+        return str(value) if value is not None else None
+
+    def _vector(self, record: Dict) -> Optional[np.ndarray]:
+        embedding = record.get(self.embedding_key)
+        if embedding is None or len(embedding) == 0:
+            return None
+        return np.asarray(embedding, dtype=np.float32).reshape(-1)
+
+    @staticmethod
+    def _checksum(vector: np.ndarray) -> int:
+        return zlib.crc32(np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[List[List[Dict]], np.ndarray]:
+        """
+        Find the k nearest entries for each query
+
+        Returns:
+            (records, distances): up to k records per query sorted by
+            distance, and an (m, k) distance array padded with inf
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        m = 1 if queries.ndim == 1 else queries.shape[0]
+        if not len(self) or m == 0:
+            return [[] for _ in range(m)], np.full((m, k), np.inf, dtype=np.float32)
+
+        ids, distances = self.index.search(queries, k)
+        return [[self.records[i] for i in found] for found in ids], distances
+
+    def match(self, queries: np.ndarray, max_distance: float) -> List[Optional[Tuple[Dict, float]]]:
+        """
+        Best match per query within max_distance
+
+        Returns:
+            One (record, distance) or None per query
+        """
+        records, distances = self.search(queries, k=1)
+        matches = []
+        for found, dist in zip(records, distances):
+            if found and dist[0] <= max_distance:
+                matches.append((found[0], float(dist[0])))
+            else:
+                matches.append(None)
+        return matches
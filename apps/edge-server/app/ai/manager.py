@@ -7,6 +7,10 @@ import numpy as np
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.detector import SharedDetector
+from app.ai.faces import FaceAnalyzer
+from app.ai.motion import MotionGate, MotionMap
+from app.ai.tracking import TrackService
 from config.settings import settings
 
 
@@ -16,8 +20,14 @@ class AIModuleManager:
     Loads, enables/disables, and processes frames through modules
     """
     
-    def __init__(self):
+    def __init__(self, face_index_path: Optional[str] = None):
         self.modules: Dict[str, BaseAIModule] = {}
+        self.detector = SharedDetector()
+        self.motion_gate = MotionGate()
+        self.face_analyzer = FaceAnalyzer(index_path=face_index_path)
+        self.tracks = TrackService()
+        self._frame_seq: Dict[str, int] = {}  # camera_id -> frames processed
+        self._last_detections: Dict[str, Any] = {}  # camera_id -> last shared DetectionSet
         self._load_modules()
 
     def _load_modules(self):
@@ -67,6 +77,11 @@ class AIModuleManager:
                 confidence_threshold=settings.OBJECT_CONFIDENCE
             )
 
+            # Face modules share one analyzer (detection, encodings, gallery)
+            for module in self.modules.values():
+                if module.uses_face_analysis:
+                    module.face_analyzer = self.face_analyzer
+
             logger.info(f"Loaded {len(self.modules)} AI modules")
         except ImportError as e:
             logger.warning(f"Some AI modules could not be loaded: {e}")
@@ -80,6 +95,9 @@ class AIModuleManager:
             else:
                 logger.warning(f"Unknown module: {module_id}")
 
+        if any(m.uses_shared_detector for m in self.modules.values() if m.is_enabled()):
+            self.detector.initialize()
+
     def disable_modules(self, module_ids: List[str]):
         """Disable specific modules"""
         for module_id in module_ids:
@@ -91,19 +109,262 @@ class AIModuleManager:
         frame: np.ndarray,
         camera_id: str,
         enabled_modules: List[str],
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        motion: Optional[MotionMap] = None
     ) -> Dict[str, Any]:
         """
         Process frame through enabled modules
+
+        motion is the frame's MotionMap when the capture path already
+        computed it; otherwise the motion gate computes one.
         
         Returns:
             {
                 'detections': [...],
                 'events': [...],
                 'alerts': [...],
-                'modules': {...}
+                'modules': {...},
+                'inference': {...}
             }
         """
+        active, skipped = self._gate_modules(
+            frame, camera_id, self._active_modules(enabled_modules), metadata, motion
+        )
+        consumers = [m for _, m in active if m.uses_shared_detector]
+
+        inference = {'consumers': 0, 'passes_run': 0, 'passes_saved': 0, 'inference_ms_saved': 0.0}
+        detections = None
+        if consumers and self.detector.available:
+            if self._needs_detection(camera_id, consumers):
+                classes, confidence = self._detector_request(consumers)
+                detections = self.detector.detect(frame, classes, confidence, consumers=len(consumers))
+                self._last_detections[camera_id] = detections
+                inference = {
+                    'consumers': len(consumers),
+                    'passes_run': 1,
+                    'passes_saved': len(consumers) - 1,
+                    'inference_ms': self.detector.last_inference_ms,
+                    'inference_ms_saved': self.detector.last_inference_ms * (len(consumers) - 1),
+                }
+            else:
+                detections = self._carry_over(camera_id)
+                inference = self._propagated_inference(consumers)
+            for module in consumers:
+                module.attach_detections(detections)
+
+        results = self._run_modules(
+            frame, camera_id, active, metadata, self._next_seq(camera_id), detections
+        )
+        self._keep_alive(camera_id, skipped, metadata, results)
+        results['inference'] = inference
+        return results
+
+    def process_batch(
+        self,
+        items: List[Dict[str, Any]],
+        input_size: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process frames from several cameras with one shared detector call
+
+        Args:
+            items: [{'frame', 'camera_id', 'enabled_modules', 'metadata', 'motion'}, ...]
+            input_size: Letterbox size used to give the batch one tensor shape
+
+        Returns:
+            One result dict per item (same format as process_frame), in order
+        """
+        gated = [
+            self._gate_modules(
+                item['frame'],
+                item['camera_id'],
+                self._active_modules(item['enabled_modules']),
+                item.get('metadata'),
+                item.get('motion')
+            )
+            for item in items
+        ]
+        actives = [active for active, _ in gated]
+        consumers = [[m for _, m in active if m.uses_shared_detector] for active in actives]
+
+        # Frames whose modules need the shared detector go through one batched call;
+        # frames between detections reuse the camera's last pass while tracks propagate
+        batched, propagated = [], []
+        if self.detector.available:
+            for i, mods in enumerate(consumers):
+                if not mods:
+                    continue
+                if self._needs_detection(items[i]['camera_id'], mods):
+                    batched.append(i)
+                else:
+                    propagated.append(i)
+        detections = {}
+        if batched:
+            all_consumers = [m for i in batched for m in consumers[i]]
+            classes, confidence = self._detector_request(all_consumers)
+            batch_detections = self.detector.detect_batch(
+                [items[i]['frame'] for i in batched],
+                classes,
+                confidence,
+                consumers=len(all_consumers),
+                input_size=input_size
+            )
+            detections = dict(zip(batched, batch_detections))
+            for i in batched:
+                self._last_detections[items[i]['camera_id']] = detections[i]
+
+        batch_ms = self.detector.last_inference_ms if detections else 0.0
+        outputs = []
+        for i, item in enumerate(items):
+            inference = {'consumers': 0, 'passes_run': 0, 'passes_saved': 0, 'inference_ms_saved': 0.0}
+            frame_detections = None
+            if i in detections:
+                frame_detections = detections[i]
+                for module in consumers[i]:
+                    module.attach_detections(frame_detections)
+                inference = {
+                    'consumers': len(consumers[i]),
+                    'batch_size': len(detections),
+                    'passes_run': 1,
+                    'passes_saved': len(consumers[i]) - 1,
+                    'inference_ms': batch_ms / len(detections),
+                    'inference_ms_saved': batch_ms / len(detections) * (len(consumers[i]) - 1),
+                }
+            elif i in propagated:
+                frame_detections = self._carry_over(item['camera_id'])
+                for module in consumers[i]:
+                    module.attach_detections(frame_detections)
+                inference = self._propagated_inference(consumers[i])
+
+            results = self._run_modules(
+                item['frame'],
+                item['camera_id'],
+                actives[i],
+                item.get('metadata'),
+                self._next_seq(item['camera_id']),
+                frame_detections
+            )
+            self._keep_alive(item['camera_id'], gated[i][1], item.get('metadata'), results)
+            results['inference'] = inference
+            outputs.append(results)
+
+        return outputs
+
+    def _next_seq(self, camera_id: str) -> int:
+        """Sequence number of the camera's frame being processed"""
+        seq = self._frame_seq.get(camera_id, 0) + 1
+        self._frame_seq[camera_id] = seq
+        return seq
+
+    def _active_modules(self, enabled_modules: List[str]) -> List[tuple]:
+        """Get (module_id, module) pairs that are requested and enabled"""
+        return [
+            (module_id, self.modules[module_id])
+            for module_id in enabled_modules
+            if module_id in self.modules and self.modules[module_id].is_enabled()
+        ]
+
+    def _gate_modules(
+        self,
+        frame: np.ndarray,
+        camera_id: str,
+        active: List[tuple],
+        metadata: Optional[Dict] = None,
+        motion: Optional[MotionMap] = None
+    ) -> tuple:
+        """
+        Split active modules into those that need this frame and those the
+        motion gate skips
+
+        Returns:
+            (run, skipped) lists of (module_id, module) pairs
+        """
+        if not any(module.motion_gated for _, module in active):
+            return active, []
+
+        motion = self.motion_gate.update(camera_id, frame, motion)
+        run, skipped = [], []
+        for module_id, module in active:
+            if self.motion_gate.should_run(camera_id, module_id, module, motion, metadata):
+                run.append((module_id, module))
+            else:
+                skipped.append((module_id, module))
+        return run, skipped
+
+    def _keep_alive(
+        self,
+        camera_id: str,
+        skipped: List[tuple],
+        metadata: Optional[Dict],
+        results: Dict[str, Any]
+    ):
+        """Give modules skipped by the motion gate their keep-alive update"""
+        for module_id, module in skipped:
+            try:
+                module.keep_alive(camera_id, metadata)
+            except Exception as e:
+                logger.error(f"Keep-alive error in module '{module_id}': {e}")
+            results['modules'][module_id] = {
+                'processed': False,
+                'skipped': 'no_motion',
+            }
+
+    def _needs_detection(self, camera_id: str, consumers: List[BaseAIModule]) -> bool:
+        """
+        Whether a camera's frame needs a shared detector pass
+
+        The pass is skipped (DETECTION_INTERVAL) only when every consumer
+        works from propagated tracks and the track service does not ask for
+        a fresh detection
+        """
+        if camera_id not in self._last_detections:
+            return True
+        if not all(module.propagates_tracks for module in consumers):
+            return True
+        return self.tracks.needs_detection(camera_id)
+
+    def _carry_over(self, camera_id: str):
+        """Last detector pass of a camera, marked as carried over"""
+        self.detector.record_propagated()
+        return self._last_detections[camera_id].carried_over()
+
+    def _propagated_inference(self, consumers: List[BaseAIModule]) -> Dict[str, Any]:
+        """Inference stats of a frame whose detector pass was skipped"""
+        return {
+            'consumers': len(consumers),
+            'passes_run': 0,
+            'passes_saved': len(consumers),
+            'propagated': True,
+            'inference_ms_saved': self.detector.last_inference_ms * len(consumers),
+        }
+
+    def _detector_request(self, consumers: List[BaseAIModule]) -> tuple:
+        """
+        Build one detector request for a set of consumer modules
+
+        The pass uses the union of the consumers' classes and the lowest
+        confidence among them; each module filters its own view afterwards
+        """
+        classes = set()
+        for module in consumers:
+            if module.detector_classes is None:
+                classes = None
+                break
+            classes.update(module.detector_classes)
+
+        confidence = min(m.detector_confidence() for m in consumers)
+        return classes, confidence
+
+    def _run_modules(
+        self,
+        frame: np.ndarray,
+        camera_id: str,
+        active: List[tuple],
+        metadata: Optional[Dict] = None,
+        seq: Optional[int] = None,
+        detections=None
+    ) -> Dict[str, Any]:
+        """Run a frame through the given modules and aggregate their results"""
         results = {
             'detections': [],
             'events': [],
@@ -111,14 +372,29 @@ class AIModuleManager:
             'modules': {},
         }
 
-        for module_id in enabled_modules:
-            if module_id not in self.modules:
-                continue
+        # Face modules read one analysis of this frame (computed lazily, once)
+        face_consumers = [m for _, m in active if m.uses_face_analysis]
+        if face_consumers:
+            self.face_analyzer.sync(metadata)
+            analysis = self.face_analyzer.analysis(camera_id, frame, seq)
+            for module in face_consumers:
+                module.attach_face_analysis(analysis)
 
-            module = self.modules[module_id]
-            if not module.is_enabled():
-                continue
+        # Person modules read one set of tracks of this camera frame
+        track_consumers = [m for _, m in active if m.uses_person_tracks]
+        if track_consumers and detections is not None:
+            tracks = self.tracks.update(
+                camera_id,
+                frame,
+                detections,
+                seq,
+                zones=metadata.get('zones') if metadata else None,
+                confidence=min(m.detector_confidence() for m in track_consumers)
+            )
+            for module in track_consumers:
+                module.attach_person_tracks(tracks)
 
+        for module_id, module in active:
             try:
                 module_result = module.process_frame(frame, camera_id, metadata)
                 
@@ -143,6 +419,13 @@ class AIModuleManager:
                     'processed': False,
                     'error': str(e),
                 }
+            finally:
+                module.attach_detections(None)
+                module.attach_face_analysis(None)
+                module.attach_person_tracks(None)
+
+        if face_consumers:
+            self.face_analyzer.release(camera_id)
 
         return results
 
@@ -161,11 +444,29 @@ class AIModuleManager:
             for module_id, module in self.modules.items()
         ]
 
+    def get_inference_stats(self) -> Dict[str, Any]:
+        """Get shared detector statistics"""
+        return self.detector.get_stats()
+
+    def get_face_stats(self) -> Dict[str, Any]:
+        """Get shared face analysis statistics"""
+        return self.face_analyzer.get_stats()
+
+    def get_tracking_stats(self) -> Dict[str, Any]:
+        """Get shared person tracking statistics"""
+        return self.tracks.get_stats()
+
+    def get_motion_stats(self) -> Dict[str, Any]:
+        """Get motion gate skip ratios per camera and module"""
+        return self.motion_gate.get_stats()
+
     def cleanup(self):
         """Cleanup all modules"""
         for module in self.modules.values():
             module.cleanup()
         self.modules.clear()
+        self.tracks.cleanup()
+        self.face_analyzer.gallery.flush()
 
 
 
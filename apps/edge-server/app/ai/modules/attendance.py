@@ -8,6 +8,7 @@ from datetime import datetime
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.faces import FaceAnalysis, FaceAnalyzer
 from config.settings import settings
 
 
@@ -16,6 +17,8 @@ class AttendanceModule(BaseAIModule):
     Attendance AI Module
     Tracks employee attendance using face recognition
     """
+
+    uses_face_analysis = True
     
     def __init__(self, confidence_threshold: float = 0.6):
         super().__init__(
@@ -25,13 +28,17 @@ class AttendanceModule(BaseAIModule):
         )
         self.employee_database: Dict[str, Dict] = {}  # employee_id -> employee_data
         self.attendance_log: Dict[str, datetime] = {}  # employee_id -> last_check_in
-        self._face_model = None
+        # Replaced by the manager's shared analyzer when loaded through AIModuleManager
+        self.face_analyzer = FaceAnalyzer()
 
     def initialize(self) -> bool:
         """Initialize attendance module"""
         try:
-            # TODO: Load face recognition model
-            logger.info("Attendance module initialized (placeholder - replace with actual model)")
+            if not self.face_analyzer.initialize():
+                return False
+            if not self.face_analyzer.can_encode:
+                logger.warning("Attendance needs face_recognition for matching - no check-ins will be logged")
+            logger.info("Attendance module initialized")
             self._initialized = True
             return True
         except Exception as e:
@@ -61,14 +68,15 @@ class AttendanceModule(BaseAIModule):
             'alerts': [],
         }
 
+        # The manager attaches the frame's shared analysis (and syncs the gallery);
+        # standalone use analyzes the frame here
+        analysis = self._face_analysis
+        if analysis is None:
+            self.face_analyzer.sync(metadata)
+            analysis = self.face_analyzer.analysis(camera_id, frame)
+
         try:
-            # TODO: Implement attendance tracking
-            # 1. Detect and recognize faces
-            # 2. Match against employee database
-            # 3. Log check-in/check-out
-            # 4. Prevent duplicate check-ins within time window
-            
-            faces = self._detect_and_recognize_faces(frame)
+            faces = self._detect_and_recognize_faces(analysis)
             
             for face in faces:
                 employee_id = face.get('employee_id')
@@ -119,10 +127,33 @@ class AttendanceModule(BaseAIModule):
 
         return results
 
-    def _detect_and_recognize_faces(self, frame: np.ndarray) -> List[Dict]:
-        """Detect and recognize faces in frame"""
-        # TODO: Use face recognition model
-        return []
+    def _detect_and_recognize_faces(self, analysis: FaceAnalysis) -> List[Dict]:
+        """
+        Recognize the frame's faces against the shared face gallery
+
+        Detection, encodings and the gallery search come from the shared
+        analysis, so they are not repeated when face recognition also runs
+
+        Returns:
+            [{'employee_id', 'confidence', 'bbox', 'record'}] for matched faces
+        """
+        gallery = self.face_analyzer.gallery
+        if not self.face_analyzer.can_encode or not len(gallery):
+            return []
+
+        recognized = []
+        best = analysis.match(gallery, max_distance=1.0 - self.confidence_threshold)
+        for face, found in zip(analysis.faces, best):
+            if found is None:
+                continue
+            record, distance = found
+            recognized.append({
+                'employee_id': record.get('employee_id') or record.get('id'),
+                'confidence': 1.0 - distance,
+                'bbox': face.get('bbox'),
+                'record': record,
+            })
+        return recognized
 
     def _determine_check_type(self, employee_id: str, timestamp: datetime) -> bool:
         """Determine if this is check-in or check-out"""
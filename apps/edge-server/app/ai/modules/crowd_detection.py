@@ -8,6 +8,7 @@ from datetime import datetime
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.detector import load_yolo, require_yolo
 from config.settings import settings
 
 
@@ -16,6 +17,11 @@ class CrowdDetectionModule(BaseAIModule):
     Crowd Detection AI Module
     Detects crowd density and generates alerts for overcrowding
     """
+
+    uses_shared_detector = True
+    detector_classes = [0]  # person
+    uses_person_tracks = True
+    propagates_tracks = True
     
     def __init__(self, confidence_threshold: float = 0.5):
         super().__init__(
@@ -30,10 +36,10 @@ class CrowdDetectionModule(BaseAIModule):
     def initialize(self) -> bool:
         """Initialize crowd detection"""
         try:
-            from ultralytics import YOLO
+            require_yolo('yolov8n.pt')
             
             try:
-                self._model = YOLO('yolov8n.pt')
+                self._model = load_yolo('yolov8n.pt')
                 logger.info("Crowd Detection module initialized with YOLOv8")
             except Exception as e:
                 logger.warning(f"Could not load YOLOv8 model: {e}")
@@ -119,6 +125,14 @@ class CrowdDetectionModule(BaseAIModule):
 
     def _detect_people(self, frame: np.ndarray) -> List[Dict]:
         """Detect people in frame using YOLOv8"""
+        tracks = self.person_tracks()
+        if tracks is not None:
+            return tracks.persons
+
+        shared = self.shared_detections()
+        if shared is not None:
+            return shared
+
         if not self._model:
             return []
         
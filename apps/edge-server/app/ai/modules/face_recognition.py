@@ -8,6 +8,8 @@ from datetime import datetime
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.faces import FaceAnalysis, FaceAnalyzer
+from app.ai.gallery import EmbeddingGallery
 from config.settings import settings
 
 
@@ -16,6 +18,8 @@ class FaceRecognitionModule(BaseAIModule):
     Face Recognition AI Module
     Detects faces and matches them against registered faces database
     """
+
+    uses_face_analysis = True
     
     def __init__(self, confidence_threshold: float = 0.6):
         super().__init__(
@@ -23,44 +27,27 @@ class FaceRecognitionModule(BaseAIModule):
             module_name="Face Recognition",
             confidence_threshold=confidence_threshold
         )
-        self.face_database: Dict[str, Dict] = {}  # face_id -> face_data
-        self._model = None
+        # Replaced by the manager's shared analyzer when loaded through AIModuleManager
+        self.face_analyzer = FaceAnalyzer()
+
+    @property
+    def gallery(self) -> EmbeddingGallery:
+        return self.face_analyzer.gallery
+
+    @property
+    def face_database(self) -> Dict[str, Dict]:
+        return self.face_analyzer.face_database
 
     def initialize(self) -> bool:
         """Initialize face recognition model"""
         try:
-            import face_recognition
-            import cv2
-            
-            # Load face recognition models
             # face_recognition uses dlib's HOG + Linear SVM for detection
-            # and dlib's face recognition model for encoding
-            
-            self._face_recognition = face_recognition
-            self._cv2 = cv2
-            
-            # Pre-load models (they load on first use)
-            logger.info("Face Recognition module initialized with face_recognition library")
+            # and dlib's face recognition model for encoding; without it the
+            # analyzer falls back to OpenCV detection only
+            if not self.face_analyzer.initialize():
+                return False
             self._initialized = True
             return True
-        except ImportError:
-            logger.warning("face_recognition library not installed. Install with: pip install face-recognition dlib")
-            logger.warning("Falling back to OpenCV face detection only")
-            try:
-                import cv2
-                # Load OpenCV DNN face detector as fallback
-                self._cv2 = cv2
-                self._face_recognition = None
-                self._face_detector = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-                if self._face_detector.empty():
-                    logger.error("Failed to load OpenCV face detector")
-                    return False
-                logger.info("Face Recognition module initialized with OpenCV (detection only)")
-                self._initialized = True
-                return True
-            except Exception as e:
-                logger.error(f"Failed to initialize Face Recognition: {e}")
-                return False
         except Exception as e:
             logger.error(f"Failed to initialize Face Recognition: {e}")
             return False
@@ -85,12 +72,12 @@ class FaceRecognitionModule(BaseAIModule):
         if not self.is_enabled():
             return {'detections': [], 'events': [], 'alerts': []}
 
-        # Update face database from metadata if provided
-        if metadata and 'faces_database' in metadata:
-            self.face_database = {
-                face.get('id'): face
-                for face in metadata.get('faces_database', [])
-            }
+        # The manager attaches the frame's shared analysis (and syncs the gallery);
+        # standalone use analyzes the frame here
+        analysis = self._face_analysis
+        if analysis is None:
+            self.face_analyzer.sync(metadata)
+            analysis = self.face_analyzer.analysis(camera_id, frame)
 
         results = {
             'detections': [],
@@ -99,26 +86,10 @@ class FaceRecognitionModule(BaseAIModule):
         }
 
         try:
-            # TODO: Replace with actual face detection and recognition
-            # Example workflow:
-            # 1. Detect faces in frame using face detector
-            # 2. Extract face embeddings for each detected face
-            # 3. Compare embeddings with registered faces database
-            # 4. Match faces with confidence scores
-            # 5. Generate events/alerts for recognized faces
-            
-            # Placeholder implementation
-            # In production, use libraries like:
-            # - face_recognition.compare_faces()
-            # - InsightFace model inference
-            # - Custom trained models
-            
-            detected_faces = self._detect_faces(frame)
+            detected_faces = analysis.faces
+            recognized_faces = self._recognize_faces(analysis)
             
-            for face_data in detected_faces:
-                # Try to recognize face
-                recognized = self._recognize_face(face_data, frame)
-                
+            for face_data, recognized in zip(detected_faces, recognized_faces):
                 detection = {
                     'type': 'face',
                     'camera_id': camera_id,
@@ -169,132 +140,44 @@ class FaceRecognitionModule(BaseAIModule):
 
         return results
 
-    def _detect_faces(self, frame: np.ndarray) -> List[Dict]:
+    def _recognize_faces(self, analysis: FaceAnalysis) -> List[Optional[Dict]]:
         """
-        Detect faces in frame
+        Recognize all detected faces of a frame against the gallery at once
         
         Returns:
-            List of face detections with bbox and confidence
+            One dict with person_id, person_name, confidence per face if matched, else None
         """
-        faces = []
+        matches: List[Optional[Dict]] = [None] * len(analysis.faces)
+        if not self.face_analyzer.can_encode or not len(self.gallery):
+            return matches
         
         try:
-            if self._face_recognition:
-                # Use face_recognition library (more accurate)
-                rgb_frame = self._cv2.cvtColor(frame, self._cv2.COLOR_BGR2RGB)
-                face_locations = self._face_recognition.face_locations(rgb_frame, model='hog')
-                
-                for top, right, bottom, left in face_locations:
-                    faces.append({
-                        'bbox': [left, top, right - left, bottom - top],
-                        'confidence': 0.95,  # face_recognition doesn't provide confidence
-                        'location': (top, right, bottom, left)  # For encoding
-                    })
-            else:
-                # Fallback to OpenCV
-                gray = self._cv2.cvtColor(frame, self._cv2.COLOR_BGR2GRAY)
-                face_rects = self._face_detector.detectMultiScale(
-                    gray,
-                    scaleFactor=1.1,
-                    minNeighbors=5,
-                    minSize=(30, 30)
-                )
-                
-                for (x, y, w, h) in face_rects:
-                    faces.append({
-                        'bbox': [int(x), int(y), int(w), int(h)],
-                        'confidence': 0.85,  # OpenCV doesn't provide confidence
-                        'location': None
-                    })
-        except Exception as e:
-            logger.error(f"Error detecting faces: {e}")
-        
-        return faces
-
-    def _recognize_face(self, face_data: Dict, frame: np.ndarray) -> Optional[Dict]:
-        """
-        Recognize a detected face against database
-        
-        Returns:
-            Dict with person_id, person_name, confidence if matched, else None
-        """
-        if not self._face_recognition or not face_data.get('location'):
-            return None
-        
-        if not self.face_database:
-            return None
-        
-        try:
-            rgb_frame = self._cv2.cvtColor(frame, self._cv2.COLOR_BGR2RGB)
-            top, right, bottom, left = face_data['location']
-            
-            # Extract face encoding
-            face_encoding = self._face_recognition.face_encodings(
-                rgb_frame,
-                [(top, right, bottom, left)]
-            )
-            
-            if not face_encoding:
-                return None
-            
-            face_encoding = face_encoding[0]
+            # Batched encodings and one gallery search, shared with other face modules
+            # (confidence = 1 - distance must exceed the threshold)
+            best = analysis.match(self.gallery, max_distance=1.0 - self.confidence_threshold)
             
-            # Compare with database
-            best_match = None
-            best_distance = float('inf')
-            
-            for person_id, person_data in self.face_database.items():
-                stored_encoding = person_data.get('embedding')
-                if not stored_encoding:
+            for i, found in enumerate(best):
+                if found is None:
                     continue
-                
-                # Convert list to numpy array if needed
-                if isinstance(stored_encoding, list):
-                    stored_encoding = np.array(stored_encoding)
-                
-                # Calculate distance
-                distance = self._face_recognition.face_distance([stored_encoding], face_encoding)[0]
-                
-                if distance < best_distance:
-                    best_distance = distance
-                    best_match = {
-                        'person_id': person_id,
-                        'person_name': person_data.get('name', 'Unknown'),
-                        'confidence': 1.0 - distance,  # Convert distance to confidence
+                record, distance = found
+                confidence = 1.0 - distance
+                if confidence > self.confidence_threshold:
+                    matches[i] = {
+                        'person_id': record.get('id'),
+                        'person_name': record.get('name', 'Unknown'),
+                        'confidence': confidence,
                         'distance': distance
                     }
             
-            # Return match if confidence is above threshold
-            if best_match and best_match['confidence'] > self.confidence_threshold:
-                return best_match
-            
         except Exception as e:
-            logger.error(f"Error recognizing face: {e}")
+            logger.error(f"Error recognizing faces: {e}")
         
-        return None
+        return matches
 
     def add_face_to_database(self, person_id: str, person_name: str, face_image: np.ndarray):
         """Add a face to the recognition database from image"""
         try:
-            if self._face_recognition:
-                rgb_image = self._cv2.cvtColor(face_image, self._cv2.COLOR_BGR2RGB)
-                face_encodings = self._face_recognition.face_encodings(rgb_image)
-                
-                if face_encodings:
-                    embedding = face_encodings[0]
-                    self.face_database[person_id] = {
-                        'id': person_id,
-                        'name': person_name,
-                        'embedding': embedding.tolist(),  # Convert to list for JSON serialization
-                    }
-                    logger.info(f"Added face to database: {person_name} ({person_id})")
-                    return True
-                else:
-                    logger.warning(f"No face found in image for {person_name}")
-                    return False
-            else:
-                logger.warning("Face recognition not available - cannot add face to database")
-                return False
+            return self.face_analyzer.add_face(person_id, person_name, face_image)
         except Exception as e:
             logger.error(f"Error adding face to database: {e}")
             return False
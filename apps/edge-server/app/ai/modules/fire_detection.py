@@ -8,6 +8,7 @@ from datetime import datetime
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.detector import load_yolo, DEFAULT_WEIGHTS
 from config.settings import settings
 
 
@@ -16,6 +17,9 @@ class FireDetectionModule(BaseAIModule):
     Fire Detection AI Module
     Detects fire and smoke using computer vision
     """
+
+    # Slow smoke can stay under the motion threshold; never skip frames
+    motion_gated = False
     
     def __init__(self, confidence_threshold: float = 0.7):
         super().__init__(
@@ -40,7 +44,9 @@ class FireDetectionModule(BaseAIModule):
             except:
                 # Fallback to YOLOv8 for general object detection
                 try:
-                    self._model = YOLO('yolov8n.pt')
+                    self._model = load_yolo(DEFAULT_WEIGHTS)
+                    # The general model is the shared one, so take part in the shared pass
+                    self.uses_shared_detector = True
                     logger.info("Fire Detection module initialized with YOLOv8 (general detection)")
                 except:
                     self._model = None
@@ -150,6 +156,10 @@ class FireDetectionModule(BaseAIModule):
 
     def _detect_fire(self, frame: np.ndarray) -> List[Dict]:
         """Detect fire in frame"""
+        shared = self.shared_detections()
+        if shared is not None:
+            return shared
+
         if self._model:
             # Use YOLOv8 model if available
             try:
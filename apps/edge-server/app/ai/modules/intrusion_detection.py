@@ -3,11 +3,14 @@ Intrusion Detection Module
 Detects unauthorized access to defined zones
 """
 import numpy as np
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set
 from datetime import datetime
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.detector import load_yolo, require_yolo
+from app.ai.motion import zone_boxes
+from app.ai.zones import ZoneCache, ZoneMap
 from config.settings import settings
 
 
@@ -16,6 +19,10 @@ class IntrusionDetectionModule(BaseAIModule):
     Intrusion Detection AI Module
     Detects unauthorized access to restricted zones
     """
+
+    uses_shared_detector = True
+    detector_classes = [0, 2, 3, 5, 7]  # person and vehicles
+    uses_person_tracks = True
     
     def __init__(self, confidence_threshold: float = 0.5):
         super().__init__(
@@ -24,15 +31,17 @@ class IntrusionDetectionModule(BaseAIModule):
             confidence_threshold=confidence_threshold
         )
         self.zones: Dict[str, List] = {}  # camera_id -> list of zones
+        self._inside: Dict[str, Set[tuple]] = {}  # camera_id -> {(track_id, zone)} already alerted
+        self._zone_maps = ZoneCache()
         self._model = None
 
     def initialize(self) -> bool:
         """Initialize intrusion detection model"""
         try:
-            from ultralytics import YOLO
+            require_yolo('yolov8n.pt')
             
             try:
-                self._model = YOLO('yolov8n.pt')
+                self._model = load_yolo('yolov8n.pt')
                 logger.info("Intrusion Detection module initialized with YOLOv8")
             except Exception as e:
                 logger.warning(f"Could not load YOLOv8 model: {e}")
@@ -69,19 +78,27 @@ class IntrusionDetectionModule(BaseAIModule):
         }
 
         try:
-            # TODO: Implement intrusion detection
-            # 1. Detect objects/people in frame
+            # 1. Detect objects/people in frame (people as shared tracks)
             # 2. Check if they're in restricted zones
-            # 3. Generate alerts for intrusions
+            # 3. Generate alerts for intrusions (once per track and zone)
             
             detections = self._detect_objects(frame)
-            zones = self.zones.get(camera_id, [])
+            zones = self._zone_maps.get(camera_id, self.zones.get(camera_id))
+            alerted = self._inside.get(camera_id, set())
+            inside = set()
             
             for detection in detections:
                 if detection.get('confidence', 0) > self.confidence_threshold:
                     # Check if detection is in restricted zone
                     in_restricted_zone = self._check_zone(detection, zones)
                     
+                    track_id = detection.get('track_id')
+                    if in_restricted_zone and track_id is not None:
+                        key = (track_id, in_restricted_zone.get('name'))
+                        inside.add(key)
+                        if key in alerted:
+                            continue
+                    
                     if in_restricted_zone:
                         results['detections'].append({
                             'type': 'intrusion',
@@ -90,6 +107,7 @@ class IntrusionDetectionModule(BaseAIModule):
                             'bbox': detection.get('bbox'),
                             'confidence': detection.get('confidence', 0.0),
                             'zone': in_restricted_zone.get('name') if isinstance(in_restricted_zone, dict) else None,
+                            'track_id': track_id,
                         })
                         
                         # Create alert
@@ -104,6 +122,7 @@ class IntrusionDetectionModule(BaseAIModule):
                                 'bbox': detection.get('bbox'),
                                 'confidence': detection.get('confidence'),
                                 'zone': in_restricted_zone.get('name') if isinstance(in_restricted_zone, dict) else None,
+                                'track_id': track_id,
                             }
                         })
                         
@@ -114,13 +133,29 @@ class IntrusionDetectionModule(BaseAIModule):
                             'timestamp': datetime.utcnow().isoformat(),
                         })
 
+            # Tracks that left a zone alert again when they come back
+            self._inside[camera_id] = inside
+
         except Exception as e:
             logger.error(f"Error processing frame in Intrusion Detection: {e}")
 
         return results
 
+    def motion_roi(self, camera_id: str, metadata: Optional[Dict] = None) -> Optional[List[List[int]]]:
+        """Only motion inside the restricted zones matters"""
+        zones = metadata.get('zones') if metadata and 'zones' in metadata else self.zones.get(camera_id)
+        return zone_boxes(zones) or None
+
     def _detect_objects(self, frame: np.ndarray) -> List[Dict]:
         """Detect objects/people in frame using YOLOv8"""
+        shared = self.shared_detections()
+        tracks = self.person_tracks()
+        if shared is not None and tracks is not None:
+            # People come from the shared tracks (with track ids), vehicles from the detector pass
+            return tracks.persons + [d for d in shared if d['class_id'] != 0]
+        if shared is not None:
+            return shared
+
         if not self._model:
             return []
         
@@ -146,9 +181,11 @@ class IntrusionDetectionModule(BaseAIModule):
             logger.error(f"Error detecting objects: {e}")
             return []
 
-    def _check_zone(self, detection: Dict, zones: List[Dict]) -> Optional[Dict]:
-        """Check if detection is in restricted zone"""
-        # TODO: Implement zone checking logic
-        # Check if bbox center or any point is within zone polygon
-        return None
-
+    def _check_zone(self, detection: Dict, zones: ZoneMap) -> Optional[Dict]:
+        """Check if detection's bbox center is in a restricted zone"""
+        center = detection.get('center')
+        if center is None:
+            x, y, w, h = detection['bbox']
+            center = (x + w / 2, y + h / 2)
+        names = zones.zones_at([center])[0]
+        return {'name': names[0]} if names else None
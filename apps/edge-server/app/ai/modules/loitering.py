@@ -16,6 +16,11 @@ class LoiteringDetectionModule(BaseAIModule):
     Loitering Detection AI Module
     Detects people staying in an area for too long
     """
+
+    uses_shared_detector = True
+    detector_classes = [0]  # person
+    uses_person_tracks = True
+    propagates_tracks = True
     
     def __init__(self, confidence_threshold: float = 0.5):
         super().__init__(
@@ -23,14 +28,14 @@ class LoiteringDetectionModule(BaseAIModule):
             module_name="Loitering Detection",
             confidence_threshold=confidence_threshold
         )
-        self.tracking_data: Dict[str, Dict] = {}  # track_id -> {start_time, location, duration}
+        self.tracking_data: Dict[str, Dict[int, Dict]] = {}  # camera_id -> track_id -> {start_time, location, last_seen}
         self.loitering_threshold_seconds = 60  # Alert if person stays > 60 seconds
 
     def initialize(self) -> bool:
         """Initialize loitering detection"""
         try:
-            # TODO: Load person detection and tracking models
-            logger.info("Loitering Detection module initialized (placeholder - replace with actual model)")
+            # People and their track ids come from the shared track service
+            logger.info("Loitering Detection module initialized")
             self._initialized = True
             return True
         except Exception as e:
@@ -54,28 +59,28 @@ class LoiteringDetectionModule(BaseAIModule):
         }
 
         try:
-            # TODO: Implement loitering detection
-            # 1. Detect and track people
+            # 1. Track people (shared track service)
             # 2. Calculate time spent in same location
             # 3. Alert if exceeds threshold
             
             tracked_people = self._track_people(camera_id, frame)
+            camera_tracks = self.tracking_data.setdefault(camera_id, {})
             now = datetime.utcnow()
             
             for person in tracked_people:
                 track_id = person.get('track_id')
-                location = person.get('location')  # Center point of bbox
+                location = person.get('center')  # Center point of bbox
                 
-                if track_id not in self.tracking_data:
+                if track_id not in camera_tracks:
                     # New person detected
-                    self.tracking_data[track_id] = {
+                    camera_tracks[track_id] = {
                         'start_time': now,
                         'location': location,
                         'last_seen': now,
                     }
                 else:
                     # Update tracking
-                    track_data = self.tracking_data[track_id]
+                    track_data = camera_tracks[track_id]
                     track_data['last_seen'] = now
                     
                     # Check if person is in same location (within threshold)
@@ -125,10 +130,21 @@ class LoiteringDetectionModule(BaseAIModule):
 
         return results
 
+    def keep_alive(self, camera_id: str, metadata: Optional[Dict] = None):
+        """Static scene: tracked people are still where they were"""
+        now = datetime.utcnow()
+        for track_data in self.tracking_data.get(camera_id, {}).values():
+            track_data['last_seen'] = now
+
     def _track_people(self, camera_id: str, frame: np.ndarray) -> List[Dict]:
-        """Track people in frame"""
-        # TODO: Use person detection + tracking (DeepSORT)
-        return []
+        """Tracked people of the frame (expired tracks are forgotten)"""
+        tracks = self.person_tracks()
+        if tracks is None:
+            return []
+        camera_tracks = self.tracking_data.get(camera_id, {})
+        for track_id in tracks.ended:
+            camera_tracks.pop(track_id, None)
+        return tracks.persons
 
     def _is_same_location(self, loc1: tuple, loc2: tuple, threshold: float = 50.0) -> bool:
         """Check if two locations are the same (within threshold pixels)"""
@@ -154,6 +154,9 @@ class EventDispatcher:
         """
         Capture snapshot with face blurring
         
+        Always returns an owned copy: the snapshot travels with the event to
+        the outbox and uploader long after the frame's bus slot is reused
+        
         Args:
             frame: Original frame
             event: Event dict
@@ -171,14 +174,11 @@ class EventDispatcher:
         if self.only_high_risk and risk_level not in ['high', 'critical']:
             return None
         
-        if not CV2_AVAILABLE:
-            return frame.copy()
-        
         try:
             snapshot = frame.copy()
             
             # Blur faces if enabled
-            if self.face_blur:
+            if CV2_AVAILABLE and self.face_blur:
                 snapshot = self._blur_faces(snapshot, person_bbox)
             
             return snapshot
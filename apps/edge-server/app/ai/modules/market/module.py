@@ -7,6 +7,7 @@ suspicious behavior in retail settings. It NEVER accuses theft,
 only reports risk-based suspicious behavior.
 """
 import numpy as np
+from time import perf_counter
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from pathlib import Path
@@ -14,12 +15,14 @@ import yaml
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.zones import ZoneCache
+from app.core.metrics import MARKET_STAGE_LATENCY
 from config.settings import settings
 
 # Import market module components
 try:
     from app.ai.modules.market.person_tracking import PersonTracker
-    from app.ai.modules.market.shelf_interaction import ShelfInteractionDetector
+    from app.ai.modules.market.shelf_interaction import ShelfInteractionDetector, RETAIL_OBJECT_CLASSES
     from app.ai.modules.market.temporal_filter import TemporalFilter
     from app.ai.modules.market.pose_concealment import PoseConcealmentDetector
     from app.ai.modules.market.zone_logic import ZoneLogic
@@ -43,6 +46,13 @@ class MarketModule(BaseAIModule):
     6. Risk Scoring Engine
     7. Event Dispatcher
     """
+
+    STAGES = ("tracking", "shelf", "temporal", "pose", "zone", "risk", "dispatch")
+
+    uses_shared_detector = True
+    detector_classes = [0] + RETAIL_OBJECT_CLASSES  # person + retail items
+    uses_person_tracks = True
+    propagates_tracks = True
     
     def __init__(self, confidence_threshold: float = 0.5):
         super().__init__(
@@ -62,14 +72,19 @@ class MarketModule(BaseAIModule):
         self._zone_logic = None
         self._risk_engine = None
         self._event_dispatcher = None
+        self._unavailable_stages: List[str] = []
         
         # Per-camera zone definitions
         self._zones: Dict[str, Dict] = {}  # camera_id -> {zone_name: polygon}
+        self._shelf_zones = ZoneCache(include=lambda name: 'shelf' in name.lower())  # compiled per camera
+        
+        # Per-stage latency series (edge_market_stage_seconds)
+        self._stage_latency = {stage: MARKET_STAGE_LATENCY.labels(stage) for stage in self.STAGES}
     
     def _load_config(self) -> Dict:
         """Load configuration from YAML file"""
         try:
-            config_path = Path(__file__).parent / "market" / "config.yaml"
+            config_path = Path(__file__).parent / "config.yaml"
             if config_path.exists():
                 with open(config_path, 'r') as f:
                     config = yaml.safe_load(f)
@@ -88,13 +103,18 @@ class MarketModule(BaseAIModule):
             # Initialize components with config
             detection_config = self.config.get('detection', {})
             tracking_config = self.config.get('tracking', {})
+            self._unavailable_stages = []
             
             # Stage 1: Person Tracking
             self._person_tracker = PersonTracker(
                 confidence_threshold=detection_config.get('person_confidence', 0.5),
-                track_expiry=tracking_config.get('track_expiry', 300)
+                track_expiry=tracking_config.get('track_expiry', 300),
+                detection_interval=settings.DETECTION_INTERVAL,
+                min_quality=settings.TRACK_MIN_QUALITY,
+                optical_flow=settings.TRACK_OPTICAL_FLOW
             )
             if not self._person_tracker.initialize():
+                self._unavailable_stages.append("person_tracking")
                 logger.warning("Person Tracker initialization failed - module will be limited")
             
             # Stage 2: Shelf Interaction
@@ -104,12 +124,14 @@ class MarketModule(BaseAIModule):
                 confidence_threshold=detection_config.get('person_confidence', 0.5)
             )
             if not self._shelf_interaction.initialize():
+                self._unavailable_stages.append("shelf_interaction")
                 logger.warning("Shelf Interaction Detector initialization failed - module will be limited")
             
             # Stage 3: Temporal Filter
             self._temporal_filter = TemporalFilter(
                 min_tracking_duration=detection_config.get('min_tracking_duration', 3.0),
-                max_track_gap=detection_config.get('max_track_gap', 1.0)
+                max_track_gap=detection_config.get('max_track_gap', 1.0),
+                history_size=tracking_config.get('history_size', 256)
             )
             
             # Stage 4: Pose Concealment
@@ -119,10 +141,14 @@ class MarketModule(BaseAIModule):
                 concealment_zones=concealment_config
             )
             if not self._pose_concealment.initialize():
+                self._unavailable_stages.append("pose_concealment")
                 logger.warning("Pose Concealment Detector initialization failed - module will be limited")
             
             # Stage 5: Zone Logic
-            self._zone_logic = ZoneLogic()
+            self._zone_logic = ZoneLogic(
+                history_size=tracking_config.get('zone_history_size', 32),
+                track_expiry=tracking_config.get('track_expiry', 300)
+            )
             
             # Stage 6: Risk Engine
             self._risk_engine = RiskEngine(config=self.config)
@@ -139,6 +165,25 @@ class MarketModule(BaseAIModule):
             self._initialized = False
             return False
     
+    def detector_confidence(self) -> float:
+        """Lowest confidence needed by the tracker and shelf stages"""
+        thresholds = [
+            stage.confidence_threshold
+            for stage in (self._person_tracker, self._shelf_interaction)
+            if stage is not None
+        ]
+        return min(thresholds) if thresholds else self.confidence_threshold
+    
+    def unavailable_stages(self) -> List[str]:
+        """Stages whose model failed to load"""
+        return list(self._unavailable_stages)
+    
+    def _stage_done(self, stage: str, start: float) -> float:
+        """Record a stage's latency and return the start of the next stage"""
+        now = perf_counter()
+        self._stage_latency[stage].observe(now - start)
+        return now
+    
     def process_frame(
         self,
         frame: np.ndarray,
@@ -177,24 +222,36 @@ class MarketModule(BaseAIModule):
             
             zones = self._zones.get(camera_id, {})
             
-            # Extract shelf zones
-            shelf_zones = [
-                {'name': name, 'polygon': polygon}
-                for name, polygon in zones.items()
-                if 'shelf' in name.lower()
-            ]
+            # Shelf zones, compiled again only when the camera's zones change
+            shelf_zones = self._shelf_zones.get(camera_id, zones)
             
             # Stage 1: Person Detection & Tracking
+            stage_start = perf_counter()
             tracked_persons = []
+            tracks = self.person_tracks()
             if self._person_tracker:
                 try:
-                    tracked_persons = self._person_tracker.process_frame(
-                        frame, camera_id, zones
-                    )
+                    if tracks is not None:
+                        # Shared per-camera tracks: same ids as the other person modules
+                        tracked_persons = self._person_tracker.process_frame(
+                            frame, camera_id, zones, tracks=tracks
+                        )
+                        if self._zone_logic:
+                            for track_id in tracks.ended:
+                                self._zone_logic.cleanup_track(camera_id, track_id)
+                    else:
+                        tracked_persons = self._person_tracker.process_frame(
+                            frame, camera_id, zones,
+                            detections=self.shared_detections(
+                                [0], self._person_tracker.confidence_threshold
+                            ),
+                            keyframe=self.detection_keyframe()
+                        )
                 except Exception as e:
                     logger.error(f"Person tracking error: {e}")
                     if not self.config.get('behavior', {}).get('graceful_failure', True):
                         raise
+            stage_start = self._stage_done("tracking", stage_start)
             
             if not tracked_persons:
                 return results
@@ -204,12 +261,16 @@ class MarketModule(BaseAIModule):
             if self._shelf_interaction:
                 try:
                     interactions = self._shelf_interaction.process_frame(
-                        frame, camera_id, tracked_persons, shelf_zones
+                        frame, camera_id, tracked_persons, shelf_zones,
+                        objects=self.shared_detections(
+                            RETAIL_OBJECT_CLASSES, self._shelf_interaction.confidence_threshold
+                        )
                     )
                 except Exception as e:
                     logger.error(f"Shelf interaction error: {e}")
                     if not self.config.get('behavior', {}).get('graceful_failure', True):
                         raise
+            stage_start = self._stage_done("shelf", stage_start)
             
             # Stage 3: Temporal Filtering
             filtered_interactions = []
@@ -224,6 +285,7 @@ class MarketModule(BaseAIModule):
                         raise
             else:
                 filtered_interactions = interactions
+            stage_start = self._stage_done("temporal", stage_start)
             
             # Stage 4: Pose-Based Concealment Detection
             concealments = []
@@ -236,6 +298,7 @@ class MarketModule(BaseAIModule):
                     logger.error(f"Pose concealment error: {e}")
                     if not self.config.get('behavior', {}).get('graceful_failure', True):
                         raise
+            stage_start = self._stage_done("pose", stage_start)
             
             # Stage 5: Zone Logic
             zone_events = []
@@ -248,6 +311,7 @@ class MarketModule(BaseAIModule):
                     logger.error(f"Zone logic error: {e}")
                     if not self.config.get('behavior', {}).get('graceful_failure', True):
                         raise
+            stage_start = self._stage_done("zone", stage_start)
             
             # Stage 6: Risk Scoring
             actions = []
@@ -268,6 +332,7 @@ class MarketModule(BaseAIModule):
                     logger.error(f"Risk scoring error: {e}")
                     if not self.config.get('behavior', {}).get('graceful_failure', True):
                         raise
+            stage_start = self._stage_done("risk", stage_start)
             
             # Stage 7: Event Dispatcher
             if risk_result and self._risk_engine.should_generate_alert(risk_result['risk_level']):
@@ -329,6 +394,7 @@ class MarketModule(BaseAIModule):
                         'camera_id': camera_id,
                         'timestamp': datetime.utcnow().isoformat(),
                     })
+                self._stage_done("dispatch", stage_start)
         
         except Exception as e:
             logger.error(f"Error processing frame in Market Module: {e}")
@@ -337,6 +403,11 @@ class MarketModule(BaseAIModule):
         
         return results
     
+    def keep_alive(self, camera_id: str, metadata: Optional[Dict] = None):
+        """Keep person tracks alive on frames skipped by the motion gate"""
+        if self._person_tracker:
+            self._person_tracker.keep_alive(camera_id)
+    
     def cleanup(self):
         """Cleanup all resources"""
         if self._person_tracker:
@@ -357,5 +428,6 @@ class MarketModule(BaseAIModule):
         self._zone_logic = None
         self._risk_engine = None
         self._event_dispatcher = None
+        self._shelf_zones.clear()
         
         super().cleanup()
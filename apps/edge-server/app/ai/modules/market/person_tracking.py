@@ -4,17 +4,14 @@ Stage 1 of Market Module Pipeline
 Uses YOLO for detection and ByteTrack for tracking
 """
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from collections import defaultdict
 from loguru import logger
 
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
-    logger.warning("ultralytics not available - person tracking will be limited")
+from app.ai.detector import load_yolo
+from app.ai.tracker import IoUTracker
+from app.ai.zones import ZoneCache
 
 try:
     from byte_tracker import BYTETracker
@@ -28,16 +25,28 @@ class PersonTracker:
     """
     Person Detection & Tracking
     - Detects people using YOLO
-    - Tracks across frames using ByteTrack (or fallback)
+    - Tracks across frames using the shared track service, or its own
+      ByteTrack (or fallback) tracker when no shared tracks are attached
+    - Optionally detects only every N frames, propagating tracks in between
     - Assigns temporary track_id
     - Tracks across zones (Shelf, Checkout, Exit)
     - NO identity persistence
     - track_id expires automatically
     """
     
-    def __init__(self, confidence_threshold: float = 0.5, track_expiry: int = 300):
+    def __init__(
+        self,
+        confidence_threshold: float = 0.5,
+        track_expiry: int = 300,
+        detection_interval: int = 1,
+        min_quality: float = 0.5,
+        optical_flow: bool = False
+    ):
         self.confidence_threshold = confidence_threshold
         self.track_expiry = track_expiry  # seconds
+        self.detection_interval = max(1, detection_interval)
+        self.min_quality = min_quality  # propagated track quality that forces a detection
+        self.optical_flow = optical_flow
         
         # Detection model
         self._detection_model = None
@@ -46,24 +55,25 @@ class PersonTracker:
         self._trackers: Dict[str, any] = {}  # camera_id -> tracker
         self._tracks: Dict[str, Dict[int, Dict]] = defaultdict(dict)  # camera_id -> track_id -> track_data
         self._track_created: Dict[str, Dict[int, datetime]] = defaultdict(dict)  # track creation time
+        self._since_detection: Dict[str, int] = {}  # camera_id -> frames propagated since last detection
         
         # Zone tracking per track
         self._track_zones: Dict[str, Dict[int, set]] = defaultdict(lambda: defaultdict(set))
+        self._zone_maps = ZoneCache()  # compiled zones per camera
         
         self._initialized = False
     
     def initialize(self) -> bool:
         """Initialize detection model"""
-        if not YOLO_AVAILABLE:
-            logger.warning("YOLO not available - person tracking disabled")
-            return False
-        
         try:
             # Use YOLOv8n (nano) for speed, or yolov8s for better accuracy
-            self._detection_model = YOLO('yolov8n.pt')
+            self._detection_model = load_yolo('yolov8n.pt')
             logger.info("Person Tracker initialized with YOLOv8")
             self._initialized = True
             return True
+        except ImportError:
+            logger.warning("YOLO not available - person tracking disabled")
+            return False
         except Exception as e:
             logger.error(f"Failed to initialize Person Tracker: {e}")
             return False
@@ -72,7 +82,10 @@ class PersonTracker:
         self,
         frame: np.ndarray,
         camera_id: str,
-        zones: Optional[Dict[str, List]] = None
+        zones: Optional[Dict[str, List]] = None,
+        detections: Optional[List[Dict]] = None,
+        keyframe: bool = True,
+        tracks=None
     ) -> List[Dict]:
         """
         Process frame for person detection and tracking
@@ -81,6 +94,11 @@ class PersonTracker:
             frame: Input frame
             camera_id: Camera identifier
             zones: Zone definitions {zone_name: [polygon_points]}
+            detections: Person detections from the shared detector pass
+                (when None, the tracker runs its own detection)
+            keyframe: False when the shared detections were carried over from
+                an earlier frame; tracks are then propagated instead
+            tracks: The camera's shared PersonTracks (used instead of detections)
             
         Returns:
             List of tracked persons:
@@ -93,34 +111,23 @@ class PersonTracker:
                 'age': float  # seconds since first detection
             }]
         """
-        if not self._initialized or not self._detection_model:
+        if tracks is not None:
+            return self._adopt_tracks(camera_id, tracks)
+        
+        if detections is None and (not self._initialized or not self._detection_model):
             return []
         
         try:
-            # Detect people (class 0 in COCO)
-            results = self._detection_model(
-                frame,
-                classes=[0],  # person class only
-                conf=self.confidence_threshold,
-                verbose=False
-            )
-            
-            # Extract detections
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = float(box.conf[0].cpu().numpy())
-                    
-                    detections.append({
-                        'bbox': [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],
-                        'confidence': confidence,
-                        'center': (int((x1 + x2) / 2), int((y1 + y2) / 2))
-                    })
+            if detections is None:
+                keyframe = self.needs_detection(camera_id)
+                if keyframe:
+                    detections = self._detect_people(frame)
             
             # Update tracker
-            tracked_persons = self._update_tracking(camera_id, detections, zones)
+            if keyframe:
+                tracked_persons = self._update_tracking(camera_id, detections, zones, frame)
+            else:
+                tracked_persons = self._propagate_tracking(camera_id, zones, frame)
             
             # Cleanup expired tracks
             self._cleanup_expired_tracks(camera_id)
@@ -131,26 +138,69 @@ class PersonTracker:
             logger.error(f"Error in person tracking: {e}")
             return []
     
+    def _detect_people(self, frame: np.ndarray) -> List[Dict]:
+        """Detect people (class 0 in COCO) with the tracker's own model"""
+        results = self._detection_model(
+            frame,
+            classes=[0],  # person class only
+            conf=self.confidence_threshold,
+            verbose=False
+        )
+        
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            for box in boxes:
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                confidence = float(box.conf[0].cpu().numpy())
+                
+                detections.append({
+                    'bbox': [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],
+                    'confidence': confidence,
+                    'center': (int((x1 + x2) / 2), int((y1 + y2) / 2))
+                })
+        
+        return detections
+    
+    def needs_detection(self, camera_id: str) -> bool:
+        """
+        Whether the camera's next frame needs a detector pass
+
+        True every detection_interval frames, and earlier when a propagated
+        track's quality falls below min_quality
+        """
+        tracker = self._trackers.get(camera_id)
+        if self.detection_interval <= 1 or not isinstance(tracker, IoUTracker):
+            return True
+        if self._since_detection.get(camera_id, 0) + 1 >= self.detection_interval:
+            return True
+        return tracker.min_quality() < self.min_quality
+
     def _update_tracking(
         self,
         camera_id: str,
         detections: List[Dict],
-        zones: Optional[Dict[str, List]] = None
+        zones: Optional[Dict[str, List]] = None,
+        frame: Optional[np.ndarray] = None
     ) -> List[Dict]:
         """Update tracking with new detections"""
-        if not detections:
-            # Update existing tracks (mark as not seen this frame)
-            for track_id in list(self._tracks[camera_id].keys()):
-                self._tracks[camera_id][track_id]['seen'] = False
-            return []
-        
         # Initialize tracker for camera if needed
         if camera_id not in self._trackers:
             if BYTETRACK_AVAILABLE:
                 self._trackers[camera_id] = BYTETracker()
             else:
-                # Simple fallback tracker (IoU-based)
-                self._trackers[camera_id] = SimpleTracker()
+                # Fallback tracker (IoU with optimal assignment)
+                self._trackers[camera_id] = IoUTracker(optical_flow=self.optical_flow)
+        self._since_detection[camera_id] = 0
+        
+        if not detections:
+            # Update existing tracks (mark as not seen this frame)
+            for track_id in list(self._tracks[camera_id].keys()):
+                self._tracks[camera_id][track_id]['seen'] = False
+            if not BYTETRACK_AVAILABLE:
+                # Age unmatched tracks so they expire
+                self._trackers[camera_id].update([], frame)
+            return []
         
         # Convert detections to tracker format
         tracker_detections = []
@@ -163,13 +213,71 @@ class PersonTracker:
         if BYTETRACK_AVAILABLE:
             tracked_objects = tracker.update(np.array(tracker_detections), frame=None)
         else:
-            tracked_objects = tracker.update(tracker_detections)
+            tracked_objects = tracker.update(tracker_detections, frame)
+        
+        return self._tracks_to_persons(camera_id, tracked_objects, zones)
+    
+    def _propagate_tracking(
+        self,
+        camera_id: str,
+        zones: Optional[Dict[str, List]] = None,
+        frame: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """Advance tracks on a frame without detections (Kalman prediction / optical flow)"""
+        tracker = self._trackers.get(camera_id)
+        if not isinstance(tracker, IoUTracker):
+            return []
+        self._since_detection[camera_id] = self._since_detection.get(camera_id, 0) + 1
+        return self._tracks_to_persons(camera_id, tracker.propagate(frame), zones)
+    
+    def _adopt_tracks(self, camera_id: str, tracks) -> List[Dict]:
+        """Take tracked persons from the shared track service"""
+        now = datetime.utcnow()
+        camera_tracks = self._tracks[camera_id]
+        for track_id in tracks.ended:
+            camera_tracks.pop(track_id, None)
+            self._track_created[camera_id].pop(track_id, None)
+            self._track_zones[camera_id].pop(track_id, None)
+        for track in camera_tracks.values():
+            track['seen'] = False
         
-        # Process tracked objects
+        tracked_persons = []
+        for person in tracks.persons:
+            track_id = person['track_id']
+            if track_id not in camera_tracks:
+                camera_tracks[track_id] = {
+                    'confidence': person['confidence'],
+                    'first_seen': now,
+                }
+                self._track_created[camera_id][track_id] = now
+            camera_tracks[track_id].update({
+                'bbox': person['bbox'],
+                'center': person['center'],
+                'seen': True,
+                'last_seen': now,
+            })
+            self._track_zones[camera_id][track_id].update(person['zones'])
+            tracked_persons.append(dict(person))
+        
+        self._cleanup_expired_tracks(camera_id)
+        return tracked_persons
+    
+    def _tracks_to_persons(
+        self,
+        camera_id: str,
+        tracked_objects,
+        zones: Optional[Dict[str, List]] = None
+    ) -> List[Dict]:
+        """Convert tracker rows [x1, y1, x2, y2, track_id, conf] into tracked persons"""
         tracked_persons = []
         now = datetime.utcnow()
         
-        for track in tracked_objects:
+        # Zones of every track center in one lookup
+        zone_map = self._zone_maps.get(camera_id, zones)
+        centers = [((t[0] + t[2]) / 2, (t[1] + t[3]) / 2) for t in tracked_objects]
+        center_zones = zone_map.zones_at(centers) if zone_map else [()] * len(centers)
+        
+        for track, zone_names in zip(tracked_objects, center_zones):
             track_id = int(track[4]) if len(track) > 4 else None
             
             if track_id is None:
@@ -185,7 +293,7 @@ class PersonTracker:
                 self._tracks[camera_id][track_id] = {
                     'bbox': bbox,
                     'center': center,
-                    'confidence': track[5] if len(track) > 5 else 0.5,
+                    'confidence': float(track[5]) if len(track) > 5 else 0.5,
                     'seen': True,
                     'first_seen': now,
                     'last_seen': now,
@@ -200,13 +308,9 @@ class PersonTracker:
                     'last_seen': now,
                 })
             
-            # Check zones
-            track_zones = set()
-            if zones:
-                for zone_name, zone_polygon in zones.items():
-                    if self._point_in_zone(center, zone_polygon):
-                        track_zones.add(zone_name)
-                        self._track_zones[camera_id][track_id].add(zone_name)
+            # Record zones
+            track_zones = set(zone_names)
+            self._track_zones[camera_id][track_id].update(track_zones)
             
             # Calculate track age
             first_seen = self._track_created[camera_id].get(track_id, now)
@@ -223,29 +327,13 @@ class PersonTracker:
         
         return tracked_persons
     
-    def _point_in_zone(self, point: Tuple[int, int], zone_polygon: List) -> bool:
-        """Check if point is inside zone polygon"""
-        if not zone_polygon or len(zone_polygon) < 3:
-            return False
-        
-        x, y = point
-        n = len(zone_polygon)
-        inside = False
-        
-        p1x, p1y = zone_polygon[0]
-        for i in range(1, n + 1):
-            p2x, p2y = zone_polygon[i % n]
-            if y > min(p1y, p2y):
-                if y <= max(p1y, p2y):
-                    if x <= max(p1x, p2x):
-                        if p1y != p2y:
-                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                        if p1x == p2x or x <= xinters:
-                            inside = not inside
-            p1x, p1y = p2x, p2y
-        
-        return inside
-    
+    def keep_alive(self, camera_id: str):
+        """Refresh tracks visible on the last analyzed frame when a static frame is skipped"""
+        now = datetime.utcnow()
+        for track in self._tracks.get(camera_id, {}).values():
+            if track.get('seen'):
+                track['last_seen'] = now
+
     def _cleanup_expired_tracks(self, camera_id: str):
         """Remove expired tracks"""
         now = datetime.utcnow()
@@ -277,15 +365,21 @@ class PersonTracker:
         """Cleanup resources"""
         self._detection_model = None
         self._trackers.clear()
+        self._since_detection.clear()
         self._tracks.clear()
         self._track_created.clear()
         self._track_zones.clear()
+        self._zone_maps.clear()
         self._initialized = False
 
 
 class SimpleTracker:
     """
-    Simple IoU-based tracker (fallback when ByteTrack not available)
+    Simple greedy IoU-based tracker
+
+    Superseded by app.ai.tracker.IoUTracker as the ByteTrack fallback; kept
+    as the reference implementation for the tracker micro-benchmark.
+    Returns rows as [x1, y1, x2, y2, confidence, track_id].
     """
     def __init__(self):
         self.tracks = {}
@@ -8,11 +8,11 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from loguru import logger
 
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
+from app.ai.detector import load_yolo
+from app.ai.zones import ZoneMap
+
+# Common retail items in COCO: 39=bottle, 40=wine glass, 41=cup, 67=cell phone
+RETAIL_OBJECT_CLASSES = [39, 40, 41, 67]
 
 
 class ShelfInteractionDetector:
@@ -49,16 +49,15 @@ class ShelfInteractionDetector:
     
     def initialize(self) -> bool:
         """Initialize object detection model"""
-        if not YOLO_AVAILABLE:
-            logger.warning("YOLO not available - shelf interaction detection disabled")
-            return False
-        
         try:
             # Use YOLO for object detection
-            self._object_model = YOLO('yolov8n.pt')
+            self._object_model = load_yolo('yolov8n.pt')
             logger.info("Shelf Interaction Detector initialized")
             self._initialized = True
             return True
+        except ImportError:
+            logger.warning("YOLO not available - shelf interaction detection disabled")
+            return False
         except Exception as e:
             logger.error(f"Failed to initialize Shelf Interaction Detector: {e}")
             return False
@@ -68,7 +67,8 @@ class ShelfInteractionDetector:
         frame: np.ndarray,
         camera_id: str,
         tracked_persons: List[Dict],
-        shelf_zones: Optional[List[Dict]] = None
+        shelf_zones: Optional[ZoneMap] = None,
+        objects: Optional[List[Dict]] = None
     ) -> List[Dict]:
         """
         Detect shelf interactions
@@ -77,7 +77,9 @@ class ShelfInteractionDetector:
             frame: Input frame
             camera_id: Camera identifier
             tracked_persons: List of tracked persons from Stage 1
-            shelf_zones: List of shelf zone definitions
+            shelf_zones: Compiled shelf zones of the camera
+            objects: Retail object detections from the shared detector pass
+                (when None, the detector runs its own model)
             
         Returns:
             List of detected interactions:
@@ -90,7 +92,7 @@ class ShelfInteractionDetector:
                 'bbox': [x, y, w, h]  # object bbox
             }]
         """
-        if not self._initialized or not shelf_zones:
+        if not shelf_zones or (objects is None and not self._initialized):
             return []
         
         interactions = []
@@ -101,7 +103,12 @@ class ShelfInteractionDetector:
             self._interactions[camera_id] = {}
         
         # Detect objects in frame
-        objects = self._detect_objects(frame)
+        if objects is None:
+            objects = self._detect_objects(frame)
+        
+        # Shelf zone of every object in one lookup; objects off the shelves are ignored
+        object_zones = shelf_zones.zones_at([obj['center'] for obj in objects])
+        shelf_objects = [(obj, names[0]) for obj, names in zip(objects, object_zones) if names]
         
         # For each tracked person, check for shelf interactions
         for person in tracked_persons:
@@ -122,17 +129,17 @@ class ShelfInteractionDetector:
             hand_bbox = self._estimate_hand_bbox(person_bbox)
             
             # Find objects near hand
-            nearby_objects = self._find_nearby_objects(hand_bbox, objects, shelf_zones)
+            nearby_objects = self._find_nearby_objects(hand_bbox, shelf_objects)
             
             # Check for pick-up events
-            for obj in nearby_objects:
+            for obj, shelf_zone in nearby_objects:
                 interaction = self._check_pickup(
                     camera_id,
                     track_id,
                     person_bbox,
                     hand_bbox,
                     obj,
-                    shelf_zones,
+                    shelf_zone,
                     now
                 )
                 
@@ -151,10 +158,9 @@ class ShelfInteractionDetector:
         
         try:
             # Detect common retail objects (bottles, bags, etc.)
-            # COCO classes: 39=bottle, 40=wine glass, 41=cup, 67=cell phone, etc.
             results = self._object_model(
                 frame,
-                classes=[39, 40, 41, 67],  # Common retail items
+                classes=RETAIL_OBJECT_CLASSES,
                 conf=self.confidence_threshold,
                 verbose=False
             )
@@ -196,30 +202,17 @@ class ShelfInteractionDetector:
     def _find_nearby_objects(
         self,
         hand_bbox: List[int],
-        objects: List[Dict],
-        shelf_zones: List[Dict]
-    ) -> List[Dict]:
-        """Find objects near hand that are in shelf zones"""
+        shelf_objects: List[Tuple[Dict, str]]
+    ) -> List[Tuple[Dict, str]]:
+        """Find objects near hand among the (object, shelf zone) pairs on the shelves"""
         nearby = []
         
-        for obj in objects:
-            obj_center = obj['center']
-            
-            # Check if object is in shelf zone
-            in_shelf = False
-            for zone in shelf_zones:
-                if self._point_in_zone(obj_center, zone.get('polygon', [])):
-                    in_shelf = True
-                    break
-            
-            if not in_shelf:
-                continue
-            
+        for obj, shelf_zone in shelf_objects:
             # Check if object overlaps with hand region
             overlap = self._calculate_bbox_overlap(hand_bbox, obj['bbox'])
             
             if overlap > self.overlap_threshold:
-                nearby.append(obj)
+                nearby.append((obj, shelf_zone))
         
         return nearby
     
@@ -230,7 +223,7 @@ class ShelfInteractionDetector:
         person_bbox: List[int],
         hand_bbox: List[int],
         obj: Dict,
-        shelf_zones: List[Dict],
+        shelf_zone: str,
         timestamp: datetime
     ) -> Optional[Dict]:
         """
@@ -273,13 +266,6 @@ class ShelfInteractionDetector:
                     }
         else:
             # New interaction
-            # Find which shelf zone
-            shelf_zone = 'unknown'
-            for zone in shelf_zones:
-                if self._point_in_zone(obj['center'], zone.get('polygon', [])):
-                    shelf_zone = zone.get('name', 'unknown')
-                    break
-            
             interactions[interaction_key] = {
                 'first_seen': timestamp,
                 'last_seen': timestamp,
@@ -315,29 +301,6 @@ class ShelfInteractionDetector:
         
         return intersection / union if union > 0 else 0.0
     
-    def _point_in_zone(self, point: Tuple[int, int], zone_polygon: List) -> bool:
-        """Check if point is inside zone polygon"""
-        if not zone_polygon or len(zone_polygon) < 3:
-            return False
-        
-        x, y = point
-        n = len(zone_polygon)
-        inside = False
-        
-        p1x, p1y = zone_polygon[0]
-        for i in range(1, n + 1):
-            p2x, p2y = zone_polygon[i % n]
-            if y > min(p1y, p2y):
-                if y <= max(p1y, p2y):
-                    if x <= max(p1x, p2x):
-                        if p1y != p2y:
-                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                        if p1x == p2x or x <= xinters:
-                            inside = not inside
-            p1x, p1y = p2x, p2y
-        
-        return inside
-    
     def _cleanup_old_interactions(self, camera_id: str, now: datetime):
         """Remove old interaction data"""
         if camera_id not in self._interactions:
@@ -3,11 +3,86 @@ Temporal Filtering
 Stage 3 of Market Module Pipeline
 Filters out short interactions and broken track chains
 """
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
+import math
+import time
+from typing import Dict, List, Optional, Set
+from collections import OrderedDict, defaultdict
+import numpy as np
 from loguru import logger
 
+HISTORY_SECONDS = 10.0  # samples this far behind a track's newest one leave its history
+STALE_SECONDS = 30.0  # tracks not seen for this long are dropped
+
+
+class TrackHistory:
+    """
+    Fixed-capacity ring buffer of one track's samples
+
+    Timestamps are monotonic seconds. The window start and the last gap are
+    maintained on append, so age and continuity queries are O(1). When the
+    buffer is full the oldest sample is overwritten.
+    """
+
+    __slots__ = ('times', 'boxes', 'start', 'end', 'gap_start', 'gap_end', 'zones')
+
+    def __init__(self, capacity: int):
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)  # [x, y, w, h]
+        self.start = 0  # samples that have left the window
+        self.end = 0  # samples appended
+        self.gap_start = -math.inf  # last sample before the latest gap
+        self.gap_end = -math.inf  # first sample after it
+        self.zones: Set[str] = set()  # zones visited
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def append(self, timestamp: float, bbox: List[int], max_gap: float) -> float:
+        """
+        Add a sample
+
+        Returns:
+            Seconds since the previous sample (0.0 for the first)
+        """
+        capacity = len(self.times)
+        gap = 0.0
+        if self.end:
+            gap = timestamp - self.last_seen()
+            if gap > max_gap:
+                self.gap_start = timestamp - gap
+                self.gap_end = timestamp
+
+        slot = self.end % capacity
+        self.times[slot] = timestamp
+        self.boxes[slot] = bbox
+        self.end += 1
+
+        # Advance the window start past overwritten and expired samples
+        start = max(self.start, self.end - capacity)
+        cutoff = timestamp - HISTORY_SECONDS
+        while self.times[start % capacity] <= cutoff:
+            start += 1
+        self.start = start
+        return gap
+
+    def first_seen(self) -> float:
+        """Timestamp of the oldest sample in the window"""
+        return float(self.times[self.start % len(self.times)])
+
+    def last_seen(self) -> float:
+        """Timestamp of the newest sample"""
+        return float(self.times[(self.end - 1) % len(self.times)])
+
+    def age(self) -> float:
+        """Seconds spanned by the samples in the window"""
+        return self.last_seen() - self.first_seen() if self.end else 0.0
+
+    def continuous(self, now: float, recent: float) -> bool:
+        """No gap within the window, and none that ended less than `recent` seconds ago"""
+        if not self.end or now - self.gap_end < recent:
+            return False
+        return self.gap_start < self.first_seen()
+
 
 class TemporalFilter:
     """
@@ -23,16 +98,15 @@ class TemporalFilter:
     def __init__(
         self,
         min_tracking_duration: float = 3.0,
-        max_track_gap: float = 1.0
+        max_track_gap: float = 1.0,
+        history_size: int = 256
     ):
         self.min_tracking_duration = min_tracking_duration  # seconds
         self.max_track_gap = max_track_gap  # seconds
+        self.history_size = history_size  # samples kept per track
         
-        # Track history per person
-        self._track_history: Dict[str, Dict[int, List[Dict]]] = defaultdict(lambda: defaultdict(list))
-        
-        # Track gaps (missing frames)
-        self._track_gaps: Dict[str, Dict[int, datetime]] = defaultdict(dict)
+        # Track history per person, least recently seen first
+        self._track_history: Dict[str, OrderedDict] = defaultdict(OrderedDict)  # camera_id -> track_id -> TrackHistory
     
     def filter_interactions(
         self,
@@ -51,7 +125,7 @@ class TemporalFilter:
         Returns:
             Filtered list of interactions that meet temporal requirements
         """
-        now = datetime.utcnow()
+        now = time.monotonic()
         filtered = []
         
         # Update track history
@@ -93,115 +167,60 @@ class TemporalFilter:
         camera_id: str,
         track_id: int,
         person: Dict,
-        timestamp: datetime
+        timestamp: float
     ):
         """Update track history"""
-        history = self._track_history[camera_id][track_id]
-        
-        # Add current state
-        history.append({
-            'timestamp': timestamp,
-            'bbox': person['bbox'],
-            'center': person['center'],
-            'zones': person.get('zones', set()),
-        })
-        
-        # Check for gaps
-        if len(history) > 1:
-            prev_timestamp = history[-2]['timestamp']
-            gap = (timestamp - prev_timestamp).total_seconds()
-            
-            if gap > self.max_track_gap:
-                # Track gap detected
-                self._track_gaps[camera_id][track_id] = timestamp
-                logger.debug(f"Track {track_id} gap detected: {gap:.2f}s")
-        
-        # Keep only recent history (last 10 seconds)
-        cutoff = timestamp - timedelta(seconds=10)
-        self._track_history[camera_id][track_id] = [
-            entry for entry in history
-            if entry['timestamp'] > cutoff
-        ]
+        histories = self._track_history[camera_id]
+        history = histories.get(track_id)
+        if history is None:
+            history = histories[track_id] = TrackHistory(self.history_size)
+        else:
+            histories.move_to_end(track_id)
+        
+        gap = history.append(timestamp, person['bbox'], self.max_track_gap)
+        if gap > self.max_track_gap:
+            logger.debug(f"Track {track_id} gap detected: {gap:.2f}s")
+        
+        zones = person.get('zones')
+        if zones:
+            history.zones.update(zones)
     
-    def _is_track_continuous(self, camera_id: str, track_id: int, now: datetime) -> bool:
+    def _is_track_continuous(self, camera_id: str, track_id: int, now: float) -> bool:
         """Check if track is continuous (no large gaps)"""
-        if track_id not in self._track_history[camera_id]:
+        history = self._track_history[camera_id].get(track_id)
+        if history is None:
             return False
-        
-        # Check if there's a recent gap
-        if track_id in self._track_gaps[camera_id]:
-            gap_time = self._track_gaps[camera_id][track_id]
-            time_since_gap = (now - gap_time).total_seconds()
-            
-            # If gap was recent, track is not continuous
-            if time_since_gap < self.min_tracking_duration:
-                return False
-        
-        # Check history for continuity
-        history = self._track_history[camera_id][track_id]
-        if len(history) < 2:
-            return True
-        
-        # Check gaps in recent history
-        for i in range(1, len(history)):
-            gap = (history[i]['timestamp'] - history[i-1]['timestamp']).total_seconds()
-            if gap > self.max_track_gap:
-                return False
-        
-        return True
+        return history.continuous(now, self.min_tracking_duration)
     
     def _get_track_age(self, camera_id: str, track_id: int) -> float:
         """Get track age in seconds"""
-        if track_id not in self._track_history[camera_id]:
-            return 0.0
-        
-        history = self._track_history[camera_id][track_id]
-        if not history:
-            return 0.0
-        
-        first_seen = history[0]['timestamp']
-        last_seen = history[-1]['timestamp']
-        
-        return (last_seen - first_seen).total_seconds()
+        history = self._track_history[camera_id].get(track_id)
+        return history.age() if history is not None else 0.0
     
-    def _cleanup_old_history(self, camera_id: str, now: datetime):
-        """Remove old track history"""
-        cutoff = now - timedelta(seconds=30)  # Keep 30 seconds of history
-        
-        for track_id in list(self._track_history[camera_id].keys()):
-            history = self._track_history[camera_id][track_id]
-            self._track_history[camera_id][track_id] = [
-                entry for entry in history
-                if entry['timestamp'] > cutoff
-            ]
-            
-            # Remove track if no history
-            if not self._track_history[camera_id][track_id]:
-                self._track_history[camera_id].pop(track_id, None)
-                self._track_gaps[camera_id].pop(track_id, None)
+    def _cleanup_old_history(self, camera_id: str, now: float):
+        """Remove tracks not seen for STALE_SECONDS (oldest first, stops at the first fresh one)"""
+        histories = self._track_history[camera_id]
+        cutoff = now - STALE_SECONDS
+        while histories:
+            track_id = next(iter(histories))
+            if histories[track_id].last_seen() > cutoff:
+                break
+            histories.popitem(last=False)
     
     def get_track_summary(self, camera_id: str, track_id: int) -> Optional[Dict]:
         """Get summary of track history"""
-        if track_id not in self._track_history[camera_id]:
-            return None
-        
-        history = self._track_history[camera_id][track_id]
-        if not history:
+        history = self._track_history[camera_id].get(track_id)
+        if history is None:
             return None
         
-        zones_visited = set()
-        for entry in history:
-            zones_visited.update(entry.get('zones', set()))
-        
         return {
             'track_id': track_id,
-            'duration': self._get_track_age(camera_id, track_id),
-            'zones_visited': list(zones_visited),
-            'continuous': self._is_track_continuous(camera_id, track_id, datetime.utcnow()),
+            'duration': history.age(),
+            'zones_visited': list(history.zones),
+            'continuous': history.continuous(time.monotonic(), self.min_tracking_duration),
             'history_length': len(history),
         }
     
     def cleanup(self):
         """Cleanup resources"""
         self._track_history.clear()
-        self._track_gaps.clear()
@@ -3,9 +3,10 @@ Zone Logic
 Stage 5 of Market Module Pipeline
 Tracks person movement across zones (Shelf, Checkout, Exit)
 """
-from typing import Dict, List, Optional, Set, Tuple
+import time
+from typing import Deque, Dict, List, Optional, Set, Tuple
 from datetime import datetime
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 from loguru import logger
 
 
@@ -24,9 +25,18 @@ class ZoneLogic:
     - Object was previously picked
     """
     
-    def __init__(self):
-        # Track zone history per person
-        self._zone_history: Dict[str, Dict[int, List[str]]] = defaultdict(lambda: defaultdict(list))
+    def __init__(self, history_size: int = 32, track_expiry: float = 300.0):
+        self.history_size = history_size  # zone entries kept per track
+        self.track_expiry = track_expiry  # seconds an unseen track keeps its zone state
+        
+        # Track zone history per person (most recent entries)
+        self._zone_history: Dict[str, Dict[int, Deque[str]]] = defaultdict(dict)
+        
+        # Zones of each person on the previous frame
+        self._current_zones: Dict[str, Dict[int, Set[str]]] = defaultdict(dict)
+        
+        # Last time each person was seen, least recent first
+        self._last_seen: Dict[str, OrderedDict] = defaultdict(OrderedDict)  # camera_id -> track_id -> monotonic time
         
         # Track object picks per person
         self._object_picks: Dict[str, Dict[int, List[Dict]]] = defaultdict(lambda: defaultdict(list))
@@ -60,19 +70,32 @@ class ZoneLogic:
         """
         events = []
         now = datetime.utcnow()
+        seen_at = time.monotonic()
+        last_seen = self._last_seen[camera_id]
+        previous_zones = self._current_zones[camera_id]
         
         # Update zone history
         for person in tracked_persons:
             track_id = person['track_id']
             current_zones = person.get('zones', set())
+            last_seen[track_id] = seen_at
+            last_seen.move_to_end(track_id)
             
-            # Update zone history
-            if current_zones:
-                for zone in current_zones:
-                    history = self._zone_history[camera_id][track_id]
-                    if not history or history[-1] != zone:
-                        history.append(zone)
-                        logger.debug(f"Track {track_id} entered zone: {zone}")
+            # Record zones entered since the previous frame
+            previous = previous_zones.get(track_id, ())
+            for zone in current_zones:
+                if zone in previous:
+                    continue
+                history = self._zone_history[camera_id].get(track_id)
+                if history is None:
+                    history = self._zone_history[camera_id][track_id] = deque(maxlen=self.history_size)
+                history.append(zone)
+                logger.debug(f"Track {track_id} entered zone: {zone}")
+                
+                # Remember checkout visits even after they leave the bounded history
+                if 'checkout' in zone.lower():
+                    self._checkout_status[camera_id][track_id] = True
+            previous_zones[track_id] = current_zones
         
         # Update object picks
         for interaction in interactions:
@@ -97,8 +120,8 @@ class ZoneLogic:
                 
                 if object_picks:
                     # Check if person visited checkout
-                    zones_visited = self._zone_history[camera_id].get(track_id, [])
-                    visited_checkout = any('checkout' in zone.lower() for zone in zones_visited)
+                    zones_visited = self._zone_history[camera_id].get(track_id, ())
+                    visited_checkout = self._checkout_status[camera_id].get(track_id, False)
                     
                     if not visited_checkout:
                         # Exit without checkout detected
@@ -110,15 +133,23 @@ class ZoneLogic:
                             'timestamp': now.isoformat(),
                         })
                         logger.info(f"Track {track_id} exited without checkout")
-            
-            # Check if person is in checkout zone
-            in_checkout = any('checkout' in zone.lower() for zone in current_zones)
-            if in_checkout:
-                self._checkout_status[camera_id][track_id] = True
-    
+
+        self._expire_tracks(camera_id, seen_at)
+        return events
+
+    def _expire_tracks(self, camera_id: str, now: float):
+        """Drop tracks unseen for track_expiry seconds (oldest first, stops at the first fresh one)"""
+        last_seen = self._last_seen[camera_id]
+        cutoff = now - self.track_expiry
+        while last_seen:
+            track_id = next(iter(last_seen))
+            if last_seen[track_id] > cutoff:
+                break
+            self.cleanup_track(camera_id, track_id)
+
     def get_track_summary(self, camera_id: str, track_id: int) -> Optional[Dict]:
         """Get summary of track's zone activity"""
-        zones_visited = self._zone_history[camera_id].get(track_id, [])
+        zones_visited = self._zone_history[camera_id].get(track_id, ())
         object_picks = self._object_picks[camera_id].get(track_id, [])
         visited_checkout = self._checkout_status[camera_id].get(track_id, False)
         
@@ -132,11 +163,15 @@ class ZoneLogic:
     def cleanup_track(self, camera_id: str, track_id: int):
         """Cleanup track data"""
         self._zone_history[camera_id].pop(track_id, None)
+        self._current_zones[camera_id].pop(track_id, None)
+        self._last_seen[camera_id].pop(track_id, None)
         self._object_picks[camera_id].pop(track_id, None)
         self._checkout_status[camera_id].pop(track_id, None)
     
     def cleanup(self):
         """Cleanup all resources"""
         self._zone_history.clear()
+        self._current_zones.clear()
+        self._last_seen.clear()
         self._object_picks.clear()
         self._checkout_status.clear()
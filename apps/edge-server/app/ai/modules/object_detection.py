@@ -8,6 +8,7 @@ from datetime import datetime
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.detector import load_yolo, require_yolo, COCO_CLASS_NAMES
 from config.settings import settings
 
 
@@ -16,6 +17,9 @@ class ObjectDetectionModule(BaseAIModule):
     Object Detection AI Module
     General purpose object detection (COCO classes)
     """
+
+    uses_shared_detector = True
+    detector_classes = None  # all COCO classes
     
     def __init__(self, confidence_threshold: float = 0.5):
         super().__init__(
@@ -29,31 +33,18 @@ class ObjectDetectionModule(BaseAIModule):
     def initialize(self) -> bool:
         """Initialize object detection model"""
         try:
-            from ultralytics import YOLO
+            require_yolo('yolov8n.pt')
             
             # Load YOLOv8 model
             try:
-                self._model = YOLO('yolov8n.pt')  # nano model
+                self._model = load_yolo('yolov8n.pt')  # nano model
                 logger.info("Object Detection module initialized with YOLOv8")
             except Exception as e:
                 logger.warning(f"Could not load YOLOv8 model: {e}")
                 self._model = None
             
             # COCO class names (YOLOv8 uses COCO dataset)
-            self._class_names = [
-                'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck',
-                'boat', 'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench',
-                'bird', 'cat', 'dog', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra',
-                'giraffe', 'backpack', 'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee',
-                'skis', 'snowboard', 'sports ball', 'kite', 'baseball bat', 'baseball glove',
-                'skateboard', 'surfboard', 'tennis racket', 'bottle', 'wine glass', 'cup',
-                'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple', 'sandwich', 'orange',
-                'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair', 'couch',
-                'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse',
-                'remote', 'keyboard', 'cell phone', 'microwave', 'oven', 'toaster', 'sink',
-                'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier',
-                'toothbrush'
-            ]
+            self._class_names = COCO_CLASS_NAMES
             
             self._initialized = True
             return True
@@ -126,6 +117,13 @@ class ObjectDetectionModule(BaseAIModule):
 
     def _detect_objects(self, frame: np.ndarray) -> List[Dict]:
         """Detect objects in frame using YOLOv8"""
+        shared = self.shared_detections()
+        if shared is not None:
+            for obj in shared:
+                class_id = obj['class_id']
+                obj['class'] = self._class_names[class_id] if class_id < len(self._class_names) else f'class_{class_id}'
+            return shared
+
         if not self._model:
             return []
         
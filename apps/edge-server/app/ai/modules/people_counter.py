@@ -8,6 +8,7 @@ from datetime import datetime
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.detector import load_yolo, require_yolo
 from config.settings import settings
 
 
@@ -16,6 +17,11 @@ class PeopleCounterModule(BaseAIModule):
     People Counter AI Module
     Tracks people entering and exiting defined zones
     """
+
+    uses_shared_detector = True
+    detector_classes = [0]  # person
+    uses_person_tracks = True
+    propagates_tracks = True
     
     def __init__(self, confidence_threshold: float = 0.5):
         super().__init__(
@@ -24,18 +30,19 @@ class PeopleCounterModule(BaseAIModule):
             confidence_threshold=confidence_threshold
         )
         self.counts: Dict[str, Dict] = {}  # camera_id -> {entered: int, exited: int, current: int}
-        self.tracking_data: Dict[str, List] = {}  # camera_id -> list of tracked persons
+        self.tracking_data: Dict[str, Dict[int, bool]] = {}  # camera_id -> track_id -> inside counted area
+        self.zones: Dict[str, Any] = {}  # camera_id -> counting zones (None = whole frame)
         self._model = None
 
     def initialize(self) -> bool:
         """Initialize people counter model"""
         try:
-            from ultralytics import YOLO
+            require_yolo('yolov8n.pt')
             import cv2
             
             # Load YOLOv8 model for person detection
             try:
-                self._model = YOLO('yolov8n.pt')  # nano model (fastest)
+                self._model = load_yolo('yolov8n.pt')  # nano model (fastest), shared with other modules
                 # Alternative: YOLO('yolov8s.pt') for better accuracy
                 logger.info("People Counter module initialized with YOLOv8")
             except Exception as e:
@@ -68,7 +75,10 @@ class PeopleCounterModule(BaseAIModule):
         # Initialize counts for camera if not exists
         if camera_id not in self.counts:
             self.counts[camera_id] = {'entered': 0, 'exited': 0, 'current': 0}
-            self.tracking_data[camera_id] = []
+            self.tracking_data[camera_id] = {}
+
+        if metadata and 'zones' in metadata:
+            self.zones[camera_id] = metadata.get('zones')
 
         results = {
             'detections': [],
@@ -77,14 +87,11 @@ class PeopleCounterModule(BaseAIModule):
         }
 
         try:
-            # TODO: Implement actual people detection and tracking
-            # 1. Detect people in frame using YOLOv8 or similar
-            # 2. Track people across frames using DeepSORT
-            # 3. Detect entry/exit based on zone boundaries
-            # 4. Update counts
+            # 1. Track people (shared track service)
+            # 2. Detect entry/exit based on zone boundaries
+            # 3. Update counts
             
-            detected_people = self._detect_people(frame)
-            tracked_people = self._track_people(camera_id, detected_people, frame)
+            tracked_people = self._track_people(camera_id, frame)
             
             # Update counts based on tracking
             entered, exited = self._update_counts(camera_id, tracked_people, metadata)
@@ -126,6 +133,10 @@ class PeopleCounterModule(BaseAIModule):
 
     def _detect_people(self, frame: np.ndarray) -> List[Dict]:
         """Detect people in frame using YOLOv8"""
+        shared = self.shared_detections()
+        if shared is not None:
+            return shared
+
         if not self._model:
             return []
         
@@ -151,15 +162,49 @@ class PeopleCounterModule(BaseAIModule):
             logger.error(f"Error detecting people: {e}")
             return []
 
-    def _track_people(self, camera_id: str, detections: List[Dict], frame: np.ndarray) -> List[Dict]:
-        """Track people across frames"""
-        # TODO: Use DeepSORT or similar for tracking
-        return []
+    def _track_people(self, camera_id: str, frame: np.ndarray) -> List[Dict]:
+        """Tracked people of the frame from the shared track service"""
+        tracks = self.person_tracks()
+        if tracks is None:
+            # Without the track service people are reported but not counted
+            return self._detect_people(frame)
+        return tracks.persons
 
     def _update_counts(self, camera_id: str, tracked_people: List[Dict], metadata: Optional[Dict]) -> tuple:
-        """Update entry/exit counts"""
-        # TODO: Implement zone-based entry/exit detection
-        return 0, 0
+        """
+        Update entry/exit counts
+
+        With zones, a person enters when their track moves into any zone and
+        exits when it leaves; without zones, entering and leaving the view
+        count. A track that expires while inside counts as an exit.
+        """
+        tracks = self.person_tracks()
+        if tracks is None:
+            return 0, 0
+
+        inside = self.tracking_data[camera_id]
+        zoned = bool(self.zones.get(camera_id))
+        entered = exited = 0
+
+        for person in tracked_people:
+            track_id = person['track_id']
+            now_inside = bool(person.get('zones')) if zoned else True
+            was_inside = inside.get(track_id, False)
+            if now_inside and not was_inside:
+                entered += 1
+            elif was_inside and not now_inside:
+                exited += 1
+            inside[track_id] = now_inside
+
+        for track_id in tracks.ended:
+            if inside.pop(track_id, False):
+                exited += 1
+
+        counts = self.counts[camera_id]
+        counts['entered'] += entered
+        counts['exited'] += exited
+        counts['current'] = sum(inside.values())
+        return entered, exited
 
     def get_count(self, camera_id: str) -> Dict:
         """Get current count for camera"""
@@ -8,14 +8,21 @@ from datetime import datetime
 from loguru import logger
 
 from app.ai.base import BaseAIModule
+from app.ai.detector import load_yolo, require_yolo
 from config.settings import settings
 
+# Vehicle classes in COCO: car(2), motorcycle(3), bus(5), truck(7)
+VEHICLE_TYPES = {2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck'}
+
 
 class VehicleRecognitionModule(BaseAIModule):
     """
     Vehicle Recognition AI Module
     Detects vehicles and recognizes license plates
     """
+
+    uses_shared_detector = True
+    detector_classes = list(VEHICLE_TYPES)
     
     def __init__(self, confidence_threshold: float = 0.5):
         super().__init__(
@@ -24,18 +31,19 @@ class VehicleRecognitionModule(BaseAIModule):
             confidence_threshold=confidence_threshold
         )
         self.vehicle_database: Dict[str, Dict] = {}  # plate_number -> vehicle_data
+        self._vehicles_source = None  # (list, version) the lookup was built from
         self._vehicle_model = None
         self._plate_reader = None
 
     def initialize(self) -> bool:
         """Initialize vehicle recognition models"""
         try:
-            from ultralytics import YOLO
+            require_yolo('yolov8n.pt')
             import cv2
             
             # Load vehicle detection model
             try:
-                self._vehicle_model = YOLO('yolov8n.pt')
+                self._vehicle_model = load_yolo('yolov8n.pt')
                 logger.info("Vehicle Recognition module initialized with YOLOv8")
             except Exception as e:
                 logger.warning(f"Could not load YOLOv8 model: {e}")
@@ -74,12 +82,17 @@ class VehicleRecognitionModule(BaseAIModule):
         if not self.is_enabled():
             return {'detections': [], 'events': [], 'alerts': []}
 
-        # Update vehicle database from metadata
+        # Update vehicle database from metadata only when the synced list changes
         if metadata and 'vehicles_database' in metadata:
-            self.vehicle_database = {
-                vehicle.get('plate_number'): vehicle
-                for vehicle in metadata.get('vehicles_database', [])
-            }
+            vehicles = metadata.get('vehicles_database') or []
+            version = metadata.get('vehicles_version')
+            source = self._vehicles_source
+            if source is None or (source[1] != version if version is not None else source[0] is not vehicles):
+                self.vehicle_database = {
+                    vehicle.get('plate_number'): vehicle
+                    for vehicle in vehicles
+                }
+                self._vehicles_source = (vehicles, version)
 
         results = {
             'detections': [],
@@ -153,12 +166,17 @@ class VehicleRecognitionModule(BaseAIModule):
 
     def _detect_vehicles(self, frame: np.ndarray) -> List[Dict]:
         """Detect vehicles in frame using YOLOv8"""
+        shared = self.shared_detections()
+        if shared is not None:
+            for vehicle in shared:
+                vehicle['type'] = VEHICLE_TYPES.get(vehicle['class_id'], 'vehicle')
+            return shared
+
         if not self._vehicle_model:
             return []
         
         try:
-            # Vehicle classes in COCO: car(2), motorcycle(3), bus(5), truck(7)
-            results = self._vehicle_model(frame, classes=[2, 3, 5, 7], conf=self.confidence_threshold, verbose=False)
+            results = self._vehicle_model(frame, classes=list(VEHICLE_TYPES), conf=self.confidence_threshold, verbose=False)
             
             detections = []
             for result in results:
@@ -169,8 +187,7 @@ class VehicleRecognitionModule(BaseAIModule):
                     class_id = int(box.cls[0].cpu().numpy())
                     
                     # Map class IDs to vehicle types
-                    vehicle_types = {2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck'}
-                    vehicle_type = vehicle_types.get(class_id, 'vehicle')
+                    vehicle_type = VEHICLE_TYPES.get(class_id, 'vehicle')
                     
                     detections.append({
                         'bbox': [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],
@@ -0,0 +1,248 @@
+"""
+Motion Gate
+Cheap per-camera motion pre-filter that decides which modules need a frame
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Iterable
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+
+def zone_boxes(zones: Any) -> List[List[int]]:
+    """
+    Get bounding boxes [x, y, w, h] of zone polygons
+
+    Accepts the zone formats used by the modules: {name: [[x, y], ...]},
+    [{'polygon' or 'points': [[x, y], ...]}, ...] or [[[x, y], ...], ...]
+    """
+    if not zones:
+        return []
+
+    polygons: Iterable = zones.values() if isinstance(zones, dict) else zones
+    boxes = []
+    for polygon in polygons:
+        if isinstance(polygon, dict):
+            polygon = polygon.get('polygon') or polygon.get('points')
+        if not polygon or len(polygon) < 3:
+            continue
+        try:
+            points = np.asarray(
+                [(p['x'], p['y']) if isinstance(p, dict) else p for p in polygon],
+                dtype=np.float32
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+        x1, y1 = points.min(axis=0)
+        x2, y2 = points.max(axis=0)
+        boxes.append([int(x1), int(y1), int(x2 - x1), int(y2 - y1)])
+    return boxes
+
+
+class MotionMap:
+    """Changed-pixel mask of one frame at reduced resolution"""
+
+    def __init__(self, mask: np.ndarray, scale: float):
+        self.scale = scale  # small pixels per frame pixel
+        self.shape = mask.shape
+        # Integral image: any rectangle's changed-pixel count in O(1)
+        self._integral = np.pad(mask.astype(np.int32).cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+
+    @classmethod
+    def full(cls) -> 'MotionMap':
+        """Map that reports motion everywhere (no reference frame yet)"""
+        return cls(np.ones((1, 1), dtype=bool), 0.0)
+
+    @classmethod
+    def _unpack(cls, bits: np.ndarray, shape: tuple, scale: float) -> 'MotionMap':
+        mask = np.unpackbits(bits, count=shape[0] * shape[1]).reshape(shape).astype(bool)
+        return cls(mask, scale)
+
+    def __reduce__(self):
+        # Sent to AI workers with every frame: ship the bit-packed mask, not the integral image
+        mask = np.diff(np.diff(self._integral, axis=0), axis=1).astype(bool)
+        return MotionMap._unpack, (np.packbits(mask), self.shape, self.scale)
+
+    def energy(self, roi: Optional[List[int]] = None) -> float:
+        """Fraction of changed pixels inside roi [x, y, w, h] (frame coordinates)"""
+        h, w = self.shape
+        if roi is None or self.scale == 0.0:
+            x1, y1, x2, y2 = 0, 0, w, h
+        else:
+            x, y, rw, rh = roi
+            x1 = min(max(int(x * self.scale), 0), w)
+            y1 = min(max(int(y * self.scale), 0), h)
+            x2 = min(max(int(np.ceil((x + rw) * self.scale)), x1 + 1), w)
+            y2 = min(max(int(np.ceil((y + rh) * self.scale)), y1 + 1), h)
+            if x2 <= x1 or y2 <= y1:
+                return 0.0
+
+        ii = self._integral
+        changed = ii[y2, x2] - ii[y1, x2] - ii[y2, x1] + ii[y1, x1]
+        return float(changed) / ((x2 - x1) * (y2 - y1))
+
+
+class MotionEstimator:
+    """
+    Per-camera changed-pixel maps
+
+    Keeps a running-average background per camera at MOTION_WIDTH pixels wide
+    and turns each frame into one MotionMap. The frame rate governor runs it
+    once per analyzed frame; the motion gate reuses that map.
+    """
+
+    def __init__(
+        self,
+        width: Optional[int] = None,
+        pixel_threshold: Optional[int] = None,
+        learning_rate: float = 0.05
+    ):
+        self.width = width or settings.MOTION_WIDTH
+        self.pixel_threshold = pixel_threshold or settings.MOTION_PIXEL_THRESHOLD
+        self.learning_rate = learning_rate
+        self._backgrounds: Dict[str, np.ndarray] = {}
+
+    def _downscale(self, frame: np.ndarray) -> tuple:
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.width / float(w))
+        if CV2_AVAILABLE:
+            # Resize first so the colour conversion runs on the small image
+            small = cv2.resize(
+                frame,
+                (max(1, int(w * scale)), max(1, int(h * scale))),
+                interpolation=cv2.INTER_AREA
+            )
+            if small.ndim == 3:
+                small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        else:
+            step = max(1, int(round(1.0 / scale)))
+            small = frame[::step, ::step]
+            if small.ndim == 3:
+                small = small.mean(axis=2)
+            scale = 1.0 / step
+        return small.astype(np.float32), scale
+
+    def update(self, camera_id: str, frame: np.ndarray) -> MotionMap:
+        """Compute the motion map of a camera's frame and update its background"""
+        small, scale = self._downscale(frame)
+        background = self._backgrounds.get(camera_id)
+        if background is None or background.shape != small.shape:
+            self._backgrounds[camera_id] = small
+            return MotionMap.full()
+
+        mask = np.abs(small - background) > self.pixel_threshold
+        # Running average background: slow scene changes are absorbed
+        background += self.learning_rate * (small - background)
+        return MotionMap(mask, scale)
+
+    def remove_camera(self, camera_id: str):
+        self._backgrounds.pop(camera_id, None)
+
+
+class MotionGate:
+    """
+    Motion pre-stage for AIModuleManager
+
+    Lets a module run only when the motion energy inside its regions of
+    interest reaches its threshold. A module is still run every
+    MOTION_MAX_SKIP frames so stationary objects are re-evaluated. Frames
+    from the camera service arrive with the governor's MotionMap; other
+    frames get one from the gate's own estimator.
+    """
+
+    def __init__(
+        self,
+        width: Optional[int] = None,
+        pixel_threshold: Optional[int] = None,
+        threshold: Optional[float] = None,
+        max_skip: Optional[int] = None,
+        learning_rate: float = 0.05
+    ):
+        self.enabled = settings.MOTION_GATE_ENABLED
+        self.threshold = settings.MOTION_THRESHOLD if threshold is None else threshold
+        self.max_skip = settings.MOTION_MAX_SKIP if max_skip is None else max_skip
+        self.estimator = MotionEstimator(width, pixel_threshold, learning_rate)
+
+        self._skipped_in_row: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._stats: Dict[str, Dict[str, Dict[str, int]]] = defaultdict(
+            lambda: defaultdict(lambda: {'runs': 0, 'skips': 0})
+        )
+        self._frames: Dict[str, int] = defaultdict(int)
+
+    def update(self, camera_id: str, frame: np.ndarray, motion: Optional[MotionMap] = None) -> MotionMap:
+        """
+        Get the motion map of a camera's frame
+
+        Args:
+            camera_id: Camera identifier
+            frame: Frame, used only when no motion map is given
+            motion: Map already computed for this frame (capture path)
+        """
+        self._frames[camera_id] += 1
+        if not self.enabled:
+            return MotionMap.full()
+        if motion is not None:
+            return motion
+        return self.estimator.update(camera_id, frame)
+
+    def should_run(
+        self,
+        camera_id: str,
+        module_id: str,
+        module,
+        motion: MotionMap,
+        metadata: Optional[Dict] = None
+    ) -> bool:
+        """Decide whether a module needs this frame and record the decision"""
+        run = True
+        if self.enabled and module.motion_gated:
+            skipped = self._skipped_in_row[camera_id].get(module_id, 0)
+            if skipped < self.max_skip:
+                threshold = self.threshold if module.motion_threshold is None else module.motion_threshold
+                try:
+                    rois = module.motion_roi(camera_id, metadata)
+                except Exception as e:
+                    logger.debug(f"Motion ROI error in module '{module_id}': {e}")
+                    rois = None
+                energy = max(motion.energy(roi) for roi in rois) if rois else motion.energy()
+                run = energy >= threshold
+
+        stats = self._stats[camera_id][module_id]
+        if run:
+            self._skipped_in_row[camera_id][module_id] = 0
+            stats['runs'] += 1
+        else:
+            self._skipped_in_row[camera_id][module_id] = self._skipped_in_row[camera_id].get(module_id, 0) + 1
+            stats['skips'] += 1
+        return run
+
+    def remove_camera(self, camera_id: str):
+        self.estimator.remove_camera(camera_id)
+        self._skipped_in_row.pop(camera_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get skip ratios per camera and per module"""
+        cameras = {}
+        for camera_id, modules in self._stats.items():
+            runs = sum(m['runs'] for m in modules.values())
+            skips = sum(m['skips'] for m in modules.values())
+            cameras[camera_id] = {
+                'frames': self._frames.get(camera_id, 0),
+                'skip_ratio': skips / (runs + skips) if runs + skips else 0.0,
+                'modules': {
+                    module_id: {
+                        **counts,
+                        'skip_ratio': counts['skips'] / (counts['runs'] + counts['skips'])
+                        if counts['runs'] + counts['skips'] else 0.0,
+                    }
+                    for module_id, counts in modules.items()
+                },
+            }
+        return {'enabled': self.enabled, 'cameras': cameras}
@@ -0,0 +1,223 @@
+"""
+Batched Inference Scheduler
+Collects frames from all cameras into micro-batches for the AI Module Manager
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from app.ai.motion import MotionMap
+
+
+@dataclass
+class _PendingFrame:
+    camera_id: str
+    frame: np.ndarray
+    enabled_modules: List[str]
+    metadata: Optional[Dict]
+    future: asyncio.Future
+    motion: Optional[MotionMap] = None  # From the capture path
+    submitted_at: float = field(default_factory=time.perf_counter)
+
+
+class BatchInferenceScheduler:
+    """
+    Cross-camera micro-batching scheduler
+
+    Frames submitted by each camera loop are queued; a single worker forms
+    batches of up to max_batch_size frames, waiting at most max_wait_ms for
+    the batch to fill, runs them through AIModuleManager.process_batch in one
+    call and scatters the per-camera results back to the callers
+    """
+
+    def __init__(
+        self,
+        ai_manager,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        input_size: Optional[int] = None
+    ):
+        self.ai_manager = ai_manager
+        self.max_batch_size = max(1, max_batch_size or settings.INFERENCE_BATCH_SIZE)
+        self.max_wait = (settings.INFERENCE_BATCH_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self.input_size = settings.INFERENCE_INPUT_SIZE if input_size is None else input_size
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        # Models are not thread-safe; one inference thread keeps calls serialized
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+        # Metrics
+        self._frames = 0
+        self._batches = 0
+        self._started_at: Optional[float] = None
+        self._completed = deque(maxlen=512)  # (finished_at, frames) for rolling fps
+        self._single_frame_ms: Optional[float] = None  # EMA, batch size 1
+        self._batched_frame_ms: Optional[float] = None  # EMA per frame, batch size > 1
+
+    async def start(self):
+        """Start the batching worker"""
+        if self._running:
+            return
+
+        self._running = True
+        self._queue = asyncio.Queue()
+        self._started_at = time.perf_counter()
+        self._task = asyncio.create_task(self._batch_loop())
+        logger.info(
+            f"Inference scheduler started (batch={self.max_batch_size}, "
+            f"wait={self.max_wait * 1000:.0f}ms, input={self.input_size or 'native'})"
+        )
+
+    async def stop(self):
+        """Stop the batching worker and fail pending submissions"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._queue and not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.cancel()
+
+        self._executor.shutdown(wait=False)
+        logger.info("Inference scheduler stopped")
+
+    async def submit(
+        self,
+        camera_id: str,
+        frame: np.ndarray,
+        enabled_modules: List[str],
+        metadata: Optional[Dict] = None,
+        motion: Optional[MotionMap] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a frame for batched processing and wait for its results
+
+        Returns the same result dict as AIModuleManager.process_frame
+        """
+        if not self._running:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingFrame(camera_id, frame, enabled_modules, metadata, future, motion))
+        return await future
+
+    async def _batch_loop(self):
+        """Form micro-batches and run them off the event loop"""
+        loop = asyncio.get_running_loop()
+
+        while self._running:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    # Take whatever is already queued without waiting
+                    if self._queue.empty():
+                        break
+                    batch.append(self._queue.get_nowait())
+                    continue
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [item for item in batch if not item.future.done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                outputs = await loop.run_in_executor(self._executor, self._run_batch, batch)
+            except Exception as e:
+                logger.error(f"Batched inference error: {e}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            self._record_batch(len(batch), (time.perf_counter() - started) * 1000.0)
+
+            for item, output in zip(batch, outputs):
+                if not item.future.done():
+                    item.future.set_result(output)
+
+    def _run_batch(self, batch: List[_PendingFrame]) -> List[Dict[str, Any]]:
+        """Run one batch through the AI manager (inference thread)"""
+        return self.ai_manager.process_batch(
+            [
+                {
+                    'camera_id': item.camera_id,
+                    'frame': item.frame,
+                    'enabled_modules': item.enabled_modules,
+                    'metadata': item.metadata,
+                    'motion': item.motion,
+                }
+                for item in batch
+            ],
+            input_size=self.input_size
+        )
+
+    def _record_batch(self, size: int, elapsed_ms: float, alpha: float = 0.1):
+        """Update throughput and per-frame cost metrics"""
+        self._frames += size
+        self._batches += 1
+        self._completed.append((time.perf_counter(), size))
+
+        per_frame = elapsed_ms / size
+        if size == 1:
+            prev = self._single_frame_ms
+            self._single_frame_ms = per_frame if prev is None else prev + alpha * (per_frame - prev)
+        else:
+            prev = self._batched_frame_ms
+            self._batched_frame_ms = per_frame if prev is None else prev + alpha * (per_frame - prev)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler metrics
+
+        batching_gain is the per-frame cost at batch size 1 divided by the
+        per-frame cost in larger batches (> 1 means batching raises fps)
+        """
+        fps = 0.0
+        if len(self._completed) > 1:
+            window = self._completed[-1][0] - self._completed[0][0]
+            frames = sum(size for _, size in list(self._completed)[1:])
+            fps = frames / window if window > 0 else 0.0
+
+        gain = None
+        if self._single_frame_ms and self._batched_frame_ms:
+            gain = self._single_frame_ms / self._batched_frame_ms
+
+        return {
+            'frames': self._frames,
+            'batches': self._batches,
+            'avg_batch_size': self._frames / self._batches if self._batches else 0.0,
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'throughput_fps': fps,
+            'single_frame_ms': self._single_frame_ms,
+            'batched_frame_ms': self._batched_frame_ms,
+            'batching_gain': gain,
+        }
+
+    async def get_module_stats(self) -> Dict[str, Any]:
+        """Get the face, tracking and motion gate stats of the manager's modules"""
+        return {
+            'faces': self.ai_manager.get_face_stats(),
+            'tracking': self.ai_manager.get_tracking_stats(),
+            'motion': self.ai_manager.get_motion_stats(),
+        }
@@ -0,0 +1,474 @@
+"""
+IoU Tracker
+Vectorized IoU matching with optimal (Hungarian) assignment and array-backed track state
+"""
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# Constant-velocity model over [cx, cy, w, h, vcx, vcy, vw, vh], one step per analyzed frame
+_TRANSITION = np.eye(8, dtype=np.float32)
+_TRANSITION[:4, 4:] = np.eye(4, dtype=np.float32)
+_DIAG = np.arange(8)
+
+# Noise scales relative to box height (as in SORT/ByteTrack)
+STD_POSITION = 1.0 / 20
+STD_VELOCITY = 1.0 / 160
+FLOW_NOISE = 2.0  # optical-flow measurements are trusted less than detections
+FLOW_WIDTH = 640  # width of the grey image used for optical flow
+FLOW_POINTS = 16  # feature points per track
+FLOW_MIN_POINTS = 3  # tracked points needed for a flow measurement
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU of two sets of [x1, y1, x2, y2] boxes
+
+    Args:
+        boxes_a: (N, 4) array
+        boxes_b: (M, 4) array
+
+    Returns:
+        (N, M) IoU matrix
+    """
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = inter_w * inter_h
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def _xyxy_to_state(boxes: np.ndarray) -> np.ndarray:
+    """[x1, y1, x2, y2] -> [cx, cy, w, h]"""
+    wh = boxes[:, 2:4] - boxes[:, 0:2]
+    return np.hstack([boxes[:, 0:2] + wh / 2, wh])
+
+
+def _state_to_xyxy(state: np.ndarray) -> np.ndarray:
+    """[cx, cy, w, h] -> [x1, y1, x2, y2]"""
+    half = np.maximum(state[:, 2:4], 1.0) / 2
+    return np.hstack([state[:, 0:2] - half, state[:, 0:2] + half])
+
+
+def flow_shifts(
+    previous_gray: np.ndarray,
+    gray: np.ndarray,
+    boxes: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Median Lucas-Kanade displacement of feature points inside each box
+
+    Args:
+        previous_gray: Grey image the boxes refer to
+        gray: Current grey image (same size)
+        boxes: (N, 4) boxes in image coordinates
+
+    Returns:
+        (shifts, tracked): (N, 2) median [dx, dy] per box and the number of
+        points tracked in each box (boxes with too few points get a zero shift)
+    """
+    n = len(boxes)
+    shifts = np.zeros((n, 2), dtype=np.float32)
+    tracked = np.zeros(n, dtype=np.int32)
+    if not n:
+        return shifts, tracked
+
+    h, w = gray.shape[:2]
+    clipped = np.clip(boxes, 0, [w - 1, h - 1, w - 1, h - 1]).astype(np.int32)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    for x1, y1, x2, y2 in clipped:
+        mask[y1:y2 + 1, x1:x2 + 1] = 255
+
+    points = cv2.goodFeaturesToTrack(
+        previous_gray, maxCorners=FLOW_POINTS * n, qualityLevel=0.01, minDistance=3, mask=mask
+    )
+    if points is None:
+        return shifts, tracked
+
+    moved, status, _ = cv2.calcOpticalFlowPyrLK(
+        previous_gray, gray, points, None, winSize=(15, 15), maxLevel=2
+    )
+    good = status.reshape(-1) == 1
+    start = points.reshape(-1, 2)[good]
+    delta = moved.reshape(-1, 2)[good] - start
+
+    inside = (
+        (start[:, None, 0] >= clipped[None, :, 0]) & (start[:, None, 0] <= clipped[None, :, 2]) &
+        (start[:, None, 1] >= clipped[None, :, 1]) & (start[:, None, 1] <= clipped[None, :, 3])
+    )
+    tracked[:] = inside.sum(axis=0)
+    for i in np.flatnonzero(tracked >= FLOW_MIN_POINTS):
+        shifts[i] = np.median(delta[inside[:, i]], axis=0)
+    return shifts, tracked
+
+
+def _hungarian(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-cost assignment for a cost matrix with rows <= columns
+
+    Shortest augmenting path with row/column potentials (O(n^2 m)); the
+    scan over columns is vectorized, so each augmentation step is a handful
+    of numpy operations.
+    """
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)  # row (1-based) assigned to each column, 0 = free
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for row in range(1, n + 1):
+        owner[0] = row
+        column = 0
+        min_reduced = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current = owner[column]
+            reduced = cost[current - 1] - u[current] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = column
+
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+
+            used_columns = np.flatnonzero(used)
+            u[owner[used_columns]] += delta
+            v[used_columns] -= delta
+            min_reduced[1:][free] -= delta
+
+            column = next_column
+            if owner[column] == 0:
+                break
+
+        # Flip the augmenting path
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    columns = np.flatnonzero(owner[1:])
+    return owner[1:][columns] - 1, columns
+
+
+def linear_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Optimal assignment of rows to columns (minimum total cost)
+
+    Uses scipy when installed, otherwise the numpy Hungarian solver.
+
+    Returns:
+        (row_indices, column_indices) sorted by row
+    """
+    if cost.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    if SCIPY_AVAILABLE:
+        rows, columns = linear_sum_assignment(cost)
+        return rows.astype(np.int64), columns.astype(np.int64)
+    if cost.shape[0] > cost.shape[1]:
+        columns, rows = _hungarian(cost.T)
+    else:
+        rows, columns = _hungarian(cost)
+    order = np.argsort(rows)
+    return rows[order], columns[order]
+
+
+def match_iou(
+    track_boxes: np.ndarray,
+    detection_boxes: np.ndarray,
+    threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Match tracks to detections maximizing total IoU
+
+    Only tracks and detections with at least one pair above the threshold
+    enter the assignment, so crowded frames stay small problems.
+
+    Returns:
+        (track_indices, detection_indices) of pairs with IoU >= threshold
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if not len(track_boxes) or not len(detection_boxes):
+        return empty, empty
+
+    iou = iou_matrix(track_boxes, detection_boxes)
+    candidate = iou >= threshold
+    rows = np.flatnonzero(candidate.any(axis=1))
+    columns = np.flatnonzero(candidate.any(axis=0))
+    if not len(rows):
+        return empty, empty
+
+    sub = iou[np.ix_(rows, columns)]
+    # Pairs below the threshold cost nothing, so they never displace a valid match
+    assigned_rows, assigned_columns = linear_assignment(-np.where(sub >= threshold, sub, 0.0))
+    valid = sub[assigned_rows, assigned_columns] >= threshold
+    return rows[assigned_rows[valid]], columns[assigned_columns[valid]]
+
+
+class IoUTracker:
+    """
+    Multi-object tracker on box overlap
+
+    Each update computes the track/detection IoU matrix in one broadcast and
+    solves the assignment optimally instead of greedily. Track state lives in
+    preallocated arrays (boxes, ids, confidences, Kalman mean and covariance,
+    hit and miss counters) that grow by doubling; tracks unmatched for more
+    than max_age updates are compacted away.
+
+    Between detector passes, propagate() advances the tracks with their
+    constant-velocity Kalman prediction, corrected by sparse optical flow
+    when enabled. Each propagated frame lowers a track's quality (by
+    coast_decay, or to the fraction of flow points still tracked); a
+    detection restores it to 1.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_age: int = 30,
+        capacity: int = 64,
+        optical_flow: bool = False,
+        coast_decay: float = 0.9
+    ):
+        """
+        Args:
+            iou_threshold: Lowest IoU for a track/detection match
+            max_age: Updates a track survives without a match
+            capacity: Initial number of track slots
+            optical_flow: Correct propagated tracks with Lucas-Kanade flow (needs OpenCV)
+            coast_decay: Quality factor per propagated frame without a flow measurement
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.optical_flow = optical_flow and CV2_AVAILABLE
+        self.coast_decay = coast_decay
+        self.next_id = 1
+        self.count = 0  # live tracks occupy slots [0, count)
+        self._previous_gray: Optional[np.ndarray] = None
+        self._flow_scale = 1.0
+        self._allocate(capacity)
+
+    def _state_arrays(self) -> tuple:
+        return (
+            self.boxes, self.anchors, self.ids, self.confidences, self.quality,
+            self.mean, self.covariance, self.hits, self.misses
+        )
+
+    def _allocate(self, capacity: int):
+        old = self._state_arrays() if self.count else None
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)
+        # Last detected box moved by the optical flow since (the flow measurement)
+        self.anchors = np.zeros((capacity, 4), dtype=np.float32)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.confidences = np.zeros(capacity, dtype=np.float32)
+        self.quality = np.zeros(capacity, dtype=np.float32)
+        self.mean = np.zeros((capacity, 8), dtype=np.float32)
+        self.covariance = np.zeros((capacity, 8, 8), dtype=np.float32)
+        self.hits = np.zeros(capacity, dtype=np.int32)
+        self.misses = np.zeros(capacity, dtype=np.int32)
+        if old:
+            for new_array, old_array in zip(self._state_arrays(), old):
+                new_array[:self.count] = old_array[:self.count]
+
+    def _predict(self):
+        """Advance every live track one frame with the constant-velocity model"""
+        live = self.count
+        if not live:
+            return
+        mean = self.mean[:live]
+        height = np.maximum(mean[:, 3], 1.0)
+        noise = np.empty((live, 8), dtype=np.float32)
+        noise[:, :4] = (STD_POSITION * height)[:, None]
+        noise[:, 4:] = (STD_VELOCITY * height)[:, None]
+
+        mean[:] = mean @ _TRANSITION.T
+        covariance = _TRANSITION @ self.covariance[:live] @ _TRANSITION.T
+        covariance[:, _DIAG, _DIAG] += noise ** 2
+        self.covariance[:live] = covariance
+        self.boxes[:live] = _state_to_xyxy(mean[:, :4])
+
+    def _correct(self, idx: np.ndarray, boxes: np.ndarray, noise_scale: float = 1.0):
+        """Kalman update of tracks idx with measured [x1, y1, x2, y2] boxes"""
+        if not len(idx):
+            return
+        measurement = _xyxy_to_state(boxes)
+        covariance = self.covariance[idx]
+        std = noise_scale * STD_POSITION * np.maximum(measurement[:, 3], 1.0)
+        innovation_cov = covariance[:, :4, :4].copy()
+        innovation_cov[:, _DIAG[:4], _DIAG[:4]] += (std ** 2)[:, None]
+        gain = covariance[:, :, :4] @ np.linalg.inv(innovation_cov)
+        innovation = measurement - self.mean[idx, :4]
+        self.mean[idx] += (gain @ innovation[:, :, None])[:, :, 0]
+        self.covariance[idx] = covariance - gain @ covariance[:, :4, :]
+
+    def _start_tracks(self, boxes: np.ndarray, confidences: np.ndarray) -> slice:
+        """Start one track per box in the next free slots"""
+        live, n = self.count, len(boxes)
+        if live + n > len(self.ids):
+            self._allocate(max(2 * len(self.ids), live + n))
+        slots = slice(live, live + n)
+        state = _xyxy_to_state(boxes)
+        height = np.maximum(state[:, 3], 1.0)
+        self.boxes[slots] = boxes
+        self.anchors[slots] = boxes
+        self.confidences[slots] = confidences
+        self.quality[slots] = 1.0
+        self.ids[slots] = np.arange(self.next_id, self.next_id + n)
+        self.mean[slots, :4] = state
+        self.mean[slots, 4:] = 0.0
+        self.covariance[slots] = 0.0
+        self.covariance[slots, _DIAG[:4], _DIAG[:4]] = ((2 * STD_POSITION * height) ** 2)[:, None]
+        self.covariance[slots, _DIAG[4:], _DIAG[4:]] = ((10 * STD_VELOCITY * height) ** 2)[:, None]
+        self.hits[slots] = 1
+        self.misses[slots] = 0
+        self.next_id += n
+        self.count = live + n
+        return slots
+
+    def update(
+        self,
+        detections: Sequence[Sequence[float]],
+        frame: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Advance all tracks by one frame with a detector result
+
+        Args:
+            detections: [[x1, y1, x2, y2, confidence], ...] (array or list)
+            frame: Current frame, kept as the optical-flow reference
+
+        Returns:
+            (K, 8) array of [x1, y1, x2, y2, track_id, confidence, vx, vy]
+            for the tracks matched or started by these detections (velocity
+            of the box center in pixels per update)
+        """
+        dets = np.asarray(detections, dtype=np.float32).reshape(-1, 5) if len(detections) else np.zeros((0, 5), np.float32)
+        self._predict()
+        live = self.count
+
+        track_idx, det_idx = match_iou(self.boxes[:live], dets[:, :4], self.iou_threshold)
+
+        self.misses[:live] += 1
+        self._correct(track_idx, dets[det_idx, :4])
+        # Matched tracks report the detected box; the filtered state carries the motion
+        self.boxes[track_idx] = dets[det_idx, :4]
+        self.anchors[track_idx] = dets[det_idx, :4]
+        self.confidences[track_idx] = dets[det_idx, 4]
+        self.quality[track_idx] = 1.0
+        self.hits[track_idx] += 1
+        self.misses[track_idx] = 0
+
+        new = np.ones(len(dets), dtype=bool)
+        new[det_idx] = False
+        new_idx = np.flatnonzero(new)
+        if len(new_idx):
+            self._start_tracks(dets[new_idx, :4], dets[new_idx, 4])
+
+        output_idx = np.concatenate([track_idx, np.arange(live, self.count)])
+        output = self._rows(output_idx)
+
+        self._expire()
+        self._remember(frame)
+        return output
+
+    def propagate(self, frame: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Advance all tracks by one frame without a detector result
+
+        Args:
+            frame: Current frame (used for optical flow when enabled)
+
+        Returns:
+            (K, 8) array of [x1, y1, x2, y2, track_id, confidence, vx, vy]
+            for the tracks that were visible on the last detection
+        """
+        live = self.count
+        previous_boxes = self.boxes[:live].copy()
+        self._predict()
+
+        measured = np.zeros(live, dtype=bool)
+        gray = self._gray(frame)
+        if gray is not None and self._previous_gray is not None and live:
+            shifts, tracked = flow_shifts(self._previous_gray, gray, previous_boxes * self._flow_scale)
+            measured = tracked >= FLOW_MIN_POINTS
+            idx = np.flatnonzero(measured)
+            if len(idx):
+                # Shifting the anchor (not the filtered box) keeps filter lag from compounding
+                self.anchors[idx] += np.tile(shifts[idx] / self._flow_scale, 2)
+                self._correct(idx, self.anchors[idx], noise_scale=FLOW_NOISE)
+                self.boxes[idx] = _state_to_xyxy(self.mean[idx, :4])
+                # Fraction of the box's points that survived, relative to a full set
+                self.quality[idx] *= np.minimum(tracked[idx] / FLOW_POINTS, 1.0)
+        self.quality[:live][~measured] *= self.coast_decay
+        self.anchors[:live][~measured] = self.boxes[:live][~measured]
+        self._previous_gray = gray if gray is not None else self._previous_gray
+
+        return self._rows(np.flatnonzero(self.misses[:live] == 0))
+
+    def _gray(self, frame: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Downscaled grey image for optical flow"""
+        if not self.optical_flow or frame is None:
+            return None
+        h, w = frame.shape[:2]
+        self._flow_scale = min(1.0, FLOW_WIDTH / float(w))
+        if self._flow_scale < 1.0:
+            frame = cv2.resize(
+                frame, (int(w * self._flow_scale), int(h * self._flow_scale)),
+                interpolation=cv2.INTER_AREA
+            )
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def _remember(self, frame: Optional[np.ndarray]):
+        gray = self._gray(frame)
+        if gray is not None:
+            self._previous_gray = gray
+
+    def _rows(self, idx: np.ndarray) -> np.ndarray:
+        # float64: track ids stay exact up to 2**53 (float32 only to 2**24)
+        output = np.empty((len(idx), 8), dtype=np.float64)
+        output[:, :4] = self.boxes[idx]
+        output[:, 4] = self.ids[idx]
+        output[:, 5] = self.confidences[idx]
+        output[:, 6:8] = self.mean[idx, 4:6]
+        return output
+
+    def _expire(self):
+        """Compact away tracks unmatched for more than max_age updates"""
+        live = self.count
+        keep = self.misses[:live] <= self.max_age
+        if keep.all():
+            return
+        kept = int(keep.sum())
+        for array in self._state_arrays():
+            array[:kept] = array[:live][keep]
+        self.count = kept
+
+    def min_quality(self) -> float:
+        """Lowest quality among tracks visible on the last detection (1.0 when none)"""
+        visible = self.misses[:self.count] == 0
+        return float(self.quality[:self.count][visible].min()) if visible.any() else 1.0
+
+    def active_ids(self) -> List[int]:
+        return self.ids[:self.count].tolist()
+
+    def reset(self):
+        self.count = 0
+        self._previous_gray = None
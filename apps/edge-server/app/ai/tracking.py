@@ -0,0 +1,224 @@
+"""
+Person Track Service
+Tracks the people of each camera once per frame and shares the result between modules
+"""
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from app.ai.tracker import IoUTracker
+from app.ai.zones import ZoneCache, ZoneMap
+from config.settings import settings
+
+PERSON_CLASS = 0
+
+
+class PersonTracks:
+    """
+    Tracked persons of one camera frame
+
+    persons: [{'track_id', 'bbox': [x, y, w, h], 'center': (x, y),
+               'velocity': (vx, vy) pixels per analyzed frame, 'confidence',
+               'zones': set, 'age': seconds since first seen}]
+    ended: track ids that expired since the previous frame
+    keyframe: False when the tracks were propagated without a detector pass
+    """
+
+    __slots__ = ('camera_id', 'seq', 'persons', 'ended', 'keyframe')
+
+    def __init__(
+        self,
+        camera_id: str,
+        seq: Optional[int],
+        persons: List[Dict],
+        ended: List[int],
+        keyframe: bool
+    ):
+        self.camera_id = camera_id
+        self.seq = seq
+        self.persons = persons
+        self.ended = ended
+        self.keyframe = keyframe
+
+    def __len__(self) -> int:
+        return len(self.persons)
+
+
+class TrackService:
+    """
+    Camera-scoped person tracking
+
+    AIModuleManager owns one service and hands the PersonTracks of each
+    (camera_id, frame sequence) to every module with uses_person_tracks,
+    so tracking runs once per camera and track ids agree between modules.
+    Person boxes come from the shared detector pass; between passes
+    (DETECTION_INTERVAL) tracks are propagated by the IoUTracker.
+    """
+
+    def __init__(
+        self,
+        detection_interval: Optional[int] = None,
+        min_quality: Optional[float] = None,
+        optical_flow: Optional[bool] = None,
+        max_age: Optional[int] = None
+    ):
+        self.detection_interval = max(1, settings.DETECTION_INTERVAL if detection_interval is None else detection_interval)
+        self.min_quality = settings.TRACK_MIN_QUALITY if min_quality is None else min_quality
+        self.optical_flow = settings.TRACK_OPTICAL_FLOW if optical_flow is None else optical_flow
+        self.max_age = settings.TRACK_MAX_AGE if max_age is None else max_age
+
+        self._trackers: Dict[str, IoUTracker] = {}
+        self._first_seen: Dict[str, Dict[int, float]] = {}  # camera_id -> track_id -> monotonic time
+        self._since_detection: Dict[str, int] = {}
+        self._zones = ZoneCache()
+        self._latest: Dict[str, PersonTracks] = {}
+        self._stats = {
+            'frames': 0,
+            'keyframes': 0,
+            'propagated': 0,
+            'reused': 0,
+            'tracks_started': 0,
+            'tracks_ended': 0,
+        }
+
+    def needs_detection(self, camera_id: str) -> bool:
+        """
+        Whether the camera's next frame needs a detector pass
+
+        True every detection_interval frames, and earlier when a propagated
+        track's quality falls below min_quality
+        """
+        tracker = self._trackers.get(camera_id)
+        if self.detection_interval <= 1 or tracker is None:
+            return True
+        if self._since_detection.get(camera_id, 0) + 1 >= self.detection_interval:
+            return True
+        return tracker.min_quality() < self.min_quality
+
+    def update(
+        self,
+        camera_id: str,
+        frame: Optional[np.ndarray],
+        detections,
+        seq: Optional[int] = None,
+        zones: Any = None,
+        confidence: float = 0.0
+    ) -> PersonTracks:
+        """
+        Advance a camera's tracks by one frame
+
+        The result is cached per camera under its sequence number, so a
+        second call for the same frame returns the same PersonTracks
+
+        Args:
+            camera_id: Camera identifier
+            frame: Current frame (used for optical flow)
+            detections: The frame's shared DetectionSet (keyframe=False when
+                carried over from an earlier pass)
+            seq: Frame sequence number
+            zones: Zone definitions from the frame metadata (None keeps the last)
+            confidence: Lowest person confidence the consumers need
+
+        Returns:
+            PersonTracks of the frame
+        """
+        cached = self._latest.get(camera_id)
+        if seq is not None and cached is not None and cached.seq == seq:
+            self._stats['reused'] += 1
+            return cached
+
+        tracker = self._trackers.get(camera_id)
+        if tracker is None:
+            tracker = IoUTracker(max_age=self.max_age, optical_flow=self.optical_flow)
+            self._trackers[camera_id] = tracker
+            self._first_seen[camera_id] = {}
+        before = set(tracker.active_ids())
+
+        keyframe = detections is None or detections.keyframe
+        if keyframe:
+            rows = tracker.update(self._person_rows(detections, confidence), frame)
+            self._since_detection[camera_id] = 0
+            self._stats['keyframes'] += 1
+        else:
+            rows = tracker.propagate(frame)
+            self._since_detection[camera_id] = self._since_detection.get(camera_id, 0) + 1
+            self._stats['propagated'] += 1
+
+        now = time.monotonic()
+        first_seen = self._first_seen[camera_id]
+        after = set(tracker.active_ids())
+        ended = sorted(before - after)
+        for track_id in ended:
+            first_seen.pop(track_id, None)
+        for track_id in after - before:
+            first_seen[track_id] = now
+        self._stats['tracks_started'] += len(after - before)
+        self._stats['tracks_ended'] += len(ended)
+
+        persons = self._persons(rows, self._zones.get(camera_id, zones), first_seen, now)
+        tracks = PersonTracks(camera_id, seq, persons, ended, keyframe)
+        self._latest[camera_id] = tracks
+        self._stats['frames'] += 1
+        return tracks
+
+    def latest(self, camera_id: str) -> Optional[PersonTracks]:
+        """Most recent PersonTracks of a camera"""
+        return self._latest.get(camera_id)
+
+    def _person_rows(self, detections, confidence: float) -> np.ndarray:
+        """Person boxes of a DetectionSet as [x1, y1, x2, y2, confidence] rows"""
+        if detections is None or not len(detections):
+            return np.zeros((0, 5), dtype=np.float32)
+        mask = (detections.class_ids == PERSON_CLASS) & (detections.confidences >= confidence)
+        return np.hstack([detections.boxes[mask], detections.confidences[mask, None]])
+
+    def _persons(
+        self,
+        rows: np.ndarray,
+        zone_map: ZoneMap,
+        first_seen: Dict[int, float],
+        now: float
+    ) -> List[Dict]:
+        """Convert tracker rows into the person dicts shared with modules"""
+        if not len(rows):
+            return []
+        centers = (rows[:, 0:2] + rows[:, 2:4]) / 2
+        zones = zone_map.zones_at(centers)
+
+        persons = []
+        for i, (x1, y1, x2, y2, track_id, conf, vx, vy) in enumerate(rows.tolist()):
+            track_id = int(track_id)
+            persons.append({
+                'track_id': track_id,
+                'bbox': [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],
+                'center': (int(centers[i, 0]), int(centers[i, 1])),
+                'velocity': (vx, vy),
+                'confidence': conf,
+                'zones': set(zones[i]),
+                'age': now - first_seen.get(track_id, now),
+            })
+        return persons
+
+    def remove_camera(self, camera_id: str):
+        """Drop a camera's tracker and cached tracks"""
+        self._trackers.pop(camera_id, None)
+        self._first_seen.pop(camera_id, None)
+        self._since_detection.pop(camera_id, None)
+        self._zones.remove(camera_id)
+        self._latest.pop(camera_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracking statistics"""
+        return {
+            **self._stats,
+            'cameras': len(self._trackers),
+            'active_tracks': {cid: tracker.count for cid, tracker in self._trackers.items()},
+            'detection_interval': self.detection_interval,
+        }
+
+    def cleanup(self):
+        self._trackers.clear()
+        self._first_seen.clear()
+        self._since_detection.clear()
+        self._zones.clear()
+        self._latest.clear()
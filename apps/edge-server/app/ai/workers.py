@@ -0,0 +1,494 @@
+"""
+AI Worker Pool
+Runs AI modules in separate processes so inference does not hold the GIL of
+the server process
+"""
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Any, Tuple
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from app.ai.motion import MotionMap
+from app.core.metrics import REGISTRY
+
+# Module stats that are the same in every worker rather than per-worker counters
+SHARED_STATS = {'gallery_size', 'detection_interval'}
+
+# How often a busy worker sends its latency histograms to the server process
+METRICS_PUSH_SECONDS = 5.0
+
+
+def _worker_main(worker_id: int, requests, results):
+    """
+    Worker process entry point
+
+    Each worker owns an AIModuleManager. Frames arrive as (segment name,
+    shape, dtype) references into shared memory written by the server
+    process, so only the small request tuple and the results are pickled.
+    Module and market stage histograms are recorded in this process's
+    metrics registry; snapshots go back as (None, {'worker', 'histograms'},
+    None) results every METRICS_PUSH_SECONDS and before each stats reply.
+    """
+    from app.ai.manager import AIModuleManager
+
+    # Every worker keeps its own gallery, so each saves its own ANN index file
+    manager = AIModuleManager(
+        face_index_path=os.path.join(settings.cache_dir, f'face_ann_index.worker{worker_id}.npz')
+    )
+    # Mapped segments, least recently used first; frame bus slots that were
+    # reallocated (new resolution, camera re-added) age out of the cache
+    segments: 'OrderedDict[str, shared_memory.SharedMemory]' = OrderedDict()
+    max_segments = settings.MAX_CAMERAS * 4
+    metadata: Dict = {}
+    metrics_pushed_at = time.monotonic()
+
+    def push_metrics():
+        nonlocal metrics_pushed_at
+        metrics_pushed_at = time.monotonic()
+        results.put((None, {'worker': worker_id, 'histograms': REGISTRY.snapshot()}, None))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+
+        kind = message[0]
+        try:
+            if kind == 'frame':
+                _, request_id, camera_id, name, shape, dtype, enabled_modules, motion = message
+                segment = segments.get(name)
+                if segment is None:
+                    segment = shared_memory.SharedMemory(name=name)
+                    segments[name] = segment
+                    if len(segments) > max_segments:
+                        segments.popitem(last=False)[1].close()
+                segments.move_to_end(name)
+                frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+                try:
+                    result = manager.process_frame(frame, camera_id, enabled_modules, metadata, motion)
+                    results.put((request_id, result, None))
+                except Exception as e:
+                    results.put((request_id, None, f"{type(e).__name__}: {e}"))
+                finally:
+                    del frame
+                if time.monotonic() - metrics_pushed_at >= METRICS_PUSH_SECONDS:
+                    push_metrics()
+            elif kind == 'metadata':
+                metadata = message[1]
+            elif kind == 'stats':
+                push_metrics()
+                results.put((message[1], {
+                    'faces': manager.get_face_stats(),
+                    'tracking': manager.get_tracking_stats(),
+                    'motion': manager.get_motion_stats(),
+                }, None))
+            elif kind == 'enable':
+                manager.enable_modules(message[1])
+            elif kind == 'disable':
+                manager.disable_modules(message[1])
+            elif kind == 'release':
+                segment = segments.pop(message[1], None)
+                if segment:
+                    segment.close()
+        except Exception as e:
+            logger.error(f"AI worker {worker_id} error handling '{kind}': {e}")
+
+    for segment in segments.values():
+        segment.close()
+    manager.cleanup()
+
+
+def _merge_stats(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine one stats dict per worker
+
+    Per-camera dicts are merged (a camera lives in one worker) and counters
+    summed; flags and SHARED_STATS are taken from the first worker.
+    """
+    merged: Dict[str, Any] = {}
+    for report in reports:
+        for key, value in report.items():
+            if key not in merged:
+                merged[key] = dict(value) if isinstance(value, dict) else value
+            elif isinstance(value, dict):
+                merged[key].update(value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in SHARED_STATS:
+                merged[key] += value
+    return merged
+
+
+class _FrameSegment:
+    """Per-camera shared memory block the server writes frames into"""
+
+    def __init__(self, nbytes: int):
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, frame: np.ndarray) -> Tuple[Tuple[int, ...], str]:
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf)
+        np.copyto(view, frame)
+        return frame.shape, frame.dtype.str
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.nbytes <= self.shm.size
+
+    def destroy(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class AIWorkerPool:
+    """
+    Process-pool execution mode for AI modules
+
+    Cameras are sharded across worker processes (sticky, so stateful modules
+    such as trackers keep seeing the same camera). Frames that come from the
+    frame bus are already in shared memory and are passed by segment name;
+    any other frame is written once into a per-camera segment. Either way
+    the worker maps the frame directly. Sync metadata is sent to the
+    workers only when it changes. Has the same submit/start/stop/get_stats interface as
+    BatchInferenceScheduler.
+    """
+
+    def __init__(self, workers: Optional[int] = None, frame_bus=None):
+        self.frame_bus = frame_bus
+        self.num_workers = max(1, workers or settings.AI_WORKERS or os.cpu_count() or 1)
+        self._ctx = mp.get_context('spawn')
+        self._processes: List[Optional[mp.Process]] = [None] * self.num_workers
+        self._requests: List[Any] = [None] * self.num_workers
+        self._results = None
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._running = False
+
+        self._assignments: Dict[str, int] = {}
+        self._segments: Dict[str, _FrameSegment] = {}
+        self._camera_locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Dict[int, Tuple[asyncio.Future, float, int, str]] = {}
+        self._ids = itertools.count(1)
+
+        self._enabled_modules: List[str] = []
+        self._metadata: Dict = {}
+
+        # Metrics
+        self._frames = 0
+        self._zero_copy_frames = 0
+        self._errors = 0
+        self._metadata_updates = 0
+        self._restarts = 0
+        self._completed = deque(maxlen=512)  # (finished_at, latency_ms)
+        self._motion: Dict[str, Dict[str, List[int]]] = {}  # camera -> module -> [runs, skips]
+
+    async def start(self):
+        """Start the worker processes and the result reader"""
+        if self._running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._results = self._ctx.Queue()
+        for index in range(self.num_workers):
+            self._spawn(index)
+
+        self._running = True
+        self._reader = threading.Thread(target=self._read_results, name="ai-results", daemon=True)
+        self._reader.start()
+        logger.info(f"AI worker pool started with {self.num_workers} processes")
+
+    async def stop(self):
+        """Stop the workers, fail pending frames and free shared memory"""
+        self._running = False
+
+        for requests in self._requests:
+            if requests is not None:
+                requests.put(None)
+
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            if process is not None:
+                await loop.run_in_executor(None, process.join, 5.0)
+                if process.is_alive():
+                    process.terminate()
+
+        if self._results is not None:
+            self._results.put(None)
+        if self._reader:
+            self._reader.join(timeout=2.0)
+
+        for future, _, _, _ in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+        for segment in self._segments.values():
+            segment.destroy()
+        self._segments.clear()
+
+        logger.info("AI worker pool stopped")
+
+    def _spawn(self, index: int):
+        """Start (or restart) one worker and replay its configuration"""
+        requests = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, requests, self._results),
+            name=f"ai-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+        self._requests[index] = requests
+
+        if self._enabled_modules:
+            requests.put(('enable', list(self._enabled_modules)))
+        if self._metadata:
+            requests.put(('metadata', self._metadata))
+
+    def _ensure_alive(self, index: int):
+        process = self._processes[index]
+        if process is not None and not process.is_alive():
+            logger.warning(f"AI worker {index} exited (code {process.exitcode}), restarting")
+            self._restarts += 1
+            # Frames sent to the dead worker will never be answered
+            for request_id, (future, _, worker, _) in list(self._pending.items()):
+                if worker == index:
+                    del self._pending[request_id]
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"AI worker {index} exited"))
+            self._spawn(index)
+
+    def _check_workers(self):
+        if self._running:
+            for index in range(self.num_workers):
+                self._ensure_alive(index)
+
+    def enable_modules(self, module_ids: List[str]):
+        """Enable modules in every worker"""
+        self._enabled_modules = sorted(set(self._enabled_modules) | set(module_ids))
+        self._broadcast(('enable', list(module_ids)))
+
+    def disable_modules(self, module_ids: List[str]):
+        """Disable modules in every worker"""
+        self._enabled_modules = [m for m in self._enabled_modules if m not in module_ids]
+        self._broadcast(('disable', list(module_ids)))
+
+    def _broadcast(self, message: tuple):
+        for requests in self._requests:
+            if requests is not None:
+                requests.put(message)
+
+    def _sync_metadata(self, metadata: Optional[Dict]):
+        """Send metadata to the workers only if one of its values was replaced"""
+        metadata = metadata or {}
+        changed = metadata.keys() != self._metadata.keys() or any(
+            value is not self._metadata[key] for key, value in metadata.items()
+        )
+        if changed:
+            # Keep references so identity comparison stays valid
+            self._metadata = dict(metadata)
+            self._metadata_updates += 1
+            self._broadcast(('metadata', self._metadata))
+
+    def _worker_for(self, camera_id: str) -> int:
+        """Sticky shard: new cameras go to the worker with the fewest cameras"""
+        index = self._assignments.get(camera_id)
+        if index is None:
+            counts = [0] * self.num_workers
+            for assigned in self._assignments.values():
+                counts[assigned] += 1
+            index = counts.index(min(counts))
+            self._assignments[camera_id] = index
+            logger.info(f"Camera {camera_id} assigned to AI worker {index}")
+        return index
+
+    def _segment_for(self, camera_id: str, frame: np.ndarray, index: int) -> _FrameSegment:
+        segment = self._segments.get(camera_id)
+        if segment is None or not segment.fits(frame):
+            if segment is not None:
+                self._requests[index].put(('release', segment.name))
+                segment.destroy()
+            segment = _FrameSegment(frame.nbytes)
+            self._segments[camera_id] = segment
+        return segment
+
+    async def submit(
+        self,
+        camera_id: str,
+        frame: np.ndarray,
+        enabled_modules: List[str],
+        metadata: Optional[Dict] = None,
+        motion: Optional[MotionMap] = None
+    ) -> Dict[str, Any]:
+        """
+        Process a frame in the camera's worker and wait for its results
+
+        Returns the same result dict as AIModuleManager.process_frame
+        """
+        if not self._running:
+            await self.start()
+
+        lock = self._camera_locks.setdefault(camera_id, asyncio.Lock())
+        async with lock:
+            # One frame in flight per camera, so its segment is not overwritten mid-read
+            index = self._worker_for(camera_id)
+            self._ensure_alive(index)
+            self._sync_metadata(metadata)
+
+            # The submitting camera loop keeps bus slots pinned until we return
+            handle = self.frame_bus.handle(camera_id, frame) if self.frame_bus else None
+            if handle:
+                name, shape, dtype = handle
+                self._zero_copy_frames += 1
+            else:
+                segment = self._segment_for(camera_id, frame, index)
+                name = segment.name
+                shape, dtype = segment.write(frame)
+
+            request_id = next(self._ids)
+            future = self._loop.create_future()
+            self._pending[request_id] = (future, time.perf_counter(), index, camera_id)
+            self._requests[index].put(
+                ('frame', request_id, camera_id, name, shape, dtype, list(enabled_modules), motion)
+            )
+            return await future
+
+    def _read_results(self):
+        """Resolve futures from worker results (reader thread)"""
+        while True:
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                if not self._running:
+                    break
+                try:
+                    self._loop.call_soon_threadsafe(self._check_workers)
+                except RuntimeError:
+                    break
+                continue
+            except (EOFError, OSError):
+                break
+
+            if message is None:
+                break
+
+            request_id, result, error = message
+            if request_id is None:
+                # Histogram snapshot: /metrics and the heartbeat report worker latencies too
+                REGISTRY.merge_remote(f"ai-worker-{result['worker']}", result['histograms'])
+                continue
+            try:
+                self._loop.call_soon_threadsafe(self._resolve, request_id, result, error)
+            except RuntimeError:
+                break  # Event loop closed
+
+    def _resolve(self, request_id: int, result: Optional[Dict], error: Optional[str]):
+        pending = self._pending.pop(request_id, None)
+        if pending is None:
+            return
+
+        future, submitted_at, _, camera_id = pending
+        if camera_id is None:  # Module stats request
+            if not future.done():
+                future.set_result(result)
+            return
+
+        self._frames += 1
+        self._completed.append((time.perf_counter(), (time.perf_counter() - submitted_at) * 1000.0))
+        if future.done():
+            return
+        if error:
+            self._errors += 1
+            future.set_exception(RuntimeError(error))
+        else:
+            self._record_modules(camera_id, result)
+            future.set_result(result)
+
+    def _record_modules(self, camera_id: str, result: Dict[str, Any]):
+        """Count motion gate decisions reported by the worker's manager"""
+        modules = self._motion.setdefault(camera_id, {})
+        for module_id, status in result.get('modules', {}).items():
+            counts = modules.setdefault(module_id, [0, 0])
+            counts[1 if status.get('skipped') else 0] += 1
+
+    async def get_module_stats(self, timeout: float = 2.0) -> Dict[str, Any]:
+        """
+        Get the face, tracking and motion gate stats of the workers' modules
+
+        Workers that do not answer within `timeout` seconds are left out.
+        """
+        if not self._running:
+            return {}
+
+        requests = {}
+        for index, worker_requests in enumerate(self._requests):
+            if worker_requests is None:
+                continue
+            request_id = next(self._ids)
+            future = self._loop.create_future()
+            self._pending[request_id] = (future, time.perf_counter(), index, None)
+            requests[request_id] = future
+            worker_requests.put(('stats', request_id))
+
+        if requests:
+            await asyncio.wait(list(requests.values()), timeout=timeout)
+        reports = []
+        for request_id, future in requests.items():
+            self._pending.pop(request_id, None)
+            if future.done() and not future.cancelled() and future.exception() is None:
+                reports.append(future.result())
+            else:
+                future.cancel()
+
+        if not reports:
+            return {}
+        return {key: _merge_stats([report[key] for report in reports]) for key in ('faces', 'tracking', 'motion')}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get worker pool metrics"""
+        fps = 0.0
+        latency = 0.0
+        if self._completed:
+            latency = sum(ms for _, ms in self._completed) / len(self._completed)
+        if len(self._completed) > 1:
+            window = self._completed[-1][0] - self._completed[0][0]
+            fps = (len(self._completed) - 1) / window if window > 0 else 0.0
+
+        cameras = [0] * self.num_workers
+        for index in self._assignments.values():
+            cameras[index] += 1
+
+        return {
+            'mode': 'process',
+            'workers': self.num_workers,
+            'workers_alive': sum(1 for p in self._processes if p is not None and p.is_alive()),
+            'cameras_per_worker': cameras,
+            'frames': self._frames,
+            'zero_copy_frames': self._zero_copy_frames,
+            'errors': self._errors,
+            'in_flight': len(self._pending),
+            'throughput_fps': fps,
+            'avg_latency_ms': latency,
+            'metadata_updates': self._metadata_updates,
+            'restarts': self._restarts,
+            'motion': {
+                camera_id: {
+                    module_id: runs_skips[1] / sum(runs_skips)
+                    for module_id, runs_skips in modules.items() if sum(runs_skips)
+                }
+                for camera_id, modules in self._motion.items()
+            },
+        }
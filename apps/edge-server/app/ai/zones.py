@@ -0,0 +1,207 @@
+"""
+Zone Geometry
+Compiles zone polygons into a label mask so zone membership is one array lookup
+"""
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from config.settings import settings
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+
+def named_polygons(zones: Any) -> List[Tuple[str, np.ndarray]]:
+    """
+    Get (name, points) of zone polygons
+
+    Accepts the zone formats used by the modules: {name: [[x, y], ...]},
+    [{'name'/'id', 'polygon' or 'points': [[x, y], ...]}, ...] or
+    [[[x, y], ...], ...] (named zone_0, zone_1, ...)
+    """
+    if not zones:
+        return []
+
+    items = zones.items() if isinstance(zones, dict) else enumerate(zones)
+    polygons = []
+    for key, polygon in items:
+        name = key if isinstance(zones, dict) else f"zone_{key}"
+        if isinstance(polygon, dict):
+            name = polygon.get('name') or polygon.get('id') or name
+            polygon = polygon.get('polygon') or polygon.get('points')
+        if not polygon or len(polygon) < 3:
+            continue
+        try:
+            points = np.asarray(
+                [(p['x'], p['y']) if isinstance(p, dict) else p for p in polygon],
+                dtype=np.float32
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+        polygons.append((str(name), points))
+    return polygons
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """
+    Even-odd test of many points against one polygon
+
+    Args:
+        points: (N, 2) array of [x, y]
+        polygon: (M, 2) array of vertices
+
+    Returns:
+        (N,) boolean array
+    """
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(crosses & (x < x_cross), axis=1) % 2 == 1
+
+
+def _rasterize(polygon: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Boolean mask of the pixels covered by a polygon given in mask coordinates"""
+    if CV2_AVAILABLE:
+        mask = np.zeros(shape, dtype=np.uint8)
+        cv2.fillPoly(mask, [np.round(polygon).astype(np.int32)], 1)
+        return mask.astype(bool)
+    ys, xs = np.mgrid[0:shape[0], 0:shape[1]]
+    centers = np.stack([xs.ravel(), ys.ravel()], axis=1).astype(np.float32)
+    return points_in_polygon(centers, polygon).reshape(shape)
+
+
+class ZoneMap:
+    """
+    Compiled zone polygons of one camera
+
+    Every pixel of an integer label mask holds the id of the set of zones
+    covering it (overlapping zones get their own label), so the zones of any
+    number of points come from a single indexed read whatever the zone count.
+    The mask covers the bounding box of all zones, at most `width` pixels
+    wide; points outside that box are rejected before the lookup.
+    """
+
+    def __init__(self, zones: Any, width: Optional[int] = None):
+        """
+        Args:
+            zones: Zone definitions in any format accepted by named_polygons
+            width: Mask width limit in pixels (None = ZONE_MASK_WIDTH, 0 = full resolution)
+        """
+        polygons = named_polygons(zones)
+        self.names = [name for name, _ in polygons]
+        self.label_zones: List[Tuple[str, ...]] = [()]  # label -> names of the zones covering it
+        self.boxes = np.zeros((len(polygons), 4), dtype=np.float32)  # [x1, y1, x2, y2] per zone
+        self.scale = 1.0  # mask pixels per frame pixel
+        self._origin = np.zeros(2, dtype=np.float32)
+        self._labels: Optional[np.ndarray] = None
+        if not polygons:
+            return
+
+        for i, (_, points) in enumerate(polygons):
+            self.boxes[i, :2] = points.min(axis=0)
+            self.boxes[i, 2:] = points.max(axis=0)
+        self._origin = np.floor(self.boxes[:, :2].min(axis=0))
+        extent = np.ceil(self.boxes[:, 2:].max(axis=0)) - self._origin + 1
+        width = settings.ZONE_MASK_WIDTH if width is None else width
+        if width > 0:
+            self.scale = min(1.0, width / float(extent[0]))
+        labels = np.zeros((math.ceil(extent[1] * self.scale), math.ceil(extent[0] * self.scale)), dtype=np.int32)
+
+        for name, points in polygons:
+            scaled = (points - self._origin) * self.scale
+            x1, y1 = np.maximum(np.floor(scaled.min(axis=0)).astype(int), 0)
+            x2, y2 = np.ceil(scaled.max(axis=0)).astype(int) + 1
+            window = labels[y1:y2, x1:x2]
+            inside = _rasterize(scaled - [x1, y1], window.shape)
+            covered = window[inside]
+            if not covered.size:
+                continue
+            # Each label this zone covers becomes a new label: its zones plus this one
+            previous, inverse = np.unique(covered, return_inverse=True)
+            first = len(self.label_zones)
+            self.label_zones.extend(self.label_zones[label] + (name,) for label in previous)
+            window[inside] = first + inverse
+        self._labels = labels
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def labels(self, points) -> np.ndarray:
+        """
+        Zone-set labels of points
+
+        Args:
+            points: (N, 2) array-like of [x, y] frame coordinates
+
+        Returns:
+            (N,) int array indexing label_zones (0 = no zone)
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        result = np.zeros(len(points), dtype=np.int32)
+        if self._labels is None or not len(points):
+            return result
+        cells = np.floor((points - self._origin) * self.scale).astype(np.int64)
+        height, width = self._labels.shape
+        valid = (cells[:, 0] >= 0) & (cells[:, 0] < width) & (cells[:, 1] >= 0) & (cells[:, 1] < height)
+        result[valid] = self._labels[cells[valid, 1], cells[valid, 0]]
+        return result
+
+    def zones_at(self, points) -> List[Tuple[str, ...]]:
+        """Names of the zones containing each point"""
+        label_zones = self.label_zones
+        return [label_zones[label] for label in self.labels(points).tolist()]
+
+
+class ZoneCache:
+    """
+    ZoneMaps per camera, compiled again only when a camera's zone config changes
+
+    A change is detected by identity: callers replace the zone definitions
+    (as the frame metadata does) rather than edit them in place.
+    """
+
+    def __init__(self, include: Optional[Callable[[str], bool]] = None, width: Optional[int] = None):
+        """
+        Args:
+            include: Keep only the zones whose name passes this test
+            width: Mask width limit passed to ZoneMap
+        """
+        self.include = include
+        self.width = width
+        self._maps: Dict[str, Tuple[Any, ZoneMap]] = {}  # camera_id -> (source, compiled)
+        self._empty = ZoneMap(None)
+
+    def get(self, camera_id: str, zones: Any = None) -> ZoneMap:
+        """
+        Compiled zones of a camera
+
+        Args:
+            camera_id: Camera identifier
+            zones: Current zone definitions (None keeps the last ones)
+        """
+        cached = self._maps.get(camera_id)
+        if zones is None:
+            return cached[1] if cached else self._empty
+        if cached is None or cached[0] is not zones:
+            selected = zones
+            if self.include is not None:
+                selected = [(name, points) for name, points in named_polygons(zones) if self.include(name)]
+                selected = {name: points.tolist() for name, points in selected}
+            cached = (zones, ZoneMap(selected, self.width))
+            self._maps[camera_id] = cached
+        return cached[1]
+
+    def remove(self, camera_id: str):
+        """Drop a camera's compiled zones"""
+        self._maps.pop(camera_id, None)
+
+    def clear(self):
+        self._maps.clear()
@@ -6,6 +6,7 @@ from datetime import datetime
 import io
 
 from config.settings import settings
+from app.core.metrics import summary as latency_summary
 
 router = APIRouter(tags=["API"])
 
@@ -40,6 +41,8 @@ class CommandRequest(BaseModel):
 async def get_status(request: Request):
     from main import state
 
+    # Module stats come from the in-process manager or from the AI workers
+    modules = await state.inference_scheduler.get_module_stats() if state.inference_scheduler else {}
     return {
         "server": {
             "name": settings.APP_NAME,
@@ -58,8 +61,20 @@ async def get_status(request: Request):
         },
         "cameras": {
             "active": len(state.cameras),
-            "max": settings.MAX_CAMERAS
-        }
+            "max": settings.MAX_CAMERAS,
+            "frame_bus": state.camera_service.frame_bus.get_stats() if state.camera_service else None,
+            "governor": state.camera_service.governor.get_stats() if state.camera_service else None
+        },
+        "inference": state.inference_scheduler.get_stats() if state.inference_scheduler else None,
+        "motion": modules.get('motion'),
+        "faces": modules.get('faces'),
+        "tracking": modules.get('tracking'),
+        "uploads": state.uploader.get_stats() if state.uploader else None,
+        "outbox": state.outbox.get_stats() if state.outbox else None,
+        "offline_queue": state.sync_service.offline_queue.get_stats() if state.sync_service else None,
+        "config_sync": state.sync_service.get_sync_stats() if state.sync_service else None,
+        "commands": state.sync_service.command_channel.get_stats() if state.sync_service else None,
+        "latency": latency_summary()
     }
 
 
@@ -183,22 +198,10 @@ async def list_automation(request: Request):
 
 @router.get("/system/info")
 async def system_info():
-    import platform
-    import psutil
+    from edge.app.system_metrics import get_sampler
 
-    return {
-        "os": platform.system(),
-        "os_version": platform.release(),
-        "python": platform.python_version(),
-        "cpu_count": psutil.cpu_count(),
-        "cpu_percent": psutil.cpu_percent(),
-        "memory_total": psutil.virtual_memory().total,
-        "memory_used": psutil.virtual_memory().used,
-        "memory_percent": psutil.virtual_memory().percent,
-        "disk_total": psutil.disk_usage('/').total,
-        "disk_used": psutil.disk_usage('/').used,
-        "disk_percent": psutil.disk_usage('/').percent
-    }
+    sampler = get_sampler()
+    return {**sampler.system_info(), "metrics": sampler.summary()}
 
 
 # Pairing endpoints
@@ -6,29 +6,54 @@ import httpx
 import asyncio
 import json
 import sys
+import time
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any, List
 from datetime import datetime
 from loguru import logger
 
 from config.settings import settings
+from app.core.metrics import CLOUD_REQUEST_LATENCY, CLOUD_REQUESTS, summary as latency_summary
+from edge.app.delta_sync import DeltaCollection
+from edge.app.system_metrics import get_sampler
 
-# Import HMACSigner from edge/app/signer.py
+# Shared Cloud client helpers (signer, transport) from edge/app
 edge_dir = Path(__file__).parent.parent.parent / "edge" / "app"
 if str(edge_dir) not in sys.path:
     sys.path.insert(0, str(edge_dir))
 try:
-    from signer import HMACSigner
+    from signer import HMACSigner, encode_json, get_signer
+    from transport import CloudTransport, TransportOptions, get_transport, release_transport
 except ImportError:
     HMACSigner = None
+    get_signer = None
+    get_transport = None
     logger.warning("HMACSigner not found - HMAC authentication will not work")
 
+    def encode_json(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def transport_options() -> "TransportOptions":
+    """Cloud transport tuning from settings"""
+    return TransportOptions(
+        max_connections=settings.CLOUD_MAX_CONNECTIONS,
+        max_keepalive=settings.CLOUD_MAX_KEEPALIVE,
+        keepalive_expiry=settings.CLOUD_KEEPALIVE_EXPIRY,
+        http2=settings.CLOUD_HTTP2,
+        connect_timeout=settings.CLOUD_CONNECT_TIMEOUT,
+        read_timeout=settings.CLOUD_READ_TIMEOUT,
+        write_timeout=settings.CLOUD_READ_TIMEOUT,
+        pool_timeout=settings.CLOUD_POOL_TIMEOUT
+    )
+
 
 class CloudDatabase:
     """Manages communication with the Cloud Laravel API"""
     
     def __init__(self):
         self.client: Optional[httpx.AsyncClient] = None
+        self._transport: Optional["CloudTransport"] = None
         self.connected = False
         self._headers = {}
         self._retry_count = 3
@@ -52,14 +77,22 @@ class CloudDatabase:
             if settings.CLOUD_API_KEY:
                 self._headers["Authorization"] = f"Bearer {settings.CLOUD_API_KEY}"
 
-            self.client = httpx.AsyncClient(
-                base_url=settings.CLOUD_API_URL.rstrip('/'),
-                headers=self._headers,
-                timeout=30.0
-            )
+            if self._transport:
+                await release_transport(self._transport)
+                self._transport = None
+
+            if get_transport:
+                # Pooled per-lane clients shared with the other Cloud clients in the process
+                self._transport = get_transport(settings.CLOUD_API_URL, transport_options())
+                self.client = self._transport.client("default")
+            else:
+                self.client = httpx.AsyncClient(
+                    base_url=settings.CLOUD_API_URL.rstrip('/'),
+                    timeout=30.0
+                )
 
             # Test connection
-            response = await self.client.get("/api/v1/public/landing")
+            response = await self.client.get("/api/v1/public/landing", headers=self._headers)
             self.connected = response.status_code in (200, 404, 401)
             
             if self.connected:
@@ -75,9 +108,12 @@ class CloudDatabase:
 
     async def disconnect(self):
         """Close connection to Cloud API"""
-        if self.client:
+        if self._transport:
+            await release_transport(self._transport)
+            self._transport = None
+        elif self.client:
             await self.client.aclose()
-            self.client = None
+        self.client = None
         self.connected = False
 
     def _load_edge_credentials(self) -> Tuple[Optional[str], Optional[str]]:
@@ -114,6 +150,8 @@ class CloudDatabase:
         method: str, 
         endpoint: str, 
         retry: bool = True, 
+        lane: str = "default",
+        raw: bool = False,
         **kwargs
     ) -> Tuple[bool, Any]:
         """
@@ -121,20 +159,29 @@ class CloudDatabase:
         
         For /api/v1/edges/* endpoints, uses HMAC authentication instead of Bearer token.
         For other endpoints, uses Bearer token if available.
+        Requests go through the connection pool of their traffic lane
+        ("default", "heartbeat", "commands" or "events").
+        With raw=True a successful request (including 304 Not Modified)
+        returns the httpx response instead of the parsed body.
         """
         if not self.client:
             return False, "Not connected"
+        client = self._transport.client(lane) if self._transport else self.client
 
         # Check if this is an Edge endpoint requiring HMAC
         is_edge_endpoint = endpoint.startswith('/api/v1/edges/')
         
         # Prepare headers (start with base headers)
         headers = dict(self._headers)
+        headers.update(kwargs.pop('headers', None) or {})
         
-        # Prepare body for signing
+        # Serialize the body once; the same bytes are signed and sent
         body_bytes = b""
         if 'json' in kwargs:
-            body_bytes = json.dumps(kwargs['json'], ensure_ascii=False).encode('utf-8')
+            kwargs['content'] = encode_json(kwargs.pop('json'))
+            headers['Content-Type'] = 'application/json'
+        if 'content' in kwargs:
+            body_bytes = kwargs['content'] or b""
         elif 'data' in kwargs:
             if isinstance(kwargs['data'], (str, bytes)):
                 body_bytes = kwargs['data'].encode('utf-8') if isinstance(kwargs['data'], str) else kwargs['data']
@@ -156,8 +203,8 @@ class CloudDatabase:
                 logger.error("Please ensure Edge Server is registered and credentials are stored")
                 return False, "Edge credentials not configured"
             
-            # Generate HMAC signature
-            signer = HMACSigner(self._edge_key, self._edge_secret)
+            # Generate HMAC signature (signer is cached per credential pair)
+            signer = get_signer(self._edge_key, self._edge_secret)
             # Use full path including /api/v1/edges/...
             path = endpoint
             sig_headers = signer.generate_signature(method.upper(), path, body_bytes)
@@ -177,12 +224,19 @@ class CloudDatabase:
         last_error = None
 
         for attempt in range(attempts):
+            started = time.perf_counter()
+            status = "error"
             try:
-                response = await self.client.request(method, endpoint, **request_kwargs)
+                response = await client.request(method, endpoint, **request_kwargs)
+                status = response.status_code
 
                 if response.status_code in (200, 201):
+                    if raw:
+                        return True, response
                     data = response.json() if response.text else None
                     return True, data
+                elif response.status_code == 304:
+                    return True, response if raw else None
                 elif response.status_code == 401:
                     # Log authentication failures with context
                     if is_edge_endpoint:
@@ -205,6 +259,8 @@ class CloudDatabase:
                 elif response.status_code == 403:
                     logger.error("Access forbidden - check permissions")
                     return False, "Forbidden"
+                elif response.status_code == 404:
+                    return False, "Not found"
                 elif response.status_code == 422:
                     error_data = response.json() if response.text else {}
                     return False, error_data.get('message', 'Validation error')
@@ -217,6 +273,9 @@ class CloudDatabase:
                 last_error = f"Timeout: {e}"
             except Exception as e:
                 last_error = str(e)
+            finally:
+                CLOUD_REQUEST_LATENCY.labels(lane).observe(time.perf_counter() - started)
+                CLOUD_REQUESTS.labels(lane, status).inc()
 
             if attempt < attempts - 1:
                 await asyncio.sleep(self._retry_delay * (attempt + 1))
@@ -313,7 +372,8 @@ class CloudDatabase:
             "POST",
             "/api/v1/edges/heartbeat",
             json=payload,
-            retry=False
+            retry=False,
+            lane="heartbeat"
         )
         
         if success and isinstance(result, dict):
@@ -439,6 +499,39 @@ class CloudDatabase:
             return data if isinstance(data, list) else []
         return []
 
+    async def fetch_collection(
+        self,
+        endpoint: str,
+        collection: DeltaCollection,
+        params: Optional[Dict] = None
+    ) -> Tuple[bool, Optional[Dict]]:
+        """
+        Refresh a synced collection with a conditional / delta request
+        
+        Args:
+            endpoint: Collection endpoint (e.g. /api/v1/edges/cameras)
+            collection: Local copy carrying the ETag and since= cursor
+            params: Extra query parameters
+            
+        Returns:
+            (success, changes) - changes is None when nothing changed;
+            on failure changes is the error ("Not found" if the Cloud has
+            no such endpoint)
+        """
+        success, response = await self._request(
+            "GET",
+            endpoint,
+            params={**(params or {}), **collection.request_params()},
+            headers=collection.request_headers(),
+            retry=False,
+            raw=True
+        )
+        if not success:
+            return False, response
+
+        data = response.json() if response.status_code != 304 and response.content else None
+        return True, collection.apply(response.status_code, data, response.headers)
+
     async def get_registered_faces(self, organization_id: str) -> List[Dict]:
         """Get registered faces (placeholder - implement when Cloud API is ready)"""
         # TODO: Implement when Cloud API endpoint is available
@@ -454,12 +547,11 @@ class CloudDatabase:
         # TODO: Implement when Cloud API endpoint is available
         return []
 
-    async def create_alert(self, alert_data: Dict) -> Tuple[bool, Optional[str]]:
+    def event_payload(self, alert_data: Dict, edge_id: Optional[str] = None) -> Dict:
         """
-        Create alert in Cloud
-        
-        Expected Cloud API endpoint: POST /api/v1/edges/events
-        Expected payload structure:
+        Map alert/event data to the payload expected by the Cloud EventController
+
+        Payload structure:
         {
             "edge_id": str,
             "event_type": str,
@@ -469,11 +561,12 @@ class CloudDatabase:
             "meta": dict (not metadata!)
         }
         """
-        from main import state
-        
-        # Map alert_data to EventController expected format
+        if edge_id is None:
+            from main import state
+            edge_id = state.edge_id or state.hardware_id
+
         payload = {
-            "edge_id": state.edge_id or state.hardware_id,
+            "edge_id": edge_id,
             "event_type": alert_data.get('type') or alert_data.get('event_type') or 'alert',
             "severity": alert_data.get('severity', 'info'),
             "occurred_at": alert_data.get('occurred_at') or datetime.utcnow().isoformat(),
@@ -501,10 +594,20 @@ class CloudDatabase:
         if meta:
             payload['meta'] = meta
 
+        return payload
+
+    async def create_alert(self, alert_data: Dict, edge_id: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Create alert in Cloud
+        
+        Expected Cloud API endpoint: POST /api/v1/edges/events
+        (payload format: see event_payload)
+        """
         success, result = await self._request(
             "POST",
             "/api/v1/edges/events",
-            json=payload
+            json=self.event_payload(alert_data, edge_id),
+            lane="events"
         )
 
         if success and result:
@@ -516,19 +619,38 @@ class CloudDatabase:
         """Create event in Cloud (same as alert)"""
         return (await self.create_alert(event_data))[0]
 
+    async def send_event_batch(self, body: bytes) -> Tuple[bool, Any]:
+        """
+        Send a batch of event payloads as one signed request
+        
+        Expected Cloud API endpoint: POST /api/v1/edges/events/batch
+        Expected request: { events: [<event payload>, ...] } (Content-Encoding: gzip)
+        
+        Args:
+            body: gzip-compressed JSON request body (signed as sent)
+            
+        Returns:
+            (success, result) - result is "Not found" if the Cloud has no batch endpoint
+        """
+        return await self._request(
+            "POST",
+            "/api/v1/edges/events/batch",
+            content=body,
+            headers={"Content-Encoding": "gzip"},
+            retry=False,
+            lane="events"
+        )
+
     async def batch_events(self, events: List[Dict]) -> bool:
-        """Batch create events"""
+        """Batch create events (batched upload with single-event fallback)"""
         if not events:
             return True
 
-        # Send events one by one (Cloud may support batch endpoint later)
-        success_count = 0
-        for event in events:
-            success = await self.create_event(event)
-            if success:
-                success_count += 1
-
-        return success_count > 0
+        from app.services.uploader import EventUploadPipeline
+        delivered = await EventUploadPipeline(self).send(
+            [{'type': 'event', 'data': event} for event in events]
+        )
+        return delivered > 0
 
     async def fetch_pending_commands(self, edge_id: str) -> List[Dict]:
         """
@@ -543,6 +665,30 @@ class CloudDatabase:
         # But we can poll if needed
         return []
 
+    async def long_poll_commands(self, cursor: Optional[str], wait: float) -> Tuple[bool, Any]:
+        """
+        Wait for commands issued to this Edge (long-poll)
+        
+        Cloud API endpoint: GET /api/v1/edges/commands/poll?wait=N&cursor=X
+        The Cloud may hold the request until a command is pending or `wait` seconds pass,
+        or answer at once (the channel then polls adaptively).
+        Expected response: { commands: [...], cursor: str }
+        
+        Returns:
+            (success, response) - response is "Not found" if the Cloud has no long-poll endpoint
+        """
+        params = {"wait": int(wait)}
+        if cursor:
+            params["cursor"] = cursor
+        return await self._request(
+            "GET",
+            "/api/v1/edges/commands/poll",
+            params=params,
+            timeout=httpx.Timeout(settings.CLOUD_CONNECT_TIMEOUT, read=wait + settings.CLOUD_CONNECT_TIMEOUT),
+            retry=False,
+            lane="commands"
+        )
+
     async def acknowledge_command(
         self,
         edge_id: str,
@@ -553,7 +699,7 @@ class CloudDatabase:
         """
         Acknowledge AI command execution
         
-        Expected Cloud API endpoint: POST /api/v1/ai-commands/{id}/ack
+        Cloud API endpoint: POST /api/v1/edges/commands/{id}/ack (HMAC)
         """
         payload = {
             "status": status,
@@ -563,8 +709,9 @@ class CloudDatabase:
 
         success, _ = await self._request(
             "POST",
-            f"/api/v1/ai-commands/{command_id}/ack",
+            f"/api/v1/edges/commands/{command_id}/ack",
             json=payload,
+            lane="commands"
         )
         return success
 
@@ -612,24 +759,24 @@ class CloudDatabase:
             return None
 
     def _get_system_info(self) -> Dict:
-        """Get system information"""
-        import platform
-        try:
-            import psutil
-            return {
-                "platform": platform.system(),
-                "platform_version": platform.version(),
-                "processor": platform.processor(),
-                "cpu_count": psutil.cpu_count(),
-                "cpu_percent": psutil.cpu_percent(interval=0.1),
-                "memory_total_gb": round(psutil.virtual_memory().total / (1024**3), 2),
-                "memory_used_percent": psutil.virtual_memory().percent,
-                "disk_total_gb": round(psutil.disk_usage('/').total / (1024**3), 2),
-                "disk_used_percent": psutil.disk_usage('/').percent,
-            }
-        except ImportError:
-            return {
-                "platform": platform.system(),
-                "platform_version": platform.version(),
-                "processor": platform.processor(),
-            }
+        """Get system information (from the background metrics sampler, never blocks)"""
+        sampler = get_sampler()
+        info = sampler.system_info()
+        memory_total = info.get("memory_total")
+        disk_total = info.get("disk_total")
+        return {
+            "platform": info.get("os"),
+            "platform_version": info.get("platform_version"),
+            "processor": info.get("processor"),
+            "hostname": info.get("hostname"),
+            "internal_ip": info.get("internal_ip"),
+            "cpu_count": info.get("cpu_count"),
+            "cpu_percent": info.get("cpu_percent"),
+            "memory_total_gb": round(memory_total / (1024**3), 2) if memory_total else None,
+            "memory_used_percent": info.get("memory_percent"),
+            "disk_total_gb": round(disk_total / (1024**3), 2) if disk_total else None,
+            "disk_used_percent": info.get("disk_percent"),
+            "process_rss_mb": info.get("process_rss_mb"),
+            "metrics": sampler.summary(),
+            "latency": latency_summary(),
+        }
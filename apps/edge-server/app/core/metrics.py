@@ -0,0 +1,424 @@
+"""
+Metrics
+Per-stage latency histograms and counters, exported in Prometheus text format
+"""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (label values, bucket counts, sum, count) of one histogram series
+SeriesSnapshot = Tuple[Tuple[str, ...], List[int], float, int]
+
+# Component stats keyed by camera (or camera, then module): the keys become
+# label values instead of parts of the gauge name
+LABEL_KEYS = {
+    "cameras": ("camera",),
+    "active_tracks": ("camera",),
+    "motion": ("camera", "module"),
+}
+
+
+class HistogramChild:
+    """
+    One labelled series of a histogram
+
+    Bucket counts live in a preallocated array, so observe() is a bisect
+    and three in-place increments - nothing is allocated per sample.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = array("Q", [0] * (len(buckets) + 1))  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def observe_since(self, start: float):
+        """Observe the time elapsed since a time.perf_counter() reading"""
+        self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the q-quantile (0 < q < 1)
+
+        Returns None without samples, and the largest finite bucket when
+        the quantile falls in +Inf.
+        """
+        counts, _, count = self.snapshot()
+        return _quantile(self.buckets, counts, count, q)
+
+
+class CounterChild:
+    """One labelled series of a counter"""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """Create the series for one set of label values"""
+
+    def labels(self, *values: Any):
+        """
+        Series for the given label values (created once, then cached)
+
+        Hot paths should keep the returned child instead of calling
+        labels() per sample.
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def _label_text(self, values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        return _label_text(pairs)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """Observe on the unlabelled series"""
+        self.labels().observe(value)
+
+    def series(self, remote: Optional[List[SeriesSnapshot]] = None) -> List[SeriesSnapshot]:
+        """
+        (label values, bucket counts, sum, count) per series
+
+        Args:
+            remote: Series snapshots from other processes, added to ours
+        """
+        merged = {values: child.snapshot() for values, child in self.children()}
+        for values, counts, total, count in remote or ():
+            values = tuple(values)
+            if values in merged:
+                own_counts, own_total, own_count = merged[values]
+                merged[values] = ([a + b for a, b in zip(own_counts, counts)], own_total + total, own_count + count)
+            else:
+                merged[values] = (list(counts), total, count)
+        return [(values, *snapshot) for values, snapshot in merged.items()]
+
+    def render(self, remote: Optional[List[SeriesSnapshot]] = None) -> List[str]:
+        lines = []
+        for values, counts, total, count in self.series(remote):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._label_text(values, ('le', _format(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._label_text(values, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_format(total)}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {count}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        """Increment the unlabelled series"""
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{self._label_text(values)} {_format(child.value)}"
+            for values, child in self.children()
+        ]
+
+
+class MetricsRegistry:
+    """
+    Named metrics of the process
+
+    Histograms recorded in other processes (the AI workers) are pushed here
+    with merge_remote() and added to ours in render() and summary().
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._remote: Dict[str, Dict[str, List[SeriesSnapshot]]] = {}  # source -> metric -> series
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def snapshot(self) -> Dict[str, List[SeriesSnapshot]]:
+        """Histogram series with samples, for merge_remote() in another process"""
+        with self._lock:
+            histograms = [metric for metric in self._metrics.values() if isinstance(metric, Histogram)]
+        snapshot = {}
+        for metric in histograms:
+            series = [(values, *child.snapshot()) for values, child in metric.children() if child.count]
+            if series:
+                snapshot[metric.name] = series
+        return snapshot
+
+    def merge_remote(self, source: str, snapshot: Dict[str, List[SeriesSnapshot]]):
+        """Replace the histogram snapshot last received from source (cumulative, like ours)"""
+        with self._lock:
+            self._remote[source] = snapshot
+
+    def _remote_series(self, name: str) -> List[SeriesSnapshot]:
+        with self._lock:
+            return [series for snapshot in self._remote.values() for series in snapshot.get(name, ())]
+
+    def render(self, gauges: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Prometheus text exposition of all metrics
+
+        Args:
+            gauges: Component stats ({"outbox": outbox.get_stats(), ...});
+                numeric values are exported as edge_<component>_<key> gauges,
+                with the keys of per-camera dicts (LABEL_KEYS) as labels
+
+        Returns:
+            Text in Prometheus exposition format 0.0.4
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                lines.extend(metric.render(self._remote_series(metric.name)))
+            else:
+                lines.extend(metric.render())
+
+        series: Dict[str, List[str]] = {}
+        for name, labels, value in _flatten(gauges or {}, "edge"):
+            series.setdefault(name, []).append(f"{name}{_label_text(labels)} {_format(value)}")
+        for name, samples in series.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Compact latency summary for the heartbeat
+
+        Returns:
+            {metric: {"label/values": {"count", "p50_ms", "p95_ms"}}}
+            for every histogram series with samples
+        """
+        with self._lock:
+            histograms = [metric for metric in self._metrics.values() if isinstance(metric, Histogram)]
+        summary = {}
+        for metric in histograms:
+            series = {}
+            for values, counts, _, count in metric.series(self._remote_series(metric.name)):
+                if not count:
+                    continue
+                series["/".join(values) or "all"] = {
+                    "count": count,
+                    "p50_ms": round(_quantile(metric.buckets, counts, count, 0.5) * 1000.0, 1),
+                    "p95_ms": round(_quantile(metric.buckets, counts, count, 0.95) * 1000.0, 1),
+                }
+            if series:
+                summary[metric.name] = series
+        return summary
+
+
+def _quantile(buckets: Tuple[float, ...], counts: List[int], count: int, q: float) -> Optional[float]:
+    """Upper bound of the bucket holding the q-quantile of a histogram series"""
+    if not count:
+        return None
+    rank = max(1, math.ceil(q * count))
+    seen = 0
+    for bound, bucket_count in zip(buckets, counts):
+        seen += bucket_count
+        if seen >= rank:
+            return bound
+    return buckets[-1]
+
+
+def _label_text(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _sanitize(name: str) -> str:
+    return "".join(ch if ch.isalnum() or ch == "_" else "_" for ch in str(name))
+
+
+def _flatten(data: Dict[str, Any], prefix: str, labels: Tuple[Tuple[str, str], ...] = ()):
+    """Yield (metric_name, labels, value) for the numeric leaves of nested stats"""
+    for key, value in data.items():
+        name = f"{prefix}_{_sanitize(key)}"
+        if isinstance(value, dict):
+            label_names = LABEL_KEYS.get(key)
+            if label_names:
+                yield from _flatten_labelled(value, name, labels, label_names)
+            else:
+                yield from _flatten(value, name, labels)
+        elif _is_number(value):
+            yield name, labels, int(value) if isinstance(value, bool) else value
+
+
+def _flatten_labelled(data: Dict[str, Any], name: str, labels: Tuple[Tuple[str, str], ...], label_names: Tuple[str, ...]):
+    """Flatten a dict whose keys are values of label_names[0] (e.g. camera ids)"""
+    for key, value in data.items():
+        item_labels = labels + ((label_names[0], str(key)),)
+        if isinstance(value, dict):
+            if len(label_names) > 1:
+                yield from _flatten_labelled(value, name, item_labels, label_names[1:])
+            else:
+                yield from _flatten(value, name, item_labels)
+        elif _is_number(value):
+            yield name, item_labels, int(value) if isinstance(value, bool) else value
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, bool) or (isinstance(value, (int, float)) and math.isfinite(value))
+
+
+# Process-wide registry and the pipeline metrics recorded into it
+REGISTRY = MetricsRegistry()
+
+AI_MODULE_LATENCY = REGISTRY.histogram(
+    "edge_ai_module_seconds",
+    "Time spent in an AI module's process_frame",
+    ("module",)
+)
+MARKET_STAGE_LATENCY = REGISTRY.histogram(
+    "edge_market_stage_seconds",
+    "Time spent in each Market pipeline stage",
+    ("stage",)
+)
+FRAME_DECODE_LATENCY = REGISTRY.histogram(
+    "edge_frame_decode_seconds",
+    "Time to decode a grabbed frame into the ring buffer",
+    ("camera",)
+)
+FRAME_AGE = REGISTRY.histogram(
+    "edge_frame_age_seconds",
+    "Age of a frame (since decode) when analysis starts",
+    ("camera",)
+)
+CAMERA_LOOP_LATENCY = REGISTRY.histogram(
+    "edge_camera_loop_seconds",
+    "Time to run all processors on one frame",
+    ("camera",)
+)
+CLOUD_REQUEST_LATENCY = REGISTRY.histogram(
+    "edge_cloud_request_seconds",
+    "Cloud API request latency per attempt",
+    ("lane",)
+)
+CLOUD_REQUESTS = REGISTRY.counter(
+    "edge_cloud_requests_total",
+    "Cloud API request attempts by lane and status code",
+    ("lane", "status")
+)
+
+
+def render(gauges: Optional[Dict[str, Any]] = None) -> str:
+    """Prometheus text of the process-wide registry"""
+    return REGISTRY.render(gauges)
+
+
+def summary() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Latency summary of the process-wide registry"""
+    return REGISTRY.summary()
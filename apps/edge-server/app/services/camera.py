@@ -1,12 +1,19 @@
 import asyncio
+import threading
+import time
 import cv2
 import numpy as np
-from typing import Dict, Optional, Callable, List, Any
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Callable, List, Any
 from datetime import datetime
 from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 
+from app.core.metrics import CAMERA_LOOP_LATENCY, FRAME_AGE
+from app.services.capture import CaptureThread, FrameRingBuffer
+from app.services.frame_bus import FrameBus
+from app.services.governor import FrameRateGovernor
 from config.settings import settings
 
 
@@ -18,21 +25,42 @@ class CameraStream:
     enabled_modules: List[str]
     capture: Optional[cv2.VideoCapture] = None
     is_active: bool = False
-    last_frame: Optional[np.ndarray] = None
     last_frame_time: Optional[datetime] = None
     error_count: int = 0
+    ring: Optional[FrameRingBuffer] = None
+    capture_thread: Optional[CaptureThread] = None
+    frame_ready: Optional[asyncio.Event] = None
+    last_seq: int = 0
+    analyzed_frames: int = 0
+    dropped_frames: int = 0
+    frame_age_ms: float = 0.0  # decode -> start of analysis
+    analysis_latency_ms: float = 0.0  # decode -> processors done
 
 
 class CameraService:
-    def __init__(self):
+    # Decoder thread started per camera (the benchmark swaps in an on-demand decoder)
+    capture_thread_class = CaptureThread
+
+    # Longest wait for a camera loop to finish its frame when stopping
+    STOP_TIMEOUT = 5.0
+
+    def __init__(self, frame_bus: Optional[FrameBus] = None):
         self.cameras: Dict[str, CameraStream] = {}
+        self.frame_bus = frame_bus or FrameBus()
         self.processors: List[Callable] = []
+        self._tasks: Dict[str, asyncio.Task] = {}
         self._running = False
         self._executor = ThreadPoolExecutor(max_workers=settings.MAX_CAMERAS)
         self._frame_interval = 1.0 / settings.PROCESSING_FPS
+        self.governor = FrameRateGovernor()
 
     def register_processor(self, processor: Callable):
-        """Register async processor function: async def processor(camera_id, frame, enabled_modules)"""
+        """
+        Register async processor function: async def processor(camera_id, frame, enabled_modules)
+
+        A processor may return the AI results dict; the frame rate governor
+        uses it to speed up cameras where people or fire are detected
+        """
         self.processors.append(processor)
 
     async def add_camera(self, camera_id: str, name: str, rtsp_url: str, modules: List[str] = None) -> bool:
@@ -55,7 +83,7 @@ class CameraService:
         logger.info(f"Camera added: {name} ({camera_id})")
 
         if self._running:
-            asyncio.create_task(self._process_camera(camera_id))
+            self._spawn(camera_id)
 
         return True
 
@@ -65,9 +93,10 @@ class CameraService:
 
         stream = self.cameras[camera_id]
         stream.is_active = False
-
-        if stream.capture:
-            stream.capture.release()
+        self._stop_capture(stream)
+        await self._join([self._tasks.pop(camera_id, None)])
+        self.frame_bus.remove(camera_id)
+        self.governor.remove_camera(camera_id)
 
         del self.cameras[camera_id]
         logger.info(f"Camera removed: {camera_id}")
@@ -78,18 +107,30 @@ class CameraService:
         logger.info("Camera service started")
 
         for camera_id in list(self.cameras.keys()):
-            asyncio.create_task(self._process_camera(camera_id))
+            self._spawn(camera_id)
 
     async def stop(self):
         self._running = False
 
         for stream in self.cameras.values():
             stream.is_active = False
-            if stream.capture:
-                stream.capture.release()
+            self._stop_capture(stream)
 
+        # Processors get views into the frame bus: let the loops finish before unmapping it
+        await self._join(list(self._tasks.values()))
+        self._tasks.clear()
+        self.frame_bus.close()
         logger.info("Camera service stopped")
 
+    def _spawn(self, camera_id: str):
+        self._tasks[camera_id] = asyncio.create_task(self._process_camera(camera_id))
+
+    async def _join(self, tasks: List[Optional[asyncio.Task]]):
+        """Wait (up to STOP_TIMEOUT) for camera loops to release their pinned frames"""
+        pending = [task for task in tasks if task and not task.done() and task is not asyncio.current_task()]
+        if pending:
+            await asyncio.wait(pending, timeout=self.STOP_TIMEOUT)
+
     def _connect_camera(self, stream: CameraStream) -> bool:
         try:
             if stream.capture:
@@ -114,35 +155,65 @@ class CameraService:
             logger.error(f"Camera connection error: {e}")
             return False
 
-    def _read_frame(self, stream: CameraStream) -> Optional[np.ndarray]:
-        if not stream.capture or not stream.is_active:
-            return None
+    def _start_capture(self, stream: CameraStream, loop: asyncio.AbstractEventLoop):
+        """Start the decoder thread that keeps the stream's ring buffer fresh"""
+        stream.ring = self.frame_bus.create_ring(stream.id)
+        stream.frame_ready = asyncio.Event()
+        stream.last_seq = 0
 
-        try:
-            ret, frame = stream.capture.read()
+        def notify():
+            try:
+                loop.call_soon_threadsafe(stream.frame_ready.set)
+            except RuntimeError:
+                pass  # Event loop closed during shutdown
+
+        stream.capture_thread = self.capture_thread_class(
+            stream.id,
+            stream.capture,
+            stream.ring,
+            decode_interval=self._frame_interval,
+            on_frame=notify
+        )
+        stream.capture_thread.start()
 
-            if not ret or frame is None:
-                stream.error_count += 1
-                if stream.error_count > 10:
-                    stream.is_active = False
-                return None
+    def _stop_capture(self, stream: CameraStream):
+        """Stop the decoder thread and release the capture"""
+        thread = stream.capture_thread
+        if thread:
+            thread.stop()
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=2.0)
+            stream.capture_thread = None
 
-            stream.error_count = 0
-            stream.last_frame = frame
-            stream.last_frame_time = datetime.utcnow()
+        if stream.capture:
+            stream.capture.release()
+            stream.capture = None
 
-            return frame
+    async def _next_frame(self, stream: CameraStream, timeout: float = 1.0):
+        """Wait for a frame newer than the last analyzed one and pin it"""
+        ref = stream.ring.acquire_latest(stream.last_seq)
+        if ref is not None:
+            return ref
 
-        except Exception as e:
-            logger.error(f"Frame read error: {e}")
+        stream.frame_ready.clear()
+        # Re-check: the capture thread may have committed before the clear
+        ref = stream.ring.acquire_latest(stream.last_seq)
+        if ref is not None:
+            return ref
+
+        try:
+            await asyncio.wait_for(stream.frame_ready.wait(), timeout)
+        except asyncio.TimeoutError:
             return None
+        return stream.ring.acquire_latest(stream.last_seq)
 
     async def _process_camera(self, camera_id: str):
         stream = self.cameras.get(camera_id)
         if not stream:
             return
 
-        connected = await asyncio.get_event_loop().run_in_executor(
+        loop = asyncio.get_event_loop()
+        connected = await loop.run_in_executor(
             self._executor,
             self._connect_camera,
             stream
@@ -151,71 +222,126 @@ class CameraService:
         if not connected:
             return
 
+        self._start_capture(stream, loop)
+        loop_latency = CAMERA_LOOP_LATENCY.labels(camera_id)
+        frame_age = FRAME_AGE.labels(camera_id)
+
         while self._running and stream.is_active:
+            thread = stream.capture_thread
+            if not thread or not thread.running:
+                stream.error_count = thread.error_count if thread else stream.error_count
+                stream.is_active = False
+                break
+
             try:
-                frame = await asyncio.get_event_loop().run_in_executor(
-                    self._executor,
-                    self._read_frame,
-                    stream
-                )
+                ref = await self._next_frame(stream)
+                if ref is None:
+                    continue
+
+                started = time.monotonic()
+                try:
+                    # Latest frame wins: anything decoded or grabbed in between is dropped
+                    if stream.last_seq:
+                        stream.dropped_frames += max(0, ref.seq - stream.last_seq - 1)
+                    stream.last_seq = ref.seq
+                    thread.consumed_seq = ref.seq
+                    stream.analyzed_frames += 1
+                    stream.last_frame_time = datetime.utcnow()
+                    stream.frame_age_ms = (started - ref.timestamp) * 1000.0
+                    frame_age.observe(started - ref.timestamp)
+                    self.governor.observe_frame(camera_id, ref.frame)
 
-                if frame is not None:
                     for processor in self.processors:
                         try:
                             # Processor should be async: async def processor(camera_id, frame, enabled_modules)
                             if asyncio.iscoroutinefunction(processor):
-                                await processor(camera_id, frame, stream.enabled_modules)
+                                result = await processor(camera_id, ref.frame, stream.enabled_modules)
                             else:
                                 # Sync processor
-                                await asyncio.get_event_loop().run_in_executor(
+                                result = await loop.run_in_executor(
                                     self._executor,
                                     processor,
                                     camera_id,
-                                    frame,
+                                    ref.frame,
                                     stream.enabled_modules
                                 )
+                            if isinstance(result, dict):
+                                self.governor.observe_results(camera_id, result)
                         except Exception as e:
                             logger.error(f"Processor error: {e}")
+                finally:
+                    stream.ring.release(ref)
+
+                finished = time.monotonic()
+                loop_latency.observe(finished - started)
+                stream.analysis_latency_ms = (finished - ref.timestamp) * 1000.0
 
-                await asyncio.sleep(self._frame_interval)
+                # Per-camera rate from the governor; the decoder follows it
+                interval = self.governor.interval(camera_id, stream.enabled_modules)
+                thread.decode_interval = interval
+
+                remaining = interval - (finished - started)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
 
             except Exception as e:
                 logger.error(f"Processing error: {e}")
                 await asyncio.sleep(1)
 
-        if stream.capture:
-            stream.capture.release()
-            stream.capture = None
+        self._stop_capture(stream)
 
     def get_camera_status(self, camera_id: str) -> Optional[Dict]:
         stream = self.cameras.get(camera_id)
         if not stream:
             return None
 
+        thread = stream.capture_thread
         return {
             "id": stream.id,
             "name": stream.name,
             "is_active": stream.is_active,
             "last_frame_time": stream.last_frame_time.isoformat() if stream.last_frame_time else None,
-            "error_count": stream.error_count
+            "error_count": thread.error_count if thread else stream.error_count,
+            "grabbed_frames": thread.grabbed if thread else 0,
+            "decoded_frames": thread.decoded if thread else 0,
+            "analyzed_frames": stream.analyzed_frames,
+            "dropped_frames": stream.dropped_frames,
+            "frame_age_ms": round(stream.frame_age_ms, 1),
+            "analysis_latency_ms": round(stream.analysis_latency_ms, 1),
+            "governor": self.governor.get_camera_state(stream.id),
         }
 
     def get_all_status(self) -> List[Dict]:
         return [self.get_camera_status(cid) for cid in self.cameras]
 
-    def get_frame(self, camera_id: str) -> Optional[np.ndarray]:
+    @contextmanager
+    def frame_view(self, camera_id: str) -> Iterator[Optional[np.ndarray]]:
+        """
+        Pin the newest frame of a camera and yield a read-only view of it
+
+        The view shares memory with the frame bus and is only valid inside
+        the with block; no copy is made.
+        """
         stream = self.cameras.get(camera_id)
-        if stream and stream.last_frame is not None:
-            return stream.last_frame.copy()
-        return None
+        ref = stream.ring.acquire_latest() if stream and stream.ring else None
+        try:
+            yield ref.frame if ref else None
+        finally:
+            if ref:
+                stream.ring.release(ref)
+
+    def get_frame(self, camera_id: str) -> Optional[np.ndarray]:
+        """Get a writable copy of the newest frame (use frame_view to avoid the copy)"""
+        with self.frame_view(camera_id) as frame:
+            return frame.copy() if frame is not None else None
 
     def get_frame_jpeg(self, camera_id: str, quality: int = 80) -> Optional[bytes]:
-        frame = self.get_frame(camera_id)
-        if frame is None:
-            return None
+        with self.frame_view(camera_id) as frame:
+            if frame is None:
+                return None
 
-        try:
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
-            return buffer.tobytes()
-        except:
-            return None
+            try:
+                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                return buffer.tobytes()
+            except:
+                return None
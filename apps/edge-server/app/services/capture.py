@@ -0,0 +1,220 @@
+"""
+Frame Capture
+Persistent per-camera decoder threads feeding a latest-frame-wins ring buffer
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from app.core.metrics import FRAME_DECODE_LATENCY
+
+
+@dataclass
+class FrameRef:
+    """A pinned ring slot handed to a consumer; release it when done"""
+    slot: int
+    seq: int
+    frame: np.ndarray
+    timestamp: float  # time.monotonic() when the frame was decoded
+
+
+class FrameRingBuffer:
+    """
+    Small preallocated ring of frame slots
+
+    The writer fills a free slot and publishes it as the newest frame; readers
+    always take the newest one as a read-only view. Slots pinned by a reader
+    are never overwritten, so a slow reader keeps a stable frame while the
+    writer moves on.
+    """
+
+    def __init__(self, slots: int = 3):
+        # latest + one pinned by the analysis loop + one being written
+        self.slots = max(3, slots)
+        self._frames: List[Optional[np.ndarray]] = [None] * self.slots
+        self._views: List[Optional[np.ndarray]] = [None] * self.slots
+        self._seqs = [0] * self.slots
+        self._times = [0.0] * self.slots
+        self._pins = [0] * self.slots
+        self._latest = -1
+        self._lock = threading.Lock()
+
+    def _allocate(self, slot: int, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """Allocate storage for a slot (overridden for shared memory)"""
+        return np.empty(shape, dtype=dtype)
+
+    def writable_slot(self, shape: Tuple[int, ...], dtype=np.uint8) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Get a slot the writer may fill
+
+        Returns (slot, array) or None when every slot is busy (the caller
+        should skip decoding this frame)
+        """
+        with self._lock:
+            for offset in range(1, self.slots + 1):
+                slot = (self._latest + offset) % self.slots
+                if slot == self._latest or self._pins[slot]:
+                    continue
+                frame = self._frames[slot]
+                if frame is None or frame.shape != tuple(shape) or frame.dtype != dtype:
+                    frame = self._allocate(slot, tuple(shape), dtype)
+                    view = frame.view()
+                    view.flags.writeable = False
+                    self._frames[slot] = frame
+                    self._views[slot] = view
+                return slot, frame
+        return None
+
+    def commit(self, slot: int, seq: int, timestamp: Optional[float] = None):
+        """Publish a filled slot as the newest frame"""
+        with self._lock:
+            self._seqs[slot] = seq
+            self._times[slot] = time.monotonic() if timestamp is None else timestamp
+            self._latest = slot
+
+    def acquire_latest(self, after_seq: int = 0) -> Optional[FrameRef]:
+        """Pin and return the newest frame if it is newer than after_seq"""
+        with self._lock:
+            slot = self._latest
+            if slot < 0 or self._seqs[slot] <= after_seq:
+                return None
+            self._pins[slot] += 1
+            return FrameRef(slot, self._seqs[slot], self._views[slot], self._times[slot])
+
+    def release(self, ref: FrameRef):
+        """Unpin a slot returned by acquire_latest"""
+        with self._lock:
+            if self._pins[ref.slot] > 0:
+                self._pins[ref.slot] -= 1
+
+    @property
+    def latest_seq(self) -> int:
+        with self._lock:
+            return self._seqs[self._latest] if self._latest >= 0 else 0
+
+    @property
+    def latest_time(self) -> Optional[float]:
+        with self._lock:
+            return self._times[self._latest] if self._latest >= 0 else None
+
+
+class CaptureThread(threading.Thread):
+    """
+    Persistent decoder thread for one camera
+
+    Calls grab() continuously so the stream buffer never backs up, but only
+    retrieve()s (decodes) a frame when the consumer has taken the previous
+    one or decode_interval has passed, so frames nobody will analyze are
+    never decoded.
+    """
+
+    def __init__(
+        self,
+        camera_id: str,
+        capture,
+        ring: FrameRingBuffer,
+        decode_interval: float,
+        on_frame: Optional[Callable[[], None]] = None,
+        max_errors: int = 10
+    ):
+        super().__init__(name=f"capture-{camera_id}", daemon=True)
+        self.camera_id = camera_id
+        self.capture = capture
+        self.ring = ring
+        self.decode_interval = decode_interval
+        self.on_frame = on_frame
+        self.max_errors = max_errors
+
+        self.grabbed = 0  # frames pulled from the stream (sequence numbers)
+        self.decoded = 0
+        self.skipped_busy = 0  # grabbed frames not decoded because every slot was pinned
+        self.error_count = 0
+        self.consumed_seq = 0  # updated by the consumer after each acquire
+        self._running = threading.Event()
+        self._last_decode = 0.0
+        self._shape: Optional[Tuple[int, ...]] = None
+        self._dtype = None
+        self._decode_latency = FRAME_DECODE_LATENCY.labels(camera_id)
+
+    def start(self):
+        # Running from start(), not run(): a check right after start() sees it,
+        # and a stop() before run() begins is not undone
+        self._running.set()
+        super().start()
+
+    def stop(self):
+        self._running.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._running.is_set()
+
+    def run(self):
+        while self._running.is_set():
+            try:
+                if not self.capture.grab():
+                    self.error_count += 1
+                    if self.error_count > self.max_errors:
+                        logger.warning(f"Capture thread for {self.camera_id} stopping after {self.error_count} errors")
+                        break
+                    time.sleep(0.05)
+                    continue
+
+                self.error_count = 0
+                self.grabbed += 1
+
+                now = time.monotonic()
+                consumer_waiting = self.consumed_seq >= self.ring.latest_seq
+                if not consumer_waiting and now - self._last_decode < self.decode_interval:
+                    continue
+
+                self._decode(now)
+
+            except Exception as e:
+                logger.error(f"Capture error on {self.camera_id}: {e}")
+                self.error_count += 1
+                if self.error_count > self.max_errors:
+                    break
+                time.sleep(0.05)
+
+        self._running.clear()
+
+    def _decode(self, now: float):
+        """Decode the grabbed frame straight into a free ring slot"""
+        if self._shape is None:
+            # First frame: decode once to learn the shape, then copy into the ring
+            ok, frame = self.capture.retrieve()
+            if not ok or frame is None:
+                return
+            self._shape, self._dtype = frame.shape, frame.dtype
+            target = self.ring.writable_slot(self._shape, self._dtype)
+            if target is None:
+                return
+            np.copyto(target[1], frame)
+        else:
+            target = self.ring.writable_slot(self._shape, self._dtype)
+            if target is None:
+                self.skipped_busy += 1
+                return
+            ok, frame = self.capture.retrieve(target[1])
+            if not ok or frame is None:
+                return
+            if frame is not target[1]:
+                # Decoder allocated its own output (e.g. resolution change)
+                if frame.shape != self._shape:
+                    self._shape, self._dtype = frame.shape, frame.dtype
+                    target = self.ring.writable_slot(self._shape, self._dtype)
+                    if target is None:
+                        return
+                np.copyto(target[1], frame)
+
+        self._last_decode = now
+        self.decoded += 1
+        self._decode_latency.observe(time.monotonic() - now)
+        self.ring.commit(target[0], self.grabbed, now)
+
+        if self.on_frame:
+            self.on_frame()
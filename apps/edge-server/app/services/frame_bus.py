@@ -0,0 +1,131 @@
+"""
+Frame Bus
+Per-camera frame rings in shared memory, readable without copies by the
+capture loop, the API and AI worker processes
+"""
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Any, Tuple
+import numpy as np
+from loguru import logger
+
+from app.services.capture import FrameRingBuffer
+
+
+def _destroy_segment(segment: shared_memory.SharedMemory):
+    """Unlink a segment; the mapping is closed once no view uses it"""
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        segment.close()
+    except BufferError:
+        pass  # A reader still holds a view; the mapping goes with it
+
+
+class SharedFrameRing(FrameRingBuffer):
+    """
+    FrameRingBuffer whose slots live in shared memory
+
+    Each slot is its own segment, so another process can map the pinned
+    frame by name. Pinning stays in the owning process.
+    """
+
+    def __init__(self, camera_id: str, slots: int = 3):
+        super().__init__(slots)
+        self.camera_id = camera_id
+        self._segments: List[Optional[shared_memory.SharedMemory]] = [None] * self.slots
+
+    def _allocate(self, slot: int, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        old = self._segments[slot]
+        if old is not None:
+            _destroy_segment(old)
+
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        segment = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+        self._segments[slot] = segment
+        return np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+
+    def handle_for(self, frame: np.ndarray) -> Optional[Tuple[str, Tuple[int, ...], str]]:
+        """Get (segment name, shape, dtype) if frame is one of this ring's slot views"""
+        with self._lock:
+            for slot, view in enumerate(self._views):
+                if view is frame and self._segments[slot] is not None:
+                    return self._segments[slot].name, view.shape, view.dtype.str
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.size for s in self._segments if s is not None)
+
+    def close(self):
+        """Release every slot segment"""
+        with self._lock:
+            self._frames = [None] * self.slots
+            self._views = [None] * self.slots
+            for segment in self._segments:
+                if segment is not None:
+                    _destroy_segment(segment)
+            self._segments = [None] * self.slots
+            self._latest = -1
+
+
+class FrameBus:
+    """
+    Registry of per-camera shared-memory frame rings
+
+    Capture threads decode each frame once into a ring slot. Consumers get
+    read-only views of pinned slots; AI workers map the same slot by name.
+    """
+
+    def __init__(self, slots: int = 3):
+        self.slots = slots
+        self._rings: Dict[str, SharedFrameRing] = {}
+        self._lock = threading.Lock()
+
+    def create_ring(self, camera_id: str) -> SharedFrameRing:
+        """Create (or replace) the ring for a camera"""
+        with self._lock:
+            old = self._rings.pop(camera_id, None)
+            ring = SharedFrameRing(camera_id, self.slots)
+            self._rings[camera_id] = ring
+        if old is not None:
+            old.close()
+        return ring
+
+    def get_ring(self, camera_id: str) -> Optional[SharedFrameRing]:
+        return self._rings.get(camera_id)
+
+    def remove(self, camera_id: str):
+        """Drop a camera's ring and free its shared memory"""
+        with self._lock:
+            ring = self._rings.pop(camera_id, None)
+        if ring is not None:
+            ring.close()
+
+    def handle(self, camera_id: str, frame: np.ndarray) -> Optional[Tuple[str, Tuple[int, ...], str]]:
+        """
+        Get the shared memory reference of a frame view handed out by the bus
+
+        Returns (segment name, shape, dtype) or None when the frame is not
+        backed by the bus (the caller must then copy it itself)
+        """
+        ring = self._rings.get(camera_id)
+        return ring.handle_for(frame) if ring else None
+
+    def close(self):
+        """Free every ring"""
+        with self._lock:
+            rings = list(self._rings.values())
+            self._rings.clear()
+        for ring in rings:
+            ring.close()
+        logger.debug(f"Frame bus closed ({len(rings)} rings)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'cameras': len(self._rings),
+            'slots_per_camera': self.slots,
+            'shared_bytes': sum(ring.nbytes for ring in list(self._rings.values())),
+        }
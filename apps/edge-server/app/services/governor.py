@@ -0,0 +1,219 @@
+"""
+Frame Rate Governor
+Adapts each camera's analysis rate to scene activity and system load
+"""
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from app.ai.motion import MotionEstimator, MotionMap
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+# Result types that mean people or fire are in view
+ACTIVITY_TYPES = {
+    'person', 'face', 'fire', 'smoke',
+    'fire_detected', 'smoke_detected', 'intrusion', 'crowd', 'loitering',
+}
+
+
+def parse_module_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse per-module rate limits
+
+    Args:
+        spec: "module:floor-ceiling,..." e.g. "fire:2-10,counter:1-5"
+
+    Returns:
+        {module_id: (floor_fps, ceiling_fps)}
+    """
+    limits = {}
+    for entry in (spec or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            module_id, rates = entry.split(':', 1)
+            floor, ceiling = rates.split('-', 1)
+            limits[module_id.strip()] = (float(floor), float(ceiling))
+        except ValueError:
+            logger.warning(f"Ignoring invalid governor module limit: '{entry}'")
+    return limits
+
+
+@dataclass
+class _CameraRate:
+    fps: float
+    motion_map: Optional[MotionMap] = None
+    motion: float = 0.0
+    static_frames: int = 0
+    active_until: float = 0.0
+    target: float = 0.0
+
+
+class FrameRateGovernor:
+    """
+    Per-camera analysis rate controller
+
+    Each camera runs at PROCESSING_FPS by default. A camera drops to its floor
+    rate after several frames with almost no change (changed-pixel fraction
+    of the frame's motion map, which the motion gate reuses), jumps to its
+    ceiling for a while after people or fire are detected, and every camera
+    is scaled towards its floor when CPU usage is above the high watermark.
+    Floors and ceilings come from the camera's enabled modules.
+    """
+
+    def __init__(
+        self,
+        base_fps: Optional[float] = None,
+        min_fps: Optional[float] = None,
+        max_fps: Optional[float] = None,
+        module_limits: Optional[Dict[str, Tuple[float, float]]] = None
+    ):
+        self.enabled = settings.GOVERNOR_ENABLED
+        self.base_fps = base_fps or settings.PROCESSING_FPS
+        self.min_fps = min_fps or settings.GOVERNOR_MIN_FPS
+        self.max_fps = max_fps or settings.GOVERNOR_MAX_FPS
+        self.module_limits = (
+            module_limits if module_limits is not None
+            else parse_module_limits(settings.GOVERNOR_MODULE_FPS)
+        )
+        self.static_threshold = settings.GOVERNOR_STATIC_THRESHOLD
+        self.static_frames = settings.GOVERNOR_STATIC_FRAMES
+        self.activity_hold = settings.GOVERNOR_ACTIVITY_HOLD
+        self.cpu_high = settings.GOVERNOR_CPU_HIGH
+
+        self.motion = MotionEstimator()
+        self._cameras: Dict[str, _CameraRate] = {}
+        self._cpu_percent = 0.0
+        self._cpu_sampled_at = 0.0
+
+        if PSUTIL_AVAILABLE:
+            psutil.cpu_percent(interval=None)  # Prime the non-blocking counter
+
+    def _state(self, camera_id: str) -> _CameraRate:
+        state = self._cameras.get(camera_id)
+        if state is None:
+            state = _CameraRate(fps=self.base_fps, target=self.base_fps)
+            self._cameras[camera_id] = state
+        return state
+
+    def remove_camera(self, camera_id: str):
+        self._cameras.pop(camera_id, None)
+        self.motion.remove_camera(camera_id)
+
+    def limits(self, enabled_modules: List[str]) -> Tuple[float, float]:
+        """Get (floor, ceiling) fps for a set of modules"""
+        floor, ceiling = self.min_fps, self.max_fps
+        module_limits = [self.module_limits[m] for m in enabled_modules if m in self.module_limits]
+        if module_limits:
+            # The most demanding module decides
+            floor = max(f for f, _ in module_limits)
+            ceiling = max(c for _, c in module_limits)
+        floor = min(floor, ceiling)
+        return floor, ceiling
+
+    def observe_frame(self, camera_id: str, frame: np.ndarray) -> MotionMap:
+        """
+        Compute the frame's motion map and update the scene change score
+
+        This is the one motion pass per analyzed frame: the AI processor
+        hands the map (motion_map) on to the motion gate.
+
+        Returns:
+            Motion map of the frame
+        """
+        state = self._state(camera_id)
+        state.motion_map = self.motion.update(camera_id, frame)
+        state.motion = state.motion_map.energy()
+
+        if state.motion < self.static_threshold:
+            state.static_frames += 1
+        else:
+            state.static_frames = 0
+
+        return state.motion_map
+
+    def motion_map(self, camera_id: str) -> Optional[MotionMap]:
+        """Motion map of the camera's most recently observed frame"""
+        state = self._cameras.get(camera_id)
+        return state.motion_map if state else None
+
+    def observe_results(self, camera_id: str, results: Dict[str, Any]):
+        """Boost the camera's rate when the AI results show people or fire"""
+        state = self._state(camera_id)
+        for key in ('alerts', 'detections', 'events'):
+            for item in results.get(key, []):
+                kind = item.get('type') or item.get('event_type')
+                if kind in ACTIVITY_TYPES or item.get('class') == 'person':
+                    state.active_until = time.monotonic() + self.activity_hold
+                    return
+
+    def cpu_percent(self) -> float:
+        """System CPU usage, sampled at most once per second without blocking"""
+        now = time.monotonic()
+        if PSUTIL_AVAILABLE and now - self._cpu_sampled_at >= 1.0:
+            self._cpu_percent = psutil.cpu_percent(interval=None)
+            self._cpu_sampled_at = now
+        return self._cpu_percent
+
+    def interval(self, camera_id: str, enabled_modules: List[str]) -> float:
+        """Get the time to wait before analyzing the camera's next frame"""
+        if not self.enabled:
+            return 1.0 / self.base_fps
+
+        state = self._state(camera_id)
+        floor, ceiling = self.limits(enabled_modules)
+        base = min(max(self.base_fps, floor), ceiling)
+        active = time.monotonic() < state.active_until
+
+        if active:
+            target = ceiling
+        elif state.static_frames >= self.static_frames:
+            target = floor
+        else:
+            target = base
+
+        # Under CPU pressure scale towards the floor (active cameras keep the base rate)
+        cpu = self.cpu_percent()
+        if cpu > self.cpu_high:
+            factor = max(0.0, 1.0 - (cpu - self.cpu_high) / (100.0 - self.cpu_high))
+            lowest = base if active else floor
+            target = lowest + (target - lowest) * factor if target > lowest else target
+
+        # Rise immediately, fall gradually to avoid flapping
+        if target >= state.fps:
+            state.fps = target
+        else:
+            state.fps += 0.3 * (target - state.fps)
+        state.target = target
+
+        return 1.0 / max(state.fps, 0.1)
+
+    def get_camera_state(self, camera_id: str) -> Optional[Dict[str, Any]]:
+        state = self._cameras.get(camera_id)
+        if state is None:
+            return None
+        return {
+            'fps': round(state.fps, 2),
+            'target_fps': round(state.target, 2),
+            'motion': round(state.motion, 4),
+            'static': state.static_frames >= self.static_frames,
+            'active': time.monotonic() < state.active_until,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'cpu_percent': self._cpu_percent,
+            'total_fps': round(sum(s.fps for s in self._cameras.values()), 2),
+            'cameras': {cid: self.get_camera_state(cid) for cid in self._cameras},
+        }
@@ -0,0 +1,199 @@
+"""
+Event Outbox
+Bounded in-process queue between AI results and cloud uploads
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Any, Tuple
+import numpy as np
+from loguru import logger
+
+from app.services.wal_queue import item_rank, SEVERITY_RANKS
+from config.settings import settings
+
+
+INFO_RANK = SEVERITY_RANKS['info']
+
+
+def strip_images(value: Any) -> Any:
+    """
+    Make AI results safe to queue for upload
+
+    Image arrays (2-D and up, e.g. a market event's snapshot) are dropped:
+    frames stay on the Edge Server. Other numpy arrays and scalars become
+    plain lists and numbers.
+    """
+    if isinstance(value, dict):
+        return {
+            key: strip_images(item) for key, item in value.items()
+            if not (isinstance(item, np.ndarray) and item.ndim >= 2)
+        }
+    if isinstance(value, (list, tuple)):
+        return [strip_images(item) for item in value if not (isinstance(item, np.ndarray) and item.ndim >= 2)]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+class EventOutbox:
+    """
+    Bounded outbox drained by dedicated uploader tasks
+
+    put() never blocks and never touches the network, so frame processing
+    does not wait on the Cloud. When the outbox holds OUTBOX_MAX_ITEMS:
+    - the oldest info/low event is dropped to make room, otherwise
+    - the oldest item is spilled to the offline queue (disk) instead.
+    Alerts are therefore never dropped, only deferred to the offline queue.
+
+    OUTBOX_WORKERS tasks take up to one upload window of items at a time
+    (waiting UPLOAD_BATCH_WAIT_MS for a batch to fill) and send them
+    through the EventUploadPipeline; whatever a send does not deliver is
+    spilled to the offline queue.
+    """
+
+    def __init__(
+        self,
+        uploader,
+        spill: Optional[Callable[[List[Dict]], None]] = None,
+        max_items: Optional[int] = None,
+        workers: Optional[int] = None,
+        batch_wait_ms: Optional[int] = None
+    ):
+        self.uploader = uploader
+        self.spill = spill
+        self.max_items = max_items or settings.OUTBOX_MAX_ITEMS
+        self.workers = workers or settings.OUTBOX_WORKERS
+        self.batch_wait = (batch_wait_ms if batch_wait_ms is not None else settings.UPLOAD_BATCH_WAIT_MS) / 1000.0
+
+        # Info events and everything else are kept apart so the oldest info
+        # event can be dropped in O(1); entries are (seq, enqueued_at, item)
+        self._info: Deque[Tuple[int, float, Dict]] = deque()
+        self._other: Deque[Tuple[int, float, Dict]] = deque()
+        self._seq = 0
+
+        self._ready: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+
+        self._stats = {
+            'enqueued': 0,
+            'delivered': 0,
+            'dropped_info': 0,
+            'spilled': 0,
+            'upload_failures': 0,
+            'max_depth': 0,
+            'last_upload_ms': 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._info) + len(self._other)
+
+    async def start(self):
+        self._ready = asyncio.Event()
+        self._running = True
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Event outbox started ({self.max_items} items, {self.workers} uploader tasks)")
+
+    async def stop(self):
+        """Stop the uploaders and spill whatever is left to the offline queue"""
+        self._running = False
+        if self._ready:
+            self._ready.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        leftover = self._take(len(self))
+        if leftover:
+            self._spill(leftover)
+            logger.info(f"Event outbox spilled {len(leftover)} items to the offline queue on shutdown")
+
+    def put(self, item_type: str, data: Dict):
+        """Queue an item for upload (never blocks)"""
+        # Enqueue time travels with the item, so a later spill keeps it
+        item = {'type': item_type, 'data': data, 'timestamp': datetime.utcnow().isoformat()}
+        rank = item_rank(item_type, data)
+
+        if len(self) >= self.max_items:
+            if self._info:
+                self._info.popleft()
+                self._stats['dropped_info'] += 1
+            else:
+                self._spill([self._pop_oldest()])
+
+        self._seq += 1
+        entry = (self._seq, time.monotonic(), item)
+        (self._info if rank <= INFO_RANK else self._other).append(entry)
+        self._stats['enqueued'] += 1
+        self._stats['max_depth'] = max(self._stats['max_depth'], len(self))
+
+        if self._ready:
+            self._ready.set()
+
+    def _pop_oldest(self) -> Dict:
+        if self._info and (not self._other or self._info[0][0] < self._other[0][0]):
+            return self._info.popleft()[2]
+        return self._other.popleft()[2]
+
+    def _take(self, count: int) -> List[Dict]:
+        """Remove up to count items in arrival order"""
+        return [self._pop_oldest() for _ in range(min(count, len(self)))]
+
+    def _spill(self, items: List[Dict]):
+        if not items:
+            return
+        self._stats['spilled'] += len(items)
+        if self.spill is None:
+            logger.warning(f"Event outbox has no offline queue - {len(items)} items lost")
+            return
+        try:
+            self.spill(items)
+        except Exception as e:
+            logger.error(f"Event outbox could not spill {len(items)} items: {e}")
+
+    async def _worker(self, worker_id: int):
+        window = self.uploader.batch_size * self.uploader.max_in_flight
+        while self._running:
+            try:
+                if not len(self):
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                # Give a batch the upload window to fill up
+                oldest = min(q[0][1] for q in (self._info, self._other) if q)
+                remaining = oldest + self.batch_wait - time.monotonic()
+                if len(self) < self.uploader.batch_size and remaining > 0:
+                    await asyncio.sleep(remaining)
+
+                items = self._take(window)
+                if not items:
+                    continue
+
+                start = time.perf_counter()
+                delivered = await self.uploader.send(items)
+                self._stats['last_upload_ms'] = (time.perf_counter() - start) * 1000
+                self._stats['delivered'] += delivered
+                if delivered < len(items):
+                    self._stats['upload_failures'] += 1
+                    self._spill(items[delivered:])
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event outbox uploader {worker_id} error: {e}")
+                await asyncio.sleep(1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        heads = [q[0][1] for q in (self._info, self._other) if q]
+        return {
+            **self._stats,
+            'depth': len(self),
+            'depth_info': len(self._info),
+            'max_items': self.max_items,
+            'oldest_age_ms': round((now - min(heads)) * 1000, 1) if heads else 0.0,
+        }
@@ -1,66 +1,65 @@
 import asyncio
 import json
 import os
+import signal
+import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 from loguru import logger
 
+from app.services.uploader import EventUploadPipeline
+from app.services.wal_queue import WALQueue
 from config.settings import settings
+from edge.app.command_channel import CommandChannel
+from edge.app.delta_sync import DeltaCollection
 
 
-class OfflineQueue:
+class OfflineQueue(WALQueue):
+    """Offline queue for alerts/events/attendance waiting for the cloud"""
+
+    # Items per upload round in _sync_pending (split into upload batches)
+    SYNC_BATCH = 1000
+
     def __init__(self):
         self.queue_dir = Path(settings.offline_queue_dir)
-        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(self.queue_dir))
         self.queue_file = self.queue_dir / "pending.json"
-        self._queue: List[Dict] = []
-        self._load()
-
-    def _load(self):
-        try:
-            if self.queue_file.exists():
-                with open(self.queue_file, 'r', encoding='utf-8') as f:
-                    self._queue = json.load(f)
-        except Exception as e:
-            logger.warning(f"Could not load offline queue: {e}")
-            self._queue = []
+        self._migrate_legacy()
 
-    def _save(self):
+    def _migrate_legacy(self):
+        """Import a pending.json left by the previous queue format"""
+        if not self.queue_file.exists():
+            return
         try:
-            with open(self.queue_file, 'w', encoding='utf-8') as f:
-                json.dump(self._queue, f, default=str)
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            for item in legacy:
+                self.add(item.get('type', 'event'), item.get('data', {}), item.get('timestamp'))
+            self.flush()
+            self.queue_file.rename(self.queue_file.with_suffix('.json.migrated'))
+            logger.info(f"Migrated {len(legacy)} items from pending.json to the offline queue log")
         except Exception as e:
-            logger.warning(f"Could not save offline queue: {e}")
-
-    def add(self, item_type: str, data: Dict):
-        self._queue.append({
-            "type": item_type,
-            "data": data,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        self._save()
-
-    def get_pending(self) -> List[Dict]:
-        return self._queue.copy()
+            logger.warning(f"Could not migrate legacy offline queue: {e}")
 
-    def clear(self):
-        self._queue = []
-        self._save()
 
-    def remove(self, count: int):
-        self._queue = self._queue[count:]
-        self._save()
+# Cloud collections kept in sync: name -> endpoint (answers 304 / deltas, see DeltaCollection)
+SYNC_COLLECTIONS = {
+    'cameras': '/api/v1/edges/cameras',
+    'faces': '/api/v1/edges/faces',
+    'vehicles': '/api/v1/edges/vehicles',
+    'rules': '/api/v1/edges/rules',
+}
 
-    @property
-    def size(self) -> int:
-        return len(self._queue)
+# Ask again this often for a collection the Cloud answered 404 for
+COLLECTION_RECHECK_SECONDS = 600
 
 
 class SyncService:
-    def __init__(self, db):
+    def __init__(self, db, uploader: Optional[EventUploadPipeline] = None):
         self.db = db
         self.offline_queue = OfflineQueue()
+        self.uploader = uploader or EventUploadPipeline(db)
         self._running = False
         self._last_sync = None
         self._last_heartbeat = None
@@ -69,17 +68,35 @@ class SyncService:
         self.cached_vehicles: List[Dict] = []
         self.cached_rules: List[Dict] = []
         self.cached_cameras: List[Dict] = []
+        # Bumped whenever the synced faces change, so consumers rebuild their galleries only then
+        self.faces_version = 0
+        # Changes between the last two face versions (see DeltaCollection.apply)
+        self.faces_delta: Optional[Dict] = None
+        self.vehicles_version = 0
+
+        self.collections = {name: DeltaCollection(name) for name in SYNC_COLLECTIONS}
+        self._unavailable: Dict[str, float] = {}
+
+        # Commands arrive over a long-poll channel instead of the sync interval
+        self.command_channel = CommandChannel(
+            long_poll=self._long_poll_commands,
+            poll=self._fetch_commands,
+            handler=self._handle_command,
+            wait=settings.COMMAND_LONG_POLL_WAIT,
+            min_interval=settings.COMMAND_POLL_MIN_INTERVAL,
+            max_interval=settings.COMMAND_POLL_MAX_INTERVAL
+        )
 
     async def run(self):
         self._running = True
         logger.info("Sync service started")
+        await self.command_channel.start()
 
         while self._running:
             try:
                 await self._heartbeat()
                 await self._sync_pending()
                 await self._sync_configuration()
-                await self._poll_commands()
             except Exception as e:
                 logger.error(f"Sync error: {e}")
 
@@ -87,6 +104,8 @@ class SyncService:
 
     async def stop(self):
         self._running = False
+        await self.command_channel.stop()
+        self.offline_queue.close()
         logger.info("Sync service stopped")
 
     async def _heartbeat(self):
@@ -125,51 +144,50 @@ class SyncService:
 
         logger.info(f"Syncing {self.offline_queue.size} pending items")
 
-        pending = self.offline_queue.get_pending()
-        synced = 0
-
-        for item in pending:
+        total = 0
+        while self.offline_queue.size:
+            # Upload in batches so a large backlog is never loaded at once
+            pending = self.offline_queue.peek(OfflineQueue.SYNC_BATCH)
             try:
-                item_type = item['type']
-                data = item['data']
-
-                if item_type == 'alert':
-                    success, _ = await self.db.create_alert(data)
-                elif item_type == 'event':
-                    success = await self.db.create_event(data)
-                elif item_type == 'attendance':
-                    success = await self.db.log_attendance(data)
-                else:
-                    success = True
-
-                if success:
-                    synced += 1
-                else:
-                    break
-
+                synced = await self.uploader.send(pending)
             except Exception as e:
-                logger.error(f"Failed to sync item: {e}")
+                logger.error(f"Failed to sync items: {e}")
                 break
 
-        if synced > 0:
-            self.offline_queue.remove(synced)
-            logger.info(f"Synced {synced} items")
+            if synced > 0:
+                self.offline_queue.remove(synced)
+                total += synced
+            if synced < len(pending) or not pending:
+                break
 
-    async def _sync_configuration(self):
+        if total > 0:
+            logger.info(f"Synced {total} items")
+
+    async def _sync_configuration(self) -> bool:
+        """Sync cached faces, vehicles, rules and cameras; returns whether the sync ran"""
         from main import state
 
         if not state.license_data:
-            return
+            return False
 
         org_id = state.license_data.get('organization_id')
         if not org_id:
-            return
+            return False
 
         try:
-            self.cached_faces = await self.db.get_registered_faces(org_id)
-            self.cached_vehicles = await self.db.get_registered_vehicles(org_id)
-            self.cached_rules = await self.db.get_automation_rules(org_id)
-            self.cached_cameras = await self.db.get_cameras(org_id)
+            faces = await self._sync_collection('faces', org_id)
+            if faces:
+                self.cached_faces = self.collections['faces'].items()
+                self.faces_delta = faces
+                self.faces_version = faces['version']
+            vehicles = await self._sync_collection('vehicles', org_id)
+            if vehicles:
+                self.cached_vehicles = self.collections['vehicles'].items()
+                self.vehicles_version = vehicles['version']
+            if await self._sync_collection('rules', org_id):
+                self.cached_rules = self.collections['rules'].items()
+            if await self._sync_collection('cameras', org_id):
+                self.cached_cameras = self.collections['cameras'].items()
 
             self._last_sync = datetime.utcnow()
 
@@ -177,43 +195,94 @@ class SyncService:
                         f"{len(self.cached_vehicles)} vehicles, "
                         f"{len(self.cached_rules)} rules, "
                         f"{len(self.cached_cameras)} cameras")
+            return True
 
         except Exception as e:
             logger.error(f"Configuration sync failed: {e}")
-
-    async def _poll_commands(self):
+            return False
+
+    async def _sync_collection(self, name: str, org_id) -> Optional[Dict]:
+        """
+        Fetch the changes of one collection
+
+        Returns:
+            The changes ({'upserts', 'removed', ...}), or None if nothing changed
+        """
+        checked_at = self._unavailable.get(name)
+        if checked_at is not None and time.monotonic() - checked_at < COLLECTION_RECHECK_SECONDS:
+            return None
+
+        success, changes = await self.db.fetch_collection(
+            SYNC_COLLECTIONS[name],
+            self.collections[name],
+            params={'organization_id': org_id}
+        )
+        if not success:
+            if changes == "Not found":
+                if name not in self._unavailable:
+                    logger.info(f"Cloud has no {name} endpoint yet - checking again in {COLLECTION_RECHECK_SECONDS}s")
+                self._unavailable[name] = time.monotonic()
+            else:
+                logger.warning(f"Could not sync {name}: {changes}")
+            return None
+
+        self._unavailable.pop(name, None)
+        if changes:
+            logger.info(f"Synced {name}: {len(changes['upserts'])} changed, {len(changes['removed'])} removed")
+        return changes
+
+    def _edge_id(self) -> Optional[str]:
         from main import state
+        return state.edge_id or state.server_id
 
-        edge_id = state.edge_id or state.server_id
-        if not edge_id:
-            return
-
-        try:
-            commands = await self.db.fetch_pending_commands(edge_id)
-        except Exception as exc:
-            logger.error(f"Failed to fetch commands: {exc}")
-            return
-
-        if not commands:
-            return
-
-        for command in commands:
-            cmd_id = command.get('id')
-            cmd_type = command.get('command_type')
-            payload = command.get('payload')
-            logger.info(f"Received command {cmd_id}: {cmd_type}")
+    async def _long_poll_commands(self, cursor: Optional[str], wait: float):
+        if not self._edge_id():
+            return False, "Edge not registered"
+        return await self.db.long_poll_commands(cursor, wait)
 
+    async def _fetch_commands(self) -> List[Dict]:
+        edge_id = self._edge_id()
+        if not edge_id:
+            return []
+        return await self.db.fetch_pending_commands(edge_id)
+
+    async def _handle_command(self, command: Dict):
+        cmd_id = command.get('id')
+        cmd_type = command.get('command_type')
+        payload = command.get('payload')
+        logger.info(f"Received command {cmd_id}: {cmd_type}")
+
+        result: Dict[str, Any] = {
+            "received_at": datetime.utcnow().isoformat(),
+            "payload": payload,
+        }
+        command_name = (cmd_type or "").replace("_", "-")
+        if command_name == "restart":
+            # Acknowledge first: the restart ends this process
+            asyncio.create_task(self._schedule_restart())
+            status = "completed"
+            result.update(success=True, message="Restart scheduled")
+        elif command_name == "sync-config":
+            self._unavailable.clear()
+            success = await self._sync_configuration()
+            status = "completed" if success else "failed"
+            result.update(
+                success=success,
+                message="Configuration synced" if success else "Configuration sync failed"
+            )
+        else:
             # TODO: route command to integrations (Modbus/Arduino/GPIO)
-            handled = True
-            result: Dict[str, Any] = {
-                "received_at": datetime.utcnow().isoformat(),
-                "payload": payload,
-                "note": "Command acknowledged by edge",
-            }
+            status = "acknowledged"
+            result["note"] = "Command acknowledged by edge"
 
-            if handled and cmd_id:
-                edge_id = state.edge_id or state.server_id
-                await self.db.acknowledge_command(edge_id, cmd_id, status="acknowledged", result=result)
+        if cmd_id:
+            await self.db.acknowledge_command(self._edge_id(), cmd_id, status=status, result=result)
+
+    async def _schedule_restart(self):
+        """Shut down gracefully after a moment; the service manager starts the server again"""
+        await asyncio.sleep(2)  # Give the acknowledgement time to reach the Cloud
+        logger.info("Restarting Edge Server...")
+        os.kill(os.getpid(), signal.SIGTERM)
 
     def queue_alert(self, alert_data: Dict):
         self.offline_queue.add('alert', alert_data)
@@ -224,6 +293,11 @@ class SyncService:
     def queue_attendance(self, attendance_data: Dict):
         self.offline_queue.add('attendance', attendance_data)
 
+    def queue_items(self, items: List[Dict]):
+        """Queue items an upload could not deliver, in order, keeping their original timestamps"""
+        for item in items:
+            self.offline_queue.add(item['type'], item['data'], item.get('timestamp'))
+
     def get_faces(self) -> List[Dict]:
         return self.cached_faces
 
@@ -235,3 +309,6 @@ class SyncService:
 
     def get_cameras(self) -> List[Dict]:
         return self.cached_cameras
+
+    def get_sync_stats(self) -> Dict[str, Any]:
+        return {name: collection.get_stats() for name, collection in self.collections.items()}
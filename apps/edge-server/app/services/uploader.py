@@ -0,0 +1,214 @@
+"""
+Event Upload Pipeline
+Coalesces alerts and events into batched, compressed and signed cloud uploads
+"""
+import asyncio
+import gzip
+import time
+from typing import Dict, List, Optional, Any, Tuple
+from loguru import logger
+
+from app.core.database import encode_json
+from config.settings import settings
+
+
+# Re-probe the batch endpoint this often after the Cloud answered 404
+BATCH_RECHECK_SECONDS = 600
+
+
+class EventUploadPipeline:
+    """
+    Batched event uploads to the Cloud
+
+    Items ({'type': 'alert' | 'event' | 'attendance', 'data': {...}}) are
+    grouped into batches of at most UPLOAD_BATCH_SIZE items and
+    UPLOAD_BATCH_BYTES of JSON. Each batch is gzip-compressed and signed
+    once, and up to UPLOAD_MAX_IN_FLIGHT batches are sent at the same time.
+    After the first failed batch no further batches are started. Only the
+    prefix of items before that batch counts as delivered, so callers can
+    retry from the same position and keep their order. Batches that were
+    already in flight may still succeed, so delivery is at-least-once.
+
+    Clouds without the batch endpoint (404) get the items one request at a
+    time; the batch endpoint is probed again every BATCH_RECHECK_SECONDS.
+
+    Live items reach the pipeline through the EventOutbox (app/services/outbox.py),
+    the offline queue backlog through SyncService.
+    """
+
+    def __init__(
+        self,
+        db,
+        edge_id: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        batch_bytes: Optional[int] = None,
+        max_in_flight: Optional[int] = None
+    ):
+        self.db = db
+        self.edge_id = edge_id
+        self.batch_size = batch_size or settings.UPLOAD_BATCH_SIZE
+        self.batch_bytes = batch_bytes or settings.UPLOAD_BATCH_BYTES
+        self.max_in_flight = max_in_flight or settings.UPLOAD_MAX_IN_FLIGHT
+
+        self.batch_supported = True
+        self._batch_checked_at = 0.0
+
+        self._stats = {
+            'batches': 0,
+            'failed_batches': 0,
+            'single_requests': 0,
+            'items': 0,
+            'bytes_raw': 0,
+            'bytes_sent': 0,
+            'upload_ms': 0.0,
+        }
+
+    async def send(self, items: List[Dict]) -> int:
+        """
+        Upload items in order
+
+        Returns:
+            Number of leading items that were delivered
+        """
+        if not items:
+            return 0
+
+        batches = self._make_batches(items)
+        failed = asyncio.Event()
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+
+        async def upload(batch) -> Optional[int]:
+            async with in_flight:
+                if failed.is_set():
+                    return 0
+                delivered = await self._send_batch(batch)
+                if delivered is None or delivered < len(batch[0]):
+                    failed.set()
+                return delivered
+
+        results = await asyncio.gather(*(upload(batch) for batch in batches))
+
+        delivered = 0
+        for index, (batch, count) in enumerate(zip(batches, results)):
+            if count is None:
+                # No batch endpoint: send the rest one by one, in order
+                for rest, _ in batches[index:]:
+                    sent = await self._send_single(rest)
+                    delivered += sent
+                    if sent < len(rest):
+                        break
+                break
+            delivered += count
+            if count < len(batch[0]):
+                break
+        return delivered
+
+    def _make_batches(self, items: List[Dict]) -> List[Tuple[List[Dict], List[Optional[bytes]]]]:
+        """Split items into (items, encoded payloads) batches by count and size"""
+        batches = []
+        batch_items: List[Dict] = []
+        batch_parts: List[Optional[bytes]] = []
+        size = 0
+
+        for item in items:
+            data = self._event_data(item)
+            part = None
+            if data is not None:
+                part = encode_json(self.db.event_payload(data, self.edge_id))
+
+            if batch_items and (
+                len(batch_items) >= self.batch_size
+                or (part and size + len(part) > self.batch_bytes)
+            ):
+                batches.append((batch_items, batch_parts))
+                batch_items, batch_parts, size = [], [], 0
+
+            batch_items.append(item)
+            batch_parts.append(part)
+            size += len(part) + 1 if part else 0
+
+        if batch_items:
+            batches.append((batch_items, batch_parts))
+        return batches
+
+    @staticmethod
+    def _event_data(item: Dict) -> Optional[Dict]:
+        """Event data of a queued item (None for types the Cloud does not take)"""
+        item_type = item.get('type')
+        data = item.get('data') or {}
+        if item.get('timestamp') and not data.get('occurred_at'):
+            # Queued items happened when they were queued, not when they are uploaded
+            data = {**data, 'occurred_at': item['timestamp']}
+        if item_type == 'attendance':
+            return {**data, 'type': 'attendance'}
+        if item_type in ('alert', 'event'):
+            return data
+        return None
+
+    async def _send_batch(self, batch: Tuple[List[Dict], List[Optional[bytes]]]) -> Optional[int]:
+        """
+        Upload one batch
+
+        Returns:
+            Number of items of the batch that were delivered (all or none),
+            or None if the Cloud has no batch endpoint
+        """
+        items, parts = batch
+        encoded = [part for part in parts if part is not None]
+        if not encoded:
+            return len(items)
+
+        if not self.batch_supported and time.monotonic() - self._batch_checked_at < BATCH_RECHECK_SECONDS:
+            return None
+
+        raw = b'{"events":[' + b','.join(encoded) + b']}'
+        body = gzip.compress(raw, compresslevel=5)
+
+        start = time.perf_counter()
+        success, result = await self.db.send_event_batch(body)
+        self._stats['upload_ms'] += (time.perf_counter() - start) * 1000
+
+        if success:
+            if not self.batch_supported:
+                logger.info("Cloud batch event endpoint is available again")
+                self.batch_supported = True
+            self._stats['batches'] += 1
+            self._stats['items'] += len(items)
+            self._stats['bytes_raw'] += len(raw)
+            self._stats['bytes_sent'] += len(body)
+            return len(items)
+
+        if result == "Not found":
+            if self.batch_supported:
+                logger.warning("Cloud has no batch event endpoint - falling back to single-event uploads")
+            self.batch_supported = False
+            self._batch_checked_at = time.monotonic()
+            return None
+
+        self._stats['failed_batches'] += 1
+        logger.warning(f"Event batch upload failed ({len(items)} items): {result}")
+        return 0
+
+    async def _send_single(self, items: List[Dict]) -> int:
+        """Upload items one request at a time, stopping at the first failure"""
+        delivered = 0
+        for item in items:
+            data = self._event_data(item)
+            if data is not None:
+                self._stats['single_requests'] += 1
+                success, _ = await self.db.create_alert(data, self.edge_id)
+                if not success:
+                    break
+                self._stats['items'] += 1
+            delivered += 1
+        return delivered
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'batch_endpoint': self.batch_supported,
+            'compression_ratio': (
+                round(self._stats['bytes_raw'] / self._stats['bytes_sent'], 2)
+                if self._stats['bytes_sent'] else None
+            ),
+        }
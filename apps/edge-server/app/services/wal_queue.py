@@ -0,0 +1,529 @@
+"""
+Write-Ahead-Log Queue
+Append-only, segmented, crash-safe queue for items waiting to reach the cloud
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from loguru import logger
+
+from config.settings import settings
+
+
+# Frame: magic, flags, record count, first seq, last seq, live records per
+# severity rank (4), payload length, payload crc32 - followed by the payload
+FRAME_HEADER = struct.Struct('<4sBIQQ4III')
+FRAME_MAGIC = b'WALQ'
+FLAG_ZLIB = 0x01
+
+COMPRESS_MIN_BYTES = 512
+
+SEVERITY_RANKS = {'info': 0, 'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+CRITICAL_RANK = 3
+
+SEGMENT_PREFIX = 'seg-'
+SEGMENT_SUFFIX = '.wal'
+
+
+def item_rank(item_type: str, data: Dict) -> int:
+    """
+    Drop-policy rank of a queued item (0 dropped first, 3 never dropped)
+
+    Alerts use their severity (default medium), attendance records are
+    kept like high alerts, everything else defaults to info
+    """
+    severity = data.get('severity') if isinstance(data, dict) else None
+    if severity in SEVERITY_RANKS:
+        return SEVERITY_RANKS[severity]
+    if item_type == 'alert':
+        return SEVERITY_RANKS['medium']
+    if item_type == 'attendance':
+        return SEVERITY_RANKS['high']
+    return SEVERITY_RANKS['info']
+
+
+@dataclass
+class _Segment:
+    path: Path
+    first_seq: int
+    last_seq: int = 0
+    bytes: int = 0
+    live: List[int] = field(default_factory=lambda: [0, 0, 0, 0])  # live records per rank
+
+    @property
+    def live_count(self) -> int:
+        return sum(self.live)
+
+
+class WALQueue:
+    """
+    Persistent FIFO queue backed by a write-ahead log
+
+    Items are appended as JSON lines to an in-memory group that is written
+    as one CRC-checked (and zlib-compressed when large enough) frame once
+    group_size items are buffered or flush_interval has passed, so the
+    cost of an append does not depend on the backlog. Frames go to
+    segment files of about segment_bytes; the consumer position is a
+    cursor file, and segments behind the cursor are deleted.
+
+    When the log exceeds max_bytes the oldest sealed segments are
+    rewritten without their lowest-severity items (info/low, then medium,
+    then high). Critical items are never dropped.
+
+    On start the segments are scanned frame by frame and a torn or
+    corrupt tail is truncated, so a crash loses at most the unflushed group.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        group_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        fsync: Optional[bool] = None
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes or settings.OFFLINE_QUEUE_SEGMENT_BYTES
+        self.max_bytes = max_bytes or settings.OFFLINE_QUEUE_MAX_BYTES
+        self.group_size = group_size or settings.OFFLINE_QUEUE_GROUP_SIZE
+        self.flush_interval = (
+            settings.OFFLINE_QUEUE_FLUSH_MS / 1000.0 if flush_interval is None else flush_interval
+        )
+        self.fsync = settings.OFFLINE_QUEUE_FSYNC if fsync is None else fsync
+        self.cursor_file = self.directory / 'cursor'
+
+        self._lock = threading.RLock()
+        self._segments: List[_Segment] = []
+        self._active_file = None
+
+        self._buffer: List[bytes] = []
+        self._buffer_ranks = [0, 0, 0, 0]
+        self._buffer_first_seq = 0
+        self._last_flush = 0.0
+        self._timer: Optional[threading.Timer] = None
+
+        self._next_seq = 1
+        self._acked = 0
+        self._pending = 0
+
+        # Read-ahead of pending items: (seq, rank, item)
+        self._reader: Deque[Tuple[int, int, Dict]] = deque()
+        self._read_path: Optional[Path] = None
+        self._read_offset = 0
+
+        self._stats = {
+            'appended': 0,
+            'flushes': 0,
+            'dropped': [0, 0, 0, 0],
+            'compactions': 0,
+            'truncated_bytes': 0,
+        }
+
+        self._recover()
+
+    # ----------------------------------------------------------------- public
+
+    def add(self, item_type: str, data: Dict, timestamp: Optional[str] = None):
+        """Append an item (durable after the next group commit)"""
+        rank = item_rank(item_type, data)
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            record = json.dumps(
+                {
+                    'seq': seq,
+                    'rank': rank,
+                    'type': item_type,
+                    'data': data,
+                    'timestamp': timestamp or datetime.utcnow().isoformat(),
+                },
+                default=str,
+                separators=(',', ':')
+            ).encode('utf-8')
+
+            if not self._buffer:
+                self._buffer_first_seq = seq
+            self._buffer.append(record)
+            self._buffer_ranks[rank] += 1
+            self._pending += 1
+            self._stats['appended'] += 1
+
+            if (
+                len(self._buffer) >= self.group_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+            elif self._timer is None:
+                # Commit the rest of a burst once the interval has passed
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write buffered items to the log as one frame"""
+        with self._lock:
+            if not self._buffer:
+                return
+            payload = b'\n'.join(self._buffer)
+            flags = 0
+            if len(payload) >= COMPRESS_MIN_BYTES:
+                compressed = zlib.compress(payload, 1)
+                if len(compressed) < len(payload):
+                    payload, flags = compressed, FLAG_ZLIB
+
+            first_seq = self._buffer_first_seq
+            last_seq = first_seq + len(self._buffer) - 1
+            frame = FRAME_HEADER.pack(
+                FRAME_MAGIC, flags, len(self._buffer), first_seq, last_seq,
+                *self._buffer_ranks, len(payload), zlib.crc32(payload)
+            ) + payload
+
+            segment = self._active_segment(first_seq, len(frame))
+            self._active_file.write(frame)
+            self._active_file.flush()
+            if self.fsync:
+                os.fsync(self._active_file.fileno())
+
+            segment.bytes += len(frame)
+            segment.last_seq = last_seq
+            for rank, count in enumerate(self._buffer_ranks):
+                segment.live[rank] += count
+
+            self._buffer = []
+            self._buffer_ranks = [0, 0, 0, 0]
+            self._last_flush = time.monotonic()
+            self._stats['flushes'] += 1
+
+            if self.total_bytes > self.max_bytes:
+                self._enforce_budget()
+
+    def peek(self, limit: int) -> List[Dict]:
+        """Get up to limit pending items, oldest first, without removing them"""
+        with self._lock:
+            self.flush()
+            self._fill(limit)
+            return [item for _, _, item in islice(self._reader, limit)]
+
+    def get_pending(self) -> List[Dict]:
+        """Get all pending items (prefer peek() for large backlogs)"""
+        return self.peek(self._pending)
+
+    def remove(self, count: int):
+        """Acknowledge the oldest count pending items"""
+        with self._lock:
+            self.flush()
+            self._fill(count)
+            removed = 0
+            while removed < count and self._reader:
+                seq, rank, _ = self._reader.popleft()
+                segment = self._segment_for(seq)
+                if segment is not None:
+                    segment.live[rank] -= 1
+                self._acked = seq
+                removed += 1
+            if removed:
+                self._pending -= removed
+                self._write_cursor()
+                self._compact()
+
+    def clear(self):
+        """Drop every pending item"""
+        with self._lock:
+            self.flush()
+            self._acked = self._next_seq - 1
+            self._pending = 0
+            self._write_cursor()
+            self._close_active()
+            for segment in self._segments:
+                segment.path.unlink(missing_ok=True)
+            self._segments = []
+            self._reset_reader()
+
+    def close(self):
+        """Commit buffered items and close the log"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.flush()
+            self._close_active()
+
+    @property
+    def size(self) -> int:
+        return self._pending
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(s.bytes for s in self._segments)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'segments': len(self._segments),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'appended': self._stats['appended'],
+                'flushes': self._stats['flushes'],
+                'compactions': self._stats['compactions'],
+                'truncated_bytes': self._stats['truncated_bytes'],
+                'dropped': {
+                    name: self._stats['dropped'][rank]
+                    for name, rank in (('info', 0), ('medium', 1), ('high', 2))
+                },
+            }
+
+    # ---------------------------------------------------------------- writing
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Offline queue flush failed: {e}")
+
+    def _active_segment(self, first_seq: int, frame_bytes: int) -> _Segment:
+        """Get the segment to append to, rolling over to a new one when full"""
+        active = self._segments[-1] if self._segments else None
+        if active is None or (active.bytes and active.bytes + frame_bytes > self.segment_bytes):
+            self._close_active()
+            path = self.directory / f"{SEGMENT_PREFIX}{first_seq:020d}{SEGMENT_SUFFIX}"
+            active = _Segment(path=path, first_seq=first_seq)
+            self._segments.append(active)
+        if self._active_file is None:
+            self._active_file = open(active.path, 'ab')
+        return active
+
+    def _close_active(self):
+        if self._active_file is not None:
+            self._active_file.close()
+            self._active_file = None
+
+    def _write_cursor(self):
+        tmp = self.cursor_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(str(self._acked))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, self.cursor_file)
+
+    # ---------------------------------------------------------------- reading
+
+    def _reset_reader(self):
+        self._reader.clear()
+        self._read_path = None
+        self._read_offset = 0
+
+    def _fill(self, count: int):
+        """Read frames until count pending items are buffered (or the log ends)"""
+        while len(self._reader) < count and self._read_next_frame():
+            pass
+
+    def _read_next_frame(self) -> bool:
+        index = next(
+            (i for i, s in enumerate(self._segments) if s.path == self._read_path),
+            None
+        )
+        if index is None:
+            # Start of the log (or our segment was compacted away)
+            if not self._segments:
+                return False
+            index, self._read_offset = 0, 0
+
+        while self._read_offset >= self._segments[index].bytes:
+            if index + 1 >= len(self._segments):
+                self._read_path = self._segments[index].path
+                return False
+            index += 1
+            self._read_offset = 0
+
+        segment = self._segments[index]
+        with open(segment.path, 'rb') as f:
+            f.seek(self._read_offset)
+            header = f.read(FRAME_HEADER.size)
+            _, flags, _, _, last_seq, *_, length, _ = FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+
+        self._read_path = segment.path
+        self._read_offset += FRAME_HEADER.size + length
+        if last_seq <= self._acked:
+            return True
+
+        for record in self._decode(flags, payload):
+            if record['seq'] > self._acked:
+                self._reader.append((
+                    record['seq'],
+                    record['rank'],
+                    {'type': record['type'], 'data': record['data'], 'timestamp': record['timestamp']},
+                ))
+        return True
+
+    @staticmethod
+    def _decode(flags: int, payload: bytes) -> List[Dict]:
+        if flags & FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        return [json.loads(line) for line in payload.split(b'\n') if line]
+
+    def _segment_for(self, seq: int) -> Optional[_Segment]:
+        index = bisect_right([s.first_seq for s in self._segments], seq) - 1
+        return self._segments[index] if index >= 0 else None
+
+    def _frames(self, path: Path):
+        """Yield (offset, header fields, payload) of a segment's valid frames"""
+        with open(path, 'rb') as f:
+            offset = 0
+            while True:
+                header = f.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    return
+                fields = FRAME_HEADER.unpack(header)
+                if fields[0] != FRAME_MAGIC:
+                    return
+                payload = f.read(fields[-2])
+                if len(payload) < fields[-2] or zlib.crc32(payload) != fields[-1]:
+                    return
+                yield offset, fields, payload
+                offset += FRAME_HEADER.size + len(payload)
+
+    # ------------------------------------------------------ compaction/budget
+
+    def _compact(self):
+        """Delete sealed segments that are entirely behind the cursor"""
+        while len(self._segments) > 1 and self._segments[0].last_seq <= self._acked:
+            segment = self._segments.pop(0)
+            segment.path.unlink(missing_ok=True)
+            self._stats['compactions'] += 1
+
+    def _enforce_budget(self):
+        """Drop the oldest lowest-severity items until the log fits max_bytes"""
+        self._compact()
+        # Seal the active segment so every segment can be rewritten
+        self._close_active()
+        for max_rank in range(CRITICAL_RANK):
+            for segment in list(self._segments):
+                if self.total_bytes <= self.max_bytes:
+                    return
+                if any(segment.live[:max_rank + 1]):
+                    self._rewrite(segment, max_rank)
+        if self.total_bytes > self.max_bytes:
+            logger.warning(
+                f"Offline queue over budget ({self.total_bytes} > {self.max_bytes} bytes) "
+                f"with only critical items left"
+            )
+
+    def _rewrite(self, segment: _Segment, max_rank: int):
+        """Rewrite a segment without pending items of rank <= max_rank"""
+        kept: List[Dict] = []
+        for _, fields, payload in self._frames(segment.path):
+            if fields[4] <= self._acked:
+                continue
+            for record in self._decode(fields[1], payload):
+                if record['seq'] <= self._acked:
+                    continue
+                if record['rank'] <= max_rank:
+                    self._stats['dropped'][record['rank']] += 1
+                    self._pending -= 1
+                else:
+                    kept.append(record)
+
+        dropped = segment.live_count - len(kept)
+        if dropped:
+            logger.warning(f"Offline queue over budget: dropped {dropped} items of severity rank <= {max_rank}")
+
+        segment.live = [0, 0, 0, 0]
+        segment.bytes = 0
+        tmp = segment.path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            for start in range(0, len(kept), self.group_size):
+                group = kept[start:start + self.group_size]
+                ranks = [0, 0, 0, 0]
+                for record in group:
+                    ranks[record['rank']] += 1
+                    segment.live[record['rank']] += 1
+                payload = zlib.compress(
+                    b'\n'.join(json.dumps(r, separators=(',', ':')).encode('utf-8') for r in group), 1
+                )
+                frame = FRAME_HEADER.pack(
+                    FRAME_MAGIC, FLAG_ZLIB, len(group), group[0]['seq'], group[-1]['seq'],
+                    *ranks, len(payload), zlib.crc32(payload)
+                ) + payload
+                f.write(frame)
+                segment.bytes += len(frame)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, segment.path)
+        self._stats['compactions'] += 1
+
+        if not kept and segment is not self._segments[-1]:
+            self._segments.remove(segment)
+            segment.path.unlink(missing_ok=True)
+        self._reset_reader()
+
+    # --------------------------------------------------------------- recovery
+
+    def _recover(self):
+        """Rebuild queue state from the cursor and the segment files"""
+        try:
+            self._acked = int(self.cursor_file.read_text(encoding='utf-8').strip() or 0)
+        except FileNotFoundError:
+            self._acked = 0
+        except ValueError:
+            logger.warning("Offline queue cursor is corrupt - replaying the whole log")
+            self._acked = 0
+
+        for tmp in self.directory.glob('*.tmp'):
+            tmp.unlink(missing_ok=True)
+
+        paths = sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+        for path in paths:
+            segment = _Segment(path=path, first_seq=int(path.stem[len(SEGMENT_PREFIX):]))
+            for offset, fields, payload in self._frames(path):
+                _, flags, count, first_seq, last_seq, r0, r1, r2, r3, length, _ = fields
+                segment.bytes = offset + FRAME_HEADER.size + length
+                segment.last_seq = last_seq
+                if last_seq <= self._acked:
+                    continue
+                if first_seq > self._acked:
+                    for rank, live in enumerate((r0, r1, r2, r3)):
+                        segment.live[rank] += live
+                else:
+                    # Frame straddles the cursor: count its pending records
+                    for record in self._decode(flags, payload):
+                        if record['seq'] > self._acked:
+                            segment.live[record['rank']] += 1
+
+            size = path.stat().st_size
+            if size > segment.bytes:
+                # Torn write or corruption: drop everything after the last valid frame
+                logger.warning(f"Offline queue: truncating {size - segment.bytes} bytes of {path.name}")
+                with open(path, 'r+b') as f:
+                    f.truncate(segment.bytes)
+                self._stats['truncated_bytes'] += size - segment.bytes
+
+            if segment.bytes == 0:
+                path.unlink(missing_ok=True)
+                continue
+            self._segments.append(segment)
+            self._next_seq = max(self._next_seq, segment.last_seq + 1)
+
+        self._next_seq = max(self._next_seq, self._acked + 1)
+        self._pending = sum(s.live_count for s in self._segments)
+        self._compact()
+
+        if self._pending:
+            logger.info(f"Offline queue recovered {self._pending} pending items from {len(self._segments)} segments")
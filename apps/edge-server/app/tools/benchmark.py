@@ -0,0 +1,565 @@
+"""
+Pipeline Benchmark
+Replays recorded video or synthetic scenes through CameraService and AIModuleManager
+
+    python -m app.tools.benchmark --cameras 4 --modules market,loitering --duration 30
+    python -m app.tools.benchmark --source store.mp4 --cameras 8 --output bench.json
+    python -m app.tools.benchmark --baseline bench.json --tolerance 0.15
+
+Frames are analyzed as fast as the pipeline takes them (no frame rate
+governor), detection uses a deterministic stub model so no weights are
+needed, and the report (frames/sec, per-module p50/p99 latency, peak RSS,
+event counts) is printed as JSON. With --baseline the exit code is 1 when
+throughput or p99 latency regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from app.ai.detector import DEFAULT_WEIGHTS, _model_cache
+from app.ai.manager import AIModuleManager
+from app.ai.scheduler import BatchInferenceScheduler
+from app.core.metrics import summary as latency_summary
+from app.services.camera import CameraService, CameraStream
+from app.services.capture import CaptureThread
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+# Sleep in grab() of an unpaced synthetic source; a real stream blocks in
+# native code there, so the capture thread must not spin on the GIL
+GRAB_IDLE_SECONDS = 0.001
+
+PERSON_CLASS = 0
+ITEM_CLASS = 39  # bottle, one of the Market module's retail classes
+
+
+class _Tensor:
+    """Just enough of a torch tensor for result parsing (.cpu().numpy(), indexing)"""
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+
+    def cpu(self) -> '_Tensor':
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self.data
+
+    def __getitem__(self, index) -> '_Tensor':
+        return _Tensor(self.data[index])
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class _Boxes:
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy, self.conf, self.cls = _Tensor(xyxy), _Tensor(conf), _Tensor(cls)
+
+    def __len__(self) -> int:
+        return len(self.xyxy)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield _Boxes(self.xyxy.data[i:i + 1], self.conf.data[i:i + 1], self.cls.data[i:i + 1])
+
+
+class _Result:
+    def __init__(self, boxes: _Boxes):
+        self.boxes = boxes
+
+
+class StubModel:
+    """
+    Deterministic stand-in for a YOLO model
+
+    Bright blobs on a darker background are "detected" with connected
+    components on a strided copy of the frame: tall blobs as people, small
+    ones as bottles. The output only depends on the frame, so repeated runs
+    over the same input give identical detections, and the cost stays far
+    below a real forward pass so the rest of the pipeline dominates.
+    Results have the ultralytics shape (result.boxes.xyxy/conf/cls).
+    """
+
+    def __init__(self, threshold: int = 200, stride: int = 4, min_area: int = 8, person_height: int = 64):
+        self.threshold = threshold
+        self.stride = stride
+        self.min_area = min_area
+        self.person_height = person_height
+
+    def __call__(self, source, conf: float = 0.25, classes=None, verbose: bool = False, **kwargs) -> List[_Result]:
+        frames = source if isinstance(source, list) else [source]
+        return [_Result(self.detect(frame, conf, classes)) for frame in frames]
+
+    def detect(self, frame: np.ndarray, conf: float = 0.25, classes=None) -> _Boxes:
+        small = frame[::self.stride, ::self.stride]
+        if small.ndim == 3:
+            small = small.max(axis=2)
+        mask = (small >= self.threshold).astype(np.uint8)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+
+        stats = stats[1:]  # drop the background component
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= self.min_area]
+        x, y, w, h, area = (stats[:, i].astype(np.float32) for i in range(5))
+        xyxy = np.stack([x, y, x + w, y + h], axis=1) * self.stride
+        confidence = (0.5 + 0.5 * area / np.maximum(w * h, 1.0)).astype(np.float32)
+        class_ids = np.where(h * self.stride >= self.person_height, PERSON_CLASS, ITEM_CLASS).astype(np.float32)
+
+        keep = confidence >= conf
+        if classes is not None:
+            keep &= np.isin(class_ids, list(classes))
+        return _Boxes(xyxy[keep].reshape(-1, 4), confidence[keep], class_ids[keep])
+
+
+class SyntheticCapture:
+    """
+    cv2.VideoCapture stand-in rendering a deterministic store scene
+
+    People (tall bright boxes) walk across a noisy background past a shelf
+    of items (small bright boxes), so the motion gate, the tracker and the
+    Market stages all get work. People advance once per decoded frame, so
+    analyzed frames show smooth motion however many grabs are skipped.
+    """
+
+    def __init__(self, width: int = 1280, height: int = 720, people: int = 6, fps: float = 0.0, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.width, self.height = width, height
+        self.fps = fps
+        self.background = rng.integers(20, 70, (height, width, 3), dtype=np.uint8)
+
+        # Shelf items along the top third of the frame
+        for x in range(width // 20, width - 24, width // 10):
+            self.background[height // 6:height // 6 + 32, x:x + 16] = 235
+
+        self.person_size = (max(16, width // 26), max(64, height // 6))
+        self.people = [
+            (
+                float(rng.uniform(0, width)),
+                int(rng.uniform(height // 8, height - self.person_size[1] - 1)),
+                float(rng.uniform(2.0, 6.0)) * (1 if i % 2 == 0 else -1),
+            )
+            for i in range(people)
+        ]
+        self.rendered = 0
+        self._next_grab = 0.0
+
+    def isOpened(self) -> bool:
+        return True
+
+    def set(self, prop: int, value: float) -> bool:
+        return False
+
+    def grab(self) -> bool:
+        if self.fps > 0:
+            delay = self._next_grab - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_grab = max(self._next_grab, time.monotonic()) + 1.0 / self.fps
+        else:
+            time.sleep(GRAB_IDLE_SECONDS)
+        return True
+
+    def retrieve(self, image: Optional[np.ndarray] = None):
+        frame = image if image is not None and image.shape == self.background.shape else np.empty_like(self.background)
+        np.copyto(frame, self.background)
+
+        person_w, person_h = self.person_size
+        span = self.width - person_w
+        for x0, y, speed in self.people:
+            x = int(x0 + speed * self.rendered) % (2 * span)
+            x = x if x < span else 2 * span - x  # walk back and forth
+            frame[y:y + person_h, x:x + person_w] = 245
+        self.rendered += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class LoopingVideoCapture:
+    """Video file capture that rewinds at the end, so a short clip can feed a long run"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+
+    def isOpened(self) -> bool:
+        return self.capture.isOpened()
+
+    def set(self, prop: int, value: float) -> bool:
+        return self.capture.set(prop, value)
+
+    def grab(self) -> bool:
+        if self.capture.grab():
+            return True
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self.capture.grab()
+
+    def retrieve(self, image: Optional[np.ndarray] = None):
+        return self.capture.retrieve(image)
+
+    def release(self):
+        self.capture.release()
+
+
+class OnDemandCaptureThread(CaptureThread):
+    """Decoder thread that decodes a frame only once the analysis loop took the previous one"""
+
+    @property
+    def decode_interval(self) -> float:
+        return math.inf
+
+    @decode_interval.setter
+    def decode_interval(self, value: float):
+        pass
+
+
+class BenchmarkCameraService(CameraService):
+    """CameraService reading from benchmark sources with the frame rate governor off"""
+
+    capture_thread_class = OnDemandCaptureThread
+
+    def __init__(self, open_capture: Callable[[CameraStream], Any]):
+        super().__init__()
+        self.open_capture = open_capture
+        # interval() is 1 / base_fps with the governor off: analyze back to back
+        self.governor.enabled = False
+        self.governor.base_fps = math.inf
+
+    def _connect_camera(self, stream: CameraStream) -> bool:
+        capture = self.open_capture(stream)
+        if not capture.isOpened():
+            logger.warning(f"Failed to open benchmark source: {stream.rtsp_url}")
+            return False
+        stream.capture = capture
+        stream.is_active = True
+        stream.error_count = 0
+        return True
+
+
+class BenchmarkRecorder:
+    """Collects frame and module timings and result counts during the measured window"""
+
+    def __init__(self):
+        self.module_seconds: Dict[str, List[float]] = defaultdict(list)
+        self.reset()
+
+    def reset(self):
+        """Start the measured window (drops warm-up samples)"""
+        self.started = time.perf_counter()
+        self.frames: Dict[str, int] = defaultdict(int)
+        self.frame_seconds: List[float] = []
+        for samples in self.module_seconds.values():
+            samples.clear()
+        self.counts = {'events': 0, 'alerts': 0, 'detections': 0}
+
+    def time_module(self, module_id: str, module):
+        """Record the module's process_frame durations (instance-level wrapper)"""
+        samples = self.module_seconds[module_id]
+        process_frame = module.process_frame
+
+        def timed(frame, camera_id, metadata=None):
+            start = time.perf_counter()
+            try:
+                return process_frame(frame, camera_id, metadata)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        module.process_frame = timed
+
+    def frame_done(self, camera_id: str, seconds: float, results: Optional[Dict]):
+        self.frames[camera_id] += 1
+        self.frame_seconds.append(seconds)
+        for key in self.counts:
+            self.counts[key] += len((results or {}).get(key) or [])
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+class PeakRssMonitor:
+    """Samples the process RSS on a background thread and keeps the peak"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+
+    def start(self):
+        if not self._process:
+            return
+        self._thread = threading.Thread(target=self._run, name="benchmark-rss", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def stop(self) -> Optional[float]:
+        """Stop sampling; returns the peak RSS in MB (None without psutil)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        if not self._process:
+            return None
+        self.peak = max(self.peak, self._process.memory_info().rss)
+        return round(self.peak / (1024 ** 2), 1)
+
+
+def latency_stats(samples: List[float]) -> Dict[str, Any]:
+    """Frame count and p50/p99/max latency in ms"""
+    if not samples:
+        return {'frames': 0, 'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+    values = np.asarray(samples) * 1000.0
+    p50, p99 = np.percentile(values, [50, 99])
+    return {
+        'frames': len(samples),
+        'p50_ms': round(float(p50), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(values.max()), 2),
+    }
+
+
+def install_stub_detector(manager: AIModuleManager) -> StubModel:
+    """
+    Use the stub model for the shared detector and for every load_yolo() call
+
+    Modules (and module stages) that fail to initialize anyway are
+    reported as unavailable.
+    """
+    model = StubModel()
+    _model_cache[DEFAULT_WEIGHTS] = model
+    manager.detector._model = model
+    manager.detector._initialized = True
+    return model
+
+
+def store_zones(width: int, height: int) -> Dict[str, List[List[int]]]:
+    """Shelf, checkout and exit zones matching the synthetic scene layout"""
+    return {
+        'shelf_main': [[0, 0], [width, 0], [width, height // 3], [0, height // 3]],
+        'checkout': [[0, height // 3], [width // 6, height // 3], [width // 6, height], [0, height]],
+        'exit': [[width - width // 8, height // 3], [width, height // 3], [width, height], [width - width // 8, height]],
+    }
+
+
+async def run_benchmark(
+    cameras: int = 1,
+    modules: Optional[List[str]] = None,
+    source: str = "synthetic",
+    duration: float = 10.0,
+    warmup: float = 2.0,
+    width: int = 1280,
+    height: int = 720,
+    people: int = 6,
+    source_fps: float = 0.0,
+    batch_size: Optional[int] = None,
+    batch_wait_ms: Optional[float] = None,
+    detection_interval: Optional[int] = None,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Run the pipeline over the given source and measure it
+
+    Args:
+        cameras: Number of simulated cameras (each gets its own source)
+        modules: Module ids to enable (default: market)
+        source: "synthetic" or a video file path
+        duration: Measured seconds
+        warmup: Seconds run before measuring (model init, caches, tracks)
+        width, height, people: Synthetic scene size and number of people
+        source_fps: Synthetic source frame rate (0 = as fast as consumed)
+        batch_size: Inference scheduler batch size (default from settings)
+        batch_wait_ms: Longest wait for a batch to fill (default from settings)
+        detection_interval: Detector pass every N frames (default from settings)
+        seed: Seed of the synthetic scenes
+
+    Returns:
+        The benchmark report
+    """
+    modules = modules or ['market']
+    settings.MAX_CAMERAS = max(settings.MAX_CAMERAS, cameras)
+    if detection_interval is not None:
+        settings.DETECTION_INTERVAL = detection_interval
+    synthetic = source == "synthetic"
+
+    manager = AIModuleManager()
+    install_stub_detector(manager)
+    manager.enable_modules(modules)
+    active = [m for m in modules if m in manager.modules and manager.modules[m].is_enabled()]
+    unavailable = [m for m in modules if m not in active]
+    unavailable += [f"{m}.{stage}" for m in active for stage in manager.modules[m].unavailable_stages()]
+    if unavailable:
+        logger.warning(f"Modules not available in this environment: {', '.join(unavailable)}")
+
+    recorder = BenchmarkRecorder()
+    for module_id in active:
+        recorder.time_module(module_id, manager.modules[module_id])
+
+    scheduler = BatchInferenceScheduler(manager, max_batch_size=batch_size, max_wait_ms=batch_wait_ms)
+    await scheduler.start()
+
+    camera_ids = [f"bench-{i}" for i in range(cameras)]
+
+    def open_capture(stream: CameraStream):
+        if synthetic:
+            index = camera_ids.index(stream.id)
+            return SyntheticCapture(width, height, people, source_fps, seed + index)
+        return LoopingVideoCapture(stream.rtsp_url)
+
+    metadata = {'zones': store_zones(width, height)} if synthetic else {}
+
+    async def processor(camera_id: str, frame, enabled_modules: list):
+        start = time.perf_counter()
+        results = await scheduler.submit(
+            camera_id, frame, enabled_modules, metadata, service.governor.motion_map(camera_id)
+        )
+        recorder.frame_done(camera_id, time.perf_counter() - start, results)
+        return results
+
+    service = BenchmarkCameraService(open_capture)
+    service.register_processor(processor)
+    for i, camera_id in enumerate(camera_ids):
+        await service.add_camera(camera_id, f"Benchmark {i}", source, active)
+
+    monitor = PeakRssMonitor()
+    monitor.start()
+    await service.start()
+    try:
+        await asyncio.sleep(warmup)
+        recorder.reset()
+        await asyncio.sleep(duration)
+        elapsed = recorder.elapsed()
+        frames = dict(recorder.frames)
+        frame_seconds = list(recorder.frame_seconds)
+        module_seconds = {m: list(recorder.module_seconds[m]) for m in active}
+        counts = dict(recorder.counts)
+    finally:
+        await service.stop()
+        await asyncio.sleep(0.1)  # let camera loops see the stop before their futures are cancelled
+        await scheduler.stop()
+        peak_rss_mb = monitor.stop()
+
+    total = sum(frames.values())
+    report = {
+        'source': source,
+        'cameras': cameras,
+        'modules': active,
+        'unavailable_modules': unavailable,
+        'duration_s': round(elapsed, 2),
+        'frames': total,
+        'fps': round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        'fps_per_camera': {cid: round(frames.get(cid, 0) / elapsed, 2) for cid in camera_ids},
+        'frame_latency': latency_stats(frame_seconds),
+        'module_latency': {m: latency_stats(module_seconds[m]) for m in active},
+        'dropped_frames': sum(stream.dropped_frames for stream in service.cameras.values()),
+        'peak_rss_mb': peak_rss_mb,
+        **counts,
+        'inference': scheduler.get_stats(),
+        'detector': manager.get_inference_stats(),
+        'detection_interval': settings.DETECTION_INTERVAL,
+        'histograms': latency_summary(),
+    }
+    if synthetic:
+        report['resolution'] = [width, height]
+    manager.cleanup()
+    return report
+
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Regressions of a report against a baseline report
+
+    Returns:
+        One message per regression: fps lower, or a module's p99 higher,
+        than the baseline by more than `tolerance` (0.15 = 15%)
+    """
+    regressions = []
+    if baseline.get('fps') and report['fps'] < baseline['fps'] * (1.0 - tolerance):
+        regressions.append(f"fps {report['fps']} < baseline {baseline['fps']}")
+    for module_id, stats in report['module_latency'].items():
+        base = (baseline.get('module_latency') or {}).get(module_id) or {}
+        if stats['p99_ms'] is not None and base.get('p99_ms') and stats['p99_ms'] > base['p99_ms'] * (1.0 + tolerance):
+            regressions.append(f"{module_id} p99 {stats['p99_ms']}ms > baseline {base['p99_ms']}ms")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.tools.benchmark",
+        description="Measure pipeline throughput and latency on recorded or synthetic video"
+    )
+    parser.add_argument("--source", default="synthetic", help="Video file path, or 'synthetic' (default)")
+    parser.add_argument("--cameras", type=int, default=1, help="Simulated cameras (default 1)")
+    parser.add_argument("--modules", default="market", help="Comma-separated module ids (default market)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds (default 10)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds before measuring (default 2)")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic frame height")
+    parser.add_argument("--people", type=int, default=6, help="People in the synthetic scene")
+    parser.add_argument("--source-fps", type=float, default=0.0, help="Synthetic source fps (0 = unpaced)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Inference batch size")
+    parser.add_argument("--batch-wait-ms", type=float, default=None, help="Inference batch fill wait")
+    parser.add_argument("--detection-interval", type=int, default=None, help="Detector pass every N frames")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic scene seed")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="Baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression (default 0.15)")
+    parser.add_argument("--log-level", default="WARNING", help="Log level (default WARNING)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level.upper())
+
+    report = asyncio.run(run_benchmark(
+        cameras=args.cameras,
+        modules=[m.strip() for m in args.modules.split(',') if m.strip()],
+        source=args.source,
+        duration=args.duration,
+        warmup=args.warmup,
+        width=args.width,
+        height=args.height,
+        people=args.people,
+        source_fps=args.source_fps,
+        batch_size=args.batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        detection_interval=args.detection_interval,
+        seed=args.seed,
+    ))
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['regressions'] = compare_reports(report, json.load(f), args.tolerance)
+
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
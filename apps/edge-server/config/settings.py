@@ -14,6 +14,13 @@ class Settings(BaseSettings):
 
     CLOUD_API_URL: str = ""
     CLOUD_API_KEY: Optional[str] = None
+    CLOUD_MAX_CONNECTIONS: int = 10  # per traffic lane (events, default)
+    CLOUD_MAX_KEEPALIVE: int = 5
+    CLOUD_KEEPALIVE_EXPIRY: float = 30.0  # seconds an idle connection stays open
+    CLOUD_HTTP2: bool = False  # needs the h2 package
+    CLOUD_CONNECT_TIMEOUT: float = 5.0
+    CLOUD_READ_TIMEOUT: float = 30.0
+    CLOUD_POOL_TIMEOUT: float = 5.0  # max wait for a free pooled connection
 
     LICENSE_KEY: str = ""
 
@@ -23,11 +30,67 @@ class Settings(BaseSettings):
     SYNC_INTERVAL: int = 30
     HEARTBEAT_INTERVAL: int = 60
 
+    METRICS_SAMPLE_INTERVAL: float = 5.0  # seconds between CPU/memory/disk samples
+    METRICS_WINDOW: float = 900.0  # seconds covered by the p50/p95 summaries
+
+    COMMAND_LONG_POLL_WAIT: float = 25.0  # seconds the Cloud may hold a command request
+    COMMAND_POLL_MIN_INTERVAL: float = 2.0  # polling fallback right after a command
+    COMMAND_POLL_MAX_INTERVAL: float = 60.0  # polling fallback when idle
+
     DATA_DIR: str = "data"
 
+    OFFLINE_QUEUE_MAX_BYTES: int = 256 * 1024 * 1024  # disk budget before low-severity items are dropped
+    OFFLINE_QUEUE_SEGMENT_BYTES: int = 8 * 1024 * 1024
+    OFFLINE_QUEUE_GROUP_SIZE: int = 64  # items per group commit
+    OFFLINE_QUEUE_FLUSH_MS: int = 200  # max time an item waits for its group commit
+    OFFLINE_QUEUE_FSYNC: bool = True
+
+    UPLOAD_BATCH_SIZE: int = 100  # events per batch upload
+    UPLOAD_BATCH_BYTES: int = 256 * 1024  # uncompressed JSON per batch
+    UPLOAD_BATCH_WAIT_MS: int = 500  # max time a live event waits for its batch
+    UPLOAD_MAX_IN_FLIGHT: int = 4
+
+    OUTBOX_MAX_ITEMS: int = 1000  # live alerts/events held in memory before dropping/spilling
+    OUTBOX_WORKERS: int = 2  # uploader tasks draining the outbox
+
     MAX_CAMERAS: int = 16
     PROCESSING_FPS: int = 5
 
+    GOVERNOR_ENABLED: bool = True
+    GOVERNOR_MIN_FPS: float = 1.0
+    GOVERNOR_MAX_FPS: float = 10.0
+    GOVERNOR_MODULE_FPS: str = "fire:2-10,intrusion:2-10"  # module:floor-ceiling,...
+    GOVERNOR_STATIC_THRESHOLD: float = 0.01  # changed-pixel fraction of the whole frame
+    GOVERNOR_STATIC_FRAMES: int = 5
+    GOVERNOR_ACTIVITY_HOLD: float = 10.0  # seconds at ceiling rate after activity
+    GOVERNOR_CPU_HIGH: float = 85.0  # CPU percent where rates start to back off
+
+    INFERENCE_BATCH_SIZE: int = 8
+    INFERENCE_BATCH_WAIT_MS: int = 20
+    INFERENCE_INPUT_SIZE: int = 640
+
+    AI_EXECUTION_MODE: str = "thread"  # "thread" (batched, in-process) or "process"
+    AI_WORKERS: int = 0  # worker processes in "process" mode, 0 = CPU core count
+
+    MOTION_GATE_ENABLED: bool = True
+    MOTION_WIDTH: int = 160  # width of the downscaled motion image
+    MOTION_PIXEL_THRESHOLD: int = 25  # grey-level change counted as motion
+    MOTION_THRESHOLD: float = 0.005  # changed-pixel fraction a module needs to run
+    MOTION_MAX_SKIP: int = 10  # run a module at least every N frames
+
+    DETECTION_INTERVAL: int = 1  # shared detector pass every N analyzed frames (1 = every frame)
+    TRACK_MIN_QUALITY: float = 0.5  # propagated track quality that forces an early detector pass
+    TRACK_OPTICAL_FLOW: bool = False  # correct propagated tracks with Lucas-Kanade optical flow
+    TRACK_MAX_AGE: int = 30  # detector passes a person track survives without a match
+
+    ZONE_MASK_WIDTH: int = 640  # max width of a camera's compiled zone label mask (0 = full resolution)
+
+    FACE_ANN_ENABLED: bool = True
+    FACE_ANN_MIN_SIZE: int = 20000  # gallery size where matching switches to the IVF index
+    FACE_ANN_NPROBE: int = 8  # inverted lists scanned per query
+    FACE_ANN_NLIST: int = 0  # inverted lists, 0 = 4 * sqrt(gallery size)
+    FACE_ANN_PERSIST_INTERVAL: float = 300.0  # min seconds between saves of a changed IVF index
+
     FACE_CONFIDENCE: float = 0.6
     OBJECT_CONFIDENCE: float = 0.5
     FIRE_CONFIDENCE: float = 0.7
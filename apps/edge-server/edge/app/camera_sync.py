@@ -10,6 +10,7 @@ from loguru import logger
 
 from .config_store import ConfigStore
 from .cloud_client import CloudClient
+from .delta_sync import DeltaCollection
 from .status_service import StatusService
 from .error_store import ErrorStore
 
@@ -37,6 +38,10 @@ class CameraSyncService:
         
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.db_file = self.data_dir / "edge.db"
+        # Last synced camera list (keyed by camera_id) with its ETag / since= cursor
+        self.cameras = DeltaCollection("cameras", id_key="camera_id")
+        # The table still holds rows from earlier runs until the first full list is applied
+        self._reconciled = False
         self._init_database()
     
     def _init_database(self):
@@ -73,52 +78,81 @@ class CameraSyncService:
             True if successful
         """
         try:
-            # Get cameras from Cloud
-            success, cameras = await self.cloud_client.get_cameras()
+            # Only changed cameras are returned (nothing at all when the ETag matches)
+            success, changes = await self.cloud_client.fetch_collection("/api/v1/edges/cameras", self.cameras)
             
             if not success:
                 self.error_store.add_error("camera_sync", "Failed to fetch cameras from Cloud")
                 return False
             
-            # Update local database
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            # Clear existing cameras
-            cursor.execute("DELETE FROM cameras")
-            
-            # Insert new cameras
-            import json
-            from datetime import datetime
-            
-            for camera in cameras:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO cameras 
-                    (camera_id, name, rtsp_url, location, status, config, synced_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    camera.get("camera_id"),
-                    camera.get("name"),
-                    camera.get("rtsp_url"),
-                    camera.get("location"),
-                    camera.get("status", "offline"),
-                    json.dumps(camera.get("config", {})),
-                    datetime.utcnow().isoformat()
-                ))
-            
-            conn.commit()
-            conn.close()
+            if changes:
+                self._apply_changes(changes)
+                logger.info(
+                    f"Synced cameras from Cloud: {len(changes['upserts'])} changed, "
+                    f"{len(changes['removed'])} removed"
+                )
+            elif not self._reconciled:
+                # First response matched our (empty) copy: still clear rows left from earlier runs
+                self._apply_changes({"upserts": [], "removed": [], "full": True})
+            self._reconciled = True  # the first response is always a full list (no cursor yet)
             
             # Update status
-            self.status_service.update_cameras_synced(len(cameras))
-            
-            logger.info(f"Synced {len(cameras)} cameras from Cloud")
+            self.status_service.update_cameras_synced(len(self.cameras.records))
             return True
         
         except Exception as e:
             self.error_store.add_error("camera_sync", f"Camera sync error: {e}", e)
             return False
     
+    def _apply_changes(self, changes: Dict[str, Any]):
+        """Upsert changed cameras and delete removed ones in the local database"""
+        import json
+        from datetime import datetime
+        
+        synced_at = datetime.utcnow().isoformat()
+        conn = sqlite3.connect(self.db_file)
+        try:
+            cursor = conn.cursor()
+            
+            if changes.get("full"):
+                # A full list replaces whatever the database still holds from earlier runs
+                keep = list(self.cameras.records)
+                placeholders = ",".join("?" * len(keep))
+                cursor.execute(
+                    f"DELETE FROM cameras WHERE camera_id NOT IN ({placeholders})" if keep else "DELETE FROM cameras",
+                    keep
+                )
+            elif changes["removed"]:
+                cursor.executemany(
+                    "DELETE FROM cameras WHERE camera_id = ?",
+                    [(camera_id,) for camera_id in changes["removed"]]
+                )
+            
+            cursor.executemany("""
+                INSERT INTO cameras
+                (camera_id, name, rtsp_url, location, status, config, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(camera_id) DO UPDATE SET
+                    name = excluded.name,
+                    rtsp_url = excluded.rtsp_url,
+                    location = excluded.location,
+                    status = excluded.status,
+                    config = excluded.config,
+                    synced_at = excluded.synced_at
+            """, [(
+                camera.get("camera_id"),
+                camera.get("name"),
+                camera.get("rtsp_url"),
+                camera.get("location"),
+                camera.get("status", "offline"),
+                json.dumps(camera.get("config", {})),
+                synced_at
+            ) for camera in changes["upserts"]])
+            
+            conn.commit()
+        finally:
+            conn.close()
+    
     def get_cameras(self) -> List[Dict[str, Any]]:
         """Get cameras from local database"""
         try:
@@ -7,28 +7,37 @@ import asyncio
 from typing import Optional, Dict, Any, Tuple
 from loguru import logger
 
-from .signer import HMACSigner
+from .signer import get_signer
+from .transport import CloudTransport, TransportOptions, get_transport, release_transport
+from .delta_sync import DeltaCollection
 from .error_store import ErrorStore
 
 
 class CloudClient:
     """Manages all Cloud API communication with HMAC authentication"""
     
-    def __init__(self, base_url: str, edge_key: str, edge_secret: str, error_store: ErrorStore):
+    def __init__(
+        self,
+        base_url: str,
+        edge_key: str,
+        edge_secret: str,
+        error_store: ErrorStore,
+        transport_options: Optional[TransportOptions] = None
+    ):
         self.base_url = base_url.rstrip('/')
-        self.signer = HMACSigner(edge_key, edge_secret)
+        self.signer = get_signer(edge_key, edge_secret)
         self.error_store = error_store
+        self.transport_options = transport_options
+        self.transport: Optional[CloudTransport] = None
         self.client: Optional[httpx.AsyncClient] = None
         self._connected = False
     
     async def connect(self) -> bool:
-        """Initialize HTTP client"""
+        """Initialize HTTP client (pooled per traffic lane)"""
         try:
-            self.client = httpx.AsyncClient(
-                base_url=self.base_url,
-                timeout=30.0,
-                follow_redirects=True
-            )
+            if self.transport is None:
+                self.transport = get_transport(self.base_url, self.transport_options)
+            self.client = self.transport.client("default")
             self._connected = True
             return True
         except Exception as e:
@@ -37,9 +46,10 @@ class CloudClient:
     
     async def disconnect(self):
         """Close HTTP client"""
-        if self.client:
-            await self.client.aclose()
-            self.client = None
+        if self.transport:
+            await release_transport(self.transport)
+            self.transport = None
+        self.client = None
         self._connected = False
     
     async def _request(
@@ -47,8 +57,13 @@ class CloudClient:
         method: str,
         path: str,
         json_data: Optional[Dict[str, Any]] = None,
-        retry: bool = False
-    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        retry: bool = False,
+        lane: str = "default",
+        params: Optional[Dict[str, Any]] = None,
+        extra_headers: Optional[Dict[str, str]] = None,
+        raw: bool = False,
+        timeout: Optional[float] = None
+    ) -> Tuple[bool, Any]:
         """
         Make authenticated request to Cloud API
         
@@ -57,6 +72,12 @@ class CloudClient:
             path: API path
             json_data: Request body (optional)
             retry: Whether to retry on failure
+            lane: Traffic lane whose connection pool is used
+            params: Query parameters (optional)
+            extra_headers: Additional request headers (optional)
+            raw: Return the httpx response on success (including 304);
+                a 404 returns "Not found" without recording an error
+            timeout: Read timeout override in seconds (optional)
         
         Returns:
             Tuple of (success, response_data)
@@ -67,25 +88,31 @@ class CloudClient:
         if not self.client:
             return False, None
         
-        # Prepare body
-        body = b""
-        if json_data:
-            import json
-            body = json.dumps(json_data, ensure_ascii=False).encode('utf-8')
-        
-        # Generate HMAC signature
-        headers = self.signer.generate_signature(method, path, body)
+        # Serialize once and sign the exact bytes that are sent
+        body, headers = self.signer.sign_json(method, path, json_data or None)
         headers["Content-Type"] = "application/json"
         headers["Accept"] = "application/json"
+        if extra_headers:
+            headers.update(extra_headers)
+        
+        request_kwargs = {}
+        if timeout:
+            request_kwargs["timeout"] = httpx.Timeout(self.transport.options.connect_timeout, read=timeout)
         
         try:
-            response = await self.client.request(
+            response = await self.transport.client(lane).request(
                 method,
                 path,
+                params=params,
                 headers=headers,
-                content=body if body else None
+                content=body if body else None,
+                **request_kwargs
             )
             
+            if raw and response.status_code in (200, 201, 204, 304):
+                return True, response
+            if raw and response.status_code == 404:
+                return False, "Not found"
             if response.status_code in (200, 201):
                 try:
                     data = response.json()
@@ -161,7 +188,7 @@ class CloudClient:
         if cameras_status:
             payload["cameras_status"] = cameras_status
         
-        success, _ = await self._request("POST", "/api/v1/edges/heartbeat", json_data=payload)
+        success, _ = await self._request("POST", "/api/v1/edges/heartbeat", json_data=payload, lane="heartbeat")
         return success
     
     async def get_cameras(self) -> Tuple[bool, list]:
@@ -179,6 +206,83 @@ class CloudClient:
         else:
             return False, []
     
+    async def fetch_collection(
+        self,
+        path: str,
+        collection: DeltaCollection
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Refresh a synced collection with a conditional / delta request
+        
+        Args:
+            path: Collection endpoint (e.g. /api/v1/edges/cameras)
+            collection: Local copy carrying the ETag and since= cursor
+        
+        Returns:
+            Tuple of (success, changes) - changes is None when nothing changed
+        """
+        success, response = await self._request(
+            "GET",
+            path,
+            params=collection.request_params() or None,
+            extra_headers=collection.request_headers(),
+            raw=True
+        )
+        if not success:
+            return False, None
+        
+        data = response.json() if response.status_code != 304 and response.content else None
+        return True, collection.apply(response.status_code, data, response.headers)
+    
+    async def long_poll_commands(self, cursor: Optional[str], wait: float) -> Tuple[bool, Any]:
+        """
+        Wait for commands issued to this Edge (long-poll)
+        
+        Args:
+            cursor: Cursor from the previous response (optional)
+            wait: Seconds the Cloud may hold the request
+        
+        Returns:
+            Tuple of (success, {"commands": [...], "cursor": str}); the
+            response is "Not found" if the Cloud has no long-poll endpoint
+        """
+        params = {"wait": int(wait)}
+        if cursor:
+            params["cursor"] = cursor
+        success, response = await self._request(
+            "GET",
+            "/api/v1/edges/commands/poll",
+            lane="commands",
+            params=params,
+            raw=True,
+            timeout=wait + 10
+        )
+        if not success:
+            return False, response
+        if response.status_code == 204 or not response.content:
+            return True, {"commands": []}
+        return True, response.json()
+    
+    async def acknowledge_command(self, command_id: Any, status: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Report the outcome of a command to Cloud
+        
+        Args:
+            command_id: Command id
+            status: completed / failed
+            result: Result details (optional)
+        
+        Returns:
+            True if successful
+        """
+        success, _ = await self._request(
+            "POST",
+            f"/api/v1/edges/commands/{command_id}/ack",
+            json_data={"status": status, "result": result or {}},
+            lane="commands"
+        )
+        return success
+    
     async def send_event(self, event_data: Dict[str, Any]) -> bool:
         """
         Send event to Cloud
@@ -189,5 +293,5 @@ class CloudClient:
         Returns:
             True if successful
         """
-        success, _ = await self._request("POST", "/api/v1/edges/events", json_data=event_data)
+        success, _ = await self._request("POST", "/api/v1/edges/events", json_data=event_data, lane="events")
         return success
@@ -0,0 +1,220 @@
+"""
+Command Channel
+Long-poll delivery of Cloud commands with adaptive polling fallback
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+
+# Ask again this often whether a Cloud without the long-poll endpoint has one now
+LONG_POLL_RECHECK_SECONDS = 600
+
+# Command ids remembered to drop redeliveries
+SEEN_COMMANDS = 1000
+
+LongPoll = Callable[[Optional[str], float], Awaitable[Tuple[bool, Any]]]
+Poll = Callable[[], Awaitable[List[Dict]]]
+Handler = Callable[[Dict], Awaitable[None]]
+
+
+class CommandChannel:
+    """
+    Receives Cloud commands as soon as they are issued
+
+    The channel keeps one long-poll request open: the Cloud holds it until a
+    command is pending or `wait` seconds pass, and answers
+    {"commands": [...], "cursor": ...}. The next request sends the cursor
+    back, so a command is delivered within one round trip while an idle
+    edge makes one request per `wait` seconds. A Cloud that answers at once
+    instead of holding the request is polled like the fallback below.
+
+    Failed requests are retried with jittered exponential backoff so a
+    fleet of edges does not reconnect in lockstep after a Cloud outage.
+    A Cloud without the long-poll endpoint (404) is polled instead, every
+    `min_interval` seconds after a command and backing off to
+    `max_interval` while idle.
+    """
+
+    def __init__(
+        self,
+        long_poll: LongPoll,
+        handler: Handler,
+        poll: Optional[Poll] = None,
+        wait: float = 25.0,
+        min_interval: float = 2.0,
+        max_interval: float = 60.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0
+    ):
+        """
+        Args:
+            long_poll: async (cursor, wait) -> (success, response); a failed
+                request with response "Not found" means no long-poll endpoint
+            handler: async callable executing one command
+            poll: async () -> pending commands, used without long-poll
+            wait: Seconds the Cloud may hold a long-poll request
+            min_interval: Fallback poll interval right after a command
+            max_interval: Fallback poll interval when idle
+            backoff_base: First retry delay after a failed request
+            backoff_max: Longest retry delay
+        """
+        self.long_poll = long_poll
+        self.handler = handler
+        self.poll = poll
+        self.wait = wait
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.mode = "long_poll"
+        self.cursor: Optional[str] = None
+        self.poll_interval = min_interval
+        self._failures = 0
+        self._long_poll_checked_at = 0.0
+        self._seen: Set[Any] = set()
+        self._seen_order: Deque[Any] = deque()
+
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "requests": 0,
+            "commands": 0,
+            "duplicates": 0,
+            "errors": 0,
+            "reconnects": 0,
+        }
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Command channel started (long-poll, {self.wait:.0f}s wait)")
+
+    async def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while self._running:
+            try:
+                if self.mode == "polling" and time.monotonic() - self._long_poll_checked_at >= LONG_POLL_RECHECK_SECONDS:
+                    self.mode = "long_poll"
+
+                if self.mode == "long_poll":
+                    await self._long_poll_once()
+                else:
+                    await self._poll_once()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Command channel error: {e}")
+                await self._backoff()
+
+    async def _long_poll_once(self):
+        self._stats["requests"] += 1
+        start = time.monotonic()
+        success, response = await self.long_poll(self.cursor, self.wait)
+        elapsed = time.monotonic() - start
+
+        if not success:
+            if response == "Not found":
+                logger.info(
+                    f"Cloud has no command long-poll endpoint - polling every "
+                    f"{self.min_interval:.0f}-{self.max_interval:.0f}s"
+                )
+                self.mode = "polling"
+                self._long_poll_checked_at = time.monotonic()
+                self.poll_interval = self.min_interval
+                return
+            self._stats["errors"] += 1
+            await self._backoff()
+            return
+
+        if self._failures:
+            self._stats["reconnects"] += 1
+            logger.info("Command channel reconnected")
+        self._failures = 0
+
+        commands = []
+        if isinstance(response, dict):
+            commands = response.get("commands") or []
+            if response.get("cursor") is not None:
+                self.cursor = str(response["cursor"])
+        elif isinstance(response, list):
+            commands = response
+        await self._dispatch(commands)
+
+        if commands:
+            self.poll_interval = self.min_interval
+        elif elapsed < self.wait / 2:
+            # The Cloud answered without holding the request - back off while idle
+            self._adapt_interval(commands)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _poll_once(self):
+        if self.poll is None:
+            await asyncio.sleep(self.max_interval)
+            return
+
+        self._stats["requests"] += 1
+        commands = await self.poll()
+        self._failures = 0
+        await self._dispatch(commands or [])
+
+        self._adapt_interval(commands)
+        await asyncio.sleep(self.poll_interval)
+
+    def _adapt_interval(self, commands: List[Dict]):
+        # Commands tend to come in bursts: poll quickly after one, back off while idle
+        if commands:
+            self.poll_interval = self.min_interval
+        else:
+            self.poll_interval = min(self.max_interval, self.poll_interval * 2)
+
+    async def _dispatch(self, commands: List[Dict]):
+        for command in commands:
+            command_id = command.get("id")
+            if command_id is not None:
+                if command_id in self._seen:
+                    self._stats["duplicates"] += 1
+                    continue
+                self._remember(command_id)
+
+            self._stats["commands"] += 1
+            try:
+                await self.handler(command)
+            except Exception as e:
+                logger.error(f"Command {command_id} failed: {e}")
+
+    def _remember(self, command_id: Any):
+        self._seen.add(command_id)
+        self._seen_order.append(command_id)
+        if len(self._seen_order) > SEEN_COMMANDS:
+            self._seen.discard(self._seen_order.popleft())
+
+    async def _backoff(self):
+        """Sleep a jittered, exponentially growing delay"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** self._failures))
+        self._failures += 1
+        await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "mode": self.mode,
+            "poll_interval": self.poll_interval if self.mode == "polling" else None,
+            "failures": self._failures,
+        }
@@ -5,10 +5,11 @@ Listens for and executes commands from Cloud
 import asyncio
 import subprocess
 import sys
-from typing import Dict, Any, Optional
+from typing import Dict, Any
 from loguru import logger
 
 from .cloud_client import CloudClient
+from .command_channel import CommandChannel
 from .status_service import StatusService
 from .error_store import ErrorStore
 from .camera_sync import CameraSyncService
@@ -22,14 +23,19 @@ class CommandListenerService:
         cloud_client: CloudClient,
         status_service: StatusService,
         error_store: ErrorStore,
-        camera_sync: CameraSyncService
+        camera_sync: CameraSyncService,
+        long_poll_wait: float = 25.0
     ):
         self.cloud_client = cloud_client
         self.status_service = status_service
         self.error_store = error_store
         self.camera_sync = camera_sync
         self._running = False
-        self._task: Optional[asyncio.Task] = None
+        self.channel = CommandChannel(
+            long_poll=cloud_client.long_poll_commands,
+            handler=self.handle_command,
+            wait=long_poll_wait
+        )
     
     async def start(self):
         """Start command listener service"""
@@ -37,27 +43,37 @@ class CommandListenerService:
             return
         
         self._running = True
-        self._task = asyncio.create_task(self._listener_loop())
+        await self.channel.start()
         logger.info("Command listener service started")
     
     async def stop(self):
         """Stop command listener service"""
         self._running = False
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+        await self.channel.stop()
         logger.info("Command listener service stopped")
     
-    async def _listener_loop(self):
-        """Main command listener loop"""
-        # Note: In a real implementation, this would poll Cloud API for commands
-        # or use WebSocket/SSE for real-time command delivery
-        # For now, commands are handled via HTTP endpoints (see main.py)
-        while self._running:
-            await asyncio.sleep(60)  # Poll every minute
+    async def handle_command(self, command: Dict[str, Any]):
+        """
+        Execute a command delivered by the command channel and acknowledge it
+        
+        Commands can also arrive as HTTP requests from Cloud (see main.py)
+        """
+        command_type = (command.get("command_type") or command.get("type") or "").replace("_", "-")
+        
+        if command_type == "restart":
+            result = await self.execute_restart()
+        elif command_type == "sync-config":
+            result = await self.execute_sync_config()
+        else:
+            logger.warning(f"Unknown command {command.get('id')}: {command_type}")
+            result = {"success": False, "error": f"Unknown command: {command_type}"}
+        
+        if command.get("id") is not None:
+            await self.cloud_client.acknowledge_command(
+                command["id"],
+                "completed" if result.get("success") else "failed",
+                result
+            )
     
     async def execute_restart(self) -> Dict[str, Any]:
         """
@@ -0,0 +1,136 @@
+"""
+Delta Sync
+Conditional and incremental fetches of Cloud collections
+"""
+from typing import Dict, List, Optional, Any, Mapping
+
+
+class DeltaCollection:
+    """
+    Local copy of one Cloud collection (cameras, faces, ...)
+
+    Requests carry If-None-Match / If-Modified-Since from the last response,
+    and since=<cursor> once the Cloud has returned a "cursor". The Cloud may
+    answer with:
+    - 304 Not Modified: nothing changed
+    - a delta: {"delta": true, <items_key>: [changed records],
+      "deleted": [ids], "cursor": ...}
+    - a full list (any other 200), diffed here against the local copy
+
+    apply() returns the changes as {'base_version', 'version', 'upserts',
+    'removed', 'full'}, or None when nothing changed, so callers only touch
+    the records that changed.
+    """
+
+    def __init__(self, name: str, items_key: Optional[str] = None, id_key: str = "id"):
+        self.name = name
+        self.items_key = items_key or name
+        self.id_key = id_key
+
+        self.records: Dict[Any, Dict] = {}
+        self.version = 0
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.cursor: Optional[str] = None
+
+        self._stats = {
+            "requests": 0,
+            "not_modified": 0,
+            "deltas": 0,
+            "full": 0,
+            "changes": 0,
+        }
+
+    def request_headers(self) -> Dict[str, str]:
+        """Conditional request headers from the last response"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def request_params(self) -> Dict[str, str]:
+        """Query parameters asking for changes since the last response"""
+        return {"since": self.cursor} if self.cursor else {}
+
+    def apply(self, status: int, data: Any, headers: Optional[Mapping[str, str]] = None) -> Optional[Dict]:
+        """
+        Apply a Cloud response to the local copy
+
+        Args:
+            status: HTTP status code (200 or 304)
+            data: Parsed JSON body
+            headers: Response headers
+
+        Returns:
+            The changes, or None if nothing changed
+        """
+        self._stats["requests"] += 1
+        if status == 304:
+            self._stats["not_modified"] += 1
+            return None
+
+        headers = headers or {}
+        self.etag = headers.get("ETag") or headers.get("etag")
+        self.last_modified = headers.get("Last-Modified") or headers.get("last-modified")
+
+        if isinstance(data, dict) and data.get("delta") and self.cursor is not None:
+            self._stats["deltas"] += 1
+            upserts = self._items(data)
+            removed = [key for key in data.get("deleted") or [] if key in self.records]
+            full = False
+        else:
+            self._stats["full"] += 1
+            upserts, removed = self._diff(self._items(data))
+            full = True
+
+        if isinstance(data, dict) and data.get("cursor") is not None:
+            self.cursor = str(data["cursor"])
+
+        for key in removed:
+            del self.records[key]
+        for record in upserts:
+            self.records[record.get(self.id_key)] = record
+
+        if not upserts and not removed:
+            return None
+
+        self.version += 1
+        self._stats["changes"] += 1
+        return {
+            "base_version": self.version - 1,
+            "version": self.version,
+            "upserts": upserts,
+            "removed": removed,
+            "full": full,
+        }
+
+    def _items(self, data: Any) -> List[Dict]:
+        if isinstance(data, list):
+            return data
+        if isinstance(data, dict):
+            items = data.get(self.items_key)
+            if items is None:
+                items = data.get("data")
+            if isinstance(items, list):
+                return items
+        return []
+
+    def _diff(self, items: List[Dict]):
+        """Changed/new records and removed ids of a full list"""
+        current = {record.get(self.id_key): record for record in items}
+        upserts = [record for key, record in current.items() if self.records.get(key) != record]
+        removed = [key for key in self.records if key not in current]
+        return upserts, removed
+
+    def items(self) -> List[Dict]:
+        return list(self.records.values())
+
+    def reset(self):
+        """Forget the local copy and validators (next fetch is a full list)"""
+        self.records = {}
+        self.etag = self.last_modified = self.cursor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "records": len(self.records), "version": self.version}
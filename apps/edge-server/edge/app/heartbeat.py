@@ -3,8 +3,6 @@ Heartbeat Service
 Sends periodic heartbeats to Cloud
 """
 import asyncio
-import platform
-import socket
 from typing import Optional
 from loguru import logger
 
@@ -12,6 +10,7 @@ from .config_store import ConfigStore
 from .cloud_client import CloudClient
 from .status_service import StatusService
 from .error_store import ErrorStore
+from .system_metrics import get_sampler
 
 
 class HeartbeatService:
@@ -54,38 +53,22 @@ class HeartbeatService:
         logger.info("Heartbeat service stopped")
     
     def _get_system_info(self) -> dict:
-        """Get system information"""
-        try:
-            import psutil
-            return {
-                "hostname": socket.gethostname(),
-                "os": platform.system(),
-                "os_version": platform.release(),
-                "cpu_count": psutil.cpu_count(),
-                "cpu_percent": psutil.cpu_percent(interval=1),
-                "memory_total": psutil.virtual_memory().total,
-                "memory_used": psutil.virtual_memory().used,
-                "memory_percent": psutil.virtual_memory().percent,
-                "internal_ip": self._get_internal_ip(),
-                "public_ip": None,  # Can be fetched from external service if needed
-            }
-        except Exception as e:
-            logger.warning(f"Failed to get system info: {e}")
-            return {
-                "hostname": socket.gethostname(),
-                "os": platform.system(),
-            }
-    
-    def _get_internal_ip(self) -> Optional[str]:
-        """Get internal IP address"""
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return None
+        """Get system information (cached by the metrics sampler, never blocks)"""
+        sampler = get_sampler()
+        info = sampler.system_info()
+        return {
+            "hostname": info.get("hostname"),
+            "os": info.get("os"),
+            "os_version": info.get("os_version"),
+            "cpu_count": info.get("cpu_count"),
+            "cpu_percent": info.get("cpu_percent"),
+            "memory_total": info.get("memory_total"),
+            "memory_used": info.get("memory_used"),
+            "memory_percent": info.get("memory_percent"),
+            "internal_ip": info.get("internal_ip"),
+            "public_ip": None,  # Can be fetched from external service if needed
+            "metrics": sampler.summary(),
+        }
     
     async def _heartbeat_loop(self):
         """Main heartbeat loop"""
@@ -20,6 +20,8 @@ from .config_store import ConfigStore
 from .error_store import ErrorStore
 from .status_service import StatusService
 from .cloud_client import CloudClient
+from .transport import TransportOptions
+from .system_metrics import get_sampler
 from .heartbeat import HeartbeatService
 from .camera_sync import CameraSyncService
 from .event_sender import EventSenderService
@@ -80,6 +82,7 @@ async def lifespan(app: FastAPI):
     config = ConfigStore()
     error_store = ErrorStore()
     status_service = StatusService()
+    sampler = get_sampler(interval=config.get("metrics_sample_interval", 5))
     
     # Check if setup is completed
     if config.is_setup_completed():
@@ -88,7 +91,8 @@ async def lifespan(app: FastAPI):
             cloud_config["base_url"],
             cloud_config["edge_key"],
             cloud_config["edge_secret"],
-            error_store
+            error_store,
+            TransportOptions.from_dict(config.get("transport"))
         )
         
         await cloud_client.connect()
@@ -96,7 +100,10 @@ async def lifespan(app: FastAPI):
         # Initialize services
         camera_sync = CameraSyncService(config, cloud_client, status_service, error_store)
         event_sender = EventSenderService(cloud_client, status_service, error_store)
-        command_listener = CommandListenerService(cloud_client, status_service, error_store, camera_sync)
+        command_listener = CommandListenerService(
+            cloud_client, status_service, error_store, camera_sync,
+            long_poll_wait=config.get("command_long_poll_wait", 25)
+        )
         heartbeat_service = HeartbeatService(config, cloud_client, status_service, error_store)
         
         # Start services
@@ -129,6 +136,7 @@ async def lifespan(app: FastAPI):
         await command_listener.stop()
     if cloud_client:
         await cloud_client.disconnect()
+    sampler.stop()
     
     logger.info("Shutdown complete")
 
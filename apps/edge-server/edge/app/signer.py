@@ -4,10 +4,39 @@ Implements HMAC-SHA256 signing for Cloud API requests
 """
 import hmac
 import hashlib
+import json
 import time
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 from loguru import logger
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def encode_json(data: Any) -> bytes:
+    """
+    Serialize a request body to UTF-8 JSON bytes
+
+    Uses orjson when installed, the json module otherwise. Values the
+    encoder does not know (e.g. Decimal, Path, numpy arrays) are sent as
+    strings.
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(
+                data,
+                default=str,
+                option=orjson.OPT_NON_STR_KEYS
+            )
+        except TypeError:
+            pass  # e.g. integers beyond 64 bit - json handles these
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
 
 class HMACSigner:
     """Handles HMAC signature generation for Edge Server requests"""
@@ -15,6 +44,8 @@ class HMACSigner:
     def __init__(self, edge_key: str, edge_secret: str):
         self.edge_key = edge_key
         self.edge_secret = edge_secret
+        # Keyed HMAC state (inner/outer pads) computed once and copied per request
+        self._mac = hmac.new(edge_secret.encode('utf-8'), digestmod=hashlib.sha256)
     
     def generate_signature(
         self,
@@ -45,11 +76,9 @@ class HMACSigner:
         message = f"{method}|{path}|{timestamp}|{body_hash}"
         
         # Generate HMAC signature
-        signature = hmac.new(
-            self.edge_secret.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
+        mac = self._mac.copy()
+        mac.update(message.encode('utf-8'))
+        signature = mac.hexdigest()
         
         return {
             "X-EDGE-KEY": self.edge_key,
@@ -57,6 +86,28 @@ class HMACSigner:
             "X-EDGE-SIGNATURE": signature,
         }
     
+    def sign_json(
+        self,
+        method: str,
+        path: str,
+        data: Any = None,
+        timestamp: Optional[int] = None
+    ) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Serialize a JSON body once and sign exactly those bytes
+        
+        Args:
+            method: HTTP method
+            path: Request path
+            data: JSON-serializable body (None for no body)
+            timestamp: Unix timestamp (defaults to current time)
+        
+        Returns:
+            Tuple of (body bytes to send, signature headers)
+        """
+        body = encode_json(data) if data is not None else b""
+        return body, self.generate_signature(method, path, body, timestamp)
+    
     def verify_timestamp(self, timestamp: int, window_seconds: int = 300) -> bool:
         """
         Verify timestamp is within acceptable window (default 5 minutes)
@@ -71,3 +122,9 @@ class HMACSigner:
         current_time = int(time.time())
         time_diff = abs(current_time - timestamp)
         return time_diff <= window_seconds
+
+
+@lru_cache(maxsize=8)
+def get_signer(edge_key: str, edge_secret: str) -> HMACSigner:
+    """Shared signer for a credential pair"""
+    return HMACSigner(edge_key, edge_secret)
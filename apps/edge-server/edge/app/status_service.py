@@ -2,12 +2,12 @@
 Status Service
 Tracks Edge Server status and metrics
 """
-import psutil
-import platform
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from loguru import logger
 
+from .system_metrics import get_sampler
+
 
 class StatusService:
     """Manages Edge Server status and metrics"""
@@ -63,9 +63,11 @@ class StatusService:
         uptime_hours = int(uptime_seconds // 3600)
         uptime_minutes = int((uptime_seconds % 3600) // 60)
         
-        # Get system metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
+        # Get system metrics (latest background sample)
+        info = get_sampler().system_info()
+        cpu_percent = info.get("cpu_percent") or 0.0
+        memory_total = info.get("memory_total") or 0
+        memory_used = info.get("memory_used") or 0
         
         return {
             "edge_state": self.state,
@@ -75,13 +77,13 @@ class StatusService:
             "events_sent_today": self.events_sent_today,
             "uptime": f"{uptime_hours}h {uptime_minutes}m",
             "cpu_usage": f"{cpu_percent:.1f}%",
-            "ram_usage": f"{memory.percent:.1f}%",
-            "ram_total_gb": f"{memory.total / (1024**3):.2f}",
-            "ram_used_gb": f"{memory.used / (1024**3):.2f}",
+            "ram_usage": f"{info.get('memory_percent') or 0.0:.1f}%",
+            "ram_total_gb": f"{memory_total / (1024**3):.2f}",
+            "ram_used_gb": f"{memory_used / (1024**3):.2f}",
             "last_command": self.last_command,
             "system_info": {
-                "os": platform.system(),
-                "os_version": platform.release(),
-                "hostname": platform.node(),
+                "os": info.get("os"),
+                "os_version": info.get("os_version"),
+                "hostname": info.get("hostname"),
             }
         }
@@ -0,0 +1,236 @@
+"""
+System Metrics Sampler
+Background sampling of CPU, memory, disk and process usage for heartbeats and status pages
+"""
+import math
+import os
+import platform
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from loguru import logger
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    psutil = None
+    PSUTIL_AVAILABLE = False
+
+
+# Series kept in the ring buffers (summarised as p50 / p95 / max)
+SERIES = (
+    "cpu_percent",
+    "memory_percent",
+    "disk_percent",
+    "process_cpu_percent",
+    "process_rss_mb",
+)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100.0 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def _idle_time(times) -> float:
+    return times.idle + getattr(times, "iowait", 0.0)
+
+
+class SystemMetricsSampler:
+    """
+    Samples system and process usage on a background thread
+
+    Every `interval` seconds one sample is appended to fixed-size ring
+    buffers covering the last `window` seconds, and the p50/p95/max summary
+    is recomputed there. latest(), summary() and system_info() only copy
+    those results, so they never block the event loop. CPU usage is derived
+    from cpu_times() deltas, so it does not disturb other
+    psutil.cpu_percent() callers.
+
+    The network identity (hostname, internal IP) is resolved on the sampler
+    thread and refreshed every `identity_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        interval: float = 5.0,
+        window: float = 900.0,
+        disk_path: Optional[str] = None,
+        identity_ttl: float = 300.0
+    ):
+        self.interval = interval
+        self.disk_path = disk_path or os.path.abspath(os.sep)
+        self.identity_ttl = identity_ttl
+
+        size = max(2, int(window / interval))
+        self._series: Dict[str, Deque[float]] = {name: deque(maxlen=size) for name in SERIES}
+        self._latest: Dict[str, Any] = {}
+        self._summary: Dict[str, Dict[str, float]] = {}
+        self._identity: Dict[str, Optional[str]] = {"hostname": socket.gethostname(), "internal_ip": None}
+        self._identity_at = 0.0
+        self._static = self._static_info()
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cpu_times = None
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+
+    def start(self):
+        """Start sampling (takes a first sample immediately)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="system-metrics", daemon=True)
+        self._thread.start()
+        logger.info(f"System metrics sampler started ({self.interval:.0f}s interval)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"System metrics sample failed: {e}")
+
+    def _static_info(self) -> Dict[str, Any]:
+        info = {
+            "os": platform.system(),
+            "os_version": platform.release(),
+            "platform_version": platform.version(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+        }
+        if PSUTIL_AVAILABLE:
+            info["cpu_count"] = psutil.cpu_count()
+            info["memory_total"] = psutil.virtual_memory().total
+            try:
+                info["disk_total"] = psutil.disk_usage(self.disk_path).total
+            except OSError:
+                info["disk_total"] = None
+        return info
+
+    def _cpu_percent(self) -> Optional[float]:
+        """System CPU usage since the previous sample (None on the first sample)"""
+        times = psutil.cpu_times()
+        previous, self._cpu_times = self._cpu_times, times
+        if previous is None:
+            return None
+        total = sum(times) - sum(previous)
+        if total <= 0:
+            return 0.0
+        busy = 100.0 * (1.0 - (_idle_time(times) - _idle_time(previous)) / total)
+        return round(max(0.0, min(100.0, busy)), 1)
+
+    def _refresh_identity(self):
+        now = time.monotonic()
+        if self._identity_at and now - self._identity_at < self.identity_ttl:
+            return
+        self._identity_at = now
+        internal_ip = None
+        try:
+            # No packets are sent - connect() on UDP only selects the outgoing interface
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.connect(("8.8.8.8", 80))
+                internal_ip = s.getsockname()[0]
+        except OSError:
+            internal_ip = self._identity.get("internal_ip")
+        self._identity = {"hostname": socket.gethostname(), "internal_ip": internal_ip}
+
+    def sample(self):
+        """Take one sample (runs on the sampler thread)"""
+        self._refresh_identity()
+        if not PSUTIL_AVAILABLE:
+            return
+
+        memory = psutil.virtual_memory()
+        try:
+            disk = psutil.disk_usage(self.disk_path)
+        except OSError:
+            disk = None
+        cpu = self._cpu_percent()
+        with self._process.oneshot():
+            process_cpu = self._process.cpu_percent(interval=None)
+            process_rss = self._process.memory_info().rss
+            process_threads = self._process.num_threads()
+
+        latest = {
+            "cpu_percent": cpu,
+            "memory_percent": memory.percent,
+            "memory_used": memory.used,
+            "memory_available": memory.available,
+            "disk_percent": disk.percent if disk else None,
+            "disk_used": disk.used if disk else None,
+            # Like the system CPU, the first process reading has no interval yet
+            "process_cpu_percent": round(process_cpu, 1) if cpu is not None else None,
+            "process_rss_mb": round(process_rss / (1024 ** 2), 1),
+            "process_threads": process_threads,
+            "sampled_at": time.time(),
+        }
+
+        summary = {}
+        with self._lock:
+            for name, series in self._series.items():
+                if latest.get(name) is not None:
+                    series.append(latest[name])
+            values = {name: sorted(series) for name, series in self._series.items() if series}
+        for name, ordered in values.items():
+            summary[name] = {
+                "p50": round(percentile(ordered, 50), 1),
+                "p95": round(percentile(ordered, 95), 1),
+                "max": round(ordered[-1], 1),
+            }
+        summary["samples"] = len(values.get("cpu_percent", []))
+        summary["window_seconds"] = round(summary["samples"] * self.interval)
+
+        with self._lock:
+            self._latest = latest
+            self._summary = summary
+
+    def latest(self) -> Dict[str, Any]:
+        """Most recent sample"""
+        with self._lock:
+            return dict(self._latest)
+
+    def summary(self) -> Dict[str, Any]:
+        """p50 / p95 / max of each series over the window"""
+        with self._lock:
+            return dict(self._summary)
+
+    def identity(self) -> Dict[str, Optional[str]]:
+        """Cached hostname and internal IP"""
+        return dict(self._identity)
+
+    def system_info(self) -> Dict[str, Any]:
+        """Static platform info, network identity and the latest sample"""
+        return {**self._static, **self.identity(), **self.latest()}
+
+
+_sampler: Optional[SystemMetricsSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(**options) -> SystemMetricsSampler:
+    """
+    Process-wide sampler, started on first use
+
+    Options (see SystemMetricsSampler) only apply to the call that creates it.
+    """
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemMetricsSampler(**options)
+            _sampler.start()
+        return _sampler
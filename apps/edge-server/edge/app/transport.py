@@ -0,0 +1,135 @@
+"""
+Cloud Transport
+Shared HTTP client factory with a separate connection pool per traffic lane
+"""
+import importlib.util
+from dataclasses import dataclass
+from typing import Dict, Optional, Any
+import httpx
+from loguru import logger
+
+
+# Traffic lanes; each gets its own pool so a bulk upload holding every
+# events connection never makes a heartbeat wait for a free socket
+LANES = ("default", "heartbeat", "commands", "events")
+
+# Control lanes stay small - they only ever need one or two warm connections
+CONTROL_LANE_CONNECTIONS = 2
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class TransportOptions:
+    """Pool, keep-alive and timeout tuning for Cloud traffic"""
+    max_connections: int = 10  # per lane (events / default)
+    max_keepalive: int = 5
+    keepalive_expiry: float = 30.0  # seconds an idle connection is kept open
+    http2: bool = False  # multiplex requests over one connection (needs the h2 package)
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 5.0  # max wait for a free pooled connection
+    verify: bool = True
+
+    @classmethod
+    def from_dict(cls, values: Optional[Dict[str, Any]]) -> "TransportOptions":
+        """Build options from a config dict, ignoring unknown keys"""
+        values = values or {}
+        return cls(**{k: v for k, v in values.items() if k in cls.__dataclass_fields__})
+
+
+class CloudTransport:
+    """
+    Per-lane httpx clients for one Cloud base URL
+
+    Clients are created on first use and keep their connections alive
+    between requests. Use get_transport() to share one transport between
+    every Cloud client in the process.
+    """
+
+    def __init__(self, base_url: str, options: Optional[TransportOptions] = None):
+        self.base_url = base_url.rstrip('/')
+        self.options = options or TransportOptions()
+        self.http2 = self.options.http2 and HTTP2_AVAILABLE
+        if self.options.http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the h2 package is not installed - using HTTP/1.1")
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._users = 0
+
+    def client(self, lane: str = "default") -> httpx.AsyncClient:
+        """Get the client of a lane (unknown lanes use the default lane)"""
+        if lane not in LANES:
+            lane = "default"
+        client = self._clients.get(lane)
+        if client is None or client.is_closed:
+            client = self._create_client(lane)
+            self._clients[lane] = client
+        return client
+
+    def _create_client(self, lane: str) -> httpx.AsyncClient:
+        options = self.options
+        connections = options.max_connections
+        keepalive = options.max_keepalive
+        if lane in ("heartbeat", "commands"):
+            connections = min(connections, CONTROL_LANE_CONNECTIONS)
+            keepalive = min(keepalive, CONTROL_LANE_CONNECTIONS)
+
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=self.http2,
+            verify=options.verify,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=connections,
+                max_keepalive_connections=keepalive,
+                keepalive_expiry=options.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(
+                connect=options.connect_timeout,
+                read=options.read_timeout,
+                write=options.write_timeout,
+                pool=options.pool_timeout
+            )
+        )
+
+    async def aclose(self):
+        """Close every lane"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients = {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "lanes": sorted(lane for lane, client in self._clients.items() if not client.is_closed),
+            "users": self._users,
+        }
+
+
+_transports: Dict[str, CloudTransport] = {}
+
+
+def get_transport(base_url: str, options: Optional[TransportOptions] = None) -> CloudTransport:
+    """
+    Acquire the shared transport for a base URL
+
+    The first caller's options win. Every call must be paired with
+    release_transport().
+    """
+    key = base_url.rstrip('/')
+    transport = _transports.get(key)
+    if transport is None:
+        transport = CloudTransport(key, options)
+        _transports[key] = transport
+    transport._users += 1
+    return transport
+
+
+async def release_transport(transport: CloudTransport):
+    """Release a transport acquired with get_transport(), closing it after its last user"""
+    transport._users -= 1
+    if transport._users <= 0:
+        _transports.pop(transport.base_url, None)
+        await transport.aclose()
@@ -66,6 +66,9 @@ hiddenimports = [
     'app.ai.modules.loitering',
     'app.ai.modules.crowd_detection',
     'app.ai.modules.object_detection',
+    'edge.app.delta_sync',
+    'edge.app.command_channel',
+    'edge.app.system_metrics',
     'config',
     'config.settings',
     'loguru',
@@ -49,9 +49,12 @@ class EdgeServerState:
         self.edge_id = None  # Edge ID for Cloud registration
         self.cameras = {}
         self.modules_loaded = False
-        self.ai_manager = None  # AI Module Manager
+        self.ai_manager = None  # AI Module Manager (thread execution mode only)
+        self.inference_scheduler = None  # Cross-camera batching scheduler
         self.camera_service = None  # Camera Service
         self.sync_service = None  # Sync Service
+        self.uploader = None  # Batched event uploads
+        self.outbox = None  # Bounded queue between AI results and uploads
 
 
 state = EdgeServerState()
@@ -154,21 +157,32 @@ async def register_server():
 
 async def start_services():
     from app.services.sync import SyncService
+    from app.services.uploader import EventUploadPipeline
+    from app.services.outbox import EventOutbox, strip_images
     from app.services.camera import CameraService
     from app.ai.manager import AIModuleManager
-
-    # Initialize AI Module Manager
-    ai_manager = AIModuleManager()
-    state.ai_manager = ai_manager
+    from app.ai.scheduler import BatchInferenceScheduler
 
     # Initialize Camera Service
     camera_service = CameraService()
     state.camera_service = camera_service
 
+    if settings.AI_EXECUTION_MODE == "process":
+        # Shard cameras across AI worker processes (frames shared via the frame bus);
+        # each worker owns its AI Module Manager
+        from app.ai.workers import AIWorkerPool
+        inference_scheduler = AIWorkerPool(frame_bus=camera_service.frame_bus)
+    else:
+        # Initialize AI Module Manager and batch frames from all cameras into shared inference calls
+        state.ai_manager = AIModuleManager()
+        inference_scheduler = BatchInferenceScheduler(state.ai_manager)
+    state.inference_scheduler = inference_scheduler
+    await inference_scheduler.start()
+
     # Register AI processor with camera service
     async def ai_processor(camera_id: str, frame, enabled_modules: list):
         """Process frame through AI modules"""
-        if not state.ai_manager:
+        if not state.inference_scheduler:
             return
         
         # Get metadata from sync service
@@ -176,47 +190,72 @@ async def start_services():
         if state.sync_service:
             metadata = {
                 'faces_database': state.sync_service.get_faces(),
+                'faces_version': state.sync_service.faces_version,
+                'faces_delta': state.sync_service.faces_delta,
                 'vehicles_database': state.sync_service.get_vehicles(),
+                'vehicles_version': state.sync_service.vehicles_version,
                 'rules': state.sync_service.get_rules(),
             }
         
-        # Process frame
-        results = state.ai_manager.process_frame(
-            frame=frame,
-            camera_id=camera_id,
-            enabled_modules=enabled_modules,
-            metadata=metadata
+        # Process frame (batched with other cameras, or in the camera's AI worker);
+        # the motion gate reuses the motion map the governor computed for this frame
+        results = await state.inference_scheduler.submit(
+            camera_id,
+            frame,
+            enabled_modules,
+            metadata,
+            camera_service.governor.motion_map(camera_id)
         )
         
-        # Send alerts and events to Cloud
-        if state.db and state.is_connected:
-            for alert in results.get('alerts', []):
-                alert_data = {
-                    'camera_id': camera_id,
-                    'module': alert.get('module', 'unknown'),
-                    'type': alert.get('type') or alert.get('event_type', 'alert'),
-                    'severity': alert.get('severity', 'medium'),
-                    'title': alert.get('title', 'Alert'),
-                    'description': alert.get('description'),
-                    'metadata': alert.get('metadata', {}),
-                }
-                await state.db.create_alert(alert_data)
-            
-            for event in results.get('events', []):
-                event_data = {
-                    'camera_id': camera_id,
-                    'type': event.get('type') or event.get('event_type', 'event'),
-                    'severity': event.get('severity', 'info'),
-                    'metadata': event,
-                }
-                await state.db.create_event(event_data)
+        # Hand alerts and events to the outbox; uploads never block frame analysis.
+        # Snapshots and other image arrays stay here (they would outlive the frame)
+        items = []
+        for alert in results.get('alerts', []):
+            alert_data = {
+                'camera_id': camera_id,
+                'module': alert.get('module', 'unknown'),
+                'type': alert.get('type') or alert.get('event_type', 'alert'),
+                'severity': alert.get('severity', 'medium'),
+                'title': alert.get('title', 'Alert'),
+                'description': alert.get('description'),
+                'metadata': alert.get('metadata', {}),
+            }
+            items.append({'type': 'alert', 'data': strip_images(alert_data)})
+
+        for event in results.get('events', []):
+            event_data = {
+                'camera_id': camera_id,
+                'type': event.get('type') or event.get('event_type', 'event'),
+                'severity': event.get('severity', 'info'),
+                'metadata': event,
+            }
+            items.append({'type': 'event', 'data': strip_images(event_data)})
+
+        if items:
+            if state.outbox and state.is_connected:
+                for item in items:
+                    state.outbox.put(item['type'], item['data'])
+            elif state.sync_service:
+                # Offline: straight to the offline queue (disk), synced once the Cloud is back
+                state.sync_service.queue_items(items)
+
+        return results
 
     camera_service.register_processor(ai_processor)
 
+    # Batched event uploads
+    uploader = EventUploadPipeline(state.db)
+    state.uploader = uploader
+
     # Initialize Sync Service
-    sync_service = SyncService(state.db)
+    sync_service = SyncService(state.db, uploader=uploader)
     state.sync_service = sync_service
 
+    # Outbox drained by uploader tasks; overflow and failed uploads spill to the offline queue
+    outbox = EventOutbox(uploader, spill=sync_service.queue_items)
+    state.outbox = outbox
+    await outbox.start()
+
     # Start sync service
     asyncio.create_task(sync_service.run())
 
@@ -224,7 +263,10 @@ async def start_services():
     if state.license_data:
         enabled_modules = state.license_data.get('modules', [])
         if enabled_modules:
-            ai_manager.enable_modules(enabled_modules)
+            if state.ai_manager:
+                state.ai_manager.enable_modules(enabled_modules)
+            if hasattr(inference_scheduler, 'enable_modules'):
+                inference_scheduler.enable_modules(enabled_modules)
             logger.info(f"Enabled AI modules: {', '.join(enabled_modules)}")
 
     logger.info("Services started")
@@ -238,6 +280,14 @@ async def lifespan(app: FastAPI):
 
     connected = await initialize_database()
 
+    # Background CPU/memory/disk sampling for heartbeats and /status
+    from edge.app.system_metrics import get_sampler
+    sampler = get_sampler(
+        interval=settings.METRICS_SAMPLE_INTERVAL,
+        window=settings.METRICS_WINDOW,
+        disk_path=os.path.abspath(settings.DATA_DIR)
+    )
+
     licensed = await validate_license()
 
     if licensed and connected:
@@ -267,14 +317,22 @@ async def lifespan(app: FastAPI):
     if state.camera_service:
         await state.camera_service.stop()
     
+    if state.inference_scheduler:
+        await state.inference_scheduler.stop()
+    
     if state.ai_manager:
         state.ai_manager.cleanup()
     
+    if state.outbox:
+        await state.outbox.stop()
+    
     if state.sync_service:
         await state.sync_service.stop()
     
     if state.db:
         await state.db.disconnect()
+
+    sampler.stop()
     
     logger.info("Shutdown complete")
 
@@ -320,6 +378,31 @@ async def health():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Pipeline latency histograms and component stats in Prometheus text format"""
+    from fastapi.responses import PlainTextResponse
+    from app.core.metrics import CONTENT_TYPE, render
+
+    camera_service = state.camera_service
+    sync_service = state.sync_service
+    modules = await state.inference_scheduler.get_module_stats() if state.inference_scheduler else {}
+    gauges = {
+        "frame_bus": camera_service.frame_bus.get_stats() if camera_service else None,
+        "governor": camera_service.governor.get_stats() if camera_service else None,
+        "inference": state.inference_scheduler.get_stats() if state.inference_scheduler else None,
+        "tracking": modules.get('tracking'),
+        "uploads": state.uploader.get_stats() if state.uploader else None,
+        "outbox": state.outbox.get_stats() if state.outbox else None,
+        "offline_queue": sync_service.offline_queue.get_stats() if sync_service else None,
+        "commands": sync_service.command_channel.get_stats() if sync_service else None,
+    }
+    return PlainTextResponse(
+        render({name: stats for name, stats in gauges.items() if isinstance(stats, dict)}),
+        media_type=CONTENT_TYPE
+    )
+
+
 def main():
     import uvicorn
     uvicorn.run(
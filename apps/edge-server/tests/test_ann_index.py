@@ -0,0 +1,168 @@
+"""
+ANN Index Benchmark
+Recall and latency of the IVF face index against exact search
+
+Run with pytest or directly:
+    python tests/test_ann_index.py [gallery_size]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ai.ann import IVFIndex
+from app.ai.gallery import EmbeddingGallery, ExactIndex
+
+DIM = 128
+QUERIES = 200
+
+
+def make_gallery(size: int, seed: int = 0):
+    """Clustered synthetic embeddings (people photographed several times look alike)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 1, (max(1, size // 20), DIM)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size)
+    vectors = centers[labels] + rng.normal(0, 0.3, (size, DIM)).astype(np.float32)
+    queries = vectors[rng.choice(size, QUERIES, replace=False)] + rng.normal(0, 0.05, (QUERIES, DIM)).astype(np.float32)
+    return [str(i) for i in range(size)], vectors, queries
+
+
+def benchmark(size: int = 20000, nprobe: int = 8) -> dict:
+    ids, vectors, queries = make_gallery(size)
+
+    exact = ExactIndex(DIM)
+    exact.add(ids, vectors)
+    ivf = IVFIndex(DIM, nprobe=nprobe)
+    start = time.perf_counter()
+    ivf.train(vectors)
+    ivf.add(ids, vectors)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    truth, _ = exact.search(queries, k=1)
+    exact_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+    start = time.perf_counter()
+    found, _ = ivf.search(queries, k=1)
+    ivf_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+    recall = np.mean([bool(f) and f[0] == t[0] for f, t in zip(found, truth)])
+    return {
+        'size': size,
+        'nlist': ivf.nlist,
+        'nprobe': nprobe,
+        'build_ms': build_ms,
+        'exact_ms_per_query': exact_ms,
+        'ivf_ms_per_query': ivf_ms,
+        'recall_at_1': float(recall),
+    }
+
+
+def test_ivf_recall():
+    """IVF must find the exact nearest neighbour for nearly every query"""
+    result = benchmark(size=20000)
+    print(f"\n{result}")
+    assert result['recall_at_1'] >= 0.9
+
+
+def test_ivf_incremental_and_persistence():
+    """Removed ids disappear, re-added ids are found, save/load round-trips"""
+    ids, vectors, _ = make_gallery(2000)
+    index = IVFIndex(DIM, nprobe=8)
+    index.add(ids, vectors)
+
+    index.remove(ids[:100])
+    assert len(index) == 1900
+    found, _ = index.search(vectors[:100], k=1)
+    assert not any(f and f[0] in ids[:100] for f in found)
+
+    index.add(['new'], vectors[0:1])
+    found, dist = index.search(vectors[0:1], k=1)
+    assert found[0][0] == 'new' and dist[0, 0] < 1e-3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.npz')
+        index.save(path, extra={'tag': np.asarray(['x'])})
+        loaded, extra = IVFIndex.load(path)
+    assert len(loaded) == len(index)
+    assert extra['tag'].tolist() == ['x']
+    found, _ = loaded.search(vectors[0:1], k=1)
+    assert found[0][0] == 'new'
+
+
+def test_gallery_delta_and_switch():
+    """The gallery applies sync deltas and moves to the IVF index when it grows"""
+    ids, vectors, _ = make_gallery(3000)
+    records = [{'id': i, 'name': i, 'embedding': v} for i, v in zip(ids, vectors)]
+
+    gallery = EmbeddingGallery()
+    gallery.ann_min_size = 2000
+    gallery.sync(records[:1000], version=1)
+    assert len(gallery) == 1000 and not gallery.approximate
+
+    delta = {'base_version': 1, 'version': 2, 'upserts': records[1000:], 'removed': ['0']}
+    assert gallery.sync(records[1:], version=2, delta=delta)
+    assert len(gallery) == 2999 and gallery.approximate
+
+    match = gallery.match(vectors[5:6], max_distance=0.1)[0]
+    assert match is not None and match[0]['id'] == '5'
+    assert not gallery.sync(records[1:], version=2)
+
+
+def test_concurrent_saves_and_throttle():
+    """Writers never share a temp file; a changed gallery index is saved at most once per interval"""
+    ids, vectors, _ = make_gallery(2000)
+    index = IVFIndex(DIM, nprobe=8)
+    index.add(ids, vectors)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.npz')
+        threads = [threading.Thread(target=index.save, args=(path,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(IVFIndex.load(path)[0]) == 2000
+        assert os.listdir(tmp) == ['index.npz']
+
+        records = [{'id': i, 'embedding': v} for i, v in zip(ids, vectors)]
+        gallery = EmbeddingGallery(index_path=os.path.join(tmp, 'gallery.npz'))
+        gallery.ann_min_size = 1000
+        gallery.sync(records[:1500], version=1)  # switches to IVF: saved at once
+        saved_at = os.stat(gallery.index_path).st_mtime_ns
+        delta = {'base_version': 1, 'version': 2, 'upserts': records[1500:], 'removed': []}
+        gallery.sync(records, version=2, delta=delta)
+        assert gallery._dirty and os.stat(gallery.index_path).st_mtime_ns == saved_at
+
+        gallery.flush()
+        assert not gallery._dirty
+        loaded, _ = IVFIndex.load(gallery.index_path)
+        assert len(loaded) == 2000
+
+
+def run_all_tests():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("=" * 60)
+    print("ANN INDEX BENCHMARK")
+    print("=" * 60)
+    for nprobe in (4, 8, 16):
+        r = benchmark(size=size, nprobe=nprobe)
+        print(
+            f"size={r['size']} nlist={r['nlist']} nprobe={r['nprobe']}: "
+            f"recall@1={r['recall_at_1']:.3f} "
+            f"exact={r['exact_ms_per_query']:.3f}ms ivf={r['ivf_ms_per_query']:.3f}ms "
+            f"(build {r['build_ms']:.0f}ms)"
+        )
+    test_ivf_incremental_and_persistence()
+    test_gallery_delta_and_switch()
+    test_concurrent_saves_and_throttle()
+    print("Incremental update, persistence and gallery tests passed")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,242 @@
+"""
+Command Channel Tests
+Long-poll delivery, reconnect backoff and polling fallback against a stub Cloud
+
+Run with pytest or directly for a latency / request volume comparison:
+    python tests/test_command_channel.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from edge.app.cloud_client import CloudClient
+from edge.app.command_channel import CommandChannel
+from edge.app.error_store import ErrorStore
+from app.services.sync import SyncService
+from config.settings import settings
+from tests.test_uploader import EDGE_KEY, EDGE_SECRET
+
+
+class CommandCloud:
+    """Cloud stand-in holding long-poll requests until a command is issued"""
+
+    def __init__(self, long_poll: bool = True, fail_first: int = 0, hold: bool = True):
+        self.long_poll = long_poll
+        self.hold = hold
+        self.fail_first = fail_first
+        self.commands = []
+        self.requests = 0
+        self.acks = []
+        self.closed = False
+        self.changed = threading.Condition()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, data=None):
+                body = json.dumps(data).encode() if data is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with stub.changed:
+                    stub.requests += 1
+                    request_no = stub.requests
+                if url.path != '/api/v1/edges/commands/poll' or not stub.long_poll:
+                    return self.reply(404, {'message': 'Not found'})
+                if request_no <= stub.fail_first:
+                    return self.reply(503, {'message': 'Unavailable'})
+
+                query = parse_qs(url.query)
+                cursor = int(query.get('cursor', ['0'])[0])
+                deadline = time.monotonic() + (float(query.get('wait', ['25'])[0]) if stub.hold else 0)
+                with stub.changed:
+                    while len(stub.commands) <= cursor and time.monotonic() < deadline and not stub.closed:
+                        stub.changed.wait(deadline - time.monotonic())
+                    if stub.closed:
+                        return  # The client is gone; answering would only hit a closed socket
+                    commands = stub.commands[cursor:]
+                self.reply(200, {'commands': commands, 'cursor': str(cursor + len(commands))})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.acks.append(self.path)
+                self.reply(200, {'ok': True})
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def issue(self, command_type: str):
+        with self.changed:
+            self.commands.append({'id': len(self.commands) + 1, 'command_type': command_type,
+                                  'issued_at': time.monotonic()})
+            self.changed.notify_all()
+
+    def close(self):
+        # Release held long polls so no handler outlives the test
+        with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+async def run_channel(stub: CommandCloud, seconds: float, issue_at=(), poll=None, **options):
+    """Run a channel for a while, returning it and the delivery latency of each command"""
+    with tempfile.TemporaryDirectory() as tmp:
+        client = CloudClient(stub.url, EDGE_KEY, EDGE_SECRET, ErrorStore(Path(tmp)))
+        latencies = []
+
+        async def handler(command):
+            latencies.append(time.monotonic() - command['issued_at'])
+            await client.acknowledge_command(command['id'], 'completed')
+
+        channel = CommandChannel(client.long_poll_commands, handler, poll=poll, **options)
+        await channel.start()
+        start = time.monotonic()
+        for at in issue_at:
+            await asyncio.sleep(max(0.0, start + at - time.monotonic()))
+            stub.issue('sync-config')
+        await asyncio.sleep(max(0.0, start + seconds - time.monotonic()))
+        await channel.stop()
+        await client.disconnect()
+        return channel, latencies
+
+
+def test_long_poll_delivers_immediately():
+    stub = CommandCloud()
+    try:
+        channel, latencies = asyncio.run(run_channel(stub, 2.0, issue_at=(0.5, 1.0, 1.1), wait=10))
+        assert len(latencies) == 3 and max(latencies) < 0.5
+        assert len(stub.acks) == 3
+        # Idle time is spent inside held requests, not in repeated polls
+        assert channel.get_stats()['requests'] <= 4
+    finally:
+        stub.close()
+
+
+def test_reconnects_with_backoff():
+    stub = CommandCloud(fail_first=3)
+    try:
+        channel, latencies = asyncio.run(run_channel(stub, 2.0, issue_at=(1.5,), wait=5, backoff_base=0.05))
+        stats = channel.get_stats()
+        assert stats['errors'] == 3 and stats['reconnects'] == 1
+        assert len(latencies) == 1
+    finally:
+        stub.close()
+
+
+def test_falls_back_to_adaptive_polling():
+    stub = CommandCloud(long_poll=False)
+    polls = []
+
+    async def poll():
+        polls.append(time.monotonic())
+        return [{'id': 'first', 'issued_at': time.monotonic()}] if len(polls) == 1 else []
+
+    try:
+        channel, latencies = asyncio.run(
+            run_channel(stub, 1.5, poll=poll, wait=5, min_interval=0.05, max_interval=0.4)
+        )
+        assert channel.mode == 'polling' and len(latencies) == 1
+        gaps = [b - a for a, b in zip(polls, polls[1:])]
+        assert gaps[-1] > gaps[0] * 3, "idle polling backs off"
+        assert channel.poll_interval == 0.4
+    finally:
+        stub.close()
+
+
+def test_unheld_polls_back_off():
+    # A Cloud answering at once (the Laravel endpoint does) is polled adaptively
+    stub = CommandCloud(hold=False)
+    try:
+        channel, latencies = asyncio.run(
+            run_channel(stub, 1.5, issue_at=(0.1,), wait=5, min_interval=0.05, max_interval=0.4)
+        )
+        assert len(latencies) == 1 and len(stub.acks) == 1
+        assert channel.mode == 'long_poll' and channel.poll_interval == 0.4
+        assert channel.get_stats()['requests'] < 12
+    finally:
+        stub.close()
+
+
+def test_sync_service_runs_commands():
+    class Cloud:
+        acks = []
+
+        async def acknowledge_command(self, edge_id, command_id, status, result):
+            self.acks.append((command_id, status, result.get('success')))
+
+    async def run(service):
+        restarts, syncs = [], []
+
+        async def restart():
+            restarts.append(True)
+
+        async def sync():
+            syncs.append(True)
+            return len(syncs) == 1
+
+        service._schedule_restart = restart
+        service._sync_configuration = sync
+        service._edge_id = lambda: 'edge-1'
+        for command_id, command_type in ((1, 'restart'), (2, 'sync_config'), (3, 'sync-config'), (4, 'open_gate')):
+            await service._handle_command({'id': command_id, 'command_type': command_type})
+        await asyncio.sleep(0)
+        return restarts, syncs
+
+    data_dir = settings.DATA_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATA_DIR = tmp
+        try:
+            service = SyncService(Cloud())
+            restarts, syncs = asyncio.run(run(service))
+            service.offline_queue.close()
+        finally:
+            settings.DATA_DIR = data_dir
+
+    assert restarts == [True] and len(syncs) == 2
+    assert Cloud.acks == [(1, 'completed', True), (2, 'completed', True),
+                          (3, 'failed', False), (4, 'acknowledged', None)]
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("COMMAND CHANNEL TESTS")
+    print("=" * 60)
+    for test in (test_long_poll_delivers_immediately, test_reconnects_with_backoff,
+                 test_falls_back_to_adaptive_polling, test_unheld_polls_back_off,
+                 test_sync_service_runs_commands):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+    # 10 idle seconds with one command: long-poll vs the old fixed 1 s / 60 s polls
+    stub = CommandCloud()
+    try:
+        channel, latencies = asyncio.run(run_channel(stub, 10.0, issue_at=(4.0,), wait=25))
+        print(f"\nlong-poll: {channel.get_stats()['requests']} requests in 10s, "
+              f"command latency {latencies[0] * 1000:.0f} ms "
+              f"(fixed polling: 10 requests at 1s / up to 60s latency at 60s)")
+    finally:
+        stub.close()
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,164 @@
+"""
+Delta Sync Tests
+ETag / since= collection sync and incremental camera database updates
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from edge.app.camera_sync import CameraSyncService
+from edge.app.delta_sync import DeltaCollection
+from edge.app.cloud_client import CloudClient
+from edge.app.config_store import ConfigStore
+from edge.app.error_store import ErrorStore
+from edge.app.status_service import StatusService
+from tests.test_uploader import EDGE_KEY, EDGE_SECRET
+
+
+class CameraCloud:
+    """Cloud stand-in serving /api/v1/edges/cameras with an ETag"""
+
+    def __init__(self, cameras):
+        self.cameras = cameras
+        self.responses = []  # status codes sent
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = json.dumps({'cameras': stub.cameras, 'count': len(stub.cameras)}).encode()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    stub.responses.append(304)
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                stub.responses.append(200)
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def camera(camera_id: str, name: str = None):
+    return {'id': camera_id, 'camera_id': camera_id, 'name': name or camera_id, 'status': 'online', 'config': {}}
+
+
+def test_full_lists_are_diffed():
+    faces = DeltaCollection('faces')
+    first = faces.apply(200, {'faces': [{'id': 1, 'e': [0.1]}, {'id': 2, 'e': [0.2]}]})
+    assert first['full'] and len(first['upserts']) == 2 and first['version'] == 1
+
+    assert faces.apply(200, {'faces': [{'id': 1, 'e': [0.1]}, {'id': 2, 'e': [0.2]}]}) is None
+    assert faces.apply(304, None) is None
+
+    changes = faces.apply(200, {'faces': [{'id': 2, 'e': [0.3]}, {'id': 3, 'e': [0.4]}]})
+    assert [f['id'] for f in changes['upserts']] == [2, 3] and changes['removed'] == [1]
+    assert changes['base_version'] == 1 and changes['version'] == 2
+    assert faces.get_stats()['not_modified'] == 1
+
+
+def test_delta_responses_use_the_cursor():
+    faces = DeltaCollection('faces')
+    faces.apply(200, {'faces': [{'id': i} for i in range(5)], 'cursor': 'c1'}, {'ETag': '"v1"'})
+    assert faces.request_params() == {'since': 'c1'}
+    assert faces.request_headers() == {'If-None-Match': '"v1"'}
+
+    changes = faces.apply(200, {'delta': True, 'faces': [{'id': 9}], 'deleted': [0, 42], 'cursor': 'c2'})
+    assert not changes['full'] and changes['removed'] == [0]
+    assert sorted(faces.records) == [1, 2, 3, 4, 9] and faces.cursor == 'c2'
+
+
+def test_camera_sync_is_incremental():
+    async def run(stub, tmp):
+        client = CloudClient(stub.url, EDGE_KEY, EDGE_SECRET, ErrorStore(Path(tmp) / 'logs'))
+        service = CameraSyncService(ConfigStore(Path(tmp) / 'config'), client, StatusService(),
+                                    client.error_store, data_dir=Path(tmp) / 'data')
+
+        # Rows left from an earlier run that the Cloud no longer has are removed
+        conn = sqlite3.connect(service.db_file)
+        conn.execute("INSERT INTO cameras (camera_id, name) VALUES ('stale', 'stale')")
+        conn.commit()
+        conn.close()
+
+        assert await service.sync_cameras()
+        assert sorted(c['camera_id'] for c in service.get_cameras()) == ['cam-1', 'cam-2']
+        row_ids = {c['camera_id']: c['id'] for c in service.get_cameras()}
+
+        assert await service.sync_cameras()  # unchanged: 304, no writes
+
+        stub.cameras = [camera('cam-2', 'Gate'), camera('cam-3')]
+        assert await service.sync_cameras()
+        cameras = {c['camera_id']: c for c in service.get_cameras()}
+        await client.disconnect()
+        return cameras, row_ids
+
+    stub = CameraCloud([camera('cam-1'), camera('cam-2')])
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cameras, row_ids = asyncio.run(run(stub, tmp))
+        assert stub.responses == [200, 304, 200]
+        assert sorted(cameras) == ['cam-2', 'cam-3'] and cameras['cam-2']['name'] == 'Gate'
+        assert cameras['cam-2']['id'] == row_ids['cam-2'], "changed rows are updated in place"
+    finally:
+        stub.close()
+
+
+def test_empty_cloud_list_clears_stale_rows():
+    """A fresh process whose Cloud has no cameras still removes rows from earlier runs"""
+    async def run(stub, tmp):
+        client = CloudClient(stub.url, EDGE_KEY, EDGE_SECRET, ErrorStore(Path(tmp) / 'logs'))
+        service = CameraSyncService(ConfigStore(Path(tmp) / 'config'), client, StatusService(),
+                                    client.error_store, data_dir=Path(tmp) / 'data')
+        conn = sqlite3.connect(service.db_file)
+        conn.execute("INSERT INTO cameras (camera_id, name) VALUES ('stale', 'stale')")
+        conn.commit()
+        conn.close()
+
+        assert await service.sync_cameras()
+        cameras = service.get_cameras()
+        await client.disconnect()
+        return cameras
+
+    stub = CameraCloud([])
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            assert asyncio.run(run(stub, tmp)) == []
+    finally:
+        stub.close()
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("DELTA SYNC TESTS")
+    print("=" * 60)
+    for test in (test_full_lists_are_diffed, test_delta_responses_use_the_cursor, test_camera_sync_is_incremental,
+                 test_empty_cloud_list_clears_stale_rows):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,131 @@
+"""
+Metrics Tests
+Fixed-bucket histograms, Prometheus text output and process_frame timing
+"""
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.metrics import AI_MODULE_LATENCY, MetricsRegistry
+from app.ai.base import BaseAIModule
+from app.ai.workers import _merge_stats
+
+
+class SleepyModule(BaseAIModule):
+    def __init__(self):
+        super().__init__("test_sleepy", "Sleepy")
+
+    def initialize(self) -> bool:
+        return True
+
+    def process_frame(self, frame, camera_id, metadata=None):
+        time.sleep(0.003)
+        return {'detections': [], 'events': [], 'alerts': []}
+
+
+def test_histogram_buckets_and_text():
+    registry = MetricsRegistry()
+    latency = registry.histogram("t_seconds", "Test latency", ("stage",), buckets=(0.01, 0.1, 1.0))
+    requests = registry.counter("t_requests_total", "Test requests", ("lane", "status"))
+    tracking = latency.labels("tracking")
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        tracking.observe(value)
+    requests.labels("events", 200).inc()
+
+    assert list(tracking.counts) == [1, 2, 1, 1]
+    assert tracking.quantile(0.5) == 0.1 and tracking.quantile(0.95) == 1.0
+    assert latency.labels("tracking") is tracking, "children are cached"
+
+    text = registry.render({"outbox": {"queued": 3, "running": True, "mode": "long_poll"}})
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{stage="tracking",le="0.1"} 3' in text
+    assert 't_seconds_bucket{stage="tracking",le="+Inf"} 5' in text
+    assert 't_seconds_count{stage="tracking"} 5' in text
+    assert 't_requests_total{lane="events",status="200"} 1' in text
+    assert 'edge_outbox_queued 3' in text and 'edge_outbox_running 1' in text
+    assert 'mode' not in text, "non-numeric stats are not exported"
+
+    summary = registry.summary()
+    assert summary["t_seconds"]["tracking"] == {"count": 5, "p50_ms": 100.0, "p95_ms": 1000.0}
+
+
+def test_per_camera_stats_are_labels():
+    text = MetricsRegistry().render({
+        "governor": {"total_fps": 9.5, "cameras": {"cam-1": {"fps": 5, "static": False}, "cam-2": {"fps": 4.5}}},
+        "inference": {"motion": {"cam-1": {"market": 0.25}}},
+    })
+    assert 'edge_governor_total_fps 9.5' in text
+    assert text.count('# TYPE edge_governor_cameras_fps gauge') == 1
+    assert 'edge_governor_cameras_fps{camera="cam-1"} 5' in text
+    assert 'edge_governor_cameras_fps{camera="cam-2"} 4.5' in text
+    assert 'edge_governor_cameras_static{camera="cam-1"} 0' in text
+    assert 'edge_inference_motion{camera="cam-1",module="market"} 0.25' in text
+    assert 'cam_1' not in text, "camera ids never become part of a metric name"
+
+
+def test_process_frame_is_timed():
+    module = SleepyModule()
+    series = AI_MODULE_LATENCY.labels("test_sleepy")
+    before = series.count
+    for _ in range(5):
+        module.process_frame(None, "cam")
+    assert series.count == before + 5
+    assert series.quantile(0.5) >= 0.0025
+
+
+def test_observe_overhead():
+    child = MetricsRegistry().histogram("o_seconds", "Overhead").labels()
+    start = time.perf_counter()
+    for _ in range(100000):
+        child.observe(0.012)
+    per_sample = (time.perf_counter() - start) / 100000
+    print(f"\nhistogram observe: {per_sample * 1e9:.0f} ns")
+    assert child.count == 100000
+    assert per_sample < 20e-6
+
+
+def test_worker_stats_are_merged():
+    """Process mode reports one set of module stats summed over the workers"""
+    merged = _merge_stats([
+        {'frames': 10, 'cameras': 1, 'active_tracks': {'a': 2}, 'detection_interval': 3, 'enabled': True},
+        {'frames': 5, 'cameras': 2, 'active_tracks': {'b': 1, 'c': 0}, 'detection_interval': 3, 'enabled': True},
+    ])
+    assert merged == {'frames': 15, 'cameras': 3, 'active_tracks': {'a': 2, 'b': 1, 'c': 0},
+                      'detection_interval': 3, 'enabled': True}
+
+
+def test_worker_histograms_are_merged():
+    """Snapshots pushed by AI worker processes add to the server's own series"""
+    server, worker = MetricsRegistry(), MetricsRegistry()
+    for registry, values in ((server, (0.005,)), (worker, (0.05, 0.05, 0.5))):
+        latency = registry.histogram("m_seconds", "Module latency", ("module",), buckets=(0.01, 0.1, 1.0))
+        for value in values:
+            latency.labels("market").observe(value)
+
+    server.merge_remote("ai-worker-0", pickle.loads(pickle.dumps(worker.snapshot())))
+    text = server.render()
+    assert 'm_seconds_bucket{module="market",le="0.1"} 3' in text
+    assert 'm_seconds_count{module="market"} 4' in text
+    assert server.summary()["m_seconds"]["market"] == {"count": 4, "p50_ms": 100.0, "p95_ms": 1000.0}
+
+    # Snapshots are cumulative: a newer one replaces the last one from that worker
+    worker.histogram("m_seconds", "Module latency", ("module",)).labels("market").observe(0.05)
+    server.merge_remote("ai-worker-0", worker.snapshot())
+    assert server.summary()["m_seconds"]["market"]["count"] == 5
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("METRICS TESTS")
+    print("=" * 60)
+    for test in (test_histogram_buckets_and_text, test_per_camera_stats_are_labels, test_process_frame_is_timed,
+                 test_observe_overhead, test_worker_stats_are_merged, test_worker_histograms_are_merged):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
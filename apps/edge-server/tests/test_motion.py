@@ -0,0 +1,73 @@
+"""
+Motion Tests
+One motion pass per frame in the governor, reused by the motion gate
+"""
+import os
+import pickle
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ai.motion import MotionEstimator, MotionGate, MotionMap
+from app.services.governor import FrameRateGovernor
+
+
+class GatedModule:
+    motion_gated = True
+    motion_threshold = None
+
+    def motion_roi(self, camera_id, metadata=None):
+        return [[0, 0, 160, 120]]  # top-left quarter
+
+
+def frames(count: int, moving: bool):
+    """640x480 frames, optionally with a square moving through the top-left quarter"""
+    for i in range(count):
+        frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+        if moving:
+            frame[20:80, 10 + 10 * i:70 + 10 * i] = 220
+        yield frame
+
+
+def test_gate_reuses_governor_map():
+    governor = FrameRateGovernor()
+    gate = MotionGate(max_skip=100)
+    decisions = []
+    for moving in (False, True):
+        for frame in frames(4, moving):
+            motion = governor.observe_frame('cam', frame)
+            assert gate.update('cam', frame, motion) is motion
+            decisions.append(gate.should_run('cam', 'market', GatedModule(), motion))
+
+    assert not gate.estimator._backgrounds, "the gate never computed its own map"
+    assert decisions == [True, False, False, False, True, True, True, True]
+    assert governor.motion_map('cam') is motion and governor.get_camera_state('cam')['motion'] > 0
+    assert gate.get_stats()['cameras']['cam']['frames'] == 8
+
+
+def test_map_pickles_packed():
+    estimator = MotionEstimator()
+    for frame in frames(3, True):
+        motion = estimator.update('cam', frame)
+    data = pickle.dumps(motion)
+    copy = pickle.loads(data)
+    assert len(data) < motion._integral.nbytes / 10
+    assert copy.shape == motion.shape and copy.scale == motion.scale
+    assert copy.energy() == motion.energy() > 0
+    assert copy.energy([0, 0, 160, 120]) == motion.energy([0, 0, 160, 120])
+    assert pickle.loads(pickle.dumps(MotionMap.full())).energy() == 1.0
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("MOTION TESTS")
+    print("=" * 60)
+    for test in (test_gate_reuses_governor_map, test_map_pickles_packed):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,131 @@
+"""
+Event Outbox Tests
+Backpressure policy and decoupling of frame processing from cloud latency
+"""
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.database import encode_json
+from app.services.outbox import EventOutbox, strip_images
+from app.services.uploader import EventUploadPipeline
+from tests.test_uploader import StubCloud, make_db, make_items
+
+
+class NullUploader:
+    batch_size = 10
+    max_in_flight = 1
+
+    async def send(self, items):
+        return len(items)
+
+
+def test_overflow_drops_info_then_spills():
+    spilled = []
+    outbox = EventOutbox(NullUploader(), spill=spilled.extend, max_items=10, workers=1)
+
+    for i in range(10):
+        outbox.put('event', {'n': i, 'severity': 'info'})
+    for i in range(5):
+        outbox.put('alert', {'n': i, 'severity': 'critical'})
+    stats = outbox.get_stats()
+    assert stats['depth'] == 10 and stats['dropped_info'] == 5 and not spilled
+
+    for i in range(5, 15):
+        outbox.put('alert', {'n': i, 'severity': 'critical'})
+    stats = outbox.get_stats()
+    assert stats['dropped_info'] == 10, "info events go first"
+    assert [item['data']['n'] for item in spilled] == list(range(5)), "oldest alerts spill, in order"
+    assert all(item['timestamp'] for item in spilled), "spilled items keep their enqueue time"
+    assert stats['depth'] == 10 and stats['depth_info'] == 0
+
+
+def test_put_latency_independent_of_cloud():
+    async def run(stub):
+        db = make_db(stub)
+        spilled = []
+        uploader = EventUploadPipeline(db, edge_id='edge-test', batch_size=20)
+        outbox = EventOutbox(uploader, spill=spilled.extend, max_items=1000, workers=2, batch_wait_ms=20)
+        await outbox.start()
+
+        worst = 0.0
+        for item in make_items(200):
+            start = time.perf_counter()
+            outbox.put(item['type'], item['data'])
+            worst = max(worst, time.perf_counter() - start)
+            await asyncio.sleep(0.001)  # frames keep coming while uploads are slow
+
+        for _ in range(100):
+            if not len(outbox) and outbox.get_stats()['delivered'] == 200:
+                break
+            await asyncio.sleep(0.05)
+        await outbox.stop()
+        await db.disconnect()
+        return worst, outbox.get_stats(), spilled
+
+    stub = StubCloud(latency=0.25)
+    try:
+        worst, stats, spilled = asyncio.run(run(stub))
+        print(f"\nworst put() {worst * 1e6:.0f} us with 250 ms cloud latency: {stats}")
+        assert worst < 0.005
+        assert stats['delivered'] == 200 and not spilled
+        assert sorted(e['meta']['n'] for e in stub.events) == list(range(200))
+    finally:
+        stub.close()
+
+
+def test_failed_uploads_spill_to_offline_queue():
+    async def run(stub):
+        db = make_db(stub)
+        spilled = []
+        outbox = EventOutbox(EventUploadPipeline(db, edge_id='edge-test'), spill=spilled.extend, workers=1, batch_wait_ms=10)
+        await outbox.start()
+        for item in make_items(30):
+            outbox.put(item['type'], item['data'])
+        await asyncio.sleep(0.5)
+        await outbox.stop()
+        await db.disconnect()
+        return spilled, outbox.get_stats()
+
+    stub = StubCloud(fail_batch=1)
+    try:
+        spilled, stats = asyncio.run(run(stub))
+        assert [item['data']['metadata']['n'] for item in spilled] == list(range(30))
+        assert stats['upload_failures'] == 1 and stats['spilled'] == 30
+    finally:
+        stub.close()
+
+
+def test_image_arrays_stay_small():
+    """A market event carrying a 720p snapshot uploads as a few hundred bytes"""
+    snapshot = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    event = {
+        'camera_id': 'cam-1', 'type': 'suspicious_behavior', 'severity': 'high',
+        'metadata': {'risk_score': np.float32(0.75), 'bbox': np.array([10, 20, 30, 40]), 'snapshot': snapshot,
+                     'frames': [snapshot]},
+    }
+    data = strip_images(event)
+    assert 'snapshot' not in data['metadata'] and data['metadata']['frames'] == []
+    assert data['metadata']['bbox'] == [10, 20, 30, 40] and data['metadata']['risk_score'] == 0.75
+
+    assert len(encode_json(data)) < 512
+    assert len(encode_json(event)) < 4096, "a stray array is sent as its short repr, not a nested list"
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("EVENT OUTBOX TESTS")
+    print("=" * 60)
+    for test in (test_overflow_drops_info_then_spills, test_put_latency_independent_of_cloud,
+                 test_failed_uploads_spill_to_offline_queue, test_image_arrays_stay_small):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
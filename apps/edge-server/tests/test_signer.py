@@ -0,0 +1,84 @@
+"""
+HMAC Signer Tests
+Cached key state, single serialization, and a signing benchmark
+
+Run with pytest or directly for the benchmark:
+    python tests/test_signer.py [requests]
+"""
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.database import encode_json, get_signer
+
+EDGE_KEY = 'edge-key'
+EDGE_SECRET = 'edge-secret'
+
+PAYLOAD = {
+    'edge_id': 'edge-test', 'camera_id': 'cam-1', 'event_type': 'person_detected',
+    'severity': 'info', 'occurred_at': '2026-01-01T00:00:00',
+    'meta': {'confidence': 0.91, 'bbox': [10, 20, 30, 40], 'label': 'شخص'},
+}
+
+
+def reference_signature(method: str, path: str, body: bytes, timestamp: int) -> str:
+    message = f"{method}|{path}|{timestamp}|{hashlib.sha256(body).hexdigest()}"
+    return hmac.new(EDGE_SECRET.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def test_cached_signer_matches_reference():
+    signer = get_signer(EDGE_KEY, EDGE_SECRET)
+    assert get_signer(EDGE_KEY, EDGE_SECRET) is signer
+    assert get_signer(EDGE_KEY, 'other-secret') is not signer
+
+    for body in (b"", b'{"a":1}', os.urandom(4096)):
+        headers = signer.generate_signature('POST', '/api/v1/edges/events', body, timestamp=1700000000)
+        assert headers['X-EDGE-SIGNATURE'] == reference_signature('POST', '/api/v1/edges/events', body, 1700000000)
+
+
+def test_sign_json_signs_the_sent_bytes():
+    body, headers = get_signer(EDGE_KEY, EDGE_SECRET).sign_json('POST', '/api/v1/edges/events', PAYLOAD, timestamp=1700000000)
+    assert json.loads(body) == PAYLOAD
+    assert headers['X-EDGE-SIGNATURE'] == reference_signature('POST', '/api/v1/edges/events', body, 1700000000)
+
+
+def test_encode_json_fallbacks():
+    from datetime import datetime
+    from decimal import Decimal
+    decoded = json.loads(encode_json({'when': datetime(2026, 1, 1), 'amount': Decimal('1.5'), 1: 'x', 'big': 2 ** 70}))
+    assert decoded['amount'] == '1.5' and decoded['1'] == 'x' and decoded['big'] == 2 ** 70
+    assert decoded['when'].startswith('2026-01-01')
+
+
+def run_all_tests():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print("=" * 60)
+    print("HMAC SIGNER TESTS")
+    print("=" * 60)
+    for test in (test_cached_signer_matches_reference, test_sign_json_signs_the_sent_bytes, test_encode_json_fallbacks):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+    # Old path: new signer per request, body serialized for signing (and again by httpx)
+    start = time.perf_counter()
+    for _ in range(count):
+        body = json.dumps(PAYLOAD, ensure_ascii=False).encode('utf-8')
+        message = f"POST|/api/v1/edges/events|1700000000|{hashlib.sha256(body).hexdigest()}"
+        hmac.new(EDGE_SECRET.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).hexdigest()
+        json.dumps(PAYLOAD).encode('utf-8')
+    old = (time.perf_counter() - start) * 1e6 / count
+
+    start = time.perf_counter()
+    for _ in range(count):
+        get_signer(EDGE_KEY, EDGE_SECRET).sign_json('POST', '/api/v1/edges/events', PAYLOAD, timestamp=1700000000)
+    new = (time.perf_counter() - start) * 1e6 / count
+    print(f"\nper request: {old:.2f} us before, {new:.2f} us now")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,121 @@
+"""
+Track History Tests
+Ring-buffer histories of the market temporal filter and bounded zone histories
+
+Run with pytest or directly:
+    python tests/test_track_history.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ai.modules.market.temporal_filter import HISTORY_SECONDS, STALE_SECONDS, TemporalFilter, TrackHistory
+from app.ai.modules.market.zone_logic import ZoneLogic
+
+
+def person(track_id: int, zones=()):
+    return {'track_id': track_id, 'bbox': [10 * track_id, 20, 40, 100], 'zones': set(zones)}
+
+
+def test_window_age_and_gaps():
+    history = TrackHistory(capacity=64)
+    for t in range(25):
+        history.append(100.0 + t * 0.5, [0, 0, 10, 10], max_gap=1.0)
+    assert history.age() == HISTORY_SECONDS - 0.5, "samples 10s behind the newest left the window"
+    assert history.continuous(now=112.0, recent=3.0)
+
+    assert history.append(114.0, [0, 0, 10, 10], max_gap=1.0) == 2.0
+    assert not history.continuous(now=115.0, recent=3.0), "gap ended less than 3s ago"
+    for t in range(1, 16):
+        history.append(114.0 + t * 0.5, [0, 0, 10, 10], max_gap=1.0)
+    assert not history.continuous(now=121.5, recent=3.0), "gap still inside the 10s window"
+    history.append(122.0, [0, 0, 10, 10], max_gap=1.0)
+    assert history.continuous(now=122.0, recent=3.0), "the sample before the gap left the window"
+
+
+def test_full_buffer_overwrites_oldest():
+    history = TrackHistory(capacity=8)
+    for t in range(20):
+        history.append(t * 0.1, [t, 0, 10, 10], max_gap=1.0)
+    assert len(history) == 8
+    assert abs(history.age() - 0.7) < 1e-9
+    assert history.boxes[(history.end - 1) % 8, 0] == 19
+
+
+def test_filter_drops_stale_tracks():
+    temporal = TemporalFilter(min_tracking_duration=1.0)
+    for t in range(3):
+        for track_id in (1, 2):
+            temporal._update_track_history('cam', track_id, person(track_id, ['shelf_a']), 10.0 + t * 0.5)
+    temporal._update_track_history('cam', 2, person(2), 30.0)
+
+    temporal._cleanup_old_history('cam', 10.0 + STALE_SECONDS + 1.5)
+    assert list(temporal._track_history['cam']) == [2]
+    assert temporal._get_track_age('cam', 1) == 0.0
+    assert not temporal._is_track_continuous('cam', 2, 30.5), "20s without samples is a gap"
+    assert temporal.get_track_summary('cam', 2)['zones_visited'] == ['shelf_a']
+
+
+def test_zone_history_is_bounded():
+    """Overlapping zones are entered once, and a checkout visit outlives the bounded history"""
+    zone_logic = ZoneLogic(history_size=4)
+    zone_logic.process_zones('cam', [person(1, ['checkout'])], [])
+    for _ in range(50):
+        zone_logic.process_zones('cam', [person(1, ['shelf_a', 'shelf_b'])], [])
+    assert sorted(zone_logic._zone_history['cam'][1]) == ['checkout', 'shelf_a', 'shelf_b']
+
+    for i in range(10):
+        zone_logic.process_zones('cam', [person(1, [f'aisle_{i}'])], [])
+    assert len(zone_logic._zone_history['cam'][1]) == 4
+    pick = {'action': 'object_pick', 'track_id': 1, 'shelf_zone': 'shelf_a'}
+    assert zone_logic.process_zones('cam', [person(1, ['exit'])], [pick]) == []
+
+    zone_logic.process_zones('cam', [person(2, ['shelf_a'])], [dict(pick, track_id=2)])
+    events = zone_logic.process_zones('cam', [person(2, ['exit'])], [])
+    assert [e['event'] for e in events] == ['exit_without_checkout']
+
+    zone_logic._expire_tracks('cam', time.monotonic() + zone_logic.track_expiry + 1)
+    assert not zone_logic._zone_history['cam'] and not zone_logic._checkout_status['cam']
+
+
+def test_no_per_frame_growth():
+    """Steady-state frames allocate next to nothing in the temporal and zone stages"""
+    persons = [person(i, ['shelf_a', 'shelf_b'] if i % 2 else ['aisle']) for i in range(20)]
+    temporal, zone_logic = TemporalFilter(), ZoneLogic()
+    for _ in range(300):
+        temporal.filter_interactions('cam', persons, [])
+        zone_logic.process_zones('cam', persons, [])
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for _ in range(300):
+        temporal.filter_interactions('cam', persons, [])
+        zone_logic.process_zones('cam', persons, [])
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"\ngrowth {(current - base) / 300:.0f} B/frame, peak {peak - base} B over baseline")
+    assert current - base < 300 * 64
+    assert peak - base < 64 * 1024
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("TRACK HISTORY TESTS")
+    print("=" * 60)
+    for test in (
+        test_window_age_and_gaps,
+        test_full_buffer_overwrites_oldest,
+        test_filter_drops_stale_tracks,
+        test_zone_history_is_bounded,
+        test_no_per_frame_growth,
+    ):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,211 @@
+"""
+Tracker Benchmark
+Assignment correctness and per-frame cost of the IoU tracker against the greedy SimpleTracker,
+and track propagation between detector passes
+
+Run with pytest or directly:
+    python tests/test_tracker.py
+"""
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ai import tracker as tracker_module
+from app.ai.modules.market.person_tracking import PersonTracker, SimpleTracker
+from app.ai.tracker import CV2_AVAILABLE, IoUTracker, _hungarian, iou_matrix
+
+FRAMES = 100
+
+
+def make_scene(objects: int, frames: int = FRAMES, seed: int = 0):
+    """Boxes of people walking across a 1920x1080 frame, detections in shuffled order"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, [1800, 900], (objects, 2))
+    size = rng.uniform([40, 100], [80, 180], (objects, 2))
+    velocity = rng.normal(0, 4, (objects, 2))
+    scene = []
+    for _ in range(frames):
+        xy = xy + velocity
+        boxes = np.hstack([xy, xy + size, rng.uniform(0.5, 1.0, (objects, 1))])
+        scene.append(boxes[rng.permutation(objects)].tolist())
+    return scene
+
+
+def benchmark(objects: int) -> dict:
+    scene = make_scene(objects)
+    result = {'objects': objects}
+    for name, tracker in (('simple', SimpleTracker()), ('iou', IoUTracker())):
+        start = time.perf_counter()
+        for detections in scene:
+            tracker.update(detections)
+        result[f'{name}_ms_per_frame'] = (time.perf_counter() - start) * 1000 / len(scene)
+    return result
+
+
+def test_iou_matrix_matches_pairwise():
+    a = np.array([[0, 0, 10, 10], [5, 5, 15, 15]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [20, 20, 30, 30], [0, 5, 10, 15]], dtype=np.float32)
+    simple = SimpleTracker()
+    expected = [[simple._calculate_iou(x, y) for y in b] for x in a]
+    assert np.allclose(iou_matrix(a, b), expected)
+
+
+def test_hungarian_is_optimal():
+    """The numpy fallback solver agrees with brute force on small matrices"""
+    rng = np.random.default_rng(1)
+    for rows, cols in ((3, 3), (2, 5), (4, 4), (3, 6)):
+        for _ in range(20):
+            cost = rng.uniform(0, 1, (rows, cols))
+            r, c = _hungarian(cost)
+            best = min(cost[range(rows), list(p)].sum() for p in itertools.permutations(range(cols), rows))
+            assert len(r) == rows and np.isclose(cost[r, c].sum(), best)
+
+
+def test_optimal_assignment_beats_greedy():
+    """Greedy matching hands the first track its best box and starves the second"""
+    previous = [[0, 0, 10, 10, 0.9], [5, 0, 15, 10, 0.9]]
+    current = [[-3, 0, 7, 10, 0.9], [2, 0, 12, 10, 0.9]]
+
+    for scipy_available in (tracker_module.SCIPY_AVAILABLE, False):
+        saved = tracker_module.SCIPY_AVAILABLE
+        tracker_module.SCIPY_AVAILABLE = scipy_available
+        try:
+            tracker = IoUTracker(iou_threshold=0.3)
+            first = tracker.update(previous)
+            second = tracker.update(current)
+        finally:
+            tracker_module.SCIPY_AVAILABLE = saved
+        ids = {tuple(row[:2]): int(row[4]) for row in first}
+        matched = {tuple(row[:2]): int(row[4]) for row in second}
+        assert matched[(-3.0, 0.0)] == ids[(0.0, 0.0)]
+        assert matched[(2.0, 0.0)] == ids[(5.0, 0.0)]
+        assert tracker.next_id == 3, "no track was restarted"
+
+    greedy = SimpleTracker()
+    greedy.update(previous)
+    assert max(row[5] for row in greedy.update(current)) == 3, "greedy restarts a track"
+
+
+def test_ids_stable_and_tracks_expire():
+    scene = make_scene(50, frames=30, seed=2)
+    tracker = IoUTracker(max_age=2)
+    ids = None
+    for detections in scene:
+        frame_ids = set(tracker.update(detections)[:, 4].astype(int).tolist())
+        ids = ids or frame_ids
+        assert frame_ids == ids
+    assert tracker.count == 50
+
+    for _ in range(3):
+        assert len(tracker.update([])) == 0
+    assert tracker.count == 0
+
+
+def test_large_ids_stay_exact():
+    """Ids past 2**24 (a long-running busy camera) do not collide in the output"""
+    tracker = IoUTracker()
+    tracker.next_id = 2 ** 24
+    rows = tracker.update([[0, 0, 10, 10, 0.9], [50, 50, 60, 60, 0.9]])
+    assert rows[:, 4].astype(np.int64).tolist() == [2 ** 24, 2 ** 24 + 1]
+
+
+def textured_frame(boxes, size=(360, 640)):
+    """Black frame with a fixed noise texture pasted into each box"""
+    frame = np.zeros(size + (3,), dtype=np.uint8)
+    for x1, y1, x2, y2 in np.asarray(boxes, dtype=int):
+        texture = np.random.default_rng(x2 - x1).integers(0, 255, (y2 - y1, x2 - x1, 1), dtype=np.uint8)
+        frame[y1:y2, x1:x2] = texture
+    return frame
+
+
+def test_propagation_follows_motion():
+    """Kalman prediction carries constant-velocity tracks between detections"""
+    start = np.array([[100, 100, 160, 250], [400, 80, 450, 220]], dtype=np.float32)
+    velocity = np.array([6, 2, 6, 2], dtype=np.float32)
+    tracker = IoUTracker(coast_decay=0.9)
+    for t in range(6):
+        boxes = start + t * velocity
+        ids = tracker.update(np.hstack([boxes, np.full((2, 1), 0.8)]))[:, 4]
+
+    for t in range(6, 9):
+        rows = tracker.propagate()
+        truth = start + t * velocity
+        assert set(rows[:, 4]) == set(ids)
+        assert np.diag(iou_matrix(rows[:, :4], truth)).min() > 0.8
+    assert np.isclose(tracker.min_quality(), 0.9 ** 3)
+
+
+def test_optical_flow_corrects_propagation():
+    """Flow follows a person who starts moving after the last detection"""
+    if not CV2_AVAILABLE:
+        return
+    box = np.array([[200, 100, 260, 240]], dtype=np.float32)
+    results = {}
+    for flow in (False, True):
+        tracker = IoUTracker(optical_flow=flow)
+        for _ in range(3):
+            tracker.update(np.hstack([box, [[0.9]]]), textured_frame(box))
+        moved = box
+        for _ in range(3):
+            moved = moved + np.array([8, 0, 8, 0], dtype=np.float32)
+            rows = tracker.propagate(textured_frame(moved))
+        results[flow] = iou_matrix(rows[:, :4], moved)[0, 0]
+    print(f"\nIoU after 3 propagated frames: kalman={results[False]:.2f} flow={results[True]:.2f}")
+    assert results[True] > 0.8 > results[False]
+
+
+def test_person_tracker_detects_every_n_frames():
+    """Only every third frame needs a detection; propagated frames keep the ids"""
+    person = PersonTracker(detection_interval=3, min_quality=0.1)
+    keyframes = []
+    for t in range(9):
+        keyframe = person.needs_detection('cam')
+        keyframes.append(keyframe)
+        x = 100 + 5 * t
+        detections = [{'bbox': [x, 100, 60, 150], 'confidence': 0.9}] if keyframe else []
+        persons = person.process_frame(None, 'cam', detections=detections, keyframe=keyframe)
+        assert [p['track_id'] for p in persons] == [1]
+    assert keyframes == [True, False, False] * 3
+
+    strict = PersonTracker(detection_interval=10, min_quality=0.95)
+    strict.process_frame(None, 'cam', detections=[{'bbox': [0, 0, 50, 100], 'confidence': 0.9}])
+    strict.process_frame(None, 'cam', detections=[], keyframe=False)
+    assert strict.needs_detection('cam'), "decayed quality forces an early detection"
+
+
+def test_faster_than_greedy():
+    result = benchmark(200)
+    print(f"\n{result}")
+    assert result['iou_ms_per_frame'] < result['simple_ms_per_frame']
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("TRACKER BENCHMARK")
+    print("=" * 60)
+    print(f"scipy available: {tracker_module.SCIPY_AVAILABLE}")
+    for objects in (10, 50, 200):
+        r = benchmark(objects)
+        print(
+            f"objects={r['objects']}: simple={r['simple_ms_per_frame']:.3f}ms "
+            f"iou={r['iou_ms_per_frame']:.3f}ms per frame"
+        )
+    test_iou_matrix_matches_pairwise()
+    test_hungarian_is_optimal()
+    test_optimal_assignment_beats_greedy()
+    test_ids_stable_and_tracks_expire()
+    test_large_ids_stay_exact()
+    print("Assignment, id stability and expiry tests passed")
+    test_propagation_follows_motion()
+    test_optical_flow_corrects_propagation()
+    test_person_tracker_detects_every_n_frames()
+    print("Propagation tests passed")
+
+
+if __name__ == "__main__":
+    run_all_tests()
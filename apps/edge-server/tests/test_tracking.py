@@ -0,0 +1,115 @@
+"""
+Track Service Tests
+One set of person tracks per camera frame, shared by the person modules
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ai.detector import DetectionSet
+from app.ai.manager import AIModuleManager
+from app.ai.modules.people_counter import PeopleCounterModule
+from app.ai.tracking import TrackService
+from app.ai.zones import points_in_polygon
+from app.tools.benchmark import SyntheticCapture, install_stub_detector, store_zones
+
+ZONES = {'door': [[0, 0], [100, 0], [100, 200], [0, 200]]}
+
+
+def person_set(*boxes, bottle=True):
+    """DetectionSet with person boxes (class 0) and one bottle (class 39)"""
+    rows = [list(b) for b in boxes] + ([[300, 10, 320, 40]] if bottle else [])
+    classes = [0] * len(boxes) + ([39] if bottle else [])
+    return DetectionSet(np.array(rows, dtype=np.float32).reshape(-1, 4),
+                        np.full(len(rows), 0.9), np.array(classes))
+
+
+def test_points_in_polygon():
+    triangle = np.array([[0, 0], [10, 0], [0, 10]], dtype=np.float32)
+    points = np.array([[1, 1], [6, 6], [-1, 2], [4, 5]], dtype=np.float32)
+    assert points_in_polygon(points, triangle).tolist() == [True, False, False, True]
+
+
+def test_service_tracks_zones_and_expiry():
+    service = TrackService(detection_interval=1, max_age=1)
+    tracks = service.update('cam', None, person_set([20, 20, 60, 120], [200, 20, 240, 120]), seq=1, zones=ZONES)
+    assert len(tracks) == 2, "the bottle is not a person"
+    zones = {p['track_id']: p['zones'] for p in tracks.persons}
+    assert sorted(zones.values(), key=len) == [set(), {'door'}]
+    assert service.update('cam', None, person_set(), seq=1) is tracks, "same frame is tracked once"
+
+    moved = service.update('cam', None, person_set([24, 20, 64, 120], [204, 20, 244, 120]), seq=2)
+    assert {p['track_id'] for p in moved.persons} == set(zones)
+    assert moved.persons[0]['velocity'][0] > 0 and moved.persons[0]['zones'] == zones[moved.persons[0]['track_id']]
+
+    service.update('cam', None, person_set(bottle=False), seq=3)
+    gone = service.update('cam', None, person_set(bottle=False), seq=4)
+    assert sorted(gone.ended) == sorted(zones) and not gone.persons
+
+
+def test_service_detection_interval():
+    service = TrackService(detection_interval=3, min_quality=0.1)
+    pattern = []
+    for seq in range(1, 7):
+        keyframe = service.needs_detection('cam')
+        pattern.append(keyframe)
+        detections = person_set([20 + 3 * seq, 20, 60 + 3 * seq, 120])
+        tracks = service.update('cam', None, detections if keyframe else detections.carried_over(), seq=seq)
+        assert [p['track_id'] for p in tracks.persons] == [1]
+        assert tracks.keyframe == keyframe
+    assert pattern == [True, False, False] * 2
+
+
+def test_counter_counts_zone_entries():
+    """A person walking into the door zone and back out counts once each way"""
+    service = TrackService(detection_interval=1)
+    counter = PeopleCounterModule()
+    counter.enabled = counter._initialized = True
+
+    events = []
+    for seq, x in enumerate([105, 95, 85, 75, 65, 75, 85, 95, 105], start=1):
+        box = [x, 20, x + 40, 120]
+        counter.attach_person_tracks(service.update('cam', None, person_set(box), seq=seq, zones=ZONES))
+        events += [e['type'] for e in counter.process_frame(None, 'cam', {'zones': ZONES})['events']]
+    assert events == ['person_entered', 'person_exited']
+    assert counter.get_count('cam') == {'entered': 1, 'exited': 1, 'current': 0}
+
+
+def test_modules_share_track_ids():
+    manager = AIModuleManager()
+    install_stub_detector(manager)
+    manager.enable_modules(['market', 'loitering'])
+    capture = SyntheticCapture(640, 360, people=4, seed=1)
+    metadata = {'zones': store_zones(640, 360)}
+    for _ in range(3):
+        _, frame = capture.retrieve()
+        manager.process_frame(frame, 'cam', ['market', 'loitering'], metadata)
+
+    ids = {p['track_id'] for p in manager.tracks.latest('cam').persons}
+    assert len(ids) == 4
+    assert set(manager.modules['loitering'].tracking_data['cam']) == ids
+    assert set(manager.modules['market']._person_tracker._tracks['cam']) == ids
+    assert manager.get_tracking_stats()['frames'] == 3, "tracking ran once per frame"
+    manager.cleanup()
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("TRACK SERVICE TESTS")
+    print("=" * 60)
+    for test in (
+        test_points_in_polygon,
+        test_service_tracks_zones_and_expiry,
+        test_service_detection_interval,
+        test_counter_counts_zone_entries,
+        test_modules_share_track_ids,
+    ):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
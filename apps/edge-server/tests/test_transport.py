@@ -0,0 +1,79 @@
+"""
+Cloud Transport Tests
+Per-lane connection pools and the shared transport registry
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.database import CloudDatabase, TransportOptions, get_transport, release_transport
+from tests.test_uploader import EDGE_KEY, EDGE_SECRET, StubCloud
+
+EVENT = {'camera_id': 'cam-1', 'type': 'person_detected', 'severity': 'info'}
+
+
+def test_upload_burst_does_not_delay_heartbeat_lane():
+    async def run(stub):
+        db = CloudDatabase()
+        db._headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        db._edge_key, db._edge_secret = EDGE_KEY, EDGE_SECRET
+        db._retry_count = 1
+        db._transport = get_transport(stub.url, TransportOptions(max_connections=2, pool_timeout=10))
+        db.client = db._transport.client()
+
+        async def timed(lane):
+            start = time.perf_counter()
+            success, _ = await db._request('POST', '/api/v1/edges/events', json=EVENT, lane=lane)
+            return success, time.perf_counter() - start
+
+        uploads = [asyncio.create_task(timed('events')) for _ in range(8)]
+        await asyncio.sleep(0.05)
+        heartbeat = await timed('heartbeat')
+        results = await asyncio.gather(*uploads)
+        await db.disconnect()
+        return heartbeat, results
+
+    stub = StubCloud(latency=0.3)
+    try:
+        (success, heartbeat_time), uploads = asyncio.run(run(stub))
+        assert success and all(ok for ok, _ in uploads)
+        # 8 uploads over 2 events connections take 4 round trips; the heartbeat needs one
+        assert max(t for _, t in uploads) > 1.0
+        assert heartbeat_time < 0.6
+    finally:
+        stub.close()
+
+
+def test_transport_is_shared_until_last_release():
+    async def run():
+        first = get_transport('http://cloud.invalid/')
+        second = get_transport('http://cloud.invalid')
+        assert first is second
+        client = first.client('events')
+        assert first.client('events') is client and first.client('heartbeat') is not client
+
+        await release_transport(first)
+        assert not client.is_closed
+        await release_transport(second)
+        assert client.is_closed
+        third = get_transport('http://cloud.invalid')
+        assert third is not first
+        await release_transport(third)
+
+    asyncio.run(run())
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("CLOUD TRANSPORT TESTS")
+    print("=" * 60)
+    for test in (test_upload_burst_does_not_delay_heartbeat_lane, test_transport_is_shared_until_last_release):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
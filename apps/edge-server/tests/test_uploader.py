@@ -0,0 +1,190 @@
+"""
+Event Upload Pipeline Tests
+Batched uploads against a local stub Cloud server
+
+Run with pytest or directly for a throughput comparison:
+    python tests/test_uploader.py [events]
+"""
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.database import CloudDatabase
+from app.services.uploader import EventUploadPipeline
+
+EDGE_KEY = 'edge-key'
+EDGE_SECRET = 'edge-secret'
+
+
+class StubCloud:
+    """Cloud stand-in that verifies signatures and records received events"""
+
+    def __init__(self, batch_endpoint: bool = True, fail_batch: int = 0, latency: float = 0.005):
+        self.batch_endpoint = batch_endpoint
+        self.fail_batch = fail_batch  # answer 500 to the n-th batch (1-based)
+        self.latency = latency
+        self.events = []
+        self.requests = 0
+        self.batches = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(stub.latency)
+                status, events = stub.handle(self.command, self.path, self.headers, body)
+                with stub.lock:
+                    stub.requests += 1
+                    stub.events.extend(events)
+                response = json.dumps({'id': 1}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, method, path, headers, body):
+        # Signature covers the bytes on the wire (compressed for batches)
+        message = f"{method}|{path}|{headers['X-EDGE-TIMESTAMP']}|{hashlib.sha256(body).hexdigest()}"
+        expected = hmac.new(EDGE_SECRET.encode(), message.encode(), hashlib.sha256).hexdigest()
+        if headers.get('X-EDGE-SIGNATURE') != expected:
+            return 401, []
+
+        if path == '/api/v1/edges/events/batch':
+            if not self.batch_endpoint:
+                return 404, []
+            with self.lock:
+                self.batches += 1
+                batch_no = self.batches
+            if batch_no == self.fail_batch:
+                return 500, []
+            assert headers.get('Content-Encoding') == 'gzip'
+            return 200, json.loads(gzip.decompress(body))['events']
+        if path == '/api/v1/edges/events':
+            return 201, [json.loads(body)]
+        return 404, []
+
+    def close(self):
+        self.server.shutdown()
+
+
+def make_db(stub: StubCloud) -> CloudDatabase:
+    db = CloudDatabase()
+    db._headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+    db.client = httpx.AsyncClient(base_url=stub.url, timeout=10.0)
+    db._edge_key, db._edge_secret = EDGE_KEY, EDGE_SECRET
+    db._retry_count = 1
+    return db
+
+
+def make_items(count: int):
+    return [
+        {'type': 'alert' if i % 10 == 0 else 'event', 'data': {
+            'camera_id': f'cam-{i % 4}',
+            'type': 'person_detected',
+            'severity': 'info',
+            'metadata': {'n': i, 'confidence': 0.9, 'bbox': [10, 20, 30, 40]},
+        }}
+        for i in range(count)
+    ]
+
+
+async def _upload(stub: StubCloud, items, **kwargs) -> int:
+    db = make_db(stub)
+    try:
+        pipeline = EventUploadPipeline(db, edge_id='edge-test', **kwargs)
+        return await pipeline.send(items)
+    finally:
+        await db.disconnect()
+
+
+def test_batches_preserve_order():
+    stub = StubCloud()
+    try:
+        items = make_items(1000)
+        delivered = asyncio.run(_upload(stub, items, batch_size=100))
+        assert delivered == 1000
+        assert stub.requests == 10
+        assert sorted(e['meta']['n'] for e in stub.events) == list(range(1000))
+    finally:
+        stub.close()
+
+
+def test_queued_time_is_occurred_at():
+    stub = StubCloud()
+    try:
+        items = make_items(2)
+        items[0]['timestamp'] = '2026-01-02T03:04:05'
+        items[1]['data']['occurred_at'] = '2026-01-01T00:00:00'
+        items[1]['timestamp'] = '2026-01-02T03:04:05'
+        assert asyncio.run(_upload(stub, items)) == 2
+        assert [e['occurred_at'] for e in stub.events] == ['2026-01-02T03:04:05', '2026-01-01T00:00:00']
+    finally:
+        stub.close()
+
+
+def test_stops_at_first_failed_batch():
+    stub = StubCloud(fail_batch=3)
+    try:
+        delivered = asyncio.run(_upload(stub, make_items(1000), batch_size=100, max_in_flight=1))
+        assert delivered == 200
+    finally:
+        stub.close()
+
+
+def test_single_event_fallback():
+    stub = StubCloud(batch_endpoint=False, latency=0)
+    try:
+        delivered = asyncio.run(_upload(stub, make_items(50), batch_size=20))
+        assert delivered == 50
+        assert [e['meta']['n'] for e in stub.events] == list(range(50))
+    finally:
+        stub.close()
+
+
+def run_all_tests():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print("=" * 60)
+    print("EVENT UPLOAD PIPELINE TESTS")
+    print("=" * 60)
+    for test in (test_batches_preserve_order, test_queued_time_is_occurred_at, test_stops_at_first_failed_batch,
+                 test_single_event_fallback):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+    items = make_items(count)
+    for label, batch_endpoint in (("single events", False), ("batched", True)):
+        stub = StubCloud(batch_endpoint=batch_endpoint)
+        try:
+            start = time.perf_counter()
+            delivered = asyncio.run(_upload(stub, items))
+            elapsed = time.perf_counter() - start
+            print(f"{label:>14}: {delivered} events in {elapsed:.2f}s "
+                  f"({delivered / elapsed:.0f} events/s, {stub.requests} requests)")
+        finally:
+            stub.close()
+
+
+if __name__ == "__main__":
+    run_all_tests()
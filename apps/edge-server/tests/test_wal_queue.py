@@ -0,0 +1,149 @@
+"""
+Offline Queue (WAL) Tests
+Recovery, cursor, compaction and drop policy, plus an append benchmark
+
+Run with pytest or directly for the 1M-item benchmark:
+    python tests/test_wal_queue.py [items]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.wal_queue import WALQueue
+
+
+def make_queue(directory: str, **kwargs) -> WALQueue:
+    options = dict(segment_bytes=64 * 1024, max_bytes=64 * 1024 * 1024, group_size=32, flush_interval=0.05, fsync=False)
+    options.update(kwargs)
+    return WALQueue(directory, **options)
+
+
+def test_fifo_cursor_and_recovery():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        for i in range(1000):
+            queue.add('event', {'n': i})
+        assert queue.size == 1000
+        assert [item['data']['n'] for item in queue.peek(3)] == [0, 1, 2]
+
+        queue.remove(400)
+        assert queue.peek(1)[0]['data']['n'] == 400
+        queue.close()
+
+        reopened = make_queue(tmp)
+        assert reopened.size == 600
+        assert reopened.peek(1)[0]['data']['n'] == 400
+        reopened.add('alert', {'n': 1000, 'severity': 'high'})
+        items = reopened.get_pending()
+        assert len(items) == 601 and items[-1]['data']['n'] == 1000
+        reopened.close()
+
+
+def test_compaction_deletes_consumed_segments():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, segment_bytes=4 * 1024)
+        for i in range(5000):
+            queue.add('event', {'n': i, 'payload': 'x' * 50})
+        queue.flush()
+        segments = queue.get_stats()['segments']
+        assert segments > 3
+
+        queue.remove(4990)
+        assert queue.get_stats()['segments'] < segments
+        assert [item['data']['n'] for item in queue.peek(10)] == list(range(4990, 5000))
+        queue.close()
+
+
+def test_torn_tail_is_truncated():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        for i in range(100):
+            queue.add('event', {'n': i})
+        queue.close()
+
+        segment = sorted(p for p in os.listdir(tmp) if p.endswith('.wal'))[-1]
+        with open(os.path.join(tmp, segment), 'ab') as f:
+            f.write(b'WALQ\x00garbage from a crash mid-write')
+
+        reopened = make_queue(tmp)
+        assert reopened.size == 100
+        assert reopened.get_stats()['truncated_bytes'] > 0
+        reopened.add('event', {'n': 100})
+        assert reopened.get_pending()[-1]['data']['n'] == 100
+        reopened.close()
+
+
+def test_budget_drops_low_severity_first():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, segment_bytes=8 * 1024, max_bytes=64 * 1024)
+        for i in range(3000):
+            queue.add('alert', {'n': i, 'severity': 'critical', 'pad': os.urandom(8).hex()})
+            queue.add('event', {'n': i, 'pad': os.urandom(16).hex()})
+        queue.flush()
+
+        stats = queue.get_stats()
+        items = queue.get_pending()
+        critical = [item for item in items if item['data'].get('severity') == 'critical']
+        assert stats['dropped']['info'] > 0
+        assert len(critical) == 3000, "critical alerts must never be dropped"
+        assert [item['data']['n'] for item in critical] == list(range(3000))
+        queue.close()
+
+
+def test_append_cost_is_constant():
+    """Appends late in a large backlog cost about the same as early ones"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, segment_bytes=8 * 1024 * 1024, max_bytes=1 << 40, group_size=64)
+        timings = append_benchmark(queue, 100000, chunk=20000)
+        queue.close()
+    assert timings[-1] < timings[0] * 3
+
+
+def append_benchmark(queue: WALQueue, items: int, chunk: int):
+    """Append items, returning the mean cost in microseconds of each chunk"""
+    data = {'camera_id': 'cam-1', 'type': 'person_detected', 'confidence': 0.91, 'bbox': [10, 20, 30, 40]}
+    timings = []
+    for start in range(0, items, chunk):
+        t = time.perf_counter()
+        for _ in range(chunk):
+            queue.add('event', data)
+        timings.append((time.perf_counter() - t) * 1e6 / chunk)
+    return timings
+
+
+def run_all_tests():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print("=" * 60)
+    print("OFFLINE QUEUE (WAL) TESTS")
+    print("=" * 60)
+    for test in (
+        test_fifo_cursor_and_recovery,
+        test_compaction_deletes_consumed_segments,
+        test_torn_tail_is_truncated,
+        test_budget_drops_low_severity_first,
+    ):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, segment_bytes=8 * 1024 * 1024, max_bytes=1 << 40, group_size=64)
+        chunk = max(1, items // 10)
+        timings = append_benchmark(queue, items, chunk)
+        queue.flush()
+        stats = queue.get_stats()
+        print(f"\nAppended {items} items: {stats['bytes'] / 1e6:.1f} MB in {stats['segments']} segments")
+        for i, us in enumerate(timings):
+            print(f"  items {i * chunk:>8}-{(i + 1) * chunk:>8}: {us:.2f} us/append")
+
+        t = time.perf_counter()
+        reopened = make_queue(tmp)
+        queue.close()
+        print(f"Recovery of {reopened.size} items: {(time.perf_counter() - t) * 1000:.0f} ms")
+        reopened.close()
+
+
+if __name__ == "__main__":
+    run_all_tests()
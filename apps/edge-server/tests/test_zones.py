@@ -0,0 +1,127 @@
+"""
+Zone Geometry Tests
+Compiled label-mask lookups against the exact polygon test, and lookup cost per zone count
+
+Run with pytest or directly:
+    python tests/test_zones.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ai.modules.market.shelf_interaction import ShelfInteractionDetector
+from app.ai.zones import ZoneCache, ZoneMap, named_polygons, points_in_polygon
+
+
+def shelf_grid(count: int, width: int = 1920, height: int = 1080) -> dict:
+    """`count` non-overlapping quadrilateral shelf zones tiled over the frame"""
+    columns = int(np.ceil(np.sqrt(count)))
+    rows = int(np.ceil(count / columns))
+    w, h = width / columns, height / rows
+    zones = {}
+    for i in range(count):
+        x, y = (i % columns) * w, (i // columns) * h
+        zones[f'shelf_{i}'] = [[x + 2, y + 2], [x + w - 2, y + 6], [x + w - 6, y + h - 2], [x + 4, y + h - 4]]
+    return zones
+
+
+def exact_zones(zones, points):
+    """Zone names per point with the per-polygon even-odd test"""
+    inside = [(name, points_in_polygon(points, polygon)) for name, polygon in named_polygons(zones)]
+    return [tuple(name for name, mask in inside if mask[i]) for i in range(len(points))]
+
+
+def lookup_ms(zone_map: ZoneMap, points: np.ndarray, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        zone_map.zones_at(points)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def test_matches_exact_polygon_test():
+    """Full-resolution and downscaled masks agree with the exact test away from zone borders"""
+    zones = {
+        'entrance': [[100, 80], [400, 60], [380, 300], [90, 320]],
+        'shelf_a': [[300, 200], [700, 220], [650, 500], [320, 480]],  # overlaps entrance
+        'triangle': [[800, 100], [1100, 600], [600, 650]],
+    }
+    rng = np.random.default_rng(0)
+    points = rng.uniform([0, 0], [1280, 720], (3000, 2)).astype(np.float32)
+    expected = exact_zones(zones, points)
+
+    for width in (0, 320):
+        zone_map = ZoneMap(zones, width=width)
+        tolerance = 2.0 / zone_map.scale  # one mask pixel on either side of a border
+        nudged = [exact_zones(zones, points + offset) for offset in
+                  ((tolerance, 0), (-tolerance, 0), (0, tolerance), (0, -tolerance))]
+        for i, names in enumerate(zone_map.zones_at(points)):
+            if all(n[i] == expected[i] for n in nudged):
+                assert set(names) == set(expected[i]), (width, points[i])
+    assert ('entrance', 'shelf_a') in ZoneMap(zones).label_zones
+
+
+def test_zone_formats_and_empty():
+    as_list = [{'name': 'door', 'points': [{'x': 0, 'y': 0}, {'x': 50, 'y': 0}, {'x': 50, 'y': 50}, {'x': 0, 'y': 50}]}]
+    assert ZoneMap(as_list).zones_at([[25, 25], [75, 25], [-5, 10]]) == [('door',), (), ()]
+    assert ZoneMap([[[10, 10], [20, 10], [20, 20]]]).names == ['zone_0']
+    empty = ZoneMap(None)
+    assert not empty and empty.zones_at([[1, 1]]) == [()]
+
+
+def test_cache_compiles_on_change():
+    cache = ZoneCache(include=lambda name: name.startswith('shelf'))
+    zones = shelf_grid(4, 200, 200)
+    zones['exit'] = [[0, 0], [200, 0], [200, 200], [0, 200]]
+    compiled = cache.get('cam', zones)
+    assert compiled.names == ['shelf_0', 'shelf_1', 'shelf_2', 'shelf_3']
+    assert cache.get('cam', zones) is compiled
+    assert cache.get('cam') is compiled, "no zones in the metadata keeps the last ones"
+    assert cache.get('cam', dict(zones)) is not compiled
+
+
+def test_shelf_interaction_uses_compiled_zones():
+    detector = ShelfInteractionDetector(interaction_time=0.0)
+    shelves = ZoneMap({'shelf_drinks': [[0, 0], [400, 0], [400, 300], [0, 300]]})
+    person = {'track_id': 7, 'bbox': [100, 0, 100, 250], 'zones': {'shelf_drinks'}}
+    bottle = {'bbox': [135, 150, 30, 50], 'center': (150, 175), 'confidence': 0.6, 'class_id': 39}
+    off_shelf = dict(bottle, center=(150, 350))
+
+    assert detector.process_frame(None, 'cam', [person], shelves, objects=[off_shelf]) == []
+    detector.process_frame(None, 'cam', [person], shelves, objects=[bottle])
+    picks = detector.process_frame(None, 'cam', [person], shelves, objects=[bottle])
+    assert [(p['track_id'], p['shelf_zone']) for p in picks] == [(7, 'shelf_drinks')]
+
+
+def test_lookup_cost_independent_of_zone_count():
+    points = np.random.default_rng(1).uniform([0, 0], [1920, 1080], (50, 2))
+    timings = {}
+    for count in (2, 200):
+        start = time.perf_counter()
+        zone_map = ZoneMap(shelf_grid(count))
+        compile_ms = (time.perf_counter() - start) * 1000
+        timings[count] = lookup_ms(zone_map, points)
+        print(f"\n{count} zones: compile {compile_ms:.1f}ms, lookup {timings[count] * 1000:.1f}us per 50 points")
+    assert timings[200] < timings[2] * 3
+
+
+def run_all_tests():
+    print("=" * 60)
+    print("ZONE GEOMETRY TESTS")
+    print("=" * 60)
+    for test in (
+        test_matches_exact_polygon_test,
+        test_zone_formats_and_empty,
+        test_cache_compiles_on_change,
+        test_shelf_interaction_uses_compiled_zones,
+        test_lookup_cost_independent_of_zone_count,
+    ):
+        test()
+        print(f"[PASS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    run_all_tests()